@@ -0,0 +1,25 @@
+"""add file content hash
+
+Revision ID: 3b8e1f5c2a47
+Revises: 5ffaf739f376
+Create Date: 2026-10-18 10:12:31.402118
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = '3b8e1f5c2a47'
+down_revision = '5ffaf739f376'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('knowledge_base_files', sa.Column('content_hash', sa.String(), nullable=True))
+    op.add_column('persona_card_files', sa.Column('content_hash', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('persona_card_files', 'content_hash')
+    op.drop_column('knowledge_base_files', 'content_hash')
@@ -0,0 +1,163 @@
+"""add file blobs
+
+把知识库和人设卡文件迁移到按 SHA-256 寻址的 blob 目录并去重：
+相同内容只保留一份，文件记录的 content_hash 指向 blob，file_blobs 记录引用计数。
+磁盘上找不到的文件保持原样（content_hash 置空，仍按 base_path/file_path 读取）。
+
+迁移只复制文件，不删除：事务回滚时原文件仍在原处，重新执行会复用已复制的 blob。
+升级提交后运行 scripts/python/blob_migration_cleanup.py 删除原文件；降级后运行同一脚本删除 blob 目录。
+
+Revision ID: 8d2c4a6e9f13
+Revises: 3b8e1f5c2a47
+Create Date: 2026-10-18 14:36:05.517342
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+from datetime import datetime
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = '8d2c4a6e9f13'
+down_revision = '3b8e1f5c2a47'
+branch_labels = None
+depends_on = None
+
+# (文件表, 所属表, 外键列)
+FILE_TABLES = (
+    ('knowledge_base_files', 'knowledge_bases', 'knowledge_base_id'),
+    ('persona_card_files', 'persona_cards', 'persona_card_id'),
+)
+
+
+def _blob_dir() -> str:
+    base_dir = os.getenv("UPLOAD_DIR", "uploads") or "uploads"
+    if not (base_dir.startswith("/") or base_dir.startswith(".")):
+        base_dir = "./" + base_dir
+    return os.path.join(base_dir, "blobs")
+
+
+def _blob_path(content_hash: str) -> str:
+    return os.path.join(_blob_dir(), content_hash[:2], content_hash[2:4], content_hash)
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _copy_to_blob(source_path: str, blob_path: str) -> None:
+    """复制到临时文件后原子替换为 blob（中断时只留下以 "." 开头的临时文件，由 blob 垃圾回收删除）"""
+    directory = os.path.dirname(blob_path)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix=".blob-", suffix=".part", dir=directory)
+    os.close(fd)
+    try:
+        shutil.copyfile(source_path, temp_path)
+        os.replace(temp_path, blob_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def _file_rows(bind, table: str, parent_table: str, parent_fk: str):
+    return bind.execute(
+        sa.text(
+            f"SELECT f.id, f.file_path, f.content_hash, p.base_path FROM {table} f "
+            f"JOIN {parent_table} p ON p.id = f.{parent_fk}"
+        )
+    ).fetchall()
+
+
+def upgrade() -> None:
+    op.create_table('file_blobs',
+    sa.Column('hash', sa.String(), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('hash')
+    )
+    op.create_index('idx_file_blob_ref_count', 'file_blobs', ['ref_count'], unique=False)
+    op.create_index('idx_kb_file_content_hash', 'knowledge_base_files', ['content_hash'], unique=False)
+    op.create_index('idx_pc_file_content_hash', 'persona_card_files', ['content_hash'], unique=False)
+
+    bind = op.get_bind()
+    ref_counts: dict[str, int] = {}
+    sizes: dict[str, int] = {}
+
+    for table, parent_table, parent_fk in FILE_TABLES:
+        for file_id, file_path, _content_hash, base_path in _file_rows(bind, table, parent_table, parent_fk):
+            legacy_path = os.path.join(base_path or "", file_path or "")
+            if not base_path or not file_path or not os.path.isfile(legacy_path):
+                bind.execute(sa.text(f"UPDATE {table} SET content_hash = NULL WHERE id = :id"), {"id": file_id})
+                continue
+
+            content_hash = _hash_file(legacy_path)
+            blob_path = _blob_path(content_hash)
+            # 相同内容已复制过（同一次迁移中的重复文件，或上次失败的迁移留下）时直接复用
+            if not os.path.exists(blob_path):
+                _copy_to_blob(legacy_path, blob_path)
+
+            bind.execute(
+                sa.text(f"UPDATE {table} SET content_hash = :hash WHERE id = :id"),
+                {"hash": content_hash, "id": file_id},
+            )
+            ref_counts[content_hash] = ref_counts.get(content_hash, 0) + 1
+            sizes[content_hash] = os.path.getsize(blob_path)
+
+    now = datetime.now()
+    blobs = sa.table(
+        'file_blobs',
+        sa.column('hash', sa.String()),
+        sa.column('size', sa.Integer()),
+        sa.column('ref_count', sa.Integer()),
+        sa.column('created_at', sa.DateTime()),
+        sa.column('updated_at', sa.DateTime()),
+    )
+    if ref_counts:
+        op.bulk_insert(
+            blobs,
+            [
+                {"hash": h, "size": sizes[h], "ref_count": count, "created_at": now, "updated_at": now}
+                for h, count in ref_counts.items()
+            ],
+        )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+
+    # 把 blob 复制回各自的目录（同名文件存在时在文件名后加上记录 ID）
+    for table, parent_table, parent_fk in FILE_TABLES:
+        for file_id, file_path, content_hash, base_path in _file_rows(bind, table, parent_table, parent_fk):
+            if not content_hash or not base_path:
+                continue
+            blob_path = _blob_path(content_hash)
+            if not os.path.isfile(blob_path):
+                continue
+
+            target_path = os.path.join(base_path, file_path)
+            if os.path.exists(target_path):
+                name, ext = os.path.splitext(file_path)
+                file_path = f"{name}_{file_id}{ext}"
+                target_path = os.path.join(base_path, file_path)
+            os.makedirs(base_path, exist_ok=True)
+            shutil.copyfile(blob_path, target_path)
+            bind.execute(
+                sa.text(f"UPDATE {table} SET file_path = :file_path WHERE id = :id"),
+                {"file_path": file_path, "id": file_id},
+            )
+
+    op.drop_index('idx_pc_file_content_hash', table_name='persona_card_files')
+    op.drop_index('idx_kb_file_content_hash', table_name='knowledge_base_files')
+    op.drop_index('idx_file_blob_ref_count', table_name='file_blobs')
+    op.drop_table('file_blobs')
+    # blob 目录在降级提交后由 scripts/python/blob_migration_cleanup.py 删除
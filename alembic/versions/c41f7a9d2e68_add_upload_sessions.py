@@ -0,0 +1,46 @@
+"""add upload sessions
+
+可续传的知识库分块上传会话。
+
+Revision ID: c41f7a9d2e68
+Revises: 8d2c4a6e9f13
+Create Date: 2026-10-18 17:02:44.913205
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = 'c41f7a9d2e68'
+down_revision = '8d2c4a6e9f13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('upload_sessions',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('user_id', sa.String(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('description', sa.Text(), nullable=False),
+    sa.Column('copyright_owner', sa.String(), nullable=True),
+    sa.Column('content', sa.Text(), nullable=True),
+    sa.Column('tags', sa.Text(), nullable=True),
+    sa.Column('is_public', sa.Boolean(), nullable=True),
+    sa.Column('files', sa.Text(), nullable=False),
+    sa.Column('chunk_size', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('knowledge_base_id', sa.String(), nullable=True),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_upload_session_user_id', 'upload_sessions', ['user_id'], unique=False)
+    op.create_index('idx_upload_session_expires_at', 'upload_sessions', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_upload_session_expires_at', table_name='upload_sessions')
+    op.drop_index('idx_upload_session_user_id', table_name='upload_sessions')
+    op.drop_table('upload_sessions')
@@ -0,0 +1,27 @@
+"""add file compression
+
+知识库文件的静态压缩编码和存储中的大小。
+
+Revision ID: e7a3c9d15b20
+Revises: c41f7a9d2e68
+Create Date: 2026-10-19 09:24:17.563208
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = 'e7a3c9d15b20'
+down_revision = 'c41f7a9d2e68'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('knowledge_base_files', sa.Column('content_encoding', sa.String(), nullable=True))
+    op.add_column('knowledge_base_files', sa.Column('stored_size', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('knowledge_base_files', 'stored_size')
+    op.drop_column('knowledge_base_files', 'content_encoding')
@@ -60,7 +60,8 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    # 从数据库获取用户
+    # 从数据库获取用户（不经实体缓存：角色和密码版本必须是最新的，
+    # 批量更新、原生 SQL 或其他进程的修改不会更新实体版本）
     user_service = UserService(db)
     user = user_service.get_user_by_id(user_id)
 
@@ -170,7 +171,8 @@ async def get_current_user_optional(
     if not user_id:
         return None
 
-    # 从数据库获取用户
+    # 从数据库获取用户（不经实体缓存：角色和密码版本必须是最新的，
+    # 批量更新、原生 SQL 或其他进程的修改不会更新实体版本）
     user_service = UserService(db)
     user = user_service.get_user_by_id(user_id)
 
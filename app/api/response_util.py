@@ -1,11 +1,52 @@
 """响应工具模块 - 提供统一的API响应格式化函数"""
 
-from typing import TypeVar
+import os
+from collections.abc import Iterator, Mapping
+from typing import Any, TypeVar
+from urllib.parse import quote
 
+from fastapi.responses import FileResponse, RedirectResponse, Response, StreamingResponse
+from starlette.types import Message, Send
+
+from app.core.config import settings
+from app.core.storage import StorageBackend
 from app.models.schemas import BaseResponse, PageResponse, Pagination
+from app.services.archive_cache import archive_etag, get_archive_cache
+from app.services.blob_store import resolve_upload_dir
+from app.utils.compression import accepts_encoding, iter_decompress
+from app.utils.file_io import aiter_file_io, run_file_io
+from app.utils.zip_stream import content_disposition
 
 T = TypeVar("T")
 
+# 文件下载方式（[storage.download] mode）
+DOWNLOAD_MODE_PROXY = "proxy"  # 应用进程发送文件内容
+DOWNLOAD_MODE_REDIRECT = "redirect"  # 重定向到对象存储的预签名地址（不支持的后端按 proxy 处理）
+DOWNLOAD_MODE_X_ACCEL = "x-accel-redirect"  # nginx 内部跳转到 accel_prefix + 对象键
+DOWNLOAD_MODE_X_SENDFILE = "x-sendfile"  # 由 Web 服务器发送本机文件（远程存储中的文件按 proxy 处理）
+
+
+class RangeFileResponse(FileResponse):
+    """修正多范围响应头的 FileResponse
+
+    Starlette 把 multipart/byteranges 写入了 Content-Range 而不是 Content-Type，
+    客户端无法按分隔符解析响应体；发送响应头之前把它移回 Content-Type。
+    """
+
+    async def _handle_multiple_ranges(
+        self, send: Send, ranges: list[tuple[int, int]], file_size: int, send_header_only: bool
+    ) -> None:
+        async def send_with_content_type(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                content_range = self.headers.get("content-range", "")
+                if content_range.startswith("multipart/byteranges"):
+                    del self.headers["content-range"]
+                    self.headers["content-type"] = content_range
+                    message = {**message, "headers": self.raw_headers}
+            await send(message)
+
+        await super()._handle_multiple_ranges(send_with_content_type, ranges, file_size, send_header_only)
+
 
 def success(message: str | None = None, data: T | None = None) -> BaseResponse[T | None]:
     """创建成功响应
@@ -56,6 +97,250 @@ def page(data: list[T], page: int, page_size: int, total: int, message: str | No
     return PageResponse[T](success=True, message=message or "", data=data, pagination=pagination)
 
 
+async def archive_response(
+    kind: str, item_id: str, zip_result: dict[str, Any], range_header: str | None = None
+) -> Response:
+    """创建打包下载响应
+
+    已缓存的压缩包直接发送文件（FileResponse 处理 Range / If-Range，返回 206 部分内容）；
+    否则边压缩边发送，同时写入打包下载缓存。带有 Range 的请求在缓存未命中时先完整生成压缩包，再按范围发送。
+    两种情况都带有按打包内容版本计算的强 ETag。
+
+    Args:
+        kind: 条目类型（knowledge / persona）
+        item_id: 知识库或人设卡ID
+        zip_result: create_knowledge_base_zip / create_persona_card_zip 的返回值
+        range_header: 请求的 Range 头（可选）
+
+    Returns:
+        Response: 文件下载响应
+    """
+    headers = {
+        "Content-Disposition": content_disposition(zip_result["zip_filename"]),
+        "ETag": archive_etag(zip_result["version"]),
+    }
+    archive_path = zip_result.get("archive_path")
+    if not archive_path and range_header:
+        archive_path = await run_file_io(
+            "build_zip", get_archive_cache().build, kind, item_id, zip_result["version"], zip_result["entries"]
+        )
+    if archive_path:
+        offload = _offload_headers(_upload_relpath(archive_path), archive_path)
+        if offload:
+            return Response(media_type="application/zip", headers={**headers, **offload})
+        return RangeFileResponse(archive_path, media_type="application/zip", headers=headers)
+
+    chunks = get_archive_cache().stream(kind, item_id, zip_result["version"], zip_result["entries"])
+    return StreamingResponse(chunks, media_type="application/zip", headers={**headers, "Accept-Ranges": "bytes"})
+
+
+def _upload_relpath(path: str) -> str | None:
+    """本机文件相对上传目录的路径（与本地存储后端的对象键一致），不在上传目录中时返回 None"""
+    relpath = os.path.relpath(os.path.abspath(path), os.path.abspath(resolve_upload_dir()))
+    if relpath.startswith(".."):
+        return None
+    return relpath.replace(os.sep, "/")
+
+
+def _offload_headers(key: str | None, local_path: str | None) -> dict[str, str] | None:
+    """由 Web 服务器发送文件的响应头（X-Accel-Redirect / X-Sendfile），未启用或不适用时返回 None
+
+    Args:
+        key: 对象键（本机文件为相对上传目录的路径）
+        local_path: 本机文件路径（远程存储中的文件为 None）
+
+    Returns:
+        dict | None: 响应头
+    """
+    mode = settings.STORAGE_DOWNLOAD_MODE
+    if mode == DOWNLOAD_MODE_X_ACCEL and key:
+        return {"X-Accel-Redirect": settings.STORAGE_ACCEL_PREFIX.rstrip("/") + "/" + quote(key)}
+    if mode == DOWNLOAD_MODE_X_SENDFILE and local_path:
+        return {"X-Sendfile": os.path.abspath(local_path)}
+    return None
+
+
+def _byte_range(headers: Mapping[str, str], etag: str, size: int) -> tuple[int, int] | None:
+    """解析单个字节范围（多范围请求和 If-Range 不匹配时返回 None，按完整内容发送）
+
+    Raises:
+        ValueError: 范围无法满足（416）
+    """
+    range_header = headers.get("range")
+    if not range_header or headers.get("if-range", etag).strip() != etag:
+        return None
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        if first:
+            start, end = int(first), int(last) if last else size - 1
+        else:
+            start, end = max(size - int(last), 0), size - 1
+    except ValueError:
+        return None
+    end = min(end, size - 1)
+    if start > end:
+        raise ValueError(f"无法满足的范围: {range_header}")
+    return start, end
+
+
+def file_download_response(path: str, filename: str, content_hash: str | None = None) -> Response:
+    """创建本机文件下载响应（FileResponse 处理 Range / If-Range，支持断点续传和多范围请求）
+
+    按内容存储的文件以 SHA-256 作为强 ETag；旧文件使用 FileResponse 按修改时间和大小生成的 ETag。
+    启用 x-accel-redirect / x-sendfile 时只返回响应头，由 Web 服务器发送文件。
+
+    Args:
+        path: 文件路径
+        filename: 下载文件名
+        content_hash: 文件内容的 SHA-256（可选）
+
+    Returns:
+        Response: 文件下载响应
+    """
+    headers = {"ETag": f'"{content_hash}"'} if content_hash else {}
+    offload = _offload_headers(_upload_relpath(path), path)
+    if offload:
+        headers.update(offload, **{"Content-Disposition": content_disposition(filename)})
+        return Response(media_type="application/octet-stream", headers=headers)
+    return RangeFileResponse(
+        path=path, filename=filename, media_type="application/octet-stream", headers=headers or None
+    )
+
+
+async def stored_file_response(
+    storage: StorageBackend,
+    key: str,
+    filename: str,
+    content_hash: str,
+    request_headers: Mapping[str, str],
+    content_encoding: str | None = None,
+    size: int | None = None,
+) -> Response:
+    """创建存储后端中 blob 的下载响应
+
+    按 [storage.download] mode 选择发送方式：重定向到预签名地址、交给 Web 服务器发送，
+    或由应用进程发送（本地文件使用 FileResponse；远程对象流式转发，支持单个字节范围的断点续传）。
+    压缩保存的 blob 始终由应用进程发送，见 _encoded_file_response。
+
+    Args:
+        storage: 存储后端
+        key: blob 的对象键
+        filename: 下载文件名
+        content_hash: 文件内容的 SHA-256（用作强 ETag）
+        request_headers: 请求头（读取 Range / If-Range / Accept-Encoding）
+        content_encoding: 压缩保存的编码（可选）
+        size: 原始大小（压缩保存时必需）
+
+    Returns:
+        Response: 文件下载响应
+
+    Raises:
+        FileNotFoundError: blob 不存在
+    """
+    stat = await run_file_io("stat_blob", storage.stat, key)
+    if stat is None:
+        raise FileNotFoundError(key)
+
+    if content_encoding:
+        return _encoded_file_response(
+            storage, key, filename, content_hash, request_headers, content_encoding, size or 0, stat.size
+        )
+
+    if settings.STORAGE_DOWNLOAD_MODE == DOWNLOAD_MODE_REDIRECT:
+        url = storage.presigned_url(key, settings.STORAGE_PRESIGN_EXPIRES_SECONDS, filename)
+        if url:
+            return RedirectResponse(url)
+
+    local_path = storage.local_path(key)
+    if local_path is not None:
+        return file_download_response(local_path, filename, content_hash)
+
+    etag = f'"{content_hash}"'
+    headers = {"ETag": etag, "Content-Disposition": content_disposition(filename)}
+    offload = _offload_headers(key, None)
+    if offload:
+        return Response(media_type="application/octet-stream", headers={**headers, **offload})
+
+    headers["Accept-Ranges"] = "bytes"
+    try:
+        byte_range = _byte_range(request_headers, etag, stat.size)
+    except ValueError:
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{stat.size}"})
+    if byte_range is None:
+        start, end, status_code = 0, stat.size - 1, 200
+    else:
+        (start, end), status_code = byte_range, 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{stat.size}"
+    headers["Content-Length"] = str(end - start + 1)
+
+    chunks = aiter_file_io("stream_blob", storage.iter_range(key, start, end) if stat.size else iter(()))
+    return StreamingResponse(chunks, status_code=status_code, media_type="application/octet-stream", headers=headers)
+
+
+def _encoded_file_response(
+    storage: StorageBackend,
+    key: str,
+    filename: str,
+    content_hash: str,
+    request_headers: Mapping[str, str],
+    encoding: str,
+    size: int,
+    stored_size: int,
+) -> Response:
+    """创建压缩保存的 blob 的下载响应
+
+    客户端接受该编码且不是范围请求时直接发送保存的内容（带 Content-Encoding，ETag 区分编码）；
+    否则边读边解压，按原始内容处理单个字节范围。预签名地址和 Web 服务器发送的是压缩内容，
+    无法按客户端协商编码，因此不使用重定向和 X-Accel-Redirect / X-Sendfile。
+    """
+    headers = {
+        "Content-Disposition": content_disposition(filename),
+        "Accept-Ranges": "bytes",
+        "Vary": "Accept-Encoding",
+    }
+    if accepts_encoding(request_headers.get("accept-encoding"), encoding) and not request_headers.get("range"):
+        headers.update(
+            {
+                "ETag": f'"{content_hash}-{encoding}"',
+                "Content-Encoding": encoding,
+                "Content-Length": str(stored_size),
+            }
+        )
+        chunks = aiter_file_io("stream_blob", storage.iter_range(key))
+        return StreamingResponse(chunks, media_type="application/octet-stream", headers=headers)
+
+    etag = f'"{content_hash}"'
+    headers["ETag"] = etag
+    try:
+        byte_range = _byte_range(request_headers, etag, size)
+    except ValueError:
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+    if byte_range is None:
+        start, end, status_code = 0, size - 1, 200
+    else:
+        (start, end), status_code = byte_range, 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+
+    chunks = aiter_file_io("decompress_blob", _iter_decoded_range(storage, key, encoding, start, end))
+    return StreamingResponse(chunks, status_code=status_code, media_type="application/octet-stream", headers=headers)
+
+
+def _iter_decoded_range(storage: StorageBackend, key: str, encoding: str, start: int, end: int) -> Iterator[bytes]:
+    """边读边解压，产出原始内容的 [start, end] 字节（解压流不能跳转，范围之前的内容解压后丢弃）"""
+    offset = 0
+    for chunk in iter_decompress(storage.iter_range(key), encoding):
+        chunk_end = offset + len(chunk)
+        if chunk_end > start:
+            yield chunk[max(start - offset, 0) : end + 1 - offset]
+        offset = chunk_end
+        if offset > end:
+            return
+
+
 # 向后兼容的别名（已弃用，请使用小写版本）
 Success = success
 Error = error
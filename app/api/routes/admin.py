@@ -18,6 +18,7 @@ from sqlalchemy.orm import Session
 
 from app.api.deps import get_current_user
 from app.api.response_util import Page, Success
+from app.core.cache import get_cache_analytics
 from app.core.database import get_db
 from app.core.error_handlers import ConflictError, DatabaseError, NotFoundError, ValidationError
 
@@ -1089,7 +1090,7 @@ async def create_user_by_admin(
 async def get_cache_stats(current_user: dict = Depends(get_current_user)):
     """获取缓存统计信息（仅限admin）
 
-    返回缓存命中率、降级次数、降级原因等统计数据。
+    返回缓存命中率、降级次数、降级原因等统计数据，analytics 字段为按键前缀 / 路由模板的细分统计和热点键。
 
     Args:
         current_user: 当前用户信息
@@ -1136,6 +1137,7 @@ async def get_cache_stats(current_user: dict = Depends(get_current_user)):
                     "total_cached_requests": 0,
                     "hit_rate": "0.00%",
                     "cache_enabled": False,
+                    "analytics": get_cache_analytics().get_stats(),
                     "message": "缓存中间件未启用或未找到",
                 }
             )
@@ -17,12 +17,12 @@ from sqlalchemy.orm import Session
 
 from app.api.deps import get_current_user
 from app.api.response_util import Success
+from app.core.cache.factory import get_cache_manager
 from app.core.cache.invalidation import invalidate_comment_cache
 from app.core.database import get_db
 from app.core.error_handlers import APIError, AuthorizationError, NotFoundError, ValidationError
 from app.core.logging import app_logger, log_exception
 from app.models.database import Comment, CommentReaction, KnowledgeBase, PersonaCard, User
-from app.utils.websocket import message_ws_manager
 
 router = APIRouter()
 
@@ -56,12 +56,7 @@ async def get_comments(
 
         comments = query.all()
 
-        user_ids = list({c.user_id for c in comments})
-        users = {}
-        if user_ids:
-            user_list = db.query(User).filter(User.id.in_(user_ids)).all()
-            for u in user_list:
-                users[u.id] = u
+        users = await _load_comment_authors(db, [c.user_id for c in comments])
 
         current_user_id = str(current_user.get("id")) if current_user.get("id") else None
         reactions_map = {}
@@ -80,13 +75,13 @@ async def get_comments(
 
         result: list[dict] = []
         for c in comments:
-            user = users.get(c.user_id)
+            author = users.get(c.user_id) or {}
             result.append(
                 {
                     "id": c.id,
                     "userId": c.user_id,
-                    "username": user.username if user else "",
-                    "avatarUpdatedAt": user.avatar_updated_at.isoformat() if user and user.avatar_updated_at else None,
+                    "username": author.get("username", ""),
+                    "avatarUpdatedAt": author.get("avatarUpdatedAt"),
                     "parentId": c.parent_id,
                     "content": c.content,
                     "createdAt": c.created_at.isoformat() if c.created_at else None,
@@ -102,6 +97,44 @@ async def get_comments(
         raise APIError("获取评论失败") from e
 
 
+# 评论作者摘要的缓存时间（秒）
+COMMENT_AUTHOR_CACHE_TTL = 600
+
+
+async def _load_comment_authors(db: Session, user_ids: list[str]) -> dict[str, dict]:
+    """批量加载评论作者摘要（用户名、头像更新时间）
+
+    先批量读取缓存，未命中的作者合并为一次 IN 查询。
+
+    Args:
+        db: 数据库会话
+        user_ids: 作者ID列表（可重复）
+
+    Returns:
+        dict: {user_id: {"username", "avatarUpdatedAt"}}，不存在的用户不包含在内
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    if not user_ids:
+        return {}
+
+    cache_manager = get_cache_manager()
+    key_to_id = {cache_manager.build_key("comment_author", uid): uid for uid in user_ids}
+
+    def fetch_missing(keys: list[str]) -> dict[str, dict]:
+        rows = db.query(User).filter(User.id.in_([key_to_id[key] for key in keys])).all()
+        by_id = {
+            u.id: {
+                "username": u.username,
+                "avatarUpdatedAt": u.avatar_updated_at.isoformat() if u.avatar_updated_at else None,
+            }
+            for u in rows
+        }
+        return {key: by_id.get(key_to_id[key]) for key in keys}
+
+    cached = await cache_manager.get_many_cached(list(key_to_id), fetch_missing, ttl=COMMENT_AUTHOR_CACHE_TTL)
+    return {uid: cached[key] for key, uid in key_to_id.items() if cached.get(key) is not None}
+
+
 def _validate_comment_input(content: str, target_type: str, target_id: Any) -> str:
     """验证评论输入参数
 
@@ -352,10 +385,6 @@ async def create_comment(
         # 失效评论缓存
         invalidate_comment_cache()
 
-        # 广播WebSocket更新
-        if recipients:
-            await message_ws_manager.broadcast_user_update(recipients)
-
         # 返回响应
         return Success(message="发表评论成功", data=_build_comment_response(comment, user))
 
@@ -606,7 +635,6 @@ async def _send_reaction_notification(
         )
         db.add(message)
         db.commit()
-        await message_ws_manager.broadcast_user_update({recipient_id})
     except Exception:
         pass
 
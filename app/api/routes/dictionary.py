@@ -12,6 +12,7 @@ from typing import Any
 from fastapi import APIRouter
 
 from app.api.response_util import Success
+from app.core.cache.policy import cache_policy
 from app.core.logging import app_logger
 
 router = APIRouter()
@@ -68,6 +69,7 @@ def _load_translation_dict() -> dict[str, Any]:
 
 
 @router.get("/translation")
+@cache_policy(ttl=3600)
 async def get_translation_dictionary():
     """获取翻译字典
 
@@ -2,7 +2,7 @@
 知识库路由模块
 
 处理知识库相关的API端点，包括：
-- 上传知识库
+- 上传知识库（一次性上传或可续传的分块上传）
 - 查询知识库（公开、个人、详情）
 - 编辑知识库
 - 删除知识库
@@ -13,13 +13,15 @@
 import os
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile
+from fastapi import APIRouter, Depends, File, Form, Header, HTTPException, Query, Request, UploadFile
 from fastapi import status as http_status
-from fastapi.responses import FileResponse
+from fastapi.responses import Response
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_current_user
-from app.api.response_util import Page, Success
+from app.api.response_util import Page, Success, archive_response, file_download_response, stored_file_response
+from app.core.cache.id_filter import get_existence_filter
+from app.core.cache.policy import cache_policy
 from app.core.database import get_db
 from app.core.error_handlers import (
     APIError,
@@ -33,10 +35,20 @@ from app.core.error_handlers import (
 
 # 导入错误处理和日志记录模块
 from app.core.logging import app_logger, log_database_operation, log_exception, log_file_operation
-from app.models.database import KnowledgeBase
-from app.models.schemas import KnowledgeBaseUpdate
+from app.models.database import KnowledgeBase, UploadSession
+from app.models.schemas import KnowledgeBaseUpdate, StarredBatchRequest, UploadSessionCreate
+from app.services.archive_cache import ARCHIVE_KIND_KNOWLEDGE, archive_etag, etag_matches, is_resume_request
 from app.services.file_service import FileDatabaseError, FileService, FileValidationError
 from app.services.knowledge_service import KnowledgeService
+from app.services.upload_session_service import (
+    SESSION_STATUS_COMMITTED,
+    UploadSessionConflictError,
+    UploadSessionNotFoundError,
+    UploadSessionService,
+    parse_upload_checksum,
+)
+from app.utils.file import StagedUpload, UploadTooLargeError, discard_staged, stage_uploads
+from app.utils.file_io import StageTimer, run_file_io
 
 # 创建路由器
 router = APIRouter()
@@ -100,20 +112,29 @@ async def upload_knowledge_base(
         if knowledge_service.check_duplicate_name(name, user_id):
             raise ValidationError("您已经创建过同名的知识库")
 
-        # 准备文件数据
-        file_data = await _prepare_file_data(files)
-
-        # 使用 FileService 上传知识库
+        # 准备文件数据（接收前先按文件名检查数量和类型）
         file_service = FileService(db)
-        kb = file_service.upload_knowledge_base(
-            files=file_data,
-            name=name,
-            description=description,
-            uploader_id=user_id,
-            copyright_owner=copyright_owner if copyright_owner else username,
-            content=content,
-            tags=tags,
-        )
+        file_service.validate_knowledge_file_types([file.filename for file in files])
+        timer = StageTimer("upload_knowledge_base")
+        with timer.stage("receive"):
+            file_data = await _prepare_file_data(files, file_service.staging_dir)
+
+        # 使用 FileService 上传知识库（移动文件和写入数据库在文件 I/O 线程池中执行）
+        try:
+            kb = await run_file_io(
+                "upload_knowledge_base",
+                file_service.upload_knowledge_base,
+                files=file_data,
+                name=name,
+                description=description,
+                uploader_id=user_id,
+                copyright_owner=copyright_owner if copyright_owner else username,
+                content=content,
+                tags=tags,
+                timer=timer,
+            )
+        finally:
+            discard_staged(staged for _, staged in file_data)
 
         # 设置知识库可见性状态
         _set_kb_visibility(kb, is_public, db)
@@ -124,7 +145,7 @@ async def upload_knowledge_base(
         # 记录数据库操作成功
         log_database_operation(app_logger, "create", "knowledge_base", record_id=kb.id, user_id=user_id, success=True)
 
-        return Success(message="知识库上传成功", data=kb_to_dict(kb))
+        return Success(message="知识库上传成功", data={**kb_to_dict(kb), "timings_ms": timer.as_dict()})
 
     except (ValidationError, FileOperationError, DatabaseError, HTTPException):
         raise
@@ -158,21 +179,32 @@ def _validate_upload_params(name: str, description: str, files: list[UploadFile]
         raise ValidationError("至少需要上传一个文件")
 
 
-async def _prepare_file_data(files: list[UploadFile]) -> list[tuple[str, bytes]]:
+async def _prepare_file_data(files: list[UploadFile], staging_dir: str) -> list[tuple[str, StagedUpload]]:
     """准备文件数据
 
+    按块把每个文件写入临时文件（同时计算 SHA-256），不把文件内容读入内存；最多 MAX_PARALLEL_FILES 个文件
+    同时处理。实际大小超过 MAX_FILE_SIZE 时立即停止，并删除所有已写入的临时文件。
+    调用方处理完后应调用 discard_staged 清理未使用的临时文件。
+
     Args:
         files: 上传的文件列表
+        staging_dir: 临时文件目录
 
     Returns:
-        文件数据列表，每个元素为 (文件名, 文件内容) 元组
+        文件数据列表，每个元素为 (文件名, 临时文件) 元组
+
+    Raises:
+        FileValidationError: 文件内容过大
     """
-    file_data: list[tuple[str, bytes]] = []
-    for file in files:
-        content_bytes = await file.read()
-        file_data.append((file.filename, content_bytes))
-        await file.seek(0)  # 重置文件指针以防后续使用
-    return file_data
+    try:
+        staged_files = await stage_uploads(
+            files, staging_dir, max_size=FileService.MAX_FILE_SIZE, concurrency=FileService.MAX_PARALLEL_FILES
+        )
+    except UploadTooLargeError as e:
+        raise FileValidationError(
+            f"文件过大: {e.filename}。最大允许{FileService.MAX_FILE_SIZE // (1024*1024)}MB", code="FILE_SIZE_EXCEEDED"
+        ) from e
+    return [(staged.filename, staged) for staged in staged_files]
 
 
 def _set_kb_visibility(kb: KnowledgeBase, is_public: bool, db: Session) -> None:
@@ -206,7 +238,250 @@ def _set_kb_visibility(kb: KnowledgeBase, is_public: bool, db: Session) -> None:
         raise DatabaseError("更新知识库可见性状态失败") from e
 
 
+# 可续传的分块上传（必须在 /{kb_id}/{file_id} 等通配路由之前注册）
+
+
+@router.post("/upload-sessions")
+async def create_upload_session(
+    payload: UploadSessionCreate,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """创建可续传的知识库上传会话
+
+    声明文件清单后按返回的 chunk_size 分块上传，全部上传后提交为知识库。
+    """
+    user_id = current_user.get("id", "")
+    try:
+        app_logger.info(f"Create upload session: user_id={user_id}, name={payload.name}, files={len(payload.files)}")
+
+        if not payload.name or not payload.description:
+            raise ValidationError("名称和描述不能为空")
+
+        if KnowledgeService(db).check_duplicate_name(user_id=user_id, name=payload.name):
+            raise ValidationError("您已经创建过同名的知识库")
+
+        session_service = UploadSessionService(db)
+        upload_session = await run_file_io(
+            "create_upload_session",
+            session_service.create_session,
+            user_id=user_id,
+            name=payload.name,
+            description=payload.description,
+            files=[file.model_dump() for file in payload.files],
+            copyright_owner=payload.copyright_owner,
+            content=payload.content,
+            tags=payload.tags,
+            is_public=payload.is_public,
+        )
+
+        log_database_operation(
+            app_logger, "create", "upload_session", record_id=upload_session.id, user_id=user_id, success=True
+        )
+        return Success(message="上传会话创建成功", data=session_service.get_progress(upload_session))
+
+    except (ValidationError, HTTPException):
+        raise
+    except FileValidationError as e:
+        raise ValidationError(e.message) from e
+    except Exception as e:
+        log_exception(app_logger, "Create upload session error", exception=e)
+        raise APIError("创建上传会话失败") from e
+
+
+@router.get("/upload-sessions/{session_id}")
+async def get_upload_session(
+    session_id: str, current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)
+):
+    """查询上传进度（每个文件已收到和缺少的分块）"""
+    try:
+        session_service = UploadSessionService(db)
+        upload_session = session_service.get_session(session_id, current_user.get("id", ""))
+        progress = await run_file_io("upload_session_progress", session_service.get_progress, upload_session)
+        return Success(message="获取上传进度成功", data=progress)
+    except UploadSessionNotFoundError as e:
+        raise NotFoundError(e.message) from e
+
+
+@router.put("/upload-sessions/{session_id}/files/{file_index}/chunks/{chunk_index}")
+async def upload_session_chunk(
+    session_id: str,
+    file_index: int,
+    chunk_index: int,
+    request: Request,
+    upload_offset: int = Header(..., description="分块在文件中的偏移量，必须等于 chunk_index * chunk_size"),
+    upload_checksum: str = Header(..., description='分块内容的校验和，格式为 "sha256 <十六进制摘要>"'),
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """上传一个分块（请求体为分块的原始字节）
+
+    同一分块可以重复上传（例如没收到响应时重试），不同分块可以并行上传。
+    """
+    user_id = current_user.get("id", "")
+    try:
+        checksum = parse_upload_checksum(upload_checksum)
+        session_service = UploadSessionService(db)
+        upload_session = session_service.get_session(session_id, user_id)
+        data = await _read_chunk_body(request, upload_session.chunk_size)
+        progress = await run_file_io(
+            "upload_session_chunk",
+            session_service.put_chunk,
+            upload_session,
+            file_index,
+            chunk_index,
+            upload_offset,
+            data,
+            checksum,
+        )
+        return Success(message="分块上传成功", data=progress)
+
+    except FileValidationError as e:
+        raise ValidationError(e.message, details=e.details or None) from e
+    except UploadSessionNotFoundError as e:
+        raise NotFoundError(e.message) from e
+    except UploadSessionConflictError as e:
+        raise ConflictError(e.message) from e
+
+
+async def _read_chunk_body(request: Request, max_size: int) -> bytes:
+    """读取分块请求体，超过分块大小时立即停止
+
+    Args:
+        request: 请求对象
+        max_size: 分块大小上限（字节）
+
+    Returns:
+        bytes: 分块内容
+
+    Raises:
+        FileValidationError: 请求体超过分块大小
+    """
+    body = bytearray()
+    async for chunk in request.stream():
+        body.extend(chunk)
+        if len(body) > max_size:
+            raise FileValidationError(f"分块过大，最大允许{max_size}字节", code="CHUNK_SIZE_MISMATCH")
+    return bytes(body)
+
+
+@router.post("/upload-sessions/{session_id}/commit")
+async def commit_upload_session(
+    session_id: str, current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)
+):
+    """提交上传会话：拼接所有分块并创建知识库
+
+    重复提交已完成的会话返回同一个知识库。
+    """
+    user_id = current_user.get("id", "")
+    try:
+        session_service = UploadSessionService(db)
+        upload_session = session_service.get_session(session_id, user_id)
+        committed_kb = _get_committed_kb(upload_session, user_id, db)
+        if committed_kb:
+            return Success(message="知识库上传成功", data=kb_to_dict(committed_kb))
+
+        app_logger.info(f"Commit upload session: session_id={session_id}, user_id={user_id}")
+
+        timer = StageTimer("commit_upload_session")
+        kb = await _create_kb_from_session(session_service, upload_session, current_user, timer, db)
+
+        # 设置知识库可见性状态
+        _set_kb_visibility(kb, upload_session.is_public, db)
+
+        log_file_operation(app_logger, "upload", f"knowledge_base/{kb.id}", user_id=user_id, success=True)
+        log_database_operation(app_logger, "create", "knowledge_base", record_id=kb.id, user_id=user_id, success=True)
+
+        return Success(message="知识库上传成功", data={**kb_to_dict(kb), "timings_ms": timer.as_dict()})
+
+    except (ValidationError, NotFoundError, DatabaseError, HTTPException):
+        raise
+    except UploadSessionNotFoundError as e:
+        raise NotFoundError(e.message) from e
+    except UploadSessionConflictError as e:
+        raise ConflictError(e.message) from e
+    except FileValidationError as e:
+        raise ValidationError(e.message) from e
+    except FileDatabaseError as e:
+        raise DatabaseError(e.message) from e
+    except Exception as e:
+        log_exception(app_logger, "Commit upload session error", exception=e)
+        log_file_operation(
+            app_logger, "upload", f"upload_session/{session_id}", user_id=user_id, success=False, error_message=str(e)
+        )
+        raise APIError("提交上传会话失败") from e
+
+
+def _get_committed_kb(upload_session: UploadSession, user_id: str, db: Session) -> KnowledgeBase | None:
+    """重复提交已完成的会话时返回已创建的知识库；尚未提交时检查知识库名称是否重复
+
+    Raises:
+        NotFoundError: 会话已提交但知识库已被删除
+        ValidationError: 用户已有同名知识库
+    """
+    knowledge_service = KnowledgeService(db)
+    if upload_session.status == SESSION_STATUS_COMMITTED:
+        kb = knowledge_service.get_knowledge_base_by_id(upload_session.knowledge_base_id)
+        if not kb:
+            raise NotFoundError("知识库不存在")
+        return kb
+
+    if knowledge_service.check_duplicate_name(user_id=user_id, name=upload_session.name):
+        raise ValidationError("您已经创建过同名的知识库")
+    return None
+
+
+async def _create_kb_from_session(
+    session_service: UploadSessionService,
+    upload_session: UploadSession,
+    current_user: dict,
+    timer: StageTimer,
+    db: Session,
+) -> KnowledgeBase:
+    """拼接会话的分块并创建知识库（都在文件 I/O 线程池中执行），失败时恢复会话状态"""
+    with timer.stage("assemble"):
+        file_data = await run_file_io("commit_upload_session", session_service.begin_commit, upload_session)
+    try:
+        kb = await run_file_io(
+            "upload_knowledge_base",
+            FileService(db).upload_knowledge_base,
+            files=file_data,
+            name=upload_session.name,
+            description=upload_session.description,
+            uploader_id=current_user.get("id", ""),
+            copyright_owner=upload_session.copyright_owner or current_user.get("username", ""),
+            content=upload_session.content,
+            tags=upload_session.tags,
+            timer=timer,
+        )
+    except BaseException:
+        session_service.abort_commit(upload_session)
+        raise
+    finally:
+        discard_staged(staged for _, staged in file_data)
+
+    await run_file_io("commit_upload_session", session_service.finish_commit, upload_session, kb.id)
+    return kb
+
+
+@router.delete("/upload-sessions/{session_id}")
+async def delete_upload_session(
+    session_id: str, current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)
+):
+    """取消上传会话，删除已上传的分块"""
+    try:
+        session_service = UploadSessionService(db)
+        upload_session = session_service.get_session(session_id, current_user.get("id", ""))
+        await run_file_io("delete_upload_session", session_service.delete_session, upload_session)
+        return Success(message="上传会话已取消")
+    except UploadSessionNotFoundError as e:
+        raise NotFoundError(e.message) from e
+    except UploadSessionConflictError as e:
+        raise ConflictError(e.message) from e
+
+
 @router.get("/public")
+@cache_policy(ttl=300, tags=["knowledge:public"], stale_while_revalidate=60)
 async def get_public_knowledge_bases(
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(20, ge=1, le=100, description="每页数量"),
@@ -244,17 +519,29 @@ async def get_public_knowledge_bases(
 
 
 @router.get("/{kb_id}")
-async def get_knowledge_base(kb_id: str, db: Session = Depends(get_db)):
+@cache_policy(
+    ttl=300,
+    tags=["knowledge:{kb_id}"],
+    stale_while_revalidate=60,
+    must_exist={"kb_id": "knowledge"},
+    versioned={"kb_id": "knowledge"},
+)
+async def get_knowledge_base(kb_id: str, request: Request, db: Session = Depends(get_db)):
     """获取知识库基本信息"""
     try:
         app_logger.info(f"Get knowledge base: kb_id={kb_id}")
 
+        id_filter = get_existence_filter()
+        if not id_filter.might_exist_in_request(request, "knowledge", kb_id):
+            raise NotFoundError("知识库不存在")
+
         # 使用服务层
         knowledge_service = KnowledgeService(db)
 
         # 检查知识库是否存在
         kb = knowledge_service.get_knowledge_base_by_id(kb_id)
         if not kb:
+            id_filter.report_missing("knowledge", kb_id)
             raise NotFoundError("知识库不存在")
 
         kb_dict = kb_to_dict(kb)
@@ -285,6 +572,27 @@ async def get_knowledge_base(kb_id: str, db: Session = Depends(get_db)):
         raise APIError("获取知识库失败") from e
 
 
+@router.post("/starred/batch")
+async def check_knowledge_starred_batch(
+    body: StarredBatchRequest, current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)
+):
+    """批量检查知识库是否已被当前用户Star（列表页一次请求检查全部卡片）"""
+    user_id = current_user.get("id", "")
+    try:
+        app_logger.info(f"Check knowledge starred batch: count={len(body.ids)}, user_id={user_id}")
+
+        knowledge_service = KnowledgeService(db)
+        starred = knowledge_service.get_starred_ids(user_id, body.ids)
+
+        return Success(
+            message="批量检查Star状态成功",
+            data={"starred": [target_id for target_id in dict.fromkeys(body.ids) if target_id in starred]},
+        )
+    except Exception as e:
+        log_exception(app_logger, "Check knowledge starred batch error", exception=e)
+        raise APIError("批量检查Star状态失败") from e
+
+
 @router.get("/{kb_id}/starred")
 async def check_knowledge_starred(
     kb_id: str, current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)
@@ -295,7 +603,7 @@ async def check_knowledge_starred(
         app_logger.info(f"Check knowledge starred: kb_id={kb_id}, user_id={user_id}")
 
         knowledge_service = KnowledgeService(db)
-        starred = knowledge_service.is_starred(user_id, kb_id)
+        starred = kb_id in knowledge_service.get_starred_ids(user_id, [kb_id])
 
         return Success(message="检查Star状态成功", data={"starred": starred})
     except Exception as e:
@@ -304,6 +612,7 @@ async def check_knowledge_starred(
 
 
 @router.get("/user/{user_id}")
+@cache_policy(ttl=60, vary_by=["user"], tags=["knowledge:user:{user_id}"])
 async def get_user_knowledge_bases(
     user_id: str,
     page: int = Query(1, ge=1, description="页码"),
@@ -365,7 +674,7 @@ async def star_knowledge_base(
         message = "Star"
 
         # 检查知识库是否存在
-        kb = knowledge_service.get_knowledge_base_by_id(kb_id)
+        kb = knowledge_service.get_knowledge_base_by_id(kb_id, cached=True)
         if not kb:
             raise NotFoundError("知识库不存在")
 
@@ -410,7 +719,7 @@ async def unstar_knowledge_base(
         knowledge_service = KnowledgeService(db)
 
         # 检查知识库是否存在
-        kb = knowledge_service.get_knowledge_base_by_id(kb_id)
+        kb = knowledge_service.get_knowledge_base_by_id(kb_id, cached=True)
         if not kb:
             raise NotFoundError("知识库不存在")
 
@@ -629,12 +938,25 @@ async def add_files_to_knowledge_base(
         # 验证权限和状态
         _validate_kb_for_file_addition(kb, user_id, current_user)
 
-        # 准备文件数据
-        file_data = await _prepare_file_data(files)
+        # 准备文件数据（接收前先按文件名检查类型）
+        file_service = FileService(db)
+        file_service.validate_knowledge_file_types([file.filename for file in files])
+        timer = StageTimer("add_knowledge_base_files")
+        with timer.stage("receive"):
+            file_data = await _prepare_file_data(files, file_service.staging_dir)
 
         # 使用 FileService 添加文件
-        file_service = FileService(db)
-        updated_kb = file_service.add_files_to_knowledge_base(kb_id, file_data, user_id)
+        try:
+            updated_kb = await run_file_io(
+                "add_knowledge_base_files",
+                file_service.add_files_to_knowledge_base,
+                kb_id,
+                file_data,
+                user_id,
+                timer=timer,
+            )
+        finally:
+            discard_staged(staged for _, staged in file_data)
 
         if not updated_kb:
             raise FileOperationError("添加文件失败")
@@ -645,7 +967,7 @@ async def add_files_to_knowledge_base(
         # 记录数据库操作成功
         log_database_operation(app_logger, "update", "knowledge_base", record_id=kb_id, user_id=user_id, success=True)
 
-        return Success(message="文件添加成功")
+        return Success(message="文件添加成功", data={"timings_ms": timer.as_dict()})
 
     except (NotFoundError, AuthorizationError, ValidationError, FileOperationError, DatabaseError):
         raise
@@ -701,9 +1023,9 @@ async def delete_files_from_knowledge_base(
             return Success(message="文件删除成功")
 
         file_service = FileService(db)
-        _delete_file_from_kb(file_service, kb_id, file_id, user_id)
+        await _delete_file_from_kb(file_service, kb_id, file_id, user_id)
 
-        knowledge_deleted = _cleanup_empty_kb_if_needed(knowledge_service, file_service, kb_id, user_id)
+        knowledge_deleted = await _cleanup_empty_kb_if_needed(knowledge_service, file_service, kb_id, user_id)
 
         _log_file_deletion_success(kb_id, user_id, knowledge_deleted)
 
@@ -761,7 +1083,7 @@ def _validate_kb_for_file_deletion(
     return kb
 
 
-def _delete_file_from_kb(file_service: FileService, kb_id: str, file_id: str, user_id: str) -> None:
+async def _delete_file_from_kb(file_service: FileService, kb_id: str, file_id: str, user_id: str) -> None:
     """从知识库中删除文件
 
     Args:
@@ -773,12 +1095,14 @@ def _delete_file_from_kb(file_service: FileService, kb_id: str, file_id: str, us
     Raises:
         FileOperationError: 删除文件失败
     """
-    success = file_service.delete_file_from_knowledge_base(kb_id, file_id, user_id)
+    success = await run_file_io(
+        "delete_knowledge_base_file", file_service.delete_file_from_knowledge_base, kb_id, file_id, user_id
+    )
     if not success:
         raise FileOperationError("删除文件失败")
 
 
-def _cleanup_empty_kb_if_needed(
+async def _cleanup_empty_kb_if_needed(
     knowledge_service: KnowledgeService, file_service: FileService, kb_id: str, user_id: str
 ) -> bool:
     """如果知识库没有剩余文件，则自动删除整个知识库
@@ -800,7 +1124,7 @@ def _cleanup_empty_kb_if_needed(
     if remaining_files:
         return False
 
-    cleanup_success = file_service.delete_knowledge_base(kb_id, user_id)
+    cleanup_success = await run_file_io("delete_knowledge_base", file_service.delete_knowledge_base, kb_id, user_id)
     if not cleanup_success:
         raise FileOperationError("删除知识库文件失败")
 
@@ -833,27 +1157,32 @@ def _log_file_deletion_success(kb_id: str, user_id: str, knowledge_deleted: bool
 
 @router.get("/{kb_id}/download")
 async def download_knowledge_base_files(
-    kb_id: str, current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)
+    kb_id: str, request: Request, current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)
 ):
     """下载知识库的所有文件压缩包"""
     try:
         # 使用服务层
         knowledge_service = KnowledgeService(db)
 
-        # 使用 FileService 创建ZIP文件
+        # 使用 FileService 准备ZIP压缩包（检查文件并读取文件信息）
         file_service = FileService(db)
-        zip_result = file_service.create_knowledge_base_zip(kb_id)
-        zip_path = zip_result["zip_path"]
-        zip_filename = zip_result["zip_filename"]
+        zip_result = await run_file_io("create_zip", file_service.create_knowledge_base_zip, kb_id)
 
-        # 使用原子操作更新下载计数器
-        success = knowledge_service.increment_downloads(kb_id)
-        if not success:
-            # 如果更新计数器失败，记录日志但不影响下载
-            app_logger.warning(f"更新知识库下载计数器失败: kb_id={kb_id}")
+        # 客户端已有相同版本的压缩包，不计入下载次数
+        etag = archive_etag(zip_result["version"])
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=http_status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
 
-        # 返回文件下载响应
-        return FileResponse(path=zip_path, filename=zip_filename, media_type="application/zip")
+        # 使用原子操作更新下载计数器（断点续传的后续请求不重复计数）
+        range_header = request.headers.get("range")
+        if not is_resume_request(range_header):
+            success = knowledge_service.increment_downloads(kb_id)
+            if not success:
+                # 如果更新计数器失败，记录日志但不影响下载
+                app_logger.warning(f"更新知识库下载计数器失败: kb_id={kb_id}")
+
+        # 返回文件下载响应（已缓存时直接发送文件，支持 Range；否则边压缩边发送并写入缓存）
+        return await archive_response(ARCHIVE_KIND_KNOWLEDGE, kb_id, zip_result, range_header)
 
     except HTTPException:
         raise
@@ -867,7 +1196,11 @@ async def download_knowledge_base_files(
 
 @router.get("/{kb_id}/file/{file_id}")
 async def download_knowledge_base_file(
-    kb_id: str, file_id: str, current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)
+    kb_id: str,
+    file_id: str,
+    request: Request,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db),
 ):
     """下载知识库中的单个文件"""
     user_id = current_user.get("id", "")
@@ -878,7 +1211,7 @@ async def download_knowledge_base_file(
         knowledge_service = KnowledgeService(db)
 
         # 检查知识库是否存在
-        kb = knowledge_service.get_knowledge_base_by_id(kb_id)
+        kb = knowledge_service.get_knowledge_base_by_id(kb_id, cached=True)
         if not kb:
             raise NotFoundError("知识库不存在")
 
@@ -892,23 +1225,19 @@ async def download_knowledge_base_file(
         if not file_info:
             raise NotFoundError("文件不存在")
 
-        # 构建完整的文件路径
-        file_full_path = os.path.join(kb.base_path, file_info.get("file_path"))
-        if not os.path.exists(file_full_path):
-            raise NotFoundError("文件不存在")
+        response = await _kb_file_response(kb, file_info, file_service, request)
 
         # 记录文件操作成功
         log_file_operation(
             app_logger, "download", f"knowledge_base/{kb_id}/file/{file_id}", user_id=user_id, success=True
         )
 
-        # 返回文件响应，使用原始文件名
-        return FileResponse(
-            path=file_full_path, filename=file_info.get("file_name"), media_type="application/octet-stream"
-        )
+        return response
 
     except (NotFoundError, AuthorizationError, FileOperationError):
         raise
+    except FileNotFoundError as e:
+        raise NotFoundError("文件不存在") from e
     except FileValidationError as e:
         raise NotFoundError(e.message) from e
     except FileDatabaseError as e:
@@ -926,6 +1255,31 @@ async def download_knowledge_base_file(
         raise APIError("下载文件失败") from e
 
 
+async def _kb_file_response(
+    kb: KnowledgeBase, file_info: dict, file_service: FileService, request: Request
+) -> Response:
+    """创建知识库文件的下载响应"""
+    storage_key = file_info.get("storage_key")
+    if storage_key:
+        # blob 由存储后端发送（按配置重定向、交给 Web 服务器或由应用进程发送，支持 Range 断点续传）；
+        # 压缩保存的文件在客户端接受该编码时直接发送压缩内容，否则边读边解压
+        return await stored_file_response(
+            file_service.blob_store.storage,
+            storage_key,
+            file_info.get("file_name"),
+            file_info.get("content_hash"),
+            request.headers,
+            content_encoding=file_info.get("content_encoding"),
+            size=file_info.get("file_size"),
+        )
+
+    # 旧记录：构建完整的文件路径
+    file_full_path = file_info.get("full_path") or os.path.join(kb.base_path, file_info.get("file_path"))
+    if not os.path.exists(file_full_path):
+        raise NotFoundError("文件不存在")
+    return file_download_response(file_full_path, file_info.get("file_name"))
+
+
 @router.delete("/{kb_id}")
 async def delete_knowledge_base(
     kb_id: str, current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)
@@ -946,7 +1300,7 @@ async def delete_knowledge_base(
 
         # 删除文件和数据库记录
         file_service = FileService(db)
-        _delete_kb_files_and_records(kb_id, user_id, file_service, knowledge_service)
+        await _delete_kb_files_and_records(kb_id, user_id, file_service, knowledge_service)
 
         # 记录文件操作成功
         log_file_operation(app_logger, "delete", f"knowledge_base/{kb_id}", user_id=user_id, success=True)
@@ -985,7 +1339,7 @@ def _validate_kb_deletion_permission(kb: KnowledgeBase, user_id: str, current_us
         raise AuthorizationError("没有权限删除此知识库")
 
 
-def _delete_kb_files_and_records(
+async def _delete_kb_files_and_records(
     kb_id: str, user_id: str, file_service: FileService, knowledge_service: KnowledgeService
 ) -> None:
     """删除知识库文件和数据库记录
@@ -1000,8 +1354,8 @@ def _delete_kb_files_and_records(
         FileOperationError: 文件删除失败
         DatabaseError: 数据库删除失败
     """
-    # 删除知识库文件和目录
-    success = file_service.delete_knowledge_base(kb_id, user_id)
+    # 删除知识库文件和目录（删除目录在文件 I/O 线程池中执行）
+    success = await run_file_io("delete_knowledge_base", file_service.delete_knowledge_base, kb_id, user_id)
     if not success:
         raise FileOperationError("删除知识库文件失败")
 
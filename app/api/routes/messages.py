@@ -24,7 +24,6 @@ from app.core.error_handlers import APIError, AuthorizationError, DatabaseError,
 from app.core.logging import app_logger, log_database_operation, log_exception
 from app.models.schemas import BaseResponse, MessageCreate, MessageResponse, MessageUpdate, PageResponse
 from app.services.message_service import MessageService
-from app.utils.websocket import message_ws_manager
 
 # 创建路由器
 router = APIRouter()
@@ -217,9 +216,6 @@ async def send_message(
         for msg in created_messages:
             log_database_operation(app_logger, "create", "message", record_id=msg.id, user_id=sender_id, success=True)
 
-        # 广播WebSocket更新
-        await message_ws_manager.broadcast_user_update(set(unique_recipients.keys()))
-
         return Success(
             message="消息发送成功",
             data={
@@ -455,8 +451,6 @@ async def mark_message_read(
         # 记录数据库操作成功
         log_database_operation(app_logger, "update", "message", record_id=message_id, user_id=user_id, success=True)
 
-        await message_ws_manager.broadcast_user_update({user_id})
-
         return Success(message="消息已标记为已读")
 
     except (ValidationError, NotFoundError, AuthorizationError, DatabaseError):
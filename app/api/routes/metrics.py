@@ -10,7 +10,8 @@ from typing import Any
 from fastapi import APIRouter, Response
 from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
-from app.core.cache import get_cache_manager, get_cache_metrics
+from app.core.cache import RedisClient, get_cache_analytics, get_cache_manager, get_cache_metrics
+from app.core.cache.metrics import cache_degradation_total, cache_hits_total, cache_misses_total
 
 logger = logging.getLogger(__name__)
 
@@ -41,7 +42,10 @@ async def prometheus_metrics():
     "/cache",
     response_model=dict[str, Any],
     summary="获取缓存统计信息",
-    description="获取缓存的详细统计信息，包括命中率、降级次数等",
+    description=(
+        "获取缓存的详细统计信息，包括命中率、降级次数、Redis 熔断器状态，"
+        "以及按键前缀 / 路由模板的命中率和对象大小（热点键只在管理员接口 /api/admin/cache/stats 中返回）"
+    ),
 )
 async def cache_metrics():
     """获取缓存统计信息
@@ -64,13 +68,18 @@ async def cache_metrics():
             "hit_rate": f"{hit_rate:.2f}%",
             "hit_rate_value": hit_rate,
             "metrics": {
-                "hits_total": sum(sample.value for sample in metrics.cache_hits_total.collect()[0].samples),
-                "misses_total": sum(sample.value for sample in metrics.cache_misses_total.collect()[0].samples),
-                "degradation_total": sum(
-                    sample.value for sample in metrics.cache_degradation_total.collect()[0].samples
-                ),
+                "hits_total": sum(sample.value for sample in cache_hits_total.collect()[0].samples),
+                "misses_total": sum(sample.value for sample in cache_misses_total.collect()[0].samples),
+                "degradation_total": sum(sample.value for sample in cache_degradation_total.collect()[0].samples),
                 "enabled_status": cache_enabled,
             },
+            # 热点键包含用户 ID 等标识，本端点不要求管理员权限，不返回
+            "analytics": get_cache_analytics().get_stats(include_hot=False),
+            "circuit_breaker": (
+                cache_manager.redis_client.circuit_breaker.get_stats()
+                if isinstance(cache_manager.redis_client, RedisClient)
+                else None
+            ),
         }
     except Exception as e:
         logger.error(f"获取缓存统计信息失败: {e}")
@@ -13,13 +13,15 @@
 import os
 from typing import Any
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, Request, UploadFile
 from fastapi import status as http_status
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_current_user, get_current_user_optional
-from app.api.response_util import Page, Success
+from app.api.response_util import Page, Success, archive_response, file_download_response, stored_file_response
+from app.core.cache.id_filter import get_existence_filter
+from app.core.cache.policy import cache_policy
 from app.core.database import get_db
 from app.core.error_handlers import (
     APIError,
@@ -34,10 +36,13 @@ from app.core.error_handlers import (
 
 # 导入错误处理和日志记录模块
 from app.core.logging import app_logger, log_database_operation, log_exception, log_file_operation
-from app.models.schemas import BaseResponse, PersonaCardUpdate
+from app.models.schemas import BaseResponse, PersonaCardUpdate, StarredBatchRequest
+from app.services.archive_cache import ARCHIVE_KIND_PERSONA, archive_etag, etag_matches, is_resume_request
 from app.services.file_service import FileDatabaseError, FileService, FileValidationError
 from app.services.file_upload_service import FileUploadService
 from app.services.persona_service import PersonaService
+from app.utils.file import StagedUpload, UploadTooLargeError, discard_staged, stage_upload
+from app.utils.file_io import run_file_io
 
 # 创建路由器
 router = APIRouter()
@@ -78,21 +83,37 @@ def _check_persona_card_uniqueness(persona_service: PersonaService) -> None:
         )
 
 
-async def _prepare_persona_card_file_data(files: list[UploadFile]) -> list[tuple[str, bytes]]:
+async def _prepare_persona_card_file_data(files: list[UploadFile], staging_dir: str) -> list[tuple[str, StagedUpload]]:
     """准备人设卡文件数据
 
+    按块把每个文件写入临时文件，不把文件内容读入内存；实际大小超过 MAX_FILE_SIZE 时立即停止。
+    调用方处理完后应调用 discard_staged 清理未使用的临时文件。
+
     Args:
         files: 上传的文件列表
+        staging_dir: 临时文件目录
 
     Returns:
-        文件数据列表，每个元素为 (文件名, 文件内容) 元组
+        文件数据列表，每个元素为 (文件名, 临时文件) 元组
+
+    Raises:
+        FileValidationError: 文件内容过大
     """
-    file_data = []
-    for file in files:
-        content_bytes = await file.read()
-        file_data.append((file.filename, content_bytes))
-        await file.seek(0)
-    return file_data
+    staged_files: list[StagedUpload] = []
+    try:
+        for file in files:
+            staged_files.append(await stage_upload(file, staging_dir, max_size=FileService.MAX_FILE_SIZE))
+    except UploadTooLargeError as e:
+        discard_staged(staged_files)
+        raise FileValidationError(
+            f"人设卡配置错误：文件过大 {e.filename}，单个文件最大允许{FileService.MAX_FILE_SIZE // (1024*1024)}MB",
+            code="PERSONA_FILE_SIZE_EXCEEDED",
+            details={"filename": e.filename},
+        ) from e
+    except BaseException:
+        discard_staged(staged_files)
+        raise
+    return [(staged.filename, staged) for staged in staged_files]
 
 
 def _set_persona_card_visibility(pc, is_public: bool, db: Session) -> str:
@@ -172,18 +193,23 @@ async def upload_persona_card(
         persona_service = PersonaService(db)
         _check_persona_card_uniqueness(persona_service)
 
-        file_data = await _prepare_persona_card_file_data(files)
-
         file_service = FileService(db)
-        pc = file_service.upload_persona_card(
-            files=file_data,
-            name=name,
-            description=description,
-            uploader_id=user_id,
-            copyright_owner=copyright_owner if copyright_owner else username,
-            content=content,
-            tags=tags,
-        )
+        file_data = await _prepare_persona_card_file_data(files, file_service.staging_dir)
+
+        try:
+            pc = await run_file_io(
+                "upload_persona_card",
+                file_service.upload_persona_card,
+                files=file_data,
+                name=name,
+                description=description,
+                uploader_id=user_id,
+                copyright_owner=copyright_owner if copyright_owner else username,
+                content=content,
+                tags=tags,
+            )
+        finally:
+            discard_staged(staged for _, staged in file_data)
 
         upload_status = _set_persona_card_visibility(pc, is_public, db)
         _create_persona_card_upload_record(persona_service, user_id, pc.id, name, description, upload_status)
@@ -208,6 +234,7 @@ async def upload_persona_card(
 
 
 @router.get("/persona/public")
+@cache_policy(ttl=300, tags=["persona:public"], stale_while_revalidate=60)
 async def get_public_persona_cards(
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(20, ge=1, le=100, description="每页数量"),
@@ -245,15 +272,27 @@ async def get_public_persona_cards(
 
 
 @router.get("/persona/{pc_id}")
-async def get_persona_card(pc_id: str, db: Session = Depends(get_db)):
+@cache_policy(
+    ttl=300,
+    tags=["persona:{pc_id}"],
+    stale_while_revalidate=60,
+    must_exist={"pc_id": "persona"},
+    versioned={"pc_id": "persona"},
+)
+async def get_persona_card(pc_id: str, request: Request, db: Session = Depends(get_db)):
     """获取人设卡详情"""
     try:
         app_logger.info(f"Get persona card detail: pc_id={pc_id}")
 
+        id_filter = get_existence_filter()
+        if not id_filter.might_exist_in_request(request, "persona", pc_id):
+            raise NotFoundError("人设卡不存在")
+
         persona_service = PersonaService(db)
 
         pc = persona_service.get_persona_card_by_id(pc_id)
         if not pc:
+            id_filter.report_missing("persona", pc_id)
             raise NotFoundError("人设卡不存在")
 
         pc_dict = pc.to_dict()
@@ -284,6 +323,27 @@ async def get_persona_card(pc_id: str, db: Session = Depends(get_db)):
         raise APIError("获取人设卡详情失败") from e
 
 
+@router.post("/persona/starred/batch")
+async def check_persona_starred_batch(
+    body: StarredBatchRequest, current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)
+):
+    """批量检查人设卡是否已被当前用户Star（列表页一次请求检查全部卡片）"""
+    user_id = current_user.get("id", "")
+    try:
+        app_logger.info(f"Check persona starred batch: count={len(body.ids)}, user_id={user_id}")
+
+        persona_service = PersonaService(db)
+        starred = persona_service.get_starred_ids(user_id, body.ids)
+
+        return Success(
+            message="批量检查Star状态成功",
+            data={"starred": [target_id for target_id in dict.fromkeys(body.ids) if target_id in starred]},
+        )
+    except Exception as e:
+        log_exception(app_logger, "Check persona starred batch error", exception=e)
+        raise APIError("批量检查Star状态失败") from e
+
+
 @router.get("/persona/{pc_id}/starred")
 async def check_persona_starred(
     pc_id: str, current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)
@@ -294,7 +354,7 @@ async def check_persona_starred(
         app_logger.info(f"Check persona starred: pc_id={pc_id}, user_id={user_id}")
 
         persona_service = PersonaService(db)
-        starred = persona_service.is_starred(user_id, pc_id)
+        starred = pc_id in persona_service.get_starred_ids(user_id, [pc_id])
 
         return Success(message="Star状态检查成功", data={"starred": starred})
     except Exception as e:
@@ -303,6 +363,7 @@ async def check_persona_starred(
 
 
 @router.get("/persona/user/{user_id}")
+@cache_policy(ttl=60, vary_by=["user"], tags=["persona:user:{user_id}"])
 async def get_user_persona_cards(
     user_id: str,
     page: int = Query(1, ge=1, description="页码"),
@@ -522,7 +583,7 @@ async def star_persona_card(pc_id: str, current_user: dict = Depends(get_current
         persona_service = PersonaService(db)
 
         # 检查人设卡是否存在
-        pc = persona_service.get_persona_card_by_id(pc_id)
+        pc = persona_service.get_persona_card_by_id(pc_id, cached=True)
         if not pc:
             raise NotFoundError("人设卡不存在")
 
@@ -574,7 +635,7 @@ async def unstar_persona_card(
         persona_service = PersonaService(db)
 
         # 检查人设卡是否存在
-        pc = persona_service.get_persona_card_by_id(pc_id)
+        pc = persona_service.get_persona_card_by_id(pc_id, cached=True)
         if not pc:
             raise NotFoundError("人设卡不存在")
 
@@ -824,7 +885,10 @@ def _cleanup_empty_pc_if_needed(persona_service: Any, pc_id: str, user_id: str)
 
 @router.get("/persona/{pc_id}/download", response_class=FileResponse)
 async def download_persona_card_files(
-    pc_id: str, current_user: dict | None = Depends(get_current_user_optional), db: Session = Depends(get_db)
+    pc_id: str,
+    request: Request,
+    current_user: dict | None = Depends(get_current_user_optional),
+    db: Session = Depends(get_db),
 ):
     """下载人设卡的所有文件压缩包"""
     try:
@@ -832,27 +896,32 @@ async def download_persona_card_files(
         persona_service = PersonaService(db)
 
         # 检查人设卡是否存在
-        pc = persona_service.get_persona_card_by_id(pc_id)
+        pc = persona_service.get_persona_card_by_id(pc_id, cached=True)
         if not pc:
             raise NotFoundError("人设卡不存在")
 
         # 验证下载权限
         _validate_pc_download_permission(pc, current_user)
 
-        # 创建ZIP文件（使用文件服务）
+        # 准备ZIP压缩包（使用文件服务）
         file_service = FileService(db)
-        zip_result = file_service.create_persona_card_zip(pc_id)
-        zip_path = zip_result["zip_path"]
-        zip_filename = zip_result["zip_filename"]
+        zip_result = await run_file_io("create_zip", file_service.create_persona_card_zip, pc_id)
 
-        # 使用原子操作更新下载计数器
-        success = persona_service.increment_downloads(pc_id)
-        if not success:
-            # 如果更新计数器失败，记录日志但不影响下载
-            app_logger.warning(f"更新人设卡下载计数器失败: pc_id={pc_id}")
+        # 客户端已有相同版本的压缩包，不计入下载次数
+        etag = archive_etag(zip_result["version"])
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=http_status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
 
-        # 返回文件下载响应
-        return FileResponse(path=zip_path, filename=zip_filename, media_type="application/zip")
+        # 使用原子操作更新下载计数器（断点续传的后续请求不重复计数）
+        range_header = request.headers.get("range")
+        if not is_resume_request(range_header):
+            success = persona_service.increment_downloads(pc_id)
+            if not success:
+                # 如果更新计数器失败，记录日志但不影响下载
+                app_logger.warning(f"更新人设卡下载计数器失败: pc_id={pc_id}")
+
+        # 返回文件下载响应（已缓存时直接发送文件，支持 Range；否则边压缩边发送并写入缓存）
+        return await archive_response(ARCHIVE_KIND_PERSONA, pc_id, zip_result, range_header)
 
     except (HTTPException, NotFoundError, AuthenticationError, AuthorizationError):
         raise
@@ -892,7 +961,11 @@ def _validate_pc_download_permission(pc: Any, current_user: dict | None) -> None
 
 @router.get("/persona/{pc_id}/file/{file_id}")
 async def download_persona_card_file(
-    pc_id: str, file_id: str, current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)
+    pc_id: str,
+    file_id: str,
+    request: Request,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db),
 ):
     """下载人设卡中的单个文件"""
     user_id = current_user.get("id", "")
@@ -903,7 +976,7 @@ async def download_persona_card_file(
         persona_service = PersonaService(db)
 
         # 检查人设卡是否存在
-        pc = persona_service.get_persona_card_by_id(pc_id)
+        pc = persona_service.get_persona_card_by_id(pc_id, cached=True)
         if not pc:
             raise NotFoundError("人设卡不存在")
 
@@ -917,23 +990,34 @@ async def download_persona_card_file(
         if not file_info:
             raise NotFoundError("文件不存在")
 
-        # 构建完整的文件路径
-        file_full_path = os.path.join(pc.base_path, file_info.get("file_path"))
-        if not os.path.exists(file_full_path):
-            raise NotFoundError("文件不存在")
+        storage_key = file_info.get("storage_key")
+        if storage_key:
+            # blob 由存储后端发送（按配置重定向、交给 Web 服务器或由应用进程发送，支持 Range 断点续传）
+            response = await stored_file_response(
+                file_service.blob_store.storage,
+                storage_key,
+                file_info.get("file_name"),
+                file_info.get("content_hash"),
+                request.headers,
+            )
+        else:
+            # 旧记录：构建完整的文件路径
+            file_full_path = file_info.get("full_path") or os.path.join(pc.base_path, file_info.get("file_path"))
+            if not os.path.exists(file_full_path):
+                raise NotFoundError("文件不存在")
+            response = file_download_response(file_full_path, file_info.get("file_name"))
 
         # 记录文件操作成功
         log_file_operation(
             app_logger, "download", f"persona_card/{pc_id}/file/{file_id}", user_id=user_id, success=True
         )
 
-        # 返回文件响应，使用原始文件名
-        return FileResponse(
-            path=file_full_path, filename=file_info.get("file_name"), media_type="application/octet-stream"
-        )
+        return response
 
     except (NotFoundError, AuthorizationError, FileOperationError):
         raise
+    except FileNotFoundError as e:
+        raise NotFoundError("文件不存在") from e
     except Exception as e:
         log_exception(app_logger, "Download persona card file error", exception=e)
         log_file_operation(
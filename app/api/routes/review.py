@@ -27,7 +27,6 @@ from app.models.schemas import (
 )
 from app.services.knowledge_service import KnowledgeService
 from app.services.persona_service import PersonaService
-from app.utils.websocket import message_ws_manager
 
 # 创建路由器
 router = APIRouter()
@@ -94,7 +93,6 @@ async def _send_review_notification(
             )
             db.add(message)
             db.commit()
-            await message_ws_manager.broadcast_user_update({recipient_id})
     except Exception as e:
         app_logger.warning(f"Failed to send review notification for {target_id}: {str(e)}")
 
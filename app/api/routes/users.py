@@ -5,10 +5,14 @@ from datetime import datetime
 from typing import Any
 
 from fastapi import APIRouter, Body, Depends, File, HTTPException, Query, Request, UploadFile
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 
 from app.api.deps import get_current_user
 from app.api.response_util import Page, Success
+from app.core.cache.factory import get_cache_manager
+from app.core.cache.id_filter import get_existence_filter
+from app.core.cache.invalidation import invalidate_user_cache
+from app.core.cache.policy import cache_policy
 from app.core.database import get_db
 from app.core.error_handlers import APIError, AuthenticationError, DatabaseError, NotFoundError, ValidationError
 from app.core.logging import app_logger, log_database_operation, log_exception, log_file_operation
@@ -186,6 +190,7 @@ async def upload_avatar(
             delete_avatar_file(file_path)
             raise DatabaseError("保存头像信息失败") from None
 
+        invalidate_user_cache(user_id)
         log_file_operation(app_logger, "upload", file_path, user_id=user_id, success=True)
 
         app_logger.info(f"头像上传成功: user_id={user_id}, path={file_path}")
@@ -227,6 +232,7 @@ async def delete_avatar_endpoint(current_user: dict = Depends(get_current_user),
             db.rollback()
             raise DatabaseError("保存头像信息失败") from None
 
+        invalidate_user_cache(user_id)
         log_file_operation(app_logger, "delete", "avatar", success=True, user_id=user_id)
 
         app_logger.info(f"Avatar deleted successfully: user_id={user_id}")
@@ -241,14 +247,20 @@ async def delete_avatar_endpoint(current_user: dict = Depends(get_current_user),
 
 
 @router.get("/{user_id}/avatar")
-async def get_user_avatar(user_id: str, size: int = 200, db: Session = Depends(get_db)):
+@cache_policy(ttl=3600, store=False, must_exist={"user_id": "user"}, versioned={"user_id": "user"})
+async def get_user_avatar(user_id: str, request: Request, size: int = 200, db: Session = Depends(get_db)):
     """获取用户头像（如果不存在则生成首字母头像）"""
     try:
         from fastapi.responses import FileResponse, Response
 
+        id_filter = get_existence_filter()
+        if not id_filter.might_exist_in_request(request, "user", user_id):
+            raise NotFoundError("用户不存在")
+
         user_service = UserService(db)
         user = user_service.get_user_by_id(user_id)
         if not user:
+            id_filter.report_missing("user", user_id)
             raise NotFoundError("用户不存在")
 
         if user.avatar_path and os.path.exists(user.avatar_path):
@@ -269,6 +281,7 @@ async def get_user_avatar(user_id: str, size: int = 200, db: Session = Depends(g
             delete_avatar_file(file_path)
             raise DatabaseError("保存头像信息失败") from None
 
+        invalidate_user_cache(user_id)
         log_file_operation(app_logger, "upload", file_path, user_id=user_id, success=True)
 
         app_logger.info(f"默认首字母头像生成并保存成功: user_id={user_id}, path={file_path}")
@@ -284,6 +297,7 @@ async def get_user_avatar(user_id: str, size: int = 200, db: Session = Depends(g
 
 # 用户Star记录相关路由
 @router.get("/stars", response_model=PageResponse[dict], summary="获取用户收藏")
+@cache_policy(ttl=60, vary_by=["user"], tags=["stars:{user}"])
 async def get_user_stars(
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db),
@@ -304,8 +318,9 @@ async def get_user_stars(
 
         page_size = min(page_size, 50)
         stars = _get_user_star_records(db, user_id, star_type)
-        stars = _sort_star_records(db, stars, sort_by, sort_order)
-        result = _build_star_result_list(db, stars, include_details)
+        targets = await _load_star_targets(db, stars)
+        stars = _sort_star_records(stars, targets, sort_by, sort_order)
+        result = _build_star_result_list(stars, targets, include_details)
 
         total = len(result)
         page_items = _paginate_results(result, page, page_size)
@@ -336,23 +351,54 @@ def _get_user_star_records(db: Session, user_id: str, type_filter: str):
     return stars
 
 
-def _sort_star_records(db: Session, stars: list, sort_by: str, sort_order: str):
-    """对Star记录进行排序"""
+# 收藏目标摘要的缓存时间（秒）
+STAR_TARGET_CACHE_TTL = 300
+
+
+async def _load_star_targets(db: Session, stars: list) -> dict[tuple[str, str], dict]:
+    """批量加载收藏目标（知识库/人设卡）
+
+    先批量读取缓存，未命中的目标按类型合并为一次 IN 查询，避免逐条查询数据库。
+
+    Returns:
+        dict: {(target_type, target_id): 目标字典}，不存在的目标不包含在内
+    """
     from app.models.database import KnowledgeBase, PersonaCard
 
+    cache_manager = get_cache_manager()
+    targets: dict[tuple[str, str], dict] = {}
+
+    for target_type, model in (("knowledge", KnowledgeBase), ("persona", PersonaCard)):
+        target_ids = list(dict.fromkeys(star.target_id for star in stars if star.target_type == target_type))
+        if not target_ids:
+            continue
+
+        key_to_id = {cache_manager.build_key("star_target", f"{target_type}:{tid}"): tid for tid in target_ids}
+
+        def fetch_missing(keys: list[str], model=model, key_to_id=key_to_id) -> dict[str, dict]:
+            missing_ids = [key_to_id[key] for key in keys]
+            rows = db.query(model).options(joinedload(model.uploader)).filter(model.id.in_(missing_ids)).all()
+            by_id = {row.id: row.to_dict() for row in rows}
+            return {key: by_id.get(key_to_id[key]) for key in keys}
+
+        cached = await cache_manager.get_many_cached(list(key_to_id), fetch_missing, ttl=STAR_TARGET_CACHE_TTL)
+        for key, target_id in key_to_id.items():
+            if cached.get(key) is not None:
+                targets[(target_type, target_id)] = cached[key]
+
+    return targets
+
+
+def _sort_star_records(stars: list, targets: dict[tuple[str, str], dict], sort_by: str, sort_order: str):
+    """对Star记录进行排序"""
     reverse_order = sort_order == "desc"
 
     if sort_by == "star_count":
         star_items = []
         for star in stars:
-            if star.target_type == "knowledge":
-                kb = db.query(KnowledgeBase).filter(KnowledgeBase.id == star.target_id).first()
-                if kb and kb.is_public:
-                    star_items.append((star, kb.star_count))
-            elif star.target_type == "persona":
-                pc = db.query(PersonaCard).filter(PersonaCard.id == star.target_id).first()
-                if pc and pc.is_public:
-                    star_items.append((star, pc.star_count))
+            target = targets.get((star.target_type, star.target_id))
+            if target and target.get("is_public"):
+                star_items.append((star, target.get("star_count") or 0))
 
         star_items.sort(key=lambda x: x[1], reverse=reverse_order)
         return [item[0] for item in star_items]
@@ -361,67 +407,35 @@ def _sort_star_records(db: Session, stars: list, sort_by: str, sort_order: str):
         return stars
 
 
-def _build_star_result_list(db: Session, stars: list, include_details: bool):
+def _build_star_result_list(stars: list, targets: dict[tuple[str, str], dict], include_details: bool):
     """构建Star结果列表"""
     result = []
     for star in stars:
-        if star.target_type == "knowledge":
-            item = _build_knowledge_star_item(db, star, include_details)
-            if item:
-                result.append(item)
-        elif star.target_type == "persona":
-            item = _build_persona_star_item(db, star, include_details)
-            if item:
-                result.append(item)
+        if star.target_type not in ("knowledge", "persona"):
+            continue
+        item = _build_star_item(star, targets.get((star.target_type, star.target_id)), include_details)
+        if item:
+            result.append(item)
     return result
 
 
-def _build_knowledge_star_item(db: Session, star, include_details: bool):
-    """构建知识库Star项"""
-    from app.models.database import KnowledgeBase
-
-    kb = db.query(KnowledgeBase).filter(KnowledgeBase.id == star.target_id).first()
-    if not kb or not kb.is_public:
-        return None
-
-    item = {
-        "id": star.id,
-        "type": "knowledge",
-        "target_id": star.target_id,
-        "name": kb.name,
-        "description": kb.description,
-        "star_count": kb.star_count,
-        "created_at": star.created_at.isoformat(),
-    }
-
-    if include_details:
-        kb_dict = kb.to_dict()
-        item.update(kb_dict)
-
-    return item
-
-
-def _build_persona_star_item(db: Session, star, include_details: bool):
-    """构建人设卡Star项"""
-    from app.models.database import PersonaCard
-
-    pc = db.query(PersonaCard).filter(PersonaCard.id == star.target_id).first()
-    if not pc or not pc.is_public:
+def _build_star_item(star, target: dict | None, include_details: bool):
+    """构建单个Star项（知识库或人设卡）"""
+    if not target or not target.get("is_public"):
         return None
 
     item = {
         "id": star.id,
-        "type": "persona",
+        "type": star.target_type,
         "target_id": star.target_id,
-        "name": pc.name,
-        "description": pc.description,
-        "star_count": pc.star_count,
+        "name": target.get("name"),
+        "description": target.get("description"),
+        "star_count": target.get("star_count"),
         "created_at": star.created_at.isoformat(),
     }
 
     if include_details:
-        pc_dict = pc.to_dict()
-        item.update(pc_dict)
+        item.update(target)
 
     return item
 
@@ -1,32 +1,70 @@
 """
 缓存模块
 
-提供 Redis 缓存功能，支持自动降级机制。
+提供 Redis 缓存功能（未配置 Redis 时可使用进程内内存后端），支持自动降级机制。
 当缓存禁用或 Redis 不可用时，自动降级到数据库访问。
 """
 
+from app.core.cache.analytics import CacheAnalytics, SpaceSaving, get_cache_analytics, reset_cache_analytics
+from app.core.cache.backend import CacheBackend
+from app.core.cache.bus import InvalidationBus, get_invalidation_bus, reset_invalidation_bus
+from app.core.cache.change_tracker import ChangeTracker, get_change_tracker, reset_change_tracker
+from app.core.cache.circuit_breaker import CircuitBreaker, CircuitOpenError
 from app.core.cache.config import CacheConfig, create_cache_config_from_settings
 from app.core.cache.decorators import cache_invalidate, cached
-from app.core.cache.factory import create_cache_manager, create_redis_client, get_cache_manager, reset_cache_manager
+from app.core.cache.entity_cache import EntityCache, get_entity_cache, reset_entity_cache
+from app.core.cache.factory import (
+    create_cache_backend,
+    create_cache_manager,
+    create_redis_client,
+    get_cache_manager,
+    reset_cache_manager,
+)
+from app.core.cache.id_filter import BloomFilter, ExistenceFilter, get_existence_filter, reset_existence_filter
+from app.core.cache.invalidation_queue import InvalidationQueue, get_invalidation_queue, reset_invalidation_queue
 from app.core.cache.logger import CacheLogger, get_cache_logger
 from app.core.cache.manager import CacheManager
+from app.core.cache.memory_backend import MemoryCacheBackend
 from app.core.cache.metrics import (
     CacheMetrics,
     cache_degradation_total,
     cache_enabled_status,
     cache_hits_total,
+    cache_id_filter_checks_total,
+    cache_id_filter_false_positive_rate,
+    cache_id_filter_false_positives_total,
     cache_misses_total,
+    cache_object_size_bytes,
+    cache_prefix_requests_total,
+    cache_route_object_size_bytes,
+    cache_route_requests_total,
+    cache_ttl_remaining_seconds,
+    cache_bus_propagation_seconds,
+    cache_circuit_breaker_state,
+    cache_circuit_breaker_transitions_total,
+    cache_invalidation_batches_total,
+    cache_invalidation_lag_seconds,
+    cache_invalidation_queue_depth,
     cache_operation_duration,
     get_cache_metrics,
 )
 from app.core.cache.middleware import CacheMiddleware
+from app.core.cache.policy import CachePolicy, CachePolicyRegistry, cache_policy, get_cache_policy_registry
 from app.core.cache.redis_client import RedisClient
+from app.core.cache.starred import StarredSetCache, get_starred_cache, reset_starred_cache
+from app.core.cache.versioning import EntityValidators, resolve_validators, version_key
+from app.core.cache.warmup import CacheWarmer, CacheWarmupConfig, create_warmup_config_from_settings
 
 __all__ = [
+    "CacheBackend",
     "CacheConfig",
     "CacheManager",
+    "MemoryCacheBackend",
     "RedisClient",
+    "CircuitBreaker",
+    "CircuitOpenError",
     "create_cache_config_from_settings",
+    "create_cache_backend",
     "create_redis_client",
     "create_cache_manager",
     "get_cache_manager",
@@ -34,6 +72,39 @@ __all__ = [
     "cached",
     "cache_invalidate",
     "CacheMiddleware",
+    "CachePolicy",
+    "CachePolicyRegistry",
+    "cache_policy",
+    "get_cache_policy_registry",
+    "InvalidationBus",
+    "get_invalidation_bus",
+    "reset_invalidation_bus",
+    "InvalidationQueue",
+    "get_invalidation_queue",
+    "reset_invalidation_queue",
+    "BloomFilter",
+    "ExistenceFilter",
+    "get_existence_filter",
+    "reset_existence_filter",
+    "EntityValidators",
+    "resolve_validators",
+    "version_key",
+    "EntityCache",
+    "get_entity_cache",
+    "reset_entity_cache",
+    "ChangeTracker",
+    "get_change_tracker",
+    "reset_change_tracker",
+    "StarredSetCache",
+    "get_starred_cache",
+    "reset_starred_cache",
+    "CacheAnalytics",
+    "SpaceSaving",
+    "get_cache_analytics",
+    "reset_cache_analytics",
+    "CacheWarmer",
+    "CacheWarmupConfig",
+    "create_warmup_config_from_settings",
     "CacheLogger",
     "get_cache_logger",
     "CacheMetrics",
@@ -43,4 +114,18 @@ __all__ = [
     "cache_degradation_total",
     "cache_enabled_status",
     "cache_operation_duration",
+    "cache_bus_propagation_seconds",
+    "cache_circuit_breaker_state",
+    "cache_circuit_breaker_transitions_total",
+    "cache_invalidation_queue_depth",
+    "cache_invalidation_lag_seconds",
+    "cache_invalidation_batches_total",
+    "cache_id_filter_checks_total",
+    "cache_id_filter_false_positives_total",
+    "cache_id_filter_false_positive_rate",
+    "cache_prefix_requests_total",
+    "cache_route_requests_total",
+    "cache_object_size_bytes",
+    "cache_route_object_size_bytes",
+    "cache_ttl_remaining_seconds",
 ]
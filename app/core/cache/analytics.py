@@ -0,0 +1,319 @@
+"""
+缓存分析模块
+
+按键前缀和路由模板细分缓存效果，补充 metrics.py 中按操作类型汇总的命中/未命中计数：
+- 键前缀（去掉全局前缀后的第一段，如 "user"、"star_target"、"http"）：命中率、序列化大小
+- 路由模板（如 "/api/knowledge/{kb_id}"）：命中率、响应缓存大小、命中时剩余 TTL
+- 热点键：使用 Space-Saving 算法在固定数量的计数器内估算访问最多的缓存键和请求路径
+
+Prometheus 指标只使用前缀和路由模板作为标签（取值数量有限）；热点键的取值不受限，
+且包含用户 ID 等标识（如 "starred:knowledge:{user_id}"），只在管理员统计接口中输出。
+"""
+
+import logging
+import threading
+from typing import Any
+
+from app.core.cache.metrics import get_cache_metrics
+
+logger = logging.getLogger(__name__)
+
+# 默认输出的热点键数量
+DEFAULT_TOP_K = 20
+
+# 热点键计数器数量相对 top_k 的倍数（计数器越多，估算越准确）
+SKETCH_CAPACITY_FACTOR = 10
+
+# 最多分别统计的前缀 / 路由数量，超出后归入 OTHER_LABEL
+MAX_TRACKED_LABELS = 128
+
+OTHER_LABEL = "other"
+
+
+def serialized_size(value: str) -> int:
+    """计算序列化字符串的 UTF-8 字节数（纯 ASCII 时不编码）
+
+    Args:
+        value: 序列化后的字符串
+
+    Returns:
+        int: 字节数
+    """
+    return len(value) if value.isascii() else len(value.encode("utf-8"))
+
+
+class SpaceSaving:
+    """Space-Saving 热点元素估算
+
+    使用固定数量的计数器：元素已在表中时计数加一；表满时替换计数最小的元素，
+    新元素继承其计数并记录为误差上限。实际次数位于 [count - error, count] 之间，
+    出现次数超过 N / capacity 的元素一定在表中。
+    """
+
+    def __init__(self, capacity: int):
+        """初始化
+
+        Args:
+            capacity: 计数器数量
+        """
+        self.capacity = max(1, capacity)
+        # 元素 -> [估算次数, 误差上限]
+        self._counters: dict[str, list[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._counters)
+
+    def add(self, item: str, count: int = 1) -> None:
+        """记录一次出现
+
+        Args:
+            item: 元素
+            count: 次数
+        """
+        counter = self._counters.get(item)
+        if counter is not None:
+            counter[0] += count
+            return
+
+        if len(self._counters) < self.capacity:
+            self._counters[item] = [count, 0]
+            return
+
+        victim = min(self._counters, key=lambda key: self._counters[key][0])
+        min_count = self._counters.pop(victim)[0]
+        self._counters[item] = [min_count + count, min_count]
+
+    def top(self, k: int) -> list[dict[str, Any]]:
+        """获取估算次数最多的 k 个元素
+
+        Args:
+            k: 数量
+
+        Returns:
+            list: [{"key": 元素, "count": 估算次数, "error": 误差上限}]，按次数降序
+        """
+        ranked = sorted(self._counters.items(), key=lambda item: item[1][0], reverse=True)[:k]
+        return [{"key": key, "count": count, "error": error} for key, (count, error) in ranked]
+
+    def clear(self) -> None:
+        """清空计数器"""
+        self._counters.clear()
+
+
+class _ScopeStats:
+    """单个前缀 / 路由的累计统计"""
+
+    __slots__ = ("hits", "misses", "stale", "writes", "bytes_written", "ttl_remaining_total", "ttl_samples")
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.writes = 0
+        self.bytes_written = 0
+        self.ttl_remaining_total = 0.0
+        self.ttl_samples = 0
+
+    def to_dict(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "hit_rate": round(self.hits / lookups * 100, 2) if lookups else 0.0,
+            "writes": self.writes,
+            "avg_size_bytes": round(self.bytes_written / self.writes) if self.writes else 0,
+            "avg_ttl_remaining": round(self.ttl_remaining_total / self.ttl_samples, 1) if self.ttl_samples else None,
+        }
+
+
+class CacheAnalytics:
+    """缓存分析记录器
+
+    record_* 方法可在事件循环线程和线程池（同步缓存路径）中调用，内部加锁。
+    """
+
+    def __init__(self, key_prefix: str = "maimnp", top_k: int = DEFAULT_TOP_K, enabled: bool = True):
+        """初始化
+
+        Args:
+            key_prefix: 全局缓存键前缀，计算键前缀时去掉
+            top_k: 输出的热点键数量
+            enabled: 是否启用（禁用时 record_* 直接返回）
+        """
+        self.key_prefix = key_prefix
+        self.top_k = top_k
+        self.enabled = enabled
+        self.metrics = get_cache_metrics()
+
+        self._lock = threading.Lock()
+        self._prefixes: dict[str, _ScopeStats] = {}
+        self._routes: dict[str, _ScopeStats] = {}
+        self._hot_keys = SpaceSaving(top_k * SKETCH_CAPACITY_FACTOR)
+        self._hot_paths = SpaceSaving(top_k * SKETCH_CAPACITY_FACTOR)
+
+    def key_to_prefix(self, key: str) -> str:
+        """计算缓存键的前缀（去掉全局前缀后的第一段）
+
+        Args:
+            key: 缓存键，如 "maimnp:user:123"
+
+        Returns:
+            str: 前缀，如 "user"
+        """
+        if self.key_prefix and key.startswith(f"{self.key_prefix}:"):
+            key = key[len(self.key_prefix) + 1 :]
+        return key.split(":", 1)[0] or OTHER_LABEL
+
+    @staticmethod
+    def _scope(scopes: dict[str, _ScopeStats], name: str) -> tuple[str, _ScopeStats]:
+        """获取统计项（调用方持有锁），超过数量上限的新名称归入 OTHER_LABEL"""
+        stats = scopes.get(name)
+        if stats is None:
+            if len(scopes) >= MAX_TRACKED_LABELS:
+                name = OTHER_LABEL
+                stats = scopes.get(name)
+            if stats is None:
+                stats = scopes[name] = _ScopeStats()
+        return name, stats
+
+    def record_lookup(self, key: str, hit: bool) -> None:
+        """记录一次缓存键读取
+
+        Args:
+            key: 缓存键
+            hit: 是否命中
+        """
+        if not self.enabled:
+            return
+
+        with self._lock:
+            prefix, stats = self._scope(self._prefixes, self.key_to_prefix(key))
+            if hit:
+                stats.hits += 1
+            else:
+                stats.misses += 1
+            self._hot_keys.add(key)
+        self.metrics.record_prefix_request(prefix, "hit" if hit else "miss")
+
+    def record_write(self, key: str, size_bytes: int) -> None:
+        """记录一次缓存写入
+
+        Args:
+            key: 缓存键
+            size_bytes: 序列化后的大小（字节）
+        """
+        if not self.enabled:
+            return
+
+        with self._lock:
+            prefix, stats = self._scope(self._prefixes, self.key_to_prefix(key))
+            stats.writes += 1
+            stats.bytes_written += size_bytes
+        self.metrics.record_object_size(prefix, size_bytes)
+
+    def record_route_lookup(self, route: str, path: str, result: str, ttl_remaining: float | None = None) -> None:
+        """记录一次 HTTP 响应缓存查询
+
+        Args:
+            route: 路由模板，如 "/api/knowledge/{kb_id}"
+            path: 实际请求路径，用于热点路径统计
+            result: 查询结果（hit, stale, not_modified, miss）
+            ttl_remaining: 命中时条目的剩余有效期（秒）
+        """
+        if not self.enabled:
+            return
+
+        with self._lock:
+            route, stats = self._scope(self._routes, route)
+            if result == "miss":
+                stats.misses += 1
+            else:
+                stats.hits += 1
+                if result == "stale":
+                    stats.stale += 1
+            if ttl_remaining is not None:
+                stats.ttl_remaining_total += ttl_remaining
+                stats.ttl_samples += 1
+            self._hot_paths.add(path)
+        self.metrics.record_route_request(route, result)
+        if ttl_remaining is not None:
+            self.metrics.record_ttl_remaining(route, ttl_remaining)
+
+    def record_route_write(self, route: str, size_bytes: int) -> None:
+        """记录一次 HTTP 响应缓存写入
+
+        Args:
+            route: 路由模板
+            size_bytes: 缓存条目序列化后的大小（字节）
+        """
+        if not self.enabled:
+            return
+
+        with self._lock:
+            route, stats = self._scope(self._routes, route)
+            stats.writes += 1
+            stats.bytes_written += size_bytes
+        self.metrics.record_route_object_size(route, size_bytes)
+
+    def get_stats(self, include_hot: bool = True) -> dict[str, Any]:
+        """获取分析统计
+
+        Args:
+            include_hot: 是否包含热点键和热点路径（含用户 ID 等标识，只应在管理员接口中返回）
+
+        Returns:
+            dict: 按前缀、按路由的统计以及热点键、热点路径
+        """
+        with self._lock:
+            result = {
+                "enabled": self.enabled,
+                "prefixes": {name: stats.to_dict() for name, stats in sorted(self._prefixes.items())},
+                "routes": {name: stats.to_dict() for name, stats in sorted(self._routes.items())},
+            }
+            if include_hot:
+                result["hot_keys"] = self._hot_keys.top(self.top_k)
+                result["hot_paths"] = self._hot_paths.top(self.top_k)
+            return result
+
+    def reset(self) -> None:
+        """清空进程内统计（Prometheus 计数器不受影响）"""
+        with self._lock:
+            self._prefixes.clear()
+            self._routes.clear()
+            self._hot_keys.clear()
+            self._hot_paths.clear()
+        logger.info("缓存分析统计已重置")
+
+
+# 全局缓存分析实例（延迟初始化）
+_global_analytics: CacheAnalytics | None = None
+
+
+def get_cache_analytics() -> CacheAnalytics:
+    """获取全局缓存分析实例
+
+    Returns:
+        CacheAnalytics 实例
+    """
+    global _global_analytics
+
+    if _global_analytics is None:
+        from app.core.config import settings
+
+        _global_analytics = CacheAnalytics(
+            key_prefix=settings.CACHE_KEY_PREFIX,
+            top_k=settings.CACHE_ANALYTICS_TOP_K,
+            enabled=settings.CACHE_ANALYTICS_ENABLED,
+        )
+
+    return _global_analytics
+
+
+def reset_cache_analytics() -> None:
+    """重置全局缓存分析实例
+
+    用于测试或重新加载配置时重置。
+    """
+    global _global_analytics
+    _global_analytics = None
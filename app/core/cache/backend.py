@@ -0,0 +1,85 @@
+"""
+缓存后端接口
+
+定义 CacheManager 依赖的存储操作，Redis 客户端和进程内内存后端都实现该接口。
+值统一为已序列化的字符串，序列化与降级逻辑由 CacheManager 负责。
+同步接口（*_sync）供线程池中的同步代码和失效队列使用，不经过事件循环。
+"""
+
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+
+
+class CacheBackend(ABC):
+    """缓存后端抽象基类"""
+
+    @abstractmethod
+    async def get(self, key: str) -> str | None:
+        """获取缓存值，不存在或已过期返回 None"""
+
+    @abstractmethod
+    async def set(self, key: str, value: str, ttl: int | None = None) -> bool:
+        """设置缓存值，ttl 为 None 表示永不过期"""
+
+    @abstractmethod
+    async def get_or_set(self, key: str, value: str, ttl: int | None = None) -> str:
+        """键不存在时写入 value，返回键的当前值（原子操作，并发写入时只有一个生效）"""
+
+    @abstractmethod
+    async def delete(self, key: str) -> bool:
+        """删除缓存键，键存在且被删除返回 True"""
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        """检查键是否存在"""
+
+    @abstractmethod
+    async def expire(self, key: str, ttl: int) -> bool:
+        """设置键的过期时间，键存在且设置成功返回 True"""
+
+    @abstractmethod
+    async def delete_pattern(self, pattern: str) -> int:
+        """批量删除匹配 glob 模式的键，返回删除数量"""
+
+    @abstractmethod
+    async def mget(self, keys: list[str]) -> list[str | None]:
+        """批量获取缓存值，返回与 keys 顺序一致的列表"""
+
+    @abstractmethod
+    async def mset_with_ttl(self, mapping: dict[str, str], ttl: int | None = None) -> bool:
+        """批量设置缓存值并统一设置过期时间"""
+
+    @abstractmethod
+    async def delete_many(self, keys: list[str]) -> int:
+        """批量删除缓存键，返回实际删除数量"""
+
+    @abstractmethod
+    async def ping(self) -> bool:
+        """健康检查"""
+
+    @abstractmethod
+    async def close(self) -> None:
+        """释放后端资源"""
+
+    @abstractmethod
+    def call_sync(self, operation: Callable[[Any], T]) -> T:
+        """在后端的阻塞式客户端上执行操作（同步），不提供原生客户端的后端抛出 NotImplementedError"""
+
+    @abstractmethod
+    def set_sync(self, key: str, value: str, ttl: int | None = None) -> bool:
+        """设置缓存值（同步）"""
+
+    @abstractmethod
+    def delete_sync(self, key: str) -> bool:
+        """删除缓存键（同步），键存在且被删除返回 True"""
+
+    @abstractmethod
+    def delete_pattern_sync(self, pattern: str) -> int:
+        """批量删除匹配 glob 模式的键（同步），返回删除数量"""
+
+    @abstractmethod
+    def delete_patterns_sync(self, patterns: list[str]) -> int:
+        """批量删除匹配任一 glob 模式的键（同步），返回删除数量"""
@@ -0,0 +1,363 @@
+"""
+失效事件总线
+
+多个 uvicorn worker 各自持有进程内状态（内存缓存后端、WebSocket 连接表等），
+一个 worker 上的变更需要通知其他 worker。总线基于 Redis 发布/订阅：
+- 每个 worker 在 lifespan 中调用 start() 订阅同一频道，收到事件后调用已注册的处理函数
+- 发布方自身也会通过订阅收到事件，处理逻辑对所有 worker 一致
+- Redis 不可用或总线禁用时退化为进程内回环（loopback），事件直接在本进程处理
+
+事件格式：{"type": 事件类型, "origin": 发布方 worker ID, "ts": 发布时间戳, "data": {...}}
+每个事件处理完成后记录端到端传播延迟指标 cache_bus_propagation_seconds。
+"""
+
+import asyncio
+import concurrent.futures
+import inspect
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from collections.abc import Callable
+from typing import Any
+
+from app.core.cache.memory_backend import MemoryCacheBackend
+from app.core.cache.metrics import get_cache_metrics
+from app.core.cache.redis_client import RedisClient
+
+logger = logging.getLogger(__name__)
+
+# 事件类型
+EVENT_CACHE_INVALIDATE = "cache.invalidate"
+EVENT_MESSAGE_UPDATE = "ws.message_update"
+EVENT_ENTITY_CREATED = "entity.created"
+# 仅在本进程内分发：订阅中断后重新订阅成功，期间其他 worker 的事件可能已丢失
+EVENT_BUS_RECONNECTED = "bus.reconnected"
+
+# 传输方式
+TRANSPORT_REDIS = "redis"
+TRANSPORT_LOOPBACK = "loopback"
+
+# 订阅中断后的重连间隔上限（秒）
+MAX_RECONNECT_DELAY = 30.0
+
+
+class InvalidationBus:
+    """失效事件总线
+
+    通过 subscribe() 注册事件处理函数（同步或异步，参数为事件字典），
+    通过 publish() / publish_nowait() 发布事件。
+    """
+
+    def __init__(
+        self,
+        cache_manager=None,
+        redis_client: RedisClient | None = None,
+        channel: str | None = None,
+        enabled: bool = True,
+    ):
+        """初始化事件总线
+
+        Args:
+            cache_manager: 缓存管理器（可选，默认使用全局实例）
+            redis_client: 用于发布/订阅的 Redis 客户端（可选，默认复用缓存后端或按缓存配置创建）
+            channel: 频道名（可选，默认 "{key_prefix}:bus"）
+            enabled: 是否启用 Redis 传输，False 时始终使用进程内回环
+        """
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.enabled = enabled
+        self.channel = channel
+        self.metrics = get_cache_metrics()
+
+        self._cache_manager = cache_manager
+        self._redis_client = redis_client
+        self._redis: RedisClient | None = None
+        self._owns_redis = False
+        self._handlers: dict[str, list[Callable]] = {}
+        self._task: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        # 未完成的发布：本循环中创建的任务和从其他线程提交的 Future，保留引用直到完成
+        self._pending_tasks: set[asyncio.Task] = set()
+        self._pending_futures: set[concurrent.futures.Future] = set()
+
+        self.subscribe(EVENT_CACHE_INVALIDATE, self._handle_cache_invalidate)
+
+    @property
+    def cache_manager(self):
+        """缓存管理器"""
+        if self._cache_manager is None:
+            from app.core.cache.factory import get_cache_manager
+
+            return get_cache_manager()
+        return self._cache_manager
+
+    @property
+    def is_distributed(self) -> bool:
+        """是否通过 Redis 在多个 worker 之间传播事件"""
+        return self._redis is not None
+
+    @property
+    def transport(self) -> str:
+        """当前传输方式"""
+        return TRANSPORT_REDIS if self.is_distributed else TRANSPORT_LOOPBACK
+
+    def subscribe(self, event_type: str, handler: Callable) -> None:
+        """注册事件处理函数
+
+        Args:
+            event_type: 事件类型
+            handler: 处理函数（同步或异步），参数为事件字典
+        """
+        handlers = self._handlers.setdefault(event_type, [])
+        if handler not in handlers:
+            handlers.append(handler)
+
+    def unsubscribe(self, event_type: str, handler: Callable) -> None:
+        """注销事件处理函数"""
+        handlers = self._handlers.get(event_type, [])
+        if handler in handlers:
+            handlers.remove(handler)
+
+    async def start(self) -> None:
+        """启动总线：连接 Redis 并在后台订阅频道，失败时使用进程内回环"""
+        self._loop = asyncio.get_running_loop()
+        if self._task is not None:
+            return
+
+        if not self.enabled:
+            logger.info("失效总线已禁用，使用进程内回环")
+            return
+
+        redis_client = self._resolve_redis_client()
+        if redis_client is None:
+            logger.info("失效总线未配置 Redis，使用进程内回环")
+            return
+
+        self.channel = self.channel or f"{self.cache_manager.key_prefix}:bus"
+        try:
+            pubsub = await self._open_pubsub(redis_client)
+        except Exception as e:
+            logger.warning(f"失效总线订阅失败，使用进程内回环: {e}")
+            await self._close_owned_redis(redis_client)
+            return
+
+        self._redis = redis_client
+        self._task = asyncio.create_task(self._listen(pubsub))
+        logger.info(f"失效总线已启动: channel={self.channel}, worker={self.worker_id}")
+
+    async def stop(self) -> None:
+        """停止订阅并释放总线自己创建的 Redis 连接"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        if self._redis is not None:
+            await self._close_owned_redis(self._redis)
+            self._redis = None
+        self._loop = None
+
+    def _resolve_redis_client(self) -> RedisClient | None:
+        """选择用于发布/订阅的 Redis 客户端
+
+        优先使用显式传入的客户端，其次复用缓存后端的 RedisClient；
+        缓存使用内存后端或被禁用时，按缓存配置的连接信息单独创建客户端。
+        """
+        if self._redis_client is not None:
+            return self._redis_client
+
+        backend = self.cache_manager.redis_client
+        if isinstance(backend, RedisClient):
+            return backend
+
+        from app.core.cache.config import create_cache_config_from_settings
+
+        config = create_cache_config_from_settings()
+        self._owns_redis = True
+        return RedisClient(
+            host=config.host,
+            port=config.port,
+            db=config.db,
+            password=config.password,
+            max_connections=2,
+            socket_timeout=config.socket_timeout,
+            socket_connect_timeout=config.socket_connect_timeout,
+            retry_on_timeout=config.retry_on_timeout,
+        )
+
+    async def _close_owned_redis(self, redis_client: RedisClient) -> None:
+        """关闭总线自己创建的 Redis 客户端（复用的缓存后端由缓存管理器负责）"""
+        if self._owns_redis:
+            await redis_client.close()
+            self._owns_redis = False
+
+    async def _open_pubsub(self, redis_client: RedisClient):
+        """创建 PubSub 并订阅频道"""
+        pubsub = await redis_client.pubsub()
+        await pubsub.subscribe(self.channel)
+        return pubsub
+
+    async def _listen(self, pubsub) -> None:
+        """订阅循环，连接中断后按指数退避重连"""
+        retry_delay = 1.0
+        while True:
+            try:
+                if pubsub is None:
+                    pubsub = await self._open_pubsub(self._redis)
+                    retry_delay = 1.0
+                    logger.info(f"失效总线已重新订阅: channel={self.channel}")
+                    await self._dispatch({"type": EVENT_BUS_RECONNECTED, "origin": self.worker_id}, TRANSPORT_REDIS)
+
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is not None:
+                    await self._dispatch_raw(message["data"])
+
+            except asyncio.CancelledError:
+                await self._close_pubsub(pubsub)
+                raise
+            except Exception as e:
+                logger.warning(f"失效总线订阅中断，{retry_delay:.0f}s 后重连: {e}")
+                await self._close_pubsub(pubsub)
+                pubsub = None
+                await asyncio.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, MAX_RECONNECT_DELAY)
+
+    @staticmethod
+    async def _close_pubsub(pubsub) -> None:
+        if pubsub is None:
+            return
+        try:
+            await pubsub.aclose()
+        except Exception as e:
+            logger.debug(f"关闭 PubSub 时出错: {e}")
+
+    async def publish(self, event_type: str, data: dict[str, Any]) -> None:
+        """发布事件
+
+        Redis 可用时发布到频道（包括本进程在内的所有 worker 都会处理），
+        否则或发布失败时直接在本进程处理。
+
+        Args:
+            event_type: 事件类型
+            data: 事件数据（需可 JSON 序列化）
+        """
+        event = {"type": event_type, "origin": self.worker_id, "ts": time.time(), "data": data}
+
+        if self._redis is not None:
+            try:
+                await self._redis.publish(self.channel, json.dumps(event, ensure_ascii=False))
+                return
+            except Exception as e:
+                logger.warning(f"失效总线发布失败，改为本进程处理 (type={event_type}): {e}")
+
+        await self._dispatch(event, TRANSPORT_LOOPBACK)
+
+    def publish_nowait(self, event_type: str, data: dict[str, Any]) -> None:
+        """在同步代码中发布事件（不等待完成）
+
+        在总线所在事件循环之外（例如线程池中的同步端点）调用时，提交到总线的事件循环执行；
+        没有可用的事件循环时跳过发布。
+        """
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+
+        if self._loop is not None and self._loop.is_running() and running_loop is not self._loop:
+            future = asyncio.run_coroutine_threadsafe(self.publish(event_type, data), self._loop)
+            self._pending_futures.add(future)
+            future.add_done_callback(self._pending_futures.discard)
+        elif running_loop is not None:
+            task = running_loop.create_task(self.publish(event_type, data))
+            self._pending_tasks.add(task)
+            task.add_done_callback(self._pending_tasks.discard)
+        else:
+            logger.debug(f"没有运行中的事件循环，跳过总线事件发布 (type={event_type})")
+
+    async def _dispatch_raw(self, raw: str | bytes) -> None:
+        """解析从 Redis 收到的事件并处理"""
+        try:
+            event = json.loads(raw)
+        except (json.JSONDecodeError, TypeError) as e:
+            logger.warning(f"失效总线收到无法解析的事件: {e}")
+            return
+        await self._dispatch(event, TRANSPORT_REDIS)
+
+    async def _dispatch(self, event: dict[str, Any], transport: str) -> None:
+        """调用事件处理函数并记录传播延迟"""
+        event_type = event.get("type", "")
+        for handler in list(self._handlers.get(event_type, [])):
+            try:
+                result = handler(event)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.warning(f"失效总线事件处理失败 (type={event_type}): {e}")
+
+        if "ts" in event:
+            self.metrics.record_bus_propagation(event_type, transport, time.time() - event["ts"])
+
+    def publish_cache_invalidation(self, patterns: list[str]) -> None:
+        """通知其他 worker 失效进程内缓存
+
+        使用内存缓存后端或同步路径的一级缓存（L1）时才需要广播；
+        Redis 缓存由所有 worker 共享，发布方已完成删除。
+
+        Args:
+            patterns: 已在本进程失效的缓存键模式
+        """
+        cache_manager = self.cache_manager
+        has_local_state = (
+            isinstance(cache_manager.redis_client, MemoryCacheBackend) or cache_manager.local_cache is not None
+        )
+        if patterns and has_local_state:
+            self.publish_nowait(EVENT_CACHE_INVALIDATE, {"patterns": list(patterns)})
+
+    async def _handle_cache_invalidate(self, event: dict[str, Any]) -> None:
+        """处理缓存失效事件：删除本进程内存缓存或 L1 中匹配的键"""
+        if event.get("origin") == self.worker_id:
+            return
+
+        cache_manager = self.cache_manager
+        if not cache_manager.is_enabled():
+            return
+
+        for pattern in event.get("data", {}).get("patterns", []):
+            if isinstance(cache_manager.redis_client, MemoryCacheBackend):
+                await cache_manager.invalidate_pattern(pattern)
+            else:
+                cache_manager.evict_local(pattern)
+
+
+# 全局事件总线实例（延迟初始化）
+_global_bus: InvalidationBus | None = None
+
+
+def get_invalidation_bus() -> InvalidationBus:
+    """获取全局失效事件总线实例
+
+    Returns:
+        InvalidationBus 实例
+    """
+    global _global_bus
+
+    if _global_bus is None:
+        from app.core.config import settings
+
+        _global_bus = InvalidationBus(enabled=settings.CACHE_BUS_ENABLED)
+
+    return _global_bus
+
+
+def reset_invalidation_bus() -> None:
+    """重置全局事件总线
+
+    用于测试或重新加载配置时重置事件总线。
+    """
+    global _global_bus
+    _global_bus = None
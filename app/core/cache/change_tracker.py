@@ -0,0 +1,303 @@
+"""
+会话变更跟踪器
+
+按 SQLAlchemy 会话自动失效缓存：after_flush 时收集会话中新增、修改和删除的实例，
+按模型规则换算为缓存模式、路由缓存标签、需要推送消息更新的用户和需要失效的打包下载缓存，累积在 Session.info 中；
+after_commit 时合并为一次失效队列提交和一次 WebSocket 消息更新事件，after_rollback 时丢弃。
+
+- 同一事务中的多次 flush 只在提交后发出一次，重复的模式和用户去重
+- 只修改了忽略列（如下载次数、登录失败计数）的实例不触发失效
+- 服务层手写的业务失效函数与跟踪器共用 invalidation.py 中的 *_cache_targets，重复提交由失效队列合并
+
+通过 Query.update() / Query.delete() 或原生 SQL 执行的批量修改不会出现在会话的 new / dirty / deleted 中，
+需由调用方使用业务失效函数清除缓存。
+"""
+
+import logging
+from collections.abc import Callable
+from typing import Any, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+# 事务中累积的变更，保存在 Session.info 中
+CHANGES_INFO_KEY = "cache_change_set"
+
+
+class ChangeSet:
+    """一个事务中累积的缓存失效目标"""
+
+    def __init__(self):
+        self.patterns: set[str] = set()
+        self.tags: set[str] = set()
+        # 需要推送消息更新（未读数量等）的用户
+        self.user_ids: set[str] = set()
+        # 需要删除打包下载缓存的 (条目类型, 知识库 / 人设卡 ID)
+        self.archives: set[tuple[str, str]] = set()
+
+    def __bool__(self) -> bool:
+        return bool(self.patterns or self.tags or self.user_ids or self.archives)
+
+    def add(self, targets: tuple[list[str], list[str]]) -> None:
+        """合并 *_cache_targets 返回的 (缓存模式列表, 路由缓存标签列表)"""
+        patterns, tags = targets
+        self.patterns.update(patterns)
+        self.tags.update(tags)
+
+
+class TrackedModel(NamedTuple):
+    """模型的失效规则"""
+
+    # (缓存管理器, 实例, 变更集) -> None，把实例对应的失效目标合并到变更集
+    collect: Callable[[Any, Any, ChangeSet], None]
+    # 只修改这些列时不触发失效
+    ignored_columns: frozenset[str] = frozenset()
+
+
+def _value(instance: Any, key: str) -> Any:
+    """读取实例属性，不可加载时（如已删除的过期实例）返回 None"""
+    from sqlalchemy.inspection import inspect as sqlalchemy_inspect
+
+    state = sqlalchemy_inspect(instance)
+    if key in state.dict:
+        return state.dict[key]
+    if key == "id" and state.identity:
+        return state.identity[0]
+    try:
+        return getattr(instance, key)
+    except Exception:
+        return None
+
+
+def _default_rules() -> dict[type, TrackedModel]:
+    from app.core.cache.invalidation import (
+        comment_cache_targets,
+        knowledge_cache_targets,
+        message_cache_targets,
+        persona_cache_targets,
+        star_cache_targets,
+        user_cache_targets,
+    )
+    from app.models.database import (
+        Comment,
+        CommentReaction,
+        KnowledgeBase,
+        KnowledgeBaseFile,
+        Message,
+        PersonaCard,
+        PersonaCardFile,
+        StarRecord,
+        User,
+    )
+    from app.services.archive_cache import ARCHIVE_KIND_KNOWLEDGE, ARCHIVE_KIND_PERSONA
+
+    def collect_message(cache_manager, message, changes: ChangeSet) -> None:
+        recipient_id = _value(message, "recipient_id")
+        changes.add(message_cache_targets(cache_manager, _value(message, "id"), recipient_id))
+        if recipient_id:
+            changes.user_ids.add(str(recipient_id))
+
+    def collect_knowledge(cache_manager, kb_id, changes: ChangeSet, uploader_id=None) -> None:
+        changes.add(knowledge_cache_targets(cache_manager, kb_id, uploader_id))
+        if kb_id:
+            changes.archives.add((ARCHIVE_KIND_KNOWLEDGE, str(kb_id)))
+
+    def collect_persona(cache_manager, pc_id, changes: ChangeSet, uploader_id=None) -> None:
+        changes.add(persona_cache_targets(cache_manager, pc_id, uploader_id))
+        if pc_id:
+            changes.archives.add((ARCHIVE_KIND_PERSONA, str(pc_id)))
+
+    return {
+        KnowledgeBase: TrackedModel(
+            lambda cm, kb, changes: collect_knowledge(cm, _value(kb, "id"), changes, _value(kb, "uploader_id")),
+            frozenset({"downloads", "updated_at"}),
+        ),
+        KnowledgeBaseFile: TrackedModel(
+            lambda cm, kb_file, changes: collect_knowledge(cm, _value(kb_file, "knowledge_base_id"), changes),
+        ),
+        PersonaCard: TrackedModel(
+            lambda cm, pc, changes: collect_persona(cm, _value(pc, "id"), changes, _value(pc, "uploader_id")),
+            frozenset({"downloads", "updated_at"}),
+        ),
+        PersonaCardFile: TrackedModel(
+            lambda cm, pc_file, changes: collect_persona(cm, _value(pc_file, "persona_card_id"), changes),
+        ),
+        User: TrackedModel(
+            lambda cm, user, changes: changes.add(user_cache_targets(cm, _value(user, "id"))),
+            frozenset({"failed_login_attempts", "last_failed_login"}),
+        ),
+        Message: TrackedModel(collect_message),
+        StarRecord: TrackedModel(
+            lambda cm, star, changes: changes.add(star_cache_targets(cm, _value(star, "user_id"))),
+        ),
+        Comment: TrackedModel(
+            lambda cm, comment, changes: changes.add(
+                comment_cache_targets(cm, _value(comment, "id"), _value(comment, "target_id"))
+            ),
+        ),
+        CommentReaction: TrackedModel(
+            lambda cm, reaction, changes: changes.add(comment_cache_targets(cm, _value(reaction, "comment_id"))),
+        ),
+    }
+
+
+class ChangeTracker:
+    """按事务收集实例变更，提交后批量失效缓存并推送消息更新"""
+
+    def __init__(self, cache_manager=None, rules: dict[type, TrackedModel] | None = None):
+        """初始化变更跟踪器
+
+        Args:
+            cache_manager: 缓存管理器（可选，默认使用全局实例）
+            rules: 模型类 -> 失效规则（可选，默认为知识库、人设卡、用户、消息、收藏和评论）
+        """
+        self._cache_manager = cache_manager
+        self._rules = rules
+        self._listeners: list[tuple[Any, str, Callable]] = []
+
+    @property
+    def cache_manager(self):
+        """缓存管理器"""
+        if self._cache_manager is None:
+            from app.core.cache.factory import get_cache_manager
+
+            return get_cache_manager()
+        return self._cache_manager
+
+    @property
+    def rules(self) -> dict[type, TrackedModel]:
+        """模型类 -> 失效规则"""
+        if self._rules is None:
+            self._rules = _default_rules()
+        return self._rules
+
+    def collect(self, session) -> None:
+        """把会话中待刷新的实例换算为失效目标，累积到 Session.info
+
+        在 after_flush 中调用，此时 new / dirty / deleted 和属性历史仍是刷新前的状态。
+
+        Args:
+            session: SQLAlchemy 会话
+        """
+        rules = self.rules
+        cache_manager = self.cache_manager
+        changes: ChangeSet | None = session.info.get(CHANGES_INFO_KEY)
+
+        for instances, check_columns in ((session.new, False), (session.dirty, True), (session.deleted, False)):
+            for instance in instances:
+                rule = rules.get(type(instance))
+                if rule is None:
+                    continue
+                if check_columns and not self._has_tracked_changes(instance, rule.ignored_columns):
+                    continue
+                if changes is None:
+                    changes = session.info[CHANGES_INFO_KEY] = ChangeSet()
+                try:
+                    rule.collect(cache_manager, instance, changes)
+                except Exception as e:
+                    logger.warning(f"计算缓存失效目标失败 ({type(instance).__name__}): {e}")
+
+    @staticmethod
+    def _has_tracked_changes(instance: Any, ignored_columns: frozenset[str]) -> bool:
+        """实例是否有忽略列以外的列被修改（只修改关系属性或赋相同的值不算）"""
+        from sqlalchemy.inspection import inspect as sqlalchemy_inspect
+
+        state = sqlalchemy_inspect(instance)
+        for column in state.mapper.column_attrs:
+            if column.key not in ignored_columns and state.attrs[column.key].history.has_changes():
+                return True
+        return False
+
+    def emit(self, changes: ChangeSet) -> None:
+        """提交一次失效队列、发布一次消息更新事件，并删除变更条目的打包下载缓存
+
+        Args:
+            changes: 事务中累积的变更
+        """
+        from app.core.cache.bus import EVENT_MESSAGE_UPDATE, get_invalidation_bus
+        from app.core.cache.invalidation import invalidate_cache_targets
+
+        if changes.patterns or changes.tags:
+            invalidate_cache_targets(self.cache_manager, sorted(changes.patterns), sorted(changes.tags))
+
+        if changes.user_ids:
+            try:
+                get_invalidation_bus().publish_nowait(EVENT_MESSAGE_UPDATE, {"user_ids": sorted(changes.user_ids)})
+            except Exception as e:
+                logger.warning(f"发布消息更新事件失败: {e}")
+
+        if changes.archives:
+            from app.services.archive_cache import get_archive_cache
+
+            archive_cache = get_archive_cache()
+            for kind, item_id in sorted(changes.archives):
+                try:
+                    archive_cache.invalidate(kind, item_id)
+                except Exception as e:
+                    logger.warning(f"删除打包下载缓存失败 ({kind}/{item_id}): {e}")
+
+    def install_listeners(self) -> None:
+        """注册 SQLAlchemy 会话事件"""
+        from sqlalchemy import event
+        from sqlalchemy.orm import Session
+
+        if self._listeners:
+            return
+
+        def on_flush(session, flush_context):
+            self.collect(session)
+
+        def on_commit(session):
+            changes = session.info.pop(CHANGES_INFO_KEY, None)
+            if changes:
+                self.emit(changes)
+
+        def on_rollback(session):
+            session.info.pop(CHANGES_INFO_KEY, None)
+
+        self._listen(event, Session, "after_flush", on_flush)
+        self._listen(event, Session, "after_commit", on_commit)
+        self._listen(event, Session, "after_rollback", on_rollback)
+
+    def _listen(self, event, target: Any, identifier: str, listener: Callable) -> None:
+        event.listen(target, identifier, listener)
+        self._listeners.append((target, identifier, listener))
+
+    def remove_listeners(self) -> None:
+        """注销 SQLAlchemy 会话事件"""
+        from sqlalchemy import event
+
+        for target, identifier, listener in self._listeners:
+            event.remove(target, identifier, listener)
+        self._listeners.clear()
+
+
+# 全局变更跟踪器实例（延迟初始化）
+_global_change_tracker: ChangeTracker | None = None
+
+
+def get_change_tracker() -> ChangeTracker:
+    """获取全局变更跟踪器实例
+
+    首次获取时注册 SQLAlchemy 会话事件，之后本进程内提交的变更都会自动失效缓存。
+
+    Returns:
+        ChangeTracker 实例
+    """
+    global _global_change_tracker
+
+    if _global_change_tracker is None:
+        _global_change_tracker = ChangeTracker()
+        _global_change_tracker.install_listeners()
+
+    return _global_change_tracker
+
+
+def reset_change_tracker() -> None:
+    """重置全局变更跟踪器
+
+    用于测试或重新加载配置时重置变更跟踪器。
+    """
+    global _global_change_tracker
+    if _global_change_tracker is not None:
+        _global_change_tracker.remove_listeners()
+    _global_change_tracker = None
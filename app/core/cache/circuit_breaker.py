@@ -0,0 +1,218 @@
+"""
+Redis 熔断器
+
+Redis 挂起时每次操作都要等到 socket 超时才失败，CacheManager 降级之前每个请求都先付出这段延迟。
+熔断器按滑动时间窗口统计失败率，在 Redis 不可用期间直接拒绝调用：
+- closed（关闭）：正常访问 Redis；窗口内调用数达到 minimum_calls 且失败率达到阈值时打开
+- open（打开）：立即抛出 CircuitOpenError，不访问 Redis；经过带随机抖动的 open_seconds 后进入半开，
+  抖动使多个 worker 的探测时间错开，避免 Redis 恢复瞬间被同时涌入的请求压垮
+- half_open（半开）：放行最多 half_open_max_calls 个探测调用，成功则关闭，失败则重新打开；
+  探测调用在一个打开周期内没有结果（如协程被取消）时重新放行探测
+
+只有连接错误和超时计为失败；其他 Redis 错误（如命令参数错误）说明服务可以响应，计为成功。
+"""
+
+import logging
+import random
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.core.cache.metrics import get_cache_metrics
+
+logger = logging.getLogger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+# 状态在 Prometheus Gauge 中的取值
+STATE_VALUES = {STATE_CLOSED: 0, STATE_OPEN: 1, STATE_HALF_OPEN: 2}
+
+
+class CircuitOpenError(RedisConnectionError):
+    """熔断器打开，调用未发送到 Redis
+
+    继承 Redis 连接错误，现有的降级逻辑无需修改即可处理。
+    """
+
+
+class CircuitBreaker:
+    """按滑动时间窗口失败率熔断的断路器
+
+    before_call / record_success / record_failure 可在事件循环线程和线程池（同步缓存路径）中调用。
+    关闭状态和打开状态下的拒绝不获取锁。
+    """
+
+    def __init__(
+        self,
+        name: str = "redis",
+        failure_rate_threshold: float = 0.5,
+        window_seconds: int = 10,
+        minimum_calls: int = 20,
+        open_seconds: float = 5.0,
+        jitter: float = 0.2,
+        half_open_max_calls: int = 1,
+        enabled: bool = True,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """初始化熔断器
+
+        Args:
+            name: 名称（指标标签和日志）
+            failure_rate_threshold: 打开熔断的失败率阈值（0-1）
+            window_seconds: 统计失败率的滑动窗口长度（秒）
+            minimum_calls: 窗口内调用数达到该值后才计算失败率
+            open_seconds: 打开后到允许探测的基准时间（秒）
+            jitter: open_seconds 的随机抖动比例（0-1），实际时间在 open_seconds * (1 ± jitter) 之间
+            half_open_max_calls: 半开状态同时放行的探测调用数
+            enabled: 是否启用（禁用时不拒绝任何调用）
+            clock: 单调时钟（测试时可替换）
+        """
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.window_seconds = max(1, int(window_seconds))
+        self.minimum_calls = max(1, minimum_calls)
+        self.open_seconds = open_seconds
+        self.jitter = min(max(jitter, 0.0), 1.0)
+        self.half_open_max_calls = max(1, half_open_max_calls)
+        self.enabled = enabled
+        self.metrics = get_cache_metrics()
+
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = STATE_CLOSED
+        # 打开状态：允许探测的时间；半开状态：重新放行探测的时间
+        self._retry_at = 0.0
+        self._probes = 0
+        # 每秒一个桶：[所属秒数, 成功次数, 失败次数]
+        self._buckets: list[list[int]] = [[-1, 0, 0] for _ in range(self.window_seconds)]
+
+    @property
+    def state(self) -> str:
+        """当前状态（closed, open, half_open）"""
+        return self._state
+
+    def before_call(self) -> None:
+        """调用 Redis 之前检查是否放行
+
+        Raises:
+            CircuitOpenError: 熔断器打开，或半开状态的探测名额已用完
+        """
+        if not self.enabled or self._state == STATE_CLOSED:
+            return
+        if self._state == STATE_OPEN and self._clock() < self._retry_at:
+            raise CircuitOpenError(f"熔断器已打开，跳过 Redis 调用 ({self.name})")
+
+        with self._lock:
+            now = self._clock()
+            if self._state == STATE_OPEN:
+                if now < self._retry_at:
+                    raise CircuitOpenError(f"熔断器已打开，跳过 Redis 调用 ({self.name})")
+                self._transition(STATE_HALF_OPEN, now)
+            if self._state == STATE_HALF_OPEN:
+                if self._probes >= self.half_open_max_calls:
+                    if now < self._retry_at:
+                        raise CircuitOpenError(f"熔断器半开，等待探测结果 ({self.name})")
+                    self._probes = 0
+                    self._retry_at = now + self._jittered_open_seconds()
+                self._probes += 1
+
+    def record_success(self) -> None:
+        """记录一次成功的调用"""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            if self._state == STATE_HALF_OPEN:
+                self._transition(STATE_CLOSED, self._clock())
+            elif self._state == STATE_CLOSED:
+                self._bucket(self._clock())[1] += 1
+
+    def record_failure(self) -> None:
+        """记录一次失败的调用（连接错误或超时）"""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            now = self._clock()
+            if self._state == STATE_HALF_OPEN:
+                self._transition(STATE_OPEN, now)
+                return
+            if self._state == STATE_OPEN:
+                return
+
+            self._bucket(now)[2] += 1
+            successes, failures = self._window_totals(now)
+            calls = successes + failures
+            if calls >= self.minimum_calls and failures / calls >= self.failure_rate_threshold:
+                self._transition(STATE_OPEN, now)
+
+    def _bucket(self, now: float) -> list[int]:
+        """获取当前秒的计数桶（调用方持有锁），桶属于窗口之外的秒数时清零复用"""
+        second = int(now)
+        bucket = self._buckets[second % self.window_seconds]
+        if bucket[0] != second:
+            bucket[0], bucket[1], bucket[2] = second, 0, 0
+        return bucket
+
+    def _window_totals(self, now: float) -> tuple[int, int]:
+        """统计窗口内的 (成功次数, 失败次数)（调用方持有锁）"""
+        oldest = int(now) - self.window_seconds
+        successes = failures = 0
+        for second, bucket_successes, bucket_failures in self._buckets:
+            if second > oldest:
+                successes += bucket_successes
+                failures += bucket_failures
+        return successes, failures
+
+    def _jittered_open_seconds(self) -> float:
+        return self.open_seconds * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _transition(self, state: str, now: float) -> None:
+        """切换状态（调用方持有锁）"""
+        previous = self._state
+        if previous == state:
+            return
+
+        self._state = state
+        self._probes = 0
+        if state == STATE_CLOSED:
+            for bucket in self._buckets:
+                bucket[0], bucket[1], bucket[2] = -1, 0, 0
+        else:
+            self._retry_at = now + self._jittered_open_seconds()
+
+        if state == STATE_OPEN:
+            logger.warning(
+                f"Redis 熔断器打开 ({self.name}): {previous} -> {state}，" f"{self._retry_at - now:.1f} 秒后探测"
+            )
+        else:
+            logger.info(f"Redis 熔断器状态变更 ({self.name}): {previous} -> {state}")
+        self.metrics.record_circuit_transition(self.name, previous, state, STATE_VALUES[state])
+
+    def reset(self) -> None:
+        """恢复为关闭状态并清空统计"""
+        with self._lock:
+            self._transition(STATE_CLOSED, self._clock())
+
+    def get_stats(self) -> dict[str, Any]:
+        """获取熔断器状态
+
+        Returns:
+            dict: 状态、窗口内调用数和失败率、打开状态下距离探测的剩余秒数
+        """
+        with self._lock:
+            now = self._clock()
+            successes, failures = self._window_totals(now)
+            calls = successes + failures
+            return {
+                "enabled": self.enabled,
+                "state": self._state,
+                "window_calls": calls,
+                "failure_rate": round(failures / calls, 4) if calls else 0.0,
+                "retry_in": round(max(0.0, self._retry_at - now), 2) if self._state == STATE_OPEN else None,
+            }
@@ -17,6 +17,7 @@ class CacheConfig(BaseModel):
         json_schema_extra={
             "example": {
                 "enabled": True,
+                "backend": "redis",
                 "host": "localhost",
                 "port": 6379,
                 "db": 0,
@@ -27,11 +28,21 @@ class CacheConfig(BaseModel):
                 "socket_timeout": 5,
                 "socket_connect_timeout": 5,
                 "retry_on_timeout": True,
+                "memory_max_entries": 10000,
+                "memory_max_bytes": 67108864,
+                "circuit_breaker_enabled": True,
+                "circuit_breaker_failure_rate": 0.5,
+                "circuit_breaker_window": 10,
+                "circuit_breaker_minimum_calls": 20,
+                "circuit_breaker_open_seconds": 5.0,
+                "circuit_breaker_jitter": 0.2,
+                "circuit_breaker_half_open_calls": 1,
             }
         }
     )
 
     enabled: bool = Field(default=True, description="缓存开关，False 时自动降级到数据库")
+    backend: str = Field(default="redis", description="缓存后端：redis 或 memory（进程内内存缓存）")
     host: str = Field(default="localhost", description="Redis 服务器地址")
     port: int = Field(default=6379, description="Redis 服务器端口")
     db: int = Field(default=0, description="Redis 数据库编号")
@@ -42,6 +53,24 @@ class CacheConfig(BaseModel):
     socket_timeout: int = Field(default=5, description="Socket 超时时间（秒）")
     socket_connect_timeout: int = Field(default=5, description="连接超时时间（秒）")
     retry_on_timeout: bool = Field(default=True, description="超时时是否重试")
+    memory_max_entries: int = Field(default=10000, description="内存后端最大条目数")
+    memory_max_bytes: int = Field(default=64 * 1024 * 1024, description="内存后端最大占用字节数，默认 64MB")
+    circuit_breaker_enabled: bool = Field(default=True, description="Redis 熔断器开关")
+    circuit_breaker_failure_rate: float = Field(default=0.5, description="打开熔断的失败率阈值（0-1）")
+    circuit_breaker_window: int = Field(default=10, description="统计失败率的滑动窗口（秒）")
+    circuit_breaker_minimum_calls: int = Field(default=20, description="窗口内调用数达到该值后才判断失败率")
+    circuit_breaker_open_seconds: float = Field(default=5.0, description="熔断打开后到探测的基准时间（秒）")
+    circuit_breaker_jitter: float = Field(default=0.2, description="探测时间的随机抖动比例（0-1）")
+    circuit_breaker_half_open_calls: int = Field(default=1, description="半开状态同时放行的探测请求数")
+
+    @field_validator("backend")
+    @classmethod
+    def validate_backend(cls, v: str) -> str:
+        """验证缓存后端类型"""
+        v = v.lower()
+        if v not in ("redis", "memory"):
+            raise ValueError("缓存后端必须为 redis 或 memory")
+        return v
 
     @field_validator("port")
     @classmethod
@@ -75,6 +104,35 @@ class CacheConfig(BaseModel):
             raise ValueError("最大连接数必须大于 0")
         return v
 
+    @field_validator("memory_max_entries", "memory_max_bytes")
+    @classmethod
+    def validate_memory_limits(cls, v: int) -> int:
+        """验证内存后端上限"""
+        if v <= 0:
+            raise ValueError("内存后端上限必须大于 0")
+        return v
+
+    @field_validator("circuit_breaker_failure_rate", "circuit_breaker_jitter")
+    @classmethod
+    def validate_circuit_breaker_ratio(cls, v: float) -> float:
+        """验证熔断器比例参数"""
+        if not 0 <= v <= 1:
+            raise ValueError("熔断器失败率阈值和抖动比例必须在 0-1 范围内")
+        return v
+
+    @field_validator(
+        "circuit_breaker_window",
+        "circuit_breaker_minimum_calls",
+        "circuit_breaker_open_seconds",
+        "circuit_breaker_half_open_calls",
+    )
+    @classmethod
+    def validate_circuit_breaker_positive(cls, v: float) -> float:
+        """验证熔断器窗口、调用数和时间参数"""
+        if v <= 0:
+            raise ValueError("熔断器窗口、调用数和打开时间必须大于 0")
+        return v
+
 
 def validate_cache_config(config: CacheConfig) -> tuple[bool, list[str]]:
     """验证缓存配置的完整性和合理性
@@ -92,6 +150,13 @@ def validate_cache_config(config: CacheConfig) -> tuple[bool, list[str]]:
         warnings.append("缓存已禁用，系统将使用降级模式（直接访问数据库）")
         return True, warnings
 
+    # 内存后端不连接 Redis，只需验证 TTL 和键前缀
+    if config.backend == "memory":
+        warnings.append("使用进程内内存缓存，多进程部署时各进程缓存互不共享")
+        warnings.extend(_validate_ttl_settings(config))
+        warnings.extend(_validate_key_prefix(config))
+        return True, warnings
+
     # 验证各项配置
     warnings.extend(_validate_connection_settings(config))
     warnings.extend(_validate_ttl_settings(config))
@@ -202,7 +267,12 @@ def validate_and_log_config(config: CacheConfig) -> CacheConfig:
             raise ValueError("缓存配置验证失败")
 
         # 记录配置信息
-        if config.enabled:
+        if config.enabled and config.backend == "memory":
+            logger.info(
+                f"缓存配置已加载: backend=memory, max_entries={config.memory_max_entries}, "
+                f"max_bytes={config.memory_max_bytes}, prefix={config.key_prefix}, ttl={config.default_ttl}s"
+            )
+        elif config.enabled:
             logger.info(
                 f"缓存配置已加载: host={config.host}, port={config.port}, "
                 f"db={config.db}, prefix={config.key_prefix}, ttl={config.default_ttl}s"
@@ -236,6 +306,7 @@ def create_cache_config_from_settings() -> CacheConfig:
 
     config = CacheConfig(
         enabled=settings.CACHE_ENABLED,
+        backend=settings.CACHE_BACKEND,
         host=settings.CACHE_HOST,
         port=settings.CACHE_PORT,
         db=settings.CACHE_DB,
@@ -246,6 +317,15 @@ def create_cache_config_from_settings() -> CacheConfig:
         socket_timeout=settings.CACHE_SOCKET_TIMEOUT,
         socket_connect_timeout=settings.CACHE_SOCKET_CONNECT_TIMEOUT,
         retry_on_timeout=settings.CACHE_RETRY_ON_TIMEOUT,
+        memory_max_entries=settings.CACHE_MEMORY_MAX_ENTRIES,
+        memory_max_bytes=settings.CACHE_MEMORY_MAX_BYTES,
+        circuit_breaker_enabled=settings.CACHE_CIRCUIT_BREAKER_ENABLED,
+        circuit_breaker_failure_rate=settings.CACHE_CIRCUIT_BREAKER_FAILURE_RATE,
+        circuit_breaker_window=settings.CACHE_CIRCUIT_BREAKER_WINDOW,
+        circuit_breaker_minimum_calls=settings.CACHE_CIRCUIT_BREAKER_MINIMUM_CALLS,
+        circuit_breaker_open_seconds=settings.CACHE_CIRCUIT_BREAKER_OPEN_SECONDS,
+        circuit_breaker_jitter=settings.CACHE_CIRCUIT_BREAKER_JITTER,
+        circuit_breaker_half_open_calls=settings.CACHE_CIRCUIT_BREAKER_HALF_OPEN_CALLS,
     )
 
     # 验证并记录配置
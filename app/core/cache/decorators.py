@@ -2,6 +2,9 @@
 缓存装饰器
 
 提供声明式缓存，简化服务层集成，支持自动降级。
+@cached 只用于异步函数：同步服务方法在事件循环中执行，阻塞式缓存读写会阻塞事件循环，
+按主键读取实体的同步路径使用实体缓存（entity_cache.py）。
+@cache_invalidate 同时支持同步函数，通过 CacheManager 的同步接口失效缓存。
 """
 
 import inspect
@@ -16,7 +19,9 @@ logger = logging.getLogger(__name__)
 def cached(key_pattern: str, ttl: int = 3600, key_builder: Callable | None = None):
     """缓存装饰器
 
-    自动缓存函数返回值，支持参数化键生成和自动降级。
+    自动缓存异步函数的返回值，支持参数化键生成和自动降级。
+    键模板中的占位符按参数名取值，self/cls 和 SQLAlchemy Session 参数不参与键构建，
+    未显式传入的参数使用默认值。
 
     降级行为：
     - 缓存禁用时，直接执行被装饰的函数
@@ -31,6 +36,9 @@ def cached(key_pattern: str, ttl: int = 3600, key_builder: Callable | None = Non
     Returns:
         装饰器函数
 
+    Raises:
+        TypeError: 被装饰的函数不是异步函数
+
     Example:
         @cached(key_pattern="user:{user_id}", ttl=3600)
         async def get_user_by_id(user_id: str) -> Optional[User]:
@@ -38,12 +46,9 @@ def cached(key_pattern: str, ttl: int = 3600, key_builder: Callable | None = Non
     """
 
     def decorator(func: Callable) -> Callable:
-        is_async = inspect.iscoroutinefunction(func)
-
-        if is_async:
-            return _create_async_cached_wrapper(func, key_pattern, ttl, key_builder)
-        else:
-            return _create_sync_cached_wrapper(func)
+        if not inspect.iscoroutinefunction(func):
+            raise TypeError(f"@cached 只支持异步函数 ({func.__name__})，同步服务方法读取实体时使用实体缓存")
+        return _create_async_cached_wrapper(func, key_pattern, ttl, key_builder)
 
     return decorator
 
@@ -80,17 +85,6 @@ def _create_async_cached_wrapper(func: Callable, key_pattern: str, ttl: int, key
     return async_wrapper
 
 
-def _create_sync_cached_wrapper(func: Callable) -> Callable:
-    """创建同步函数包装器（不支持缓存）"""
-
-    @wraps(func)
-    def sync_wrapper(*args, **kwargs) -> Any:
-        logger.warning(f"@cached 装饰器不支持同步函数 ({func.__name__})，请将函数改为异步函数")
-        return func(*args, **kwargs)
-
-    return sync_wrapper
-
-
 def _safe_build_cache_key(
     key_pattern: str, key_builder: Callable | None, func: Callable, args: tuple, kwargs: dict
 ) -> str | None:
@@ -157,53 +151,85 @@ def cache_invalidate(key_pattern: str, key_builder: Callable | None = None):
         is_async = inspect.iscoroutinefunction(func)
 
         if is_async:
+            return _create_async_invalidate_wrapper(func, key_pattern, key_builder)
+        else:
+            return _create_sync_invalidate_wrapper(func, key_pattern, key_builder)
+
+    return decorator
+
+
+def _create_async_invalidate_wrapper(func: Callable, key_pattern: str, key_builder: Callable | None) -> Callable:
+    """创建异步缓存失效包装器"""
+
+    @wraps(func)
+    async def async_wrapper(*args, **kwargs) -> Any:
+        # 延迟导入以避免循环依赖
+        from app.core.cache.factory import get_cache_manager
+
+        # 执行原函数
+        result = await func(*args, **kwargs)
+
+        cache_manager = get_cache_manager()
 
-            @wraps(func)
-            async def async_wrapper(*args, **kwargs) -> Any:
-                # 延迟导入以避免循环依赖
-                from app.core.cache.factory import get_cache_manager
+        # 步骤 0: 检查缓存是否启用
+        if not cache_manager.is_enabled():
+            # 缓存禁用，跳过失效操作
+            return result
 
-                # 执行原函数
-                result = await func(*args, **kwargs)
+        try:
+            # 步骤 1: 构建缓存键
+            cache_key = _invalidation_cache_key(key_pattern, key_builder, func, args, kwargs)
 
-                cache_manager = get_cache_manager()
+            # 步骤 2: 使缓存失效
+            await cache_manager.invalidate(cache_key)
+            logger.debug(f"缓存失效成功: {cache_key}")
 
-                # 步骤 0: 检查缓存是否启用
-                if not cache_manager.is_enabled():
-                    # 缓存禁用，跳过失效操作
-                    return result
+        except Exception as e:
+            # 缓存失效失败，记录日志但不影响返回结果
+            logger.warning(f"缓存失效失败: {e}")
 
-                # 步骤 1: 构建缓存键
-                try:
-                    if key_builder is not None:
-                        # 使用自定义键构建函数
-                        cache_key = key_builder(*args, **kwargs)
-                    else:
-                        # 使用默认键构建逻辑
-                        cache_key = _build_cache_key(key_pattern, func, args, kwargs)
+        return result
 
-                    # 步骤 2: 使缓存失效
-                    await cache_manager.invalidate(cache_key)
-                    logger.debug(f"缓存失效成功: {cache_key}")
+    return async_wrapper
 
-                except Exception as e:
-                    # 缓存失效失败，记录日志但不影响返回结果
-                    logger.warning(f"缓存失效失败: {e}")
 
-                return result
+def _create_sync_invalidate_wrapper(func: Callable, key_pattern: str, key_builder: Callable | None) -> Callable:
+    """创建同步缓存失效包装器"""
 
-            return async_wrapper
-        else:
+    @wraps(func)
+    def sync_wrapper(*args, **kwargs) -> Any:
+        from app.core.cache.factory import get_cache_manager
+
+        # 执行原函数
+        result = func(*args, **kwargs)
+
+        cache_manager = get_cache_manager()
+        if not cache_manager.is_enabled():
+            return result
 
-            @wraps(func)
-            def sync_wrapper(*args, **kwargs) -> Any:
-                # 同步函数不支持缓存失效（因为 Redis 操作是异步的）
-                logger.warning(f"@cache_invalidate 装饰器不支持同步函数 ({func.__name__})，" "请将函数改为异步函数")
-                return func(*args, **kwargs)
+        try:
+            cache_key = _invalidation_cache_key(key_pattern, key_builder, func, args, kwargs)
 
-            return sync_wrapper
+            # 同步失效 L1 和 Redis，并通知其他 worker 清除各自的 L1
+            cache_manager.invalidate_sync(cache_key)
+            _publish_invalidation(cache_key)
+            logger.debug(f"缓存失效成功: {cache_key}")
 
-    return decorator
+        except Exception as e:
+            logger.warning(f"缓存失效失败: {e}")
+
+        return result
+
+    return sync_wrapper
+
+
+def _invalidation_cache_key(
+    key_pattern: str, key_builder: Callable | None, func: Callable, args: tuple, kwargs: dict
+) -> str:
+    """构建要失效的缓存键（自定义键构建函数优先）"""
+    if key_builder is not None:
+        return key_builder(*args, **kwargs)
+    return _build_cache_key(key_pattern, func, args, kwargs)
 
 
 def _build_cache_key(key_pattern: str, func: Callable, args: tuple, kwargs: dict) -> str:
@@ -224,32 +250,7 @@ def _build_cache_key(key_pattern: str, func: Callable, args: tuple, kwargs: dict
     Raises:
         ValueError: 如果无法从参数中提取所需的值
     """
-    # 获取函数签名
-    sig = inspect.signature(func)
-    param_names = list(sig.parameters.keys())
-
-    # 检测是否是绑定方法（bound method）
-    # 如果是绑定方法，args 的第一个元素是 self，但签名中已经不包含 self
-    # 需要跳过 args 的第一个元素
-    is_bound_method = hasattr(func, "__self__") or (  # 绑定方法有 __self__ 属性
-        len(args) > 0 and len(param_names) > 0 and len(args) > len(param_names)
-    )  # args 比参数多（可能包含 self）
-
-    # 如果是绑定方法且 args 第一个元素看起来像 self，跳过它
-    if is_bound_method and len(args) > len(param_names):
-        args = args[1:]  # 跳过第一个参数（self 或 cls）
-
-    # 构建参数字典（合并位置参数和关键字参数）
-    bound_args = {}
-
-    # 处理位置参数
-    for i, arg_value in enumerate(args):
-        if i < len(param_names):
-            param_name = param_names[i]
-            bound_args[param_name] = arg_value
-
-    # 处理关键字参数
-    bound_args.update(kwargs)
+    bound_args = bind_cache_args(func, args, kwargs)
 
     # 使用参数字典格式化 key_pattern
     try:
@@ -260,3 +261,62 @@ def _build_cache_key(key_pattern: str, func: Callable, args: tuple, kwargs: dict
             f"无法构建缓存键：key_pattern '{key_pattern}' 中的占位符 {e} "
             f"在函数参数中不存在。可用参数：{list(bound_args.keys())}"
         ) from e
+
+
+def bind_cache_args(func: Callable, args: tuple, kwargs: dict) -> dict[str, Any]:
+    """将调用参数绑定到参数名，用于构建缓存键
+
+    - 按函数签名绑定位置参数和关键字参数，并补齐默认值
+    - 跳过 self/cls 以及 SQLAlchemy Session 参数（它们不影响结果，也无法稳定地转成字符串）
+    - 兼容绑定方法收到包含 self 的 args 的情况
+
+    Args:
+        func: 被装饰的函数
+        args: 位置参数
+        kwargs: 关键字参数
+
+    Returns:
+        dict: {参数名: 参数值}
+    """
+    sig = inspect.signature(func)
+    param_names = list(sig.parameters.keys())
+
+    # 绑定方法的签名已不包含 self，但 args 中可能仍带有 self，跳过第一个参数
+    has_var_positional = any(p.kind is inspect.Parameter.VAR_POSITIONAL for p in sig.parameters.values())
+    if not has_var_positional and len(args) > len(param_names):
+        args = args[1:]
+
+    try:
+        bound = sig.bind_partial(*args, **kwargs)
+        bound.apply_defaults()
+        arguments = dict(bound.arguments)
+    except TypeError:
+        arguments = dict(zip(param_names, args, strict=False))
+        arguments.update(kwargs)
+
+    # 展开 **kwargs 参数
+    for name, param in sig.parameters.items():
+        if param.kind is inspect.Parameter.VAR_KEYWORD and isinstance(arguments.get(name), dict):
+            arguments.update(arguments.pop(name))
+
+    return {name: value for name, value in arguments.items() if name not in ("self", "cls") and not _is_session(value)}
+
+
+def _is_session(value: Any) -> bool:
+    """检查参数是否为 SQLAlchemy Session"""
+    try:
+        from sqlalchemy.orm import Session
+
+        return isinstance(value, Session)
+    except Exception:
+        return False
+
+
+def _publish_invalidation(cache_key: str) -> None:
+    """通知其他 worker 清除进程内缓存"""
+    try:
+        from app.core.cache.bus import get_invalidation_bus
+
+        get_invalidation_bus().publish_cache_invalidation([cache_key])
+    except Exception as e:
+        logger.debug(f"发布缓存失效事件失败: {e}")
@@ -0,0 +1,288 @@
+"""
+实体读穿缓存
+
+知识库、人设卡的 Star、下载权限检查等只读路径按主键读取单个实体。
+EntityCache 缓存这些实体的列快照，命中时重建为不关联会话的轻量模型实例，不查询数据库：
+- 数据键为 "{prefix}:entity:{type}:{id}:{version}"，值为 _serialize_sqlalchemy_object 生成的列字典
+- 版本取自实体版本键（与 HTTP 条件请求共用，见 versioning.py），不存在时原子创建
+- SQLAlchemy after_update / after_delete 事件记录被修改的实体，会话提交后删除其版本键，并经后台失效队列
+  和失效事件总线清除其他 worker 的 L1；之后的读取使用新版本，旧版本的数据键自然过期
+- 版本在查询数据库之前读取：与写入交错时读到的旧数据只会写入旧版本的数据键，不会被新版本读到
+
+命中时返回的实例处于游离状态：只能读取列属性，访问关系属性会抛出 DetachedInstanceError，修改不会写回数据库。
+需要修改实体或访问关系的代码应使用不带缓存的查询。
+通过 Query.update() 或原生 SQL 执行的批量更新不会触发 ORM 事件，需由调用方使用业务失效函数清除缓存。
+认证（get_current_user）不经实体缓存，角色和密码版本的修改不依赖版本更新即可生效。
+"""
+
+import logging
+from collections.abc import Callable
+from datetime import date, datetime
+from typing import Any
+
+from app.core.cache.id_filter import RESOURCE_USER, _default_models
+from app.core.cache.manager import _serialize_sqlalchemy_object
+from app.core.cache.versioning import VERSION_TTL, _new_version, version_key
+
+logger = logging.getLogger(__name__)
+
+# 默认的实体快照过期时间（秒）
+DEFAULT_ENTITY_TTL = 3600
+
+# 不写入快照的列（命中时这些属性不可读，需要的代码应查询数据库）
+EXCLUDED_COLUMNS: dict[str, frozenset[str]] = {RESOURCE_USER: frozenset({"hashed_password"})}
+
+# 会话中已修改、等待提交后更新版本的实体，保存在 Session.info 中
+PENDING_INFO_KEY = "entity_cache_pending"
+
+
+def entity_key(key_prefix: str, entity_type: str, entity_id: str, version: str) -> str:
+    """构建实体快照键
+
+    Args:
+        key_prefix: 全局缓存键前缀
+        entity_type: 实体类型（user, knowledge, persona）
+        entity_id: 实体 ID
+        version: 实体版本
+
+    Returns:
+        str: 缓存键
+    """
+    return f"{key_prefix}:entity:{entity_type}:{entity_id}:{version}"
+
+
+def _rehydrate_entity(model: type, data: dict) -> Any:
+    """从快照的列数据重建游离状态的实体实例（不查询数据库）"""
+    from sqlalchemy.inspection import inspect as sqlalchemy_inspect
+    from sqlalchemy.orm import Mapper, make_transient_to_detached
+
+    mapper: Mapper = sqlalchemy_inspect(model)
+    instance = mapper.class_manager.new_instance()
+    for column_attr in mapper.column_attrs:
+        if column_attr.key not in data:
+            continue
+        value = data[column_attr.key]
+        try:
+            python_type = column_attr.columns[0].type.python_type
+        except NotImplementedError:
+            python_type = None
+        if isinstance(value, str) and python_type is datetime:
+            value = datetime.fromisoformat(value)
+        elif isinstance(value, str) and python_type is date:
+            value = date.fromisoformat(value)
+        setattr(instance, column_attr.key, value)
+    make_transient_to_detached(instance)
+    return instance
+
+
+class EntityCache:
+    """按主键读取实体的版本化缓存"""
+
+    def __init__(
+        self,
+        cache_manager=None,
+        models: dict[str, Any] | None = None,
+        ttl: int = DEFAULT_ENTITY_TTL,
+        enabled: bool = True,
+    ):
+        """初始化实体缓存
+
+        Args:
+            cache_manager: 缓存管理器（可选，默认使用全局实例）
+            models: 实体类型 -> 模型类（可选，默认为用户、知识库、人设卡）
+            ttl: 实体快照过期时间（秒）
+            enabled: 是否启用（禁用时直接调用 loader）
+        """
+        self.ttl = ttl
+        self.enabled = enabled
+
+        self._cache_manager = cache_manager
+        self._models = models
+        self._listeners: list[tuple[Any, str, Callable]] = []
+
+    @property
+    def cache_manager(self):
+        """缓存管理器"""
+        if self._cache_manager is None:
+            from app.core.cache.factory import get_cache_manager
+
+            return get_cache_manager()
+        return self._cache_manager
+
+    @property
+    def models(self) -> dict[str, Any]:
+        """实体类型 -> 模型类"""
+        if self._models is None:
+            self._models = _default_models()
+        return self._models
+
+    def get(self, entity_type: str, entity_id: str, loader: Callable[[], Any]) -> Any | None:
+        """读取实体，未命中时调用 loader 查询数据库并回写快照
+
+        缓存禁用、版本读取失败或快照无法重建时降级到 loader，不存在的实体不缓存
+        （由 ID 过滤器拦截）。
+
+        Args:
+            entity_type: 实体类型
+            entity_id: 实体 ID
+            loader: 查询数据库的函数，返回模型实例或 None
+
+        Returns:
+            命中时返回游离状态的模型实例，否则返回 loader 的结果
+        """
+        cache_manager = self.cache_manager
+        model = self.models.get(entity_type)
+        if not self.enabled or model is None or not entity_id or not cache_manager.is_enabled():
+            return loader()
+
+        try:
+            version = cache_manager.get_or_set_sync(
+                version_key(cache_manager.key_prefix, entity_type, entity_id), _new_version(), ttl=VERSION_TTL
+            )
+        except Exception as e:
+            logger.warning(f"读取实体版本失败，降级到数据库 ({entity_type}:{entity_id}): {e}")
+            return loader()
+
+        key = entity_key(cache_manager.key_prefix, entity_type, entity_id, version)
+        data = cache_manager.get_cached_sync(key)
+        if isinstance(data, dict):
+            try:
+                return _rehydrate_entity(model, data)
+            except Exception as e:
+                logger.warning(f"实体快照重建失败，降级到数据库 (key={key}): {e}")
+                cache_manager.invalidate_sync(key)
+
+        entity = loader()
+        if entity is not None and self._is_committed_state(entity_type, entity):
+            cache_manager.set_cached_sync(key, self._snapshot(entity_type, entity), ttl=self.ttl)
+        return entity
+
+    @staticmethod
+    def _snapshot(entity_type: str, entity: Any) -> dict:
+        """生成实体的列快照（去掉 EXCLUDED_COLUMNS）"""
+        data = _serialize_sqlalchemy_object(entity)
+        for column in EXCLUDED_COLUMNS.get(entity_type, ()):
+            data.pop(column, None)
+        return data
+
+    @staticmethod
+    def _is_committed_state(entity_type: str, entity: Any) -> bool:
+        """实体在当前会话中没有未提交的修改时才能写入快照"""
+        from sqlalchemy.inspection import inspect as sqlalchemy_inspect
+
+        state = sqlalchemy_inspect(entity)
+        if state.modified:
+            return False
+        session = state.session
+        if session is None:
+            return True
+        return (entity_type, str(getattr(entity, "id", ""))) not in session.info.get(PENDING_INFO_KEY, ())
+
+    def bump(self, entity_type: str, entity_id: str) -> None:
+        """更新实体版本（删除版本键），旧快照和旧 ETag 随之失效
+
+        Args:
+            entity_type: 实体类型
+            entity_id: 实体 ID
+        """
+        from app.core.cache.invalidation import invalidate_cache_sync
+
+        cache_manager = self.cache_manager
+        if not cache_manager.is_enabled():
+            return
+        key = version_key(cache_manager.key_prefix, entity_type, entity_id)
+        # 同步删除保证本进程随后的请求（如修改密码后携带旧令牌）读到新版本；
+        # 再提交到失效队列，由队列在失败时重试并通过总线清除其他 worker 的 L1
+        cache_manager.invalidate_sync(key)
+        invalidate_cache_sync(cache_manager, [key])
+
+    def install_listeners(self) -> None:
+        """注册 SQLAlchemy 事件：实体更新或删除后，在会话提交时更新其版本"""
+        from sqlalchemy import event
+        from sqlalchemy.orm import Session
+
+        if self._listeners:
+            return
+
+        for entity_type, model in self.models.items():
+
+            def on_update(mapper, connection, target, entity_type=entity_type):
+                self._record_change(entity_type, target, check_modified=True)
+
+            def on_delete(mapper, connection, target, entity_type=entity_type):
+                self._record_change(entity_type, target, check_modified=False)
+
+            self._listen(event, model, "after_update", on_update)
+            self._listen(event, model, "after_delete", on_delete)
+
+        def on_commit(session):
+            for entity_type, entity_id in session.info.pop(PENDING_INFO_KEY, ()):
+                self.bump(entity_type, entity_id)
+
+        def on_rollback(session):
+            session.info.pop(PENDING_INFO_KEY, None)
+
+        self._listen(event, Session, "after_commit", on_commit)
+        self._listen(event, Session, "after_rollback", on_rollback)
+
+    def _record_change(self, entity_type: str, target: Any, check_modified: bool) -> None:
+        """记录被修改的实体，会话提交后更新版本（不属于会话的实体立即更新）"""
+        from sqlalchemy.orm import object_session
+
+        entity_id = getattr(target, "id", None)
+        if entity_id is None:
+            return
+        session = object_session(target)
+        if session is None:
+            self.bump(entity_type, str(entity_id))
+            return
+        if check_modified and not session.is_modified(target, include_collections=False):
+            return
+        session.info.setdefault(PENDING_INFO_KEY, set()).add((entity_type, str(entity_id)))
+
+    def _listen(self, event, target: Any, identifier: str, listener: Callable) -> None:
+        event.listen(target, identifier, listener)
+        self._listeners.append((target, identifier, listener))
+
+    def remove_listeners(self) -> None:
+        """注销 SQLAlchemy 事件"""
+        from sqlalchemy import event
+
+        for target, identifier, listener in self._listeners:
+            event.remove(target, identifier, listener)
+        self._listeners.clear()
+
+
+# 全局实体缓存实例（延迟初始化）
+_global_entity_cache: EntityCache | None = None
+
+
+def get_entity_cache() -> EntityCache:
+    """获取全局实体缓存实例
+
+    首次获取时注册 SQLAlchemy 事件，之后本进程内的实体更新都会更新版本。
+
+    Returns:
+        EntityCache 实例
+    """
+    global _global_entity_cache
+
+    if _global_entity_cache is None:
+        from app.core.config import settings
+
+        _global_entity_cache = EntityCache(ttl=settings.CACHE_ENTITY_TTL, enabled=settings.CACHE_ENTITY_ENABLED)
+        if _global_entity_cache.enabled:
+            _global_entity_cache.install_listeners()
+
+    return _global_entity_cache
+
+
+def reset_entity_cache() -> None:
+    """重置全局实体缓存
+
+    用于测试或重新加载配置时重置实体缓存。
+    """
+    global _global_entity_cache
+    if _global_entity_cache is not None:
+        _global_entity_cache.remove_listeners()
+    _global_entity_cache = None
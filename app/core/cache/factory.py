@@ -6,8 +6,11 @@
 
 import logging
 
+from app.core.cache.backend import CacheBackend
+from app.core.cache.circuit_breaker import CircuitBreaker
 from app.core.cache.config import CacheConfig, create_cache_config_from_settings
 from app.core.cache.manager import CacheManager
+from app.core.cache.memory_backend import MemoryCacheBackend
 from app.core.cache.redis_client import RedisClient
 
 logger = logging.getLogger(__name__)
@@ -36,6 +39,15 @@ def create_redis_client(config: CacheConfig) -> RedisClient | None:
             socket_timeout=config.socket_timeout,
             socket_connect_timeout=config.socket_connect_timeout,
             retry_on_timeout=config.retry_on_timeout,
+            circuit_breaker=CircuitBreaker(
+                failure_rate_threshold=config.circuit_breaker_failure_rate,
+                window_seconds=config.circuit_breaker_window,
+                minimum_calls=config.circuit_breaker_minimum_calls,
+                open_seconds=config.circuit_breaker_open_seconds,
+                jitter=config.circuit_breaker_jitter,
+                half_open_max_calls=config.circuit_breaker_half_open_calls,
+                enabled=config.circuit_breaker_enabled,
+            ),
         )
         logger.info("Redis 客户端创建成功")
         return redis_client
@@ -44,12 +56,32 @@ def create_redis_client(config: CacheConfig) -> RedisClient | None:
         return None
 
 
-def create_cache_manager(config: CacheConfig | None = None, redis_client: RedisClient | None = None) -> CacheManager:
+def create_cache_backend(config: CacheConfig) -> CacheBackend | None:
+    """根据配置创建缓存后端
+
+    Args:
+        config: 缓存配置
+
+    Returns:
+        backend 为 memory 时返回 MemoryCacheBackend，否则返回 RedisClient；缓存禁用则返回 None
+    """
+    if not config.enabled:
+        logger.info("缓存已禁用，跳过缓存后端创建")
+        return None
+
+    if config.backend == "memory":
+        logger.info("使用进程内内存缓存后端")
+        return MemoryCacheBackend(max_entries=config.memory_max_entries, max_memory_bytes=config.memory_max_bytes)
+
+    return create_redis_client(config)
+
+
+def create_cache_manager(config: CacheConfig | None = None, redis_client: CacheBackend | None = None) -> CacheManager:
     """创建缓存管理器
 
     Args:
         config: 缓存配置（可选，默认从应用配置加载）
-        redis_client: Redis 客户端实例（可选，如果不提供则根据配置创建）
+        redis_client: 缓存后端实例（可选，如果不提供则根据配置创建）
 
     Returns:
         CacheManager 实例
@@ -58,14 +90,14 @@ def create_cache_manager(config: CacheConfig | None = None, redis_client: RedisC
     if config is None:
         config = create_cache_config_from_settings()
 
-    # 如果未提供 Redis 客户端，根据配置创建
+    # 如果未提供缓存后端，根据配置创建
     if redis_client is None and config.enabled:
-        redis_client = create_redis_client(config)
+        redis_client = create_cache_backend(config)
 
     # 创建缓存管理器
     cache_manager = CacheManager(redis_client=redis_client, key_prefix=config.key_prefix, enabled=config.enabled)
 
-    logger.info(f"缓存管理器创建成功 (enabled={config.enabled}, " f"prefix={config.key_prefix})")
+    logger.info(f"缓存管理器创建成功 (enabled={config.enabled}, backend={config.backend}, prefix={config.key_prefix})")
 
     return cache_manager
 
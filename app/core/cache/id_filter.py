@@ -0,0 +1,404 @@
+"""
+不存在 ID 过滤器
+
+爬虫和失效的前端链接会反复请求不存在的知识库、人设卡和用户 ID，这类请求每次都会查询数据库。
+ExistenceFilter 为每种资源维护一个包含所有已存在 ID 的布隆过滤器：
+- 过滤器判定"一定不存在"的 ID 直接返回 404，不访问数据库和 Redis
+- 判定"可能存在"时照常查询；数据库中确实不存在的即为假阳性，计入指标
+- 启动时（以及每隔 rebuild_interval 秒）从数据库全量重建，新插入的行通过 SQLAlchemy after_insert 事件加入，
+  并经失效事件总线同步到其他 worker
+- 删除的 ID 仍留在过滤器中，只会产生假阳性，不影响正确性
+- 缓存中间件（策略声明 must_exist）和端点都通过 might_exist_in_request 检查，同一请求只检查一次
+
+布隆过滤器不会产生假阴性，唯一的风险是某个 worker 漏掉了其他 worker 的插入事件。
+因此只有在过滤器构建完成、且失效总线通过 Redis 传播（或显式允许单进程运行）时才会给出"不存在"的结论；
+总线重连后自动重建，期间所有 ID 均视为可能存在。
+"""
+
+import asyncio
+import hashlib
+import logging
+import math
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+from app.core.cache.metrics import get_cache_metrics
+
+logger = logging.getLogger(__name__)
+
+# 受过滤器保护的资源
+RESOURCE_KNOWLEDGE = "knowledge"
+RESOURCE_PERSONA = "persona"
+RESOURCE_USER = "user"
+
+# 最近插入的 ID 保留时长（秒），重建时合并，覆盖重建查询看不到的未提交插入
+RECENT_INSERT_WINDOW = 300.0
+
+# request.state 中保存本请求检查结果的属性名：{(资源名, ID): 是否可能存在}
+REQUEST_STATE_ATTR = "id_filter_results"
+
+
+def _default_models() -> dict[str, Any]:
+    from app.models.database import KnowledgeBase, PersonaCard, User
+
+    return {RESOURCE_KNOWLEDGE: KnowledgeBase, RESOURCE_PERSONA: PersonaCard, RESOURCE_USER: User}
+
+
+class BloomFilter:
+    """布隆过滤器
+
+    位数组和哈希函数个数由预期容量和目标假阳性率计算，哈希使用 blake2b 双重哈希。
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        """初始化布隆过滤器
+
+        Args:
+            capacity: 预期元素数量
+            error_rate: 目标假阳性率（0-1）
+        """
+        capacity = max(capacity, 1)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, item: str) -> list[int]:
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, item: str) -> None:
+        """添加元素"""
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    @property
+    def false_positive_rate(self) -> float:
+        """按当前元素数量估算的假阳性率"""
+        return (1 - math.exp(-self.num_hashes * self.count / self.num_bits)) ** self.num_hashes
+
+
+class ExistenceFilter:
+    """按资源维护已存在 ID 的布隆过滤器
+
+    might_exist() 可在任意线程中调用；rebuild() 为阻塞操作，应在线程池中执行。
+    """
+
+    def __init__(
+        self,
+        models: dict[str, Any] | None = None,
+        error_rate: float = 0.01,
+        min_capacity: int = 10000,
+        rebuild_interval: int = 3600,
+        allow_without_bus: bool = False,
+        enabled: bool = True,
+        id_loader: Callable[[Any], list[str]] | None = None,
+    ):
+        """初始化过滤器
+
+        Args:
+            models: 资源名 -> SQLAlchemy 模型（可选，默认知识库、人设卡、用户）
+            error_rate: 目标假阳性率
+            min_capacity: 每个布隆过滤器的最小容量，实际容量为当前行数的两倍与该值中的较大者
+            rebuild_interval: 定期重建间隔（秒），0 表示只在启动时构建
+            allow_without_bus: 失效总线未通过 Redis 传播时是否仍给出"不存在"结论（仅适用于单进程部署）
+            enabled: 是否启用
+            id_loader: 加载某个模型全部 ID 的函数（可选，用于测试）
+        """
+        self.error_rate = error_rate
+        self.min_capacity = min_capacity
+        self.rebuild_interval = rebuild_interval
+        self.allow_without_bus = allow_without_bus
+        self.enabled = enabled
+        self.metrics = get_cache_metrics()
+
+        self._models = models
+        self._id_loader = id_loader or self._load_ids
+        self._filters: dict[str, BloomFilter] = {}
+        self._recent: dict[str, dict[str, float]] = {}
+        self._lock = threading.Lock()
+        self._ready = False
+        # 每次 invalidate() 递增，重建期间发生失效时不把结果标记为就绪
+        self._generation = 0
+        self._listeners: list[tuple[Any, Callable]] = []
+        self._task: asyncio.Task | None = None
+        self._rebuild_requested: asyncio.Event | None = None
+
+    @property
+    def models(self) -> dict[str, Any]:
+        """受保护的资源及其模型"""
+        if self._models is None:
+            self._models = _default_models()
+        return self._models
+
+    @property
+    def is_ready(self) -> bool:
+        """过滤器是否可以给出"不存在"的结论"""
+        return self.enabled and self._ready
+
+    def might_exist(self, resource: str, entity_id: str) -> bool:
+        """判断 ID 是否可能存在
+
+        Args:
+            resource: 资源名（knowledge / persona / user）
+            entity_id: 实体 ID
+
+        Returns:
+            bool: False 表示一定不存在；过滤器未就绪或资源未受保护时始终返回 True
+        """
+        if not self.is_ready:
+            return True
+
+        bloom = self._filters.get(resource)
+        if bloom is None:
+            return True
+
+        present = entity_id in bloom
+        self.metrics.record_id_filter_check(resource, "maybe" if present else "absent")
+        return present
+
+    def might_exist_in_request(self, request: Any, resource: str, entity_id: str) -> bool:
+        """判断 ID 是否可能存在，同一请求内只检查一次
+
+        结果保存在 request.state 中：缓存中间件检查过的 ID，端点再次检查时直接复用，不重复计入指标。
+
+        Args:
+            request: 当前请求（Starlette Request）
+            resource: 资源名（knowledge / persona / user）
+            entity_id: 实体 ID
+
+        Returns:
+            bool: False 表示一定不存在
+        """
+        results = getattr(request.state, REQUEST_STATE_ATTR, None)
+        if results is None:
+            results = {}
+            setattr(request.state, REQUEST_STATE_ATTR, results)
+        if (resource, entity_id) not in results:
+            results[(resource, entity_id)] = self.might_exist(resource, entity_id)
+        return results[(resource, entity_id)]
+
+    def report_missing(self, resource: str, entity_id: str) -> None:
+        """记录过滤器判定可能存在、但数据库中不存在的 ID（假阳性）"""
+        if self.is_ready and resource in self._filters:
+            self.metrics.record_id_filter_false_positive(resource)
+
+    def add(self, resource: str, entity_id: str) -> None:
+        """将新插入的 ID 加入本进程的过滤器"""
+        if resource not in self.models:
+            return
+        with self._lock:
+            now = time.monotonic()
+            recent = self._recent.setdefault(resource, {})
+            recent[entity_id] = now
+            self._prune_recent(recent, now)
+            bloom = self._filters.get(resource)
+            if bloom is not None:
+                bloom.add(entity_id)
+                self.metrics.set_id_filter_false_positive_rate(resource, bloom.false_positive_rate)
+
+    @staticmethod
+    def _prune_recent(recent: dict[str, float], now: float) -> None:
+        """清除超出保留时长的最近插入记录（按插入顺序，调用方持有锁）"""
+        while recent:
+            entity_id, added_at = next(iter(recent.items()))
+            if now - added_at <= RECENT_INSERT_WINDOW:
+                break
+            del recent[entity_id]
+
+    @staticmethod
+    def _load_ids(model: Any) -> list[str]:
+        from app.core.database import get_db_context
+
+        with get_db_context() as db:
+            return [row[0] for row in db.query(model.id).yield_per(5000)]
+
+    def rebuild(self) -> None:
+        """从数据库全量重建所有资源的过滤器（阻塞）
+
+        重建期间插入的 ID 以及最近插入的 ID 会合并到新过滤器中。
+        """
+        if not self.enabled:
+            return
+
+        start_time = time.time()
+        generation = self._generation
+        filters: dict[str, BloomFilter] = {}
+        for resource, model in self.models.items():
+            ids = self._id_loader(model)
+            bloom = BloomFilter(max(self.min_capacity, len(ids) * 2), self.error_rate)
+            for entity_id in ids:
+                bloom.add(entity_id)
+            filters[resource] = bloom
+
+        with self._lock:
+            for resource, bloom in filters.items():
+                for entity_id in self._recent.get(resource, {}):
+                    bloom.add(entity_id)
+                self.metrics.set_id_filter_false_positive_rate(resource, bloom.false_positive_rate)
+            self._filters = filters
+            self._ready = generation == self._generation
+
+        sizes = ", ".join(f"{resource}={bloom.count}" for resource, bloom in filters.items())
+        logger.info(f"ID 过滤器已重建: {sizes}, 耗时 {time.time() - start_time:.2f}s")
+
+    def invalidate(self) -> None:
+        """停止给出"不存在"结论，直到下一次重建完成"""
+        with self._lock:
+            self._generation += 1
+            self._ready = False
+
+    def install_listeners(self) -> None:
+        """注册 SQLAlchemy after_insert 事件，新插入的行自动加入过滤器并广播到其他 worker"""
+        from sqlalchemy import event
+
+        if self._listeners:
+            return
+
+        for resource, model in self.models.items():
+
+            def on_insert(mapper, connection, target, resource=resource):
+                entity_id = getattr(target, "id", None)
+                if entity_id is not None:
+                    self.add(resource, str(entity_id))
+                    self._publish_insert(resource, str(entity_id))
+
+            event.listen(model, "after_insert", on_insert)
+            self._listeners.append((model, on_insert))
+
+    def remove_listeners(self) -> None:
+        """注销 SQLAlchemy 事件"""
+        from sqlalchemy import event
+
+        for model, listener in self._listeners:
+            event.remove(model, "after_insert", listener)
+        self._listeners.clear()
+
+    @staticmethod
+    def _publish_insert(resource: str, entity_id: str) -> None:
+        try:
+            from app.core.cache.bus import EVENT_ENTITY_CREATED, get_invalidation_bus
+
+            get_invalidation_bus().publish_nowait(EVENT_ENTITY_CREATED, {"resource": resource, "id": entity_id})
+        except Exception as e:
+            logger.warning(f"发布实体创建事件失败: {e}")
+
+    def handle_entity_created(self, event: dict[str, Any]) -> None:
+        """处理其他 worker 广播的实体创建事件"""
+        data = event.get("data", {})
+        resource, entity_id = data.get("resource"), data.get("id")
+        if resource and entity_id:
+            self.add(resource, str(entity_id))
+
+    def handle_bus_reconnected(self, event: dict[str, Any]) -> None:
+        """失效总线重连后可能漏掉了插入事件：暂停过滤并安排重建"""
+        logger.info("失效总线已重连，ID 过滤器将重建")
+        self.invalidate()
+        if self._rebuild_requested is not None:
+            self._rebuild_requested.set()
+
+    async def start(self, bus=None) -> None:
+        """注册事件并在后台构建过滤器，之后按 rebuild_interval 定期重建
+
+        Args:
+            bus: 失效事件总线（可选，默认使用全局实例）
+        """
+        if not self.enabled or self._task is not None:
+            return
+
+        if bus is None:
+            from app.core.cache.bus import get_invalidation_bus
+
+            bus = get_invalidation_bus()
+
+        if not bus.is_distributed and not self.allow_without_bus:
+            logger.info("失效总线未通过 Redis 传播，多 worker 下无法同步新插入的 ID，ID 过滤器不启用")
+            return
+
+        from app.core.cache.bus import EVENT_BUS_RECONNECTED, EVENT_ENTITY_CREATED
+
+        bus.subscribe(EVENT_ENTITY_CREATED, self.handle_entity_created)
+        bus.subscribe(EVENT_BUS_RECONNECTED, self.handle_bus_reconnected)
+        self.install_listeners()
+        self._rebuild_requested = asyncio.Event()
+        self._task = asyncio.create_task(self._rebuild_loop())
+
+    async def stop(self) -> None:
+        """停止定期重建并注销事件"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.remove_listeners()
+        self._rebuild_requested = None
+        self.invalidate()
+
+    async def _rebuild_loop(self) -> None:
+        """后台重建循环：立即构建一次，之后按间隔或在总线重连后重建"""
+        while True:
+            self._rebuild_requested.clear()
+            try:
+                await asyncio.to_thread(self.rebuild)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"ID 过滤器重建失败，暂不过滤: {e}")
+                self.invalidate()
+
+            timeout = self.rebuild_interval if self.rebuild_interval > 0 else None
+            # 不用 asyncio.wait_for：Python 3.11 中事件恰好在取消时被设置会吞掉取消，导致 stop() 一直等待
+            waiter = asyncio.ensure_future(self._rebuild_requested.wait())
+            try:
+                await asyncio.wait((waiter,), timeout=timeout)
+            finally:
+                waiter.cancel()
+
+
+# 全局过滤器实例（延迟初始化）
+_global_filter: ExistenceFilter | None = None
+
+
+def get_existence_filter() -> ExistenceFilter:
+    """获取全局 ID 过滤器实例
+
+    Returns:
+        ExistenceFilter 实例
+    """
+    global _global_filter
+
+    if _global_filter is None:
+        from app.core.config import settings
+
+        _global_filter = ExistenceFilter(
+            error_rate=settings.CACHE_ID_FILTER_ERROR_RATE,
+            min_capacity=settings.CACHE_ID_FILTER_MIN_CAPACITY,
+            rebuild_interval=settings.CACHE_ID_FILTER_REBUILD_INTERVAL,
+            allow_without_bus=settings.CACHE_ID_FILTER_ALLOW_WITHOUT_BUS,
+            enabled=settings.CACHE_ID_FILTER_ENABLED,
+        )
+
+    return _global_filter
+
+
+def reset_existence_filter() -> None:
+    """重置全局 ID 过滤器
+
+    用于测试或重新加载配置时重置过滤器。
+    """
+    global _global_filter
+    if _global_filter is not None:
+        _global_filter.remove_listeners()
+    _global_filter = None
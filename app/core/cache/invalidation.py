@@ -2,14 +2,16 @@
 缓存失效模块
 
 提供通用的自动缓存失效机制，在数据更新时自动清除相关缓存。
-支持同步和异步环境。
+同步代码中的失效提交到后台失效队列（invalidation_queue）执行，队列完成删除后发布到失效事件总线，
+由其他 worker 同步清除各自的进程内缓存。
 """
 
-import asyncio
 from collections.abc import Callable
 from functools import wraps
 from typing import Any
 
+from app.core.cache.invalidation_queue import get_invalidation_queue
+from app.core.cache.versioning import version_key
 from app.core.logging import app_logger as logger
 
 
@@ -17,68 +19,79 @@ def invalidate_cache_sync(cache_manager, patterns: list[str]):
     """
     同步方式失效缓存（用于同步代码中）
 
+    模式提交到后台失效队列后立即返回，由队列合并、批量删除并发布到失效事件总线；
+    测试中可调用 get_invalidation_queue().flush() 等待执行完毕。
+
     Args:
         cache_manager: 缓存管理器实例
         patterns: 要失效的缓存模式列表
     """
     try:
-        # 尝试获取当前运行的事件循环
-        try:
-            loop = asyncio.get_running_loop()
-            # 如果已经在事件循环中，使用 create_task 异步执行
-            for pattern in patterns:
-                asyncio.create_task(_async_invalidate_pattern(cache_manager, pattern))
-        except RuntimeError:
-            # 没有运行的事件循环，创建新的
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-
-            for pattern in patterns:
-                try:
-                    loop.run_until_complete(cache_manager.invalidate_pattern(pattern))
-                    logger.info(f"已清除缓存: pattern={pattern}")
-                except Exception as e:
-                    logger.warning(f"清除缓存失败 (pattern={pattern}): {e}")
-
-            loop.close()
-
+        get_invalidation_queue().submit(patterns, cache_manager=cache_manager)
     except Exception as e:
         logger.error(f"缓存失效操作失败: {e}")
 
 
-async def _async_invalidate_pattern(cache_manager, pattern: str):
+def invalidate_cache_tags(tags: list[str], cache_manager=None):
     """
-    异步清除缓存模式（内部辅助函数）
+    按标签失效路由缓存（对应路由缓存策略中声明的 tags）
 
     Args:
-        cache_manager: 缓存管理器实例
-        pattern: 缓存模式
+        tags: 已渲染的标签列表，如 ["knowledge:public", "knowledge:kb-1"]
+        cache_manager: 缓存管理器实例（可选），默认使用全局实例
     """
-    try:
-        await cache_manager.invalidate_pattern(pattern)
-        logger.info(f"已清除缓存: pattern={pattern}")
-    except Exception as e:
-        logger.warning(f"清除缓存失败 (pattern={pattern}): {e}")
+    from app.core.cache.policy import tag_key_pattern
 
+    if cache_manager is None:
+        from app.core.cache.factory import get_cache_manager
 
-# ============================================================================
-# 业务特定的缓存失效函数
-# ============================================================================
+        cache_manager = get_cache_manager()
 
+    if not cache_manager.is_enabled() or not tags:
+        return
 
-def invalidate_persona_cache(pc_id: str | None = None):
+    invalidate_cache_sync(cache_manager, [tag_key_pattern(cache_manager.key_prefix, tag) for tag in tags])
+
+
+def invalidate_cache_targets(cache_manager, patterns: list[str], tags: list[str]):
     """
-    失效人设卡相关的缓存
+    在一次提交中失效缓存模式和路由缓存标签
 
     Args:
-        pc_id: 人设卡ID（可选），如果提供则只清除特定人设卡的缓存
+        cache_manager: 缓存管理器实例
+        patterns: 缓存键模式列表
+        tags: 已渲染的路由缓存标签列表
     """
-    from app.core.cache.factory import get_cache_manager
+    from app.core.cache.policy import tag_key_pattern
 
-    cache_manager = get_cache_manager()
-    if not cache_manager.is_enabled():
+    if not cache_manager.is_enabled() or not (patterns or tags):
         return
 
+    invalidate_cache_sync(cache_manager, [*patterns, *(tag_key_pattern(cache_manager.key_prefix, tag) for tag in tags)])
+
+
+# ============================================================================
+# 业务特定的缓存失效目标
+#
+# *_cache_targets 只计算要失效的 (缓存模式, 路由缓存标签)，供下方的业务失效函数
+# 和会话变更跟踪器（change_tracker）共用，后者按事务合并后一次提交。
+# ============================================================================
+
+
+def persona_cache_targets(
+    cache_manager, pc_id: str | None = None, uploader_id: str | None = None
+) -> tuple[list[str], list[str]]:
+    """
+    计算人设卡相关的失效目标
+
+    Args:
+        cache_manager: 缓存管理器实例
+        pc_id: 人设卡ID（可选）
+        uploader_id: 上传者ID（可选）
+
+    Returns:
+        (缓存模式列表, 路由缓存标签列表)
+    """
     patterns = [
         "maimnp:http:*persona/public*",  # 所有公开人设卡列表的缓存
     ]
@@ -86,24 +99,33 @@ def invalidate_persona_cache(pc_id: str | None = None):
     if pc_id:
         # 如果指定了人设卡ID，还要清除该人设卡详情的缓存
         patterns.append(f"maimnp:http:*persona/{pc_id}*")
+        # 收藏列表中的人设卡摘要
+        patterns.append(cache_manager.build_key("star_target", f"persona:{pc_id}"))
+        # 实体版本（条件请求的 ETag / Last-Modified）
+        patterns.append(version_key(cache_manager.key_prefix, "persona", pc_id))
 
-    invalidate_cache_sync(cache_manager, patterns)
+    tags = ["persona:public"]
+    if pc_id:
+        tags.append(f"persona:{pc_id}")
+    if uploader_id:
+        tags.append(f"persona:user:{uploader_id}")
+    return patterns, tags
 
 
-def invalidate_knowledge_cache(kb_id: str | None = None, uploader_id: str | None = None):
+def knowledge_cache_targets(
+    cache_manager, kb_id: str | None = None, uploader_id: str | None = None
+) -> tuple[list[str], list[str]]:
     """
-    失效知识库相关的缓存
+    计算知识库相关的失效目标
 
     Args:
-        kb_id: 知识库ID（可选），如果提供则清除特定知识库的缓存
-        uploader_id: 上传者ID（可选），如果提供则清除该用户的知识库列表缓存
-    """
-    from app.core.cache.factory import get_cache_manager
-
-    cache_manager = get_cache_manager()
-    if not cache_manager.is_enabled():
-        return
+        cache_manager: 缓存管理器实例
+        kb_id: 知识库ID（可选）
+        uploader_id: 上传者ID（可选）
 
+    Returns:
+        (缓存模式列表, 路由缓存标签列表)
+    """
     patterns = [
         "maimnp:kb:public:*",  # 公开知识库列表的缓存
     ]
@@ -111,62 +133,80 @@ def invalidate_knowledge_cache(kb_id: str | None = None, uploader_id: str | None
     if kb_id:
         # 清除特定知识库详情的缓存
         patterns.append(f"maimnp:http:*knowledge/{kb_id}*")
+        # 收藏列表中的知识库摘要
+        patterns.append(cache_manager.build_key("star_target", f"knowledge:{kb_id}"))
+        # 实体版本（条件请求的 ETag / Last-Modified）
+        patterns.append(version_key(cache_manager.key_prefix, "knowledge", kb_id))
 
     if uploader_id:
         # 清除用户知识库列表的缓存
         patterns.append(f"maimnp:kb:user:{uploader_id}:*")
 
-    invalidate_cache_sync(cache_manager, patterns)
+    tags = ["knowledge:public"]
+    if kb_id:
+        tags.append(f"knowledge:{kb_id}")
+    if uploader_id:
+        tags.append(f"knowledge:user:{uploader_id}")
+    return patterns, tags
 
 
-def invalidate_user_cache(user_id: str | None = None):
+def star_cache_targets(cache_manager, user_id: str) -> tuple[list[str], list[str]]:
     """
-    失效用户相关的缓存
+    计算用户收藏列表的失效目标
 
     Args:
-        user_id: 用户ID（可选），如果不提供则清除所有用户相关缓存
+        cache_manager: 缓存管理器实例
+        user_id: 收藏操作的用户ID
+
+    Returns:
+        (缓存模式列表, 路由缓存标签列表)
     """
-    from app.core.cache.factory import get_cache_manager
+    return [], [f"stars:{user_id}"]
 
-    cache_manager = get_cache_manager()
-    if not cache_manager.is_enabled():
-        return
 
-    patterns = []
+def user_cache_targets(cache_manager, user_id: str | None = None) -> tuple[list[str], list[str]]:
+    """
+    计算用户相关的失效目标
 
+    Args:
+        cache_manager: 缓存管理器实例
+        user_id: 用户ID（可选），不提供时为所有用户
+
+    Returns:
+        (缓存模式列表, 路由缓存标签列表)
+    """
     if user_id:
-        patterns.extend(
-            [
-                f"maimnp:http:*users/{user_id}*",  # 用户详情的缓存
-                f"user:{user_id}",  # 用户数据的缓存
-            ]
-        )
+        patterns = [
+            f"maimnp:http:*users/{user_id}*",  # 用户详情的缓存
+            f"user:{user_id}",  # 用户数据的缓存
+            cache_manager.build_key("comment_author", user_id),  # 评论作者摘要
+            version_key(cache_manager.key_prefix, "user", user_id),  # 头像条件请求的版本
+        ]
     else:
         # 清除所有用户相关缓存
-        patterns.extend(
-            [
-                "maimnp:http:*users*",
-                "user:*",
-            ]
-        )
-
-    invalidate_cache_sync(cache_manager, patterns)
-
-
-def invalidate_message_cache(message_id: str | None = None, user_id: str | None = None):
+        patterns = [
+            "maimnp:http:*users*",
+            "user:*",
+            cache_manager.build_key("comment_author", "*"),
+            version_key(cache_manager.key_prefix, "user", "*"),
+        ]
+    return patterns, []
+
+
+def message_cache_targets(
+    cache_manager, message_id: str | None = None, user_id: str | None = None
+) -> tuple[list[str], list[str]]:
     """
-    失效消息相关的缓存
+    计算消息相关的失效目标
 
     Args:
+        cache_manager: 缓存管理器实例
         message_id: 消息ID（可选）
-        user_id: 用户ID（可选），清除该用户的消息列表缓存
-    """
-    from app.core.cache.factory import get_cache_manager
-
-    cache_manager = get_cache_manager()
-    if not cache_manager.is_enabled():
-        return
+        user_id: 用户ID（可选）
 
+    Returns:
+        (缓存模式列表, 路由缓存标签列表)
+    """
     patterns = [
         "maimnp:http:*messages*",  # 清除所有消息相关缓存
     ]
@@ -176,24 +216,23 @@ def invalidate_message_cache(message_id: str | None = None, user_id: str | None
 
     if user_id:
         patterns.append(f"maimnp:http:*messages*user_id={user_id}*")
-
-    invalidate_cache_sync(cache_manager, patterns)
+    return patterns, []
 
 
-def invalidate_comment_cache(comment_id: str | None = None, target_id: str | None = None):
+def comment_cache_targets(
+    cache_manager, comment_id: str | None = None, target_id: str | None = None
+) -> tuple[list[str], list[str]]:
     """
-    失效评论相关的缓存
+    计算评论相关的失效目标
 
     Args:
+        cache_manager: 缓存管理器实例
         comment_id: 评论ID（可选）
-        target_id: 目标ID（可选），清除该目标的评论列表缓存
-    """
-    from app.core.cache.factory import get_cache_manager
-
-    cache_manager = get_cache_manager()
-    if not cache_manager.is_enabled():
-        return
+        target_id: 目标ID（可选）
 
+    Returns:
+        (缓存模式列表, 路由缓存标签列表)
+    """
     patterns = [
         "maimnp:http:*comments*",  # 清除所有评论相关缓存
     ]
@@ -203,8 +242,87 @@ def invalidate_comment_cache(comment_id: str | None = None, target_id: str | Non
 
     if target_id:
         patterns.append(f"maimnp:http:*comments*target_id={target_id}*")
+    return patterns, []
+
+
+# ============================================================================
+# 业务特定的缓存失效函数
+# ============================================================================
+
+
+def _invalidate_business_cache(targets: Callable, *args) -> None:
+    """使用全局缓存管理器计算并提交业务失效目标"""
+    from app.core.cache.factory import get_cache_manager
+
+    cache_manager = get_cache_manager()
+    if not cache_manager.is_enabled():
+        return
+
+    invalidate_cache_targets(cache_manager, *targets(cache_manager, *args))
+
+
+def invalidate_persona_cache(pc_id: str | None = None, uploader_id: str | None = None):
+    """
+    失效人设卡相关的缓存
+
+    Args:
+        pc_id: 人设卡ID（可选），如果提供则只清除特定人设卡的缓存
+        uploader_id: 上传者ID（可选），如果提供则清除该用户的人设卡列表缓存
+    """
+    _invalidate_business_cache(persona_cache_targets, pc_id, uploader_id)
+
+
+def invalidate_knowledge_cache(kb_id: str | None = None, uploader_id: str | None = None):
+    """
+    失效知识库相关的缓存
+
+    Args:
+        kb_id: 知识库ID（可选），如果提供则清除特定知识库的缓存
+        uploader_id: 上传者ID（可选），如果提供则清除该用户的知识库列表缓存
+    """
+    _invalidate_business_cache(knowledge_cache_targets, kb_id, uploader_id)
+
+
+def invalidate_star_cache(user_id: str):
+    """
+    失效用户收藏列表相关的缓存
 
-    invalidate_cache_sync(cache_manager, patterns)
+    Args:
+        user_id: 收藏操作的用户ID
+    """
+    _invalidate_business_cache(star_cache_targets, user_id)
+
+
+def invalidate_user_cache(user_id: str | None = None):
+    """
+    失效用户相关的缓存
+
+    Args:
+        user_id: 用户ID（可选），如果不提供则清除所有用户相关缓存
+    """
+    _invalidate_business_cache(user_cache_targets, user_id)
+
+
+def invalidate_message_cache(message_id: str | None = None, user_id: str | None = None):
+    """
+    失效消息相关的缓存
+
+    Args:
+        message_id: 消息ID（可选）
+        user_id: 用户ID（可选），清除该用户的消息列表缓存
+    """
+    _invalidate_business_cache(message_cache_targets, message_id, user_id)
+
+
+def invalidate_comment_cache(comment_id: str | None = None, target_id: str | None = None):
+    """
+    失效评论相关的缓存
+
+    Args:
+        comment_id: 评论ID（可选）
+        target_id: 目标ID（可选），清除该目标的评论列表缓存
+    """
+    _invalidate_business_cache(comment_cache_targets, comment_id, target_id)
 
 
 def auto_invalidate_cache(cache_patterns: list[str]):
@@ -247,30 +365,10 @@ def _should_invalidate_cache(result: Any) -> bool:
 
 
 def _invalidate_cache_patterns(cache_patterns: list[str]) -> None:
-    """清除指定模式的缓存"""
+    """清除指定模式的缓存（提交到后台失效队列）"""
     try:
         from app.core.cache.factory import get_cache_manager
 
-        cache_manager = get_cache_manager()
-
-        if not cache_manager.is_enabled():
-            return
-
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-
-        for pattern in cache_patterns:
-            _invalidate_single_pattern(loop, cache_manager, pattern)
-
-        loop.close()
+        invalidate_cache_sync(get_cache_manager(), cache_patterns)
     except Exception as e:
         logger.error(f"自动缓存失效失败: {e}")
-
-
-def _invalidate_single_pattern(loop, cache_manager, pattern: str) -> None:
-    """清除单个缓存模式"""
-    try:
-        loop.run_until_complete(cache_manager.invalidate_pattern(pattern))
-        logger.debug(f"自动清除缓存: pattern={pattern}")
-    except Exception as e:
-        logger.warning(f"自动清除缓存失败 (pattern={pattern}): {e}")
@@ -0,0 +1,280 @@
+"""
+后台缓存失效队列
+
+同步代码中的缓存失效（invalidate_cache_sync、auto_invalidate_cache）提交到进程内的失效队列，
+由一个长期运行的后台线程执行，不再为每次调用创建事件循环：
+- 合并窗口内提交的相同模式只执行一次，窗口内的所有模式共用一轮批量删除
+- 使用阻塞式 Redis 客户端（内存后端使用其同步接口），不依赖事件循环
+- 批次按提交顺序执行，失败时按指数退避重试，超过次数后丢弃并记录
+- 同步路径的一级缓存（L1）在提交时立即清除，本进程后续的同步读取不会命中旧值
+- 批次执行完成后再发布到失效事件总线，其他 worker 清除 L1 时 Redis 中已是新状态
+
+flush() 阻塞到此前提交的失效全部执行完毕，用于测试和关闭流程。
+"""
+
+import logging
+import threading
+import time
+from typing import Any
+
+from app.core.cache.metrics import get_cache_metrics
+
+logger = logging.getLogger(__name__)
+
+# 默认合并窗口（秒）
+DEFAULT_COALESCE_WINDOW = 0.05
+
+# 默认最大重试次数
+DEFAULT_MAX_RETRIES = 3
+
+# 重试间隔上限（秒）
+MAX_RETRY_DELAY = 5.0
+
+
+class InvalidationQueue:
+    """缓存失效队列
+
+    submit() 可在任意线程中调用且不阻塞；后台线程在首次提交时启动。
+    """
+
+    def __init__(
+        self,
+        cache_manager=None,
+        coalesce_window: float = DEFAULT_COALESCE_WINDOW,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+    ):
+        """初始化失效队列
+
+        Args:
+            cache_manager: 缓存管理器（可选，默认使用全局实例）
+            coalesce_window: 合并窗口（秒），收到第一个模式后等待该时长再执行
+            max_retries: 批次失败后的最大重试次数
+        """
+        self.coalesce_window = coalesce_window
+        self.max_retries = max_retries
+        self.metrics = get_cache_metrics()
+
+        self._cache_manager = cache_manager
+        # (缓存管理器, 模式) -> 首次提交时间（time.monotonic），按提交顺序保存
+        self._pending: dict[tuple[Any, str], float] = {}
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._stopping = False
+        self._flush_requested = False
+        # 已提交 / 已执行完成的提交序号，用于 flush()
+        self._submitted_seq = 0
+        self._completed_seq = 0
+
+    @property
+    def cache_manager(self):
+        """缓存管理器"""
+        if self._cache_manager is None:
+            from app.core.cache.factory import get_cache_manager
+
+            return get_cache_manager()
+        return self._cache_manager
+
+    @property
+    def depth(self) -> int:
+        """等待执行的模式数量"""
+        with self._cond:
+            return len(self._pending)
+
+    @property
+    def is_running(self) -> bool:
+        """后台线程是否在运行"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def submit(self, patterns: list[str], cache_manager=None) -> None:
+        """提交要失效的缓存模式（不阻塞）
+
+        Args:
+            patterns: 缓存键模式列表
+            cache_manager: 缓存管理器（可选，默认使用队列的缓存管理器）
+        """
+        if not patterns:
+            return
+
+        if cache_manager is None:
+            cache_manager = self.cache_manager
+        if not cache_manager.is_enabled():
+            return
+
+        for pattern in patterns:
+            cache_manager.evict_local(pattern)
+
+        now = time.monotonic()
+        with self._cond:
+            for pattern in patterns:
+                self._pending.setdefault((cache_manager, pattern), now)
+            self._submitted_seq += 1
+            self.metrics.set_invalidation_queue_depth(len(self._pending))
+            self._ensure_worker()
+            self._cond.notify_all()
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """等待此前提交的失效全部执行完毕（跳过合并窗口）
+
+        Args:
+            timeout: 最长等待时间（秒），None 表示一直等待
+
+        Returns:
+            bool: 是否在超时前执行完毕
+        """
+        with self._cond:
+            target = self._submitted_seq
+            if self._completed_seq >= target:
+                return True
+            self._flush_requested = True
+            self._ensure_worker()
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: self._completed_seq >= target, timeout)
+
+    def stop(self, timeout: float | None = 5.0) -> bool:
+        """执行剩余的失效后停止后台线程
+
+        停止后再次提交会重新启动后台线程。
+
+        Args:
+            timeout: 等待剩余失效执行完毕的最长时间（秒）
+
+        Returns:
+            bool: 剩余失效是否全部执行完毕
+        """
+        drained = self.flush(timeout)
+
+        with self._cond:
+            thread = self._thread
+            self._stopping = True
+            self._cond.notify_all()
+
+        if thread is not None:
+            thread.join(timeout)
+
+        with self._cond:
+            self._thread = None
+            self._stopping = False
+
+        if not drained:
+            logger.warning(f"缓存失效队列停止时仍有未执行的模式: {self.depth}")
+        return drained
+
+    def _ensure_worker(self) -> None:
+        """启动后台线程（调用方持有锁）"""
+        if self.is_running:
+            return
+        self._thread = threading.Thread(target=self._run, name="cache-invalidation", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        """后台线程主循环"""
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopping:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+
+                deadline = time.monotonic() + self.coalesce_window
+                while not self._flush_requested and not self._stopping:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                batch = self._pending
+                batch_seq = self._submitted_seq
+                self._pending = {}
+                self._flush_requested = False
+
+            for cache_manager, patterns in self._group_by_manager(batch).items():
+                self._apply(cache_manager, patterns)
+
+            with self._cond:
+                self._completed_seq = batch_seq
+                self.metrics.set_invalidation_queue_depth(len(self._pending))
+                self._cond.notify_all()
+
+    @staticmethod
+    def _group_by_manager(batch: dict[tuple[Any, str], float]) -> dict[Any, dict[str, float]]:
+        """按缓存管理器拆分批次，保持提交顺序"""
+        groups: dict[Any, dict[str, float]] = {}
+        for (cache_manager, pattern), submitted_at in batch.items():
+            groups.setdefault(cache_manager, {})[pattern] = submitted_at
+        return groups
+
+    def _apply(self, cache_manager, batch: dict[str, float]) -> None:
+        """执行一个批次，失败时按指数退避重试
+
+        Args:
+            cache_manager: 缓存管理器
+            batch: 模式 -> 首次提交时间
+        """
+        patterns = list(batch)
+        retry_delay = 0.1
+        for attempt in range(self.max_retries + 1):
+            try:
+                deleted_count = cache_manager.invalidate_patterns_sync(patterns)
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    logger.error(f"缓存失效批次重试 {self.max_retries} 次后仍失败，已丢弃 (patterns={patterns}): {e}")
+                    self.metrics.record_invalidation_batch("dropped")
+                    return
+                logger.warning(f"缓存失效批次失败，{retry_delay:.1f}s 后重试 (patterns={len(patterns)}): {e}")
+                self.metrics.record_invalidation_batch("retry")
+                if not self._stopping:
+                    time.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, MAX_RETRY_DELAY)
+                continue
+
+            logger.debug(f"已清除缓存: patterns={patterns}, count={deleted_count}")
+            self.metrics.record_invalidation_batch("success")
+            now = time.monotonic()
+            for submitted_at in batch.values():
+                self.metrics.record_invalidation_lag(now - submitted_at)
+            self._publish(patterns)
+            return
+
+    @staticmethod
+    def _publish(patterns: list[str]) -> None:
+        """将已失效的模式发布到失效事件总线，通知其他 worker"""
+        try:
+            from app.core.cache.bus import get_invalidation_bus
+
+            get_invalidation_bus().publish_cache_invalidation(patterns)
+        except Exception as e:
+            logger.warning(f"发布缓存失效事件失败: {e}")
+
+
+# 全局失效队列实例（延迟初始化）
+_global_queue: InvalidationQueue | None = None
+
+
+def get_invalidation_queue() -> InvalidationQueue:
+    """获取全局缓存失效队列实例
+
+    Returns:
+        InvalidationQueue 实例
+    """
+    global _global_queue
+
+    if _global_queue is None:
+        from app.core.config import settings
+
+        _global_queue = InvalidationQueue(
+            coalesce_window=settings.CACHE_INVALIDATION_COALESCE_MS / 1000,
+            max_retries=settings.CACHE_INVALIDATION_MAX_RETRIES,
+        )
+
+    return _global_queue
+
+
+def reset_invalidation_queue() -> None:
+    """重置全局失效队列
+
+    用于测试或重新加载配置时重置失效队列，正在运行的后台线程会先执行完剩余失效再停止。
+    """
+    global _global_queue
+    if _global_queue is not None:
+        _global_queue.stop()
+    _global_queue = None
@@ -16,11 +16,23 @@ from typing import Any
 
 from pydantic import BaseModel
 
+from app.core.cache.analytics import get_cache_analytics, serialized_size
+from app.core.cache.backend import CacheBackend
+from app.core.cache.circuit_breaker import CircuitOpenError
 from app.core.cache.logger import get_cache_logger
+from app.core.cache.memory_backend import MemoryCacheBackend
 from app.core.cache.metrics import get_cache_metrics
 
 logger = logging.getLogger(__name__)
 
+# 同步路径的进程内一级缓存（L1）：条目最长存活时间（秒）和容量
+LOCAL_CACHE_TTL = 30
+LOCAL_CACHE_MAX_ENTRIES = 2048
+LOCAL_CACHE_MAX_BYTES = 16 * 1024 * 1024
+
+# 同步路径：缓存命中但数据无法使用（反序列化失败），需要回源
+_SYNC_MISS = object()
+
 
 def _is_sqlalchemy_model(obj: Any) -> bool:
     """检查对象是否为 SQLAlchemy 模型实例
@@ -70,18 +82,40 @@ def _serialize_sqlalchemy_object(obj: Any) -> dict:
     return result
 
 
+def _serialize_value(value: Any) -> str:
+    """将缓存值序列化为 JSON 字符串
+
+    支持 Pydantic 模型、SQLAlchemy 模型和可 JSON 序列化的普通对象。
+
+    Args:
+        value: 要缓存的值
+
+    Returns:
+        str: 序列化后的字符串
+
+    Raises:
+        TypeError: 值无法序列化
+    """
+    if isinstance(value, BaseModel):
+        return value.model_dump_json()
+    if _is_sqlalchemy_model(value):
+        return json.dumps(_serialize_sqlalchemy_object(value), ensure_ascii=False)
+    return json.dumps(value, ensure_ascii=False)
+
+
 class CacheManager:
     """缓存管理器
 
     提供统一的缓存操作接口，支持自动降级机制。
     当缓存禁用或 Redis 不可用时，自动降级到数据源。
+    存储由 CacheBackend 实现（RedisClient 或 MemoryCacheBackend），属性名沿用 redis_client。
     """
 
-    def __init__(self, redis_client: Any | None = None, key_prefix: str = "maimnp", enabled: bool = True):
+    def __init__(self, redis_client: CacheBackend | None = None, key_prefix: str = "maimnp", enabled: bool = True):
         """初始化缓存管理器
 
         Args:
-            redis_client: Redis 客户端实例（可选）
+            redis_client: 缓存后端实例（可选），RedisClient 或 MemoryCacheBackend
             key_prefix: 缓存键前缀
             enabled: 缓存开关，False 时自动降级
         """
@@ -90,6 +124,8 @@ class CacheManager:
         self.enabled = enabled
         self.cache_logger = get_cache_logger()
         self.metrics = get_cache_metrics()
+        self.analytics = get_cache_analytics()
+        self.local_cache: MemoryCacheBackend | None = None
 
         # 设置缓存启用状态指标
         self.metrics.set_cache_enabled(enabled)
@@ -190,6 +226,7 @@ class CacheManager:
         self.cache_logger.log_cache_get(key=key, hit=True, latency_ms=latency_ms, degraded=False)
         self.metrics.record_cache_hit("get")
         self.metrics.record_operation_duration("get", "success", (time.time() - start_time))
+        self.analytics.record_lookup(key, hit=True)
 
         if raw_value == "NULL_PLACEHOLDER":
             return "CACHE_HIT_NULL"
@@ -201,9 +238,17 @@ class CacheManager:
         self.cache_logger.log_cache_get(key=key, hit=False, latency_ms=latency_ms, degraded=False)
         self.metrics.record_cache_miss("get")
         self.metrics.record_operation_duration("get", "success", (time.time() - start_time))
+        self.analytics.record_lookup(key, hit=False)
 
     async def _handle_redis_error(self, key: str, error: Exception, start_time: float) -> None:
         """处理 Redis 错误"""
+        if isinstance(error, CircuitOpenError):
+            # 熔断期间每个请求都会走到这里，只记录指标，不逐条记录日志
+            self.metrics.record_degradation("circuit_open")
+            self.metrics.record_cache_miss("get")
+            self.metrics.record_operation_duration("get", "degraded", (time.time() - start_time))
+            return
+
         latency_ms = (time.time() - start_time) * 1000
         logger.warning(f"Redis 连接失败，降级到数据源 (key={key}): {error}")
         self.cache_logger.log_cache_degradation(
@@ -271,10 +316,13 @@ class CacheManager:
                     serialized = json.dumps(data, ensure_ascii=False)
 
                 await self.redis_client.set(key, serialized, ttl=ttl)
+                self.analytics.record_write(key, serialized_size(serialized))
                 set_latency_ms = (time.time() - set_start_time) * 1000
                 self.cache_logger.log_cache_set(
                     key=key, success=True, ttl=ttl, latency_ms=set_latency_ms, degraded=False
                 )
+        except CircuitOpenError:
+            pass
         except Exception as e:
             logger.warning(f"缓存写入失败 (key={key}): {e}")
             self.cache_logger.log_cache_set(key=key, success=False, ttl=ttl, degraded=False, error=str(e))
@@ -304,16 +352,11 @@ class CacheManager:
 
         try:
             # 序列化数据
-            if isinstance(value, BaseModel):
-                serialized = value.model_dump_json()
-            elif _is_sqlalchemy_model(value):
-                # 处理 SQLAlchemy 对象
-                serialized = json.dumps(_serialize_sqlalchemy_object(value), ensure_ascii=False)
-            else:
-                serialized = json.dumps(value, ensure_ascii=False)
+            serialized = _serialize_value(value)
 
             # 写入 Redis
             result = await self.redis_client.set(key, serialized, ttl=ttl)
+            self.analytics.record_write(key, serialized_size(serialized))
             latency_ms = (time.time() - start_time) * 1000
 
             self.cache_logger.log_cache_set(key=key, success=result, ttl=ttl, latency_ms=latency_ms, degraded=False)
@@ -329,6 +372,9 @@ class CacheManager:
             )
             self.metrics.record_operation_duration("set", "failed", (time.time() - start_time))
             return False
+        except CircuitOpenError:
+            self.metrics.record_operation_duration("set", "degraded", (time.time() - start_time))
+            return False
         except Exception as e:
             latency_ms = (time.time() - start_time) * 1000
             logger.warning(f"缓存写入失败 (key={key}): {e}")
@@ -357,6 +403,8 @@ class CacheManager:
             return True
 
         start_time = time.time()
+        if self.local_cache is not None:
+            self.local_cache.delete_sync(key)
         try:
             result = await self.redis_client.delete(key)
             self.cache_logger.log_cache_invalidate(key=key, success=result, degraded=False)
@@ -389,6 +437,7 @@ class CacheManager:
             return 0
 
         start_time = time.time()
+        self.evict_local(pattern)
         try:
             deleted_count = await self.redis_client.delete_pattern(pattern)
             self.cache_logger.log_cache_invalidate(pattern=pattern, count=deleted_count, success=True, degraded=False)
@@ -401,3 +450,438 @@ class CacheManager:
             )
             self.metrics.record_operation_duration("invalidate_pattern", "failed", (time.time() - start_time))
             return 0
+
+    async def get_many_cached(
+        self,
+        keys: list[str],
+        fetch_missing: Callable | None = None,
+        ttl: int | None = None,
+        model: type[BaseModel] | None = None,
+    ) -> dict[str, Any]:
+        """批量获取缓存，未命中的键通过一次批量查询补齐
+
+        使用 MGET 一次读取所有键，未命中的键交给 fetch_missing 一次性加载，
+        再通过管道批量回写（数据源中不存在的键写入空值占位，防止缓存穿透）。
+
+        降级行为：
+        - 缓存禁用时，直接以全部键调用 fetch_missing
+        - Redis 连接失败时，自动降级到 fetch_missing
+
+        Args:
+            keys: 缓存键列表
+            fetch_missing: 批量数据获取函数，接收未命中的键列表，返回 {键: 值} 字典（同步或异步）
+            ttl: 过期时间（秒）
+            model: Pydantic 模型类（用于反序列化）
+
+        Returns:
+            dict: {键: 值}，数据不存在的键对应 None
+
+        Example:
+            keys = [cache_manager.build_key("user", uid) for uid in user_ids]
+            users = await cache_manager.get_many_cached(keys, load_users_by_keys, ttl=300)
+        """
+        unique_keys = list(dict.fromkeys(keys))
+        if not unique_keys:
+            return {}
+
+        if not self.is_enabled():
+            self.metrics.record_degradation("cache_disabled")
+            return await self._fetch_many(unique_keys, fetch_missing)
+
+        start_time = time.time()
+        results, missing = await self._try_get_many_from_cache(unique_keys, model)
+        self.metrics.record_operation_duration("get_many", "success", (time.time() - start_time))
+
+        if missing and fetch_missing is not None:
+            fetched = await self._fetch_many(missing, fetch_missing)
+            results.update(fetched)
+            await self.set_many_cached(fetched, ttl=ttl)
+
+        return results
+
+    async def _try_get_many_from_cache(
+        self, keys: list[str], model: type[BaseModel] | None
+    ) -> tuple[dict[str, Any], list[str]]:
+        """批量读取缓存，返回 (命中结果, 未命中的键)"""
+        try:
+            raw_values = await self.redis_client.mget(keys)
+        except Exception as e:
+            logger.warning(f"Redis 批量读取失败，降级到数据源 (count={len(keys)}): {e}")
+            self.metrics.record_degradation("redis_connection_failed")
+            return {}, list(keys)
+
+        results: dict[str, Any] = {}
+        missing: list[str] = []
+        for key, raw_value in zip(keys, raw_values, strict=False):
+            if raw_value is None:
+                missing.append(key)
+                self.metrics.record_cache_miss("get_many")
+                self.analytics.record_lookup(key, hit=False)
+                continue
+
+            self.metrics.record_cache_hit("get_many")
+            self.analytics.record_lookup(key, hit=True)
+            if raw_value == "NULL_PLACEHOLDER":
+                results[key] = None
+                continue
+
+            value = self._deserialize_cached_data(key, raw_value, model)
+            if value is None:
+                missing.append(key)
+            else:
+                results[key] = value
+
+        return results, missing
+
+    async def _fetch_many(self, keys: list[str], fetch_missing: Callable | None) -> dict[str, Any]:
+        """调用批量数据获取函数，结果中缺失的键补为 None"""
+        if fetch_missing is None:
+            return {}
+
+        if inspect.iscoroutinefunction(fetch_missing):
+            fetched = await fetch_missing(keys)
+        else:
+            fetched = fetch_missing(keys)
+
+        fetched = fetched or {}
+        return {key: fetched.get(key) for key in keys}
+
+    async def set_many_cached(self, items: dict[str, Any], ttl: int | None = None) -> bool:
+        """批量设置缓存值（管道单次往返）
+
+        值为 None 的键写入空值占位，使用较短的 TTL（60秒）。
+
+        降级行为：
+        - 缓存禁用时，直接返回 True（不执行缓存操作）
+        - Redis 连接失败时，记录日志并返回 False
+
+        Args:
+            items: {键: 值} 字典
+            ttl: 过期时间（秒）
+
+        Returns:
+            bool: 操作是否成功
+        """
+        if not items:
+            return True
+
+        if not self.is_enabled():
+            self.metrics.record_operation_duration("set_many", "degraded", 0)
+            return True
+
+        start_time = time.time()
+        values: dict[str, str] = {}
+        placeholders: dict[str, str] = {}
+        try:
+            for key, value in items.items():
+                if value is None:
+                    placeholders[key] = "NULL_PLACEHOLDER"
+                else:
+                    values[key] = _serialize_value(value)
+
+            result = await self.redis_client.mset_with_ttl(values, ttl=ttl)
+            for key, serialized in values.items():
+                self.analytics.record_write(key, serialized_size(serialized))
+            if placeholders:
+                result = await self.redis_client.mset_with_ttl(placeholders, ttl=60) and result
+
+            self.metrics.record_operation_duration(
+                "set_many", "success" if result else "failed", time.time() - start_time
+            )
+            return result
+        except Exception as e:
+            logger.warning(f"批量缓存写入失败 (count={len(items)}): {e}")
+            self.metrics.record_operation_duration("set_many", "failed", (time.time() - start_time))
+            return False
+
+    async def invalidate_many(self, keys: list[str]) -> int:
+        """批量使缓存失效（单次往返）
+
+        降级行为：
+        - 缓存禁用时，直接返回 0（无需失效操作）
+
+        Args:
+            keys: 缓存键列表
+
+        Returns:
+            int: 删除的键数量
+        """
+        if not keys:
+            return 0
+
+        if not self.is_enabled():
+            self.metrics.record_operation_duration("invalidate_many", "degraded", 0)
+            return 0
+
+        start_time = time.time()
+        if self.local_cache is not None:
+            self.local_cache.delete_many_sync(list(keys))
+        try:
+            deleted_count = await self.redis_client.delete_many(list(keys))
+            self.metrics.record_operation_duration("invalidate_many", "success", (time.time() - start_time))
+            return deleted_count
+        except Exception as e:
+            logger.warning(f"批量缓存失效失败 (count={len(keys)}): {e}")
+            self.metrics.record_operation_duration("invalidate_many", "failed", (time.time() - start_time))
+            return 0
+
+    # ========================================================================
+    # 同步接口
+    #
+    # 服务层方法均为同步函数，运行在事件循环线程或线程池中，无法等待异步 Redis 客户端。
+    # 同步路径先查进程内一级缓存（L1，短 TTL），未命中再通过阻塞式 Redis 客户端读取；
+    # 使用内存后端时直接读写后端本身。L1 在本进程失效时同步清除，其他 worker 通过失效事件总线清除。
+    # ========================================================================
+
+    def _get_local_cache(self) -> MemoryCacheBackend:
+        """获取同步路径使用的进程内缓存"""
+        if isinstance(self.redis_client, MemoryCacheBackend):
+            return self.redis_client
+        if self.local_cache is None:
+            self.local_cache = MemoryCacheBackend(
+                max_entries=LOCAL_CACHE_MAX_ENTRIES, max_memory_bytes=LOCAL_CACHE_MAX_BYTES
+            )
+        return self.local_cache
+
+    def _uses_remote_backend(self) -> bool:
+        return not isinstance(self.redis_client, MemoryCacheBackend)
+
+    def evict_local(self, pattern: str) -> int:
+        """清除进程内一级缓存中匹配的键（不影响 Redis）
+
+        Args:
+            pattern: 缓存键或模式（支持 * 通配符）
+
+        Returns:
+            int: 清除的键数量
+        """
+        if self.local_cache is None:
+            return 0
+        return self.local_cache.delete_pattern_sync(pattern)
+
+    def _get_raw_sync(self, key: str) -> str | None:
+        """同步读取原始缓存值：L1 → Redis（命中后回填 L1）"""
+        local_cache = self._get_local_cache()
+        raw_value = local_cache.get_sync(key)
+        if raw_value is not None or not self._uses_remote_backend():
+            return raw_value
+
+        raw_value = self.redis_client.call_sync(lambda client: client.get(key))
+        if raw_value is not None:
+            local_cache.set_sync(key, raw_value, ttl=LOCAL_CACHE_TTL)
+        return raw_value
+
+    def _set_raw_sync(self, key: str, raw_value: str, ttl: int | None) -> bool:
+        """同步写入原始缓存值：Redis + L1"""
+        result = self.redis_client.set_sync(key, raw_value, ttl=ttl)
+        if self._uses_remote_backend():
+            local_ttl = LOCAL_CACHE_TTL if ttl is None else min(ttl, LOCAL_CACHE_TTL)
+            self._get_local_cache().set_sync(key, raw_value, ttl=local_ttl)
+        return result
+
+    def get_or_set_sync(self, key: str, value: str, ttl: int | None = None) -> str:
+        """同步读取原始值，键不存在时原子写入 value（L1 → Redis SET NX）
+
+        与 get_cached_sync 不同，不做序列化和降级，后端失败时直接抛出异常。
+
+        Args:
+            key: 缓存键
+            value: 键不存在时写入的原始值
+            ttl: 过期时间（秒）
+
+        Returns:
+            str: 键的当前值
+        """
+        local_cache = self._get_local_cache()
+        if not self._uses_remote_backend():
+            return local_cache.get_or_set_sync(key, value, ttl=ttl)
+
+        current = local_cache.get_sync(key)
+        if current is not None:
+            return current
+
+        def set_if_absent(client) -> str:
+            if client.set(key, value, ex=ttl, nx=True):
+                return value
+            current = client.get(key)
+            return current if current is not None else value
+
+        value = self.redis_client.call_sync(set_if_absent)
+        local_ttl = LOCAL_CACHE_TTL if ttl is None else min(ttl, LOCAL_CACHE_TTL)
+        local_cache.set_sync(key, value, ttl=local_ttl)
+        return value
+
+    def get_cached_sync(
+        self,
+        key: str,
+        fetch_func: Callable | None = None,
+        ttl: int | None = None,
+        model: type[BaseModel] | None = None,
+    ) -> Any | None:
+        """同步获取缓存，行为与 get_cached 一致（空值占位、自动降级）
+
+        Args:
+            key: 缓存键
+            fetch_func: 同步数据获取函数（缓存未命中时调用）
+            ttl: 过期时间（秒）
+            model: Pydantic 模型类（用于反序列化）
+
+        Returns:
+            缓存的数据或从数据源获取的数据
+        """
+        if not self.is_enabled():
+            self.metrics.record_degradation("cache_disabled")
+            return fetch_func() if fetch_func else None
+
+        start_time = time.time()
+        raw_value, degraded = self._try_get_raw_sync(key)
+        if raw_value is not None:
+            cached_value = self._handle_sync_hit(key, raw_value, start_time, model)
+            if cached_value is not _SYNC_MISS:
+                return cached_value
+        else:
+            self._handle_sync_miss(key, degraded, start_time)
+
+        # 降级时不回写，避免对故障中的 Redis 继续发起写入
+        return self._fetch_and_cache_sync(key, fetch_func, ttl, cache=not degraded)
+
+    def _try_get_raw_sync(self, key: str) -> tuple[str | None, bool]:
+        """同步读取原始缓存值，失败时降级
+
+        Returns:
+            tuple: (原始值, 是否已降级)
+        """
+        try:
+            return self._get_raw_sync(key), False
+        except CircuitOpenError:
+            self.metrics.record_degradation("circuit_open")
+        except Exception as e:
+            logger.warning(f"同步缓存读取失败，降级到数据源 (key={key}): {e}")
+            self.metrics.record_degradation("redis_connection_failed")
+        return None, True
+
+    def _handle_sync_hit(self, key: str, raw_value: str, start_time: float, model: type[BaseModel] | None) -> Any:
+        """处理同步缓存命中，数据损坏时删除缓存并返回 _SYNC_MISS"""
+        self.metrics.record_cache_hit("get_sync")
+        self.analytics.record_lookup(key, hit=True)
+        self.metrics.record_operation_duration("get_sync", "success", time.time() - start_time)
+        if raw_value == "NULL_PLACEHOLDER":
+            return None
+        try:
+            if model is not None:
+                return model(**json.loads(raw_value))
+            return json.loads(raw_value)
+        except (json.JSONDecodeError, TypeError, ValueError) as e:
+            logger.error(f"缓存数据反序列化失败 (key={key}): {e}")
+            self.invalidate_sync(key)
+            return _SYNC_MISS
+
+    def _handle_sync_miss(self, key: str, degraded: bool, start_time: float) -> None:
+        """处理同步缓存未命中（降级时不计入热点统计）"""
+        self.metrics.record_cache_miss("get_sync")
+        if not degraded:
+            self.analytics.record_lookup(key, hit=False)
+        self.metrics.record_operation_duration(
+            "get_sync", "degraded" if degraded else "success", time.time() - start_time
+        )
+
+    def _fetch_and_cache_sync(self, key: str, fetch_func: Callable | None, ttl: int | None, cache: bool) -> Any | None:
+        """从数据源获取数据，cache 为 True 时写入缓存"""
+        if fetch_func is None:
+            return None
+
+        data = fetch_func()
+        if cache:
+            self.set_cached_sync(key, data, ttl)
+        return data
+
+    def set_cached_sync(self, key: str, value: Any, ttl: int | None = None) -> bool:
+        """同步设置缓存值，None 写入空值占位（TTL 60 秒）
+
+        Args:
+            key: 缓存键
+            value: 要缓存的值
+            ttl: 过期时间（秒）
+
+        Returns:
+            bool: 操作是否成功
+        """
+        if not self.is_enabled():
+            return True
+
+        start_time = time.time()
+        try:
+            if value is None:
+                result = self._set_raw_sync(key, "NULL_PLACEHOLDER", ttl=60)
+            else:
+                serialized = _serialize_value(value)
+                result = self._set_raw_sync(key, serialized, ttl=ttl)
+                self.analytics.record_write(key, serialized_size(serialized))
+            self.metrics.record_operation_duration(
+                "set_sync", "success" if result else "failed", time.time() - start_time
+            )
+            return result
+        except CircuitOpenError:
+            self.metrics.record_operation_duration("set_sync", "degraded", time.time() - start_time)
+            return False
+        except Exception as e:
+            logger.warning(f"同步缓存写入失败 (key={key}): {e}")
+            self.metrics.record_operation_duration("set_sync", "failed", time.time() - start_time)
+            return False
+
+    def invalidate_sync(self, key: str) -> bool:
+        """同步使缓存失效（L1 + Redis）
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            bool: 操作是否成功
+        """
+        if not self.is_enabled():
+            return True
+
+        start_time = time.time()
+        try:
+            if self.local_cache is not None:
+                self.local_cache.delete_sync(key)
+            self.redis_client.delete_sync(key)
+            self.metrics.record_operation_duration("invalidate_sync", "success", time.time() - start_time)
+            return True
+        except Exception as e:
+            logger.warning(f"同步缓存失效失败 (key={key}): {e}")
+            self.metrics.record_operation_duration("invalidate_sync", "failed", time.time() - start_time)
+            return False
+
+    def invalidate_patterns_sync(self, patterns: list[str]) -> int:
+        """同步批量使多个模式的缓存失效（L1 + 后端）
+
+        与 invalidate_pattern 不同，后端失败时抛出异常而不是降级返回 0，
+        由调用方（失效队列）决定是否重试。
+
+        Args:
+            patterns: 缓存键模式列表（支持 * 通配符）
+
+        Returns:
+            int: 删除的键数量
+        """
+        if not self.is_enabled() or not patterns:
+            return 0
+
+        start_time = time.time()
+        for pattern in patterns:
+            self.evict_local(pattern)
+        try:
+            deleted_count = self.redis_client.delete_patterns_sync(patterns)
+        except Exception as e:
+            self.cache_logger.log_cache_invalidate(
+                pattern=",".join(patterns), count=0, success=False, degraded=False, error=str(e)
+            )
+            self.metrics.record_operation_duration("invalidate_patterns_sync", "failed", time.time() - start_time)
+            raise
+
+        self.cache_logger.log_cache_invalidate(
+            pattern=",".join(patterns), count=deleted_count, success=True, degraded=False
+        )
+        self.metrics.record_operation_duration("invalidate_patterns_sync", "success", time.time() - start_time)
+        return deleted_count
@@ -0,0 +1,333 @@
+"""
+进程内内存缓存后端
+
+未配置 Redis 时使用的单进程缓存，支持 TTL、LRU 淘汰、内存上限和 glob 模式删除。
+适用于单节点部署以及无网络的测试、基准测试；多进程部署时各进程缓存互不共享。
+"""
+
+import fnmatch
+import logging
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any, TypeVar
+
+from app.core.cache.backend import CacheBackend
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class MemoryCacheBackend(CacheBackend):
+    """内存缓存后端
+
+    条目按最近访问顺序保存在 OrderedDict 中，超出条目数或内存上限时从最久未访问的一端淘汰。
+    过期条目在访问时惰性清除，写入触发淘汰时也会先清除已过期条目。
+    使用线程锁保护，可在多个事件循环或线程中共享同一实例。
+    """
+
+    def __init__(self, max_entries: int = 10000, max_memory_bytes: int = 64 * 1024 * 1024):
+        """初始化内存缓存后端
+
+        Args:
+            max_entries: 最大条目数
+            max_memory_bytes: 键和值占用的最大字节数（按 UTF-8 编码长度估算）
+        """
+        self.max_entries = max_entries
+        self.max_memory_bytes = max_memory_bytes
+
+        # key -> (value, expires_at, size)
+        self._store: OrderedDict[str, tuple[str, float | None, int]] = OrderedDict()
+        self._memory_bytes = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+        logger.info(f"内存缓存后端初始化: max_entries={max_entries}, max_memory_bytes={max_memory_bytes}")
+
+    @property
+    def memory_bytes(self) -> int:
+        """当前占用的字节数"""
+        return self._memory_bytes
+
+    @property
+    def evictions(self) -> int:
+        """累计 LRU 淘汰次数"""
+        return self._evictions
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    @staticmethod
+    def _entry_size(key: str, value: str) -> int:
+        return len(key.encode("utf-8")) + len(value.encode("utf-8"))
+
+    @staticmethod
+    def _is_expired(expires_at: float | None, now: float) -> bool:
+        return expires_at is not None and expires_at <= now
+
+    def _remove(self, key: str) -> bool:
+        """删除条目并更新内存统计（调用方持有锁）"""
+        entry = self._store.pop(key, None)
+        if entry is None:
+            return False
+        self._memory_bytes -= entry[2]
+        return True
+
+    def _get_live(self, key: str, now: float) -> tuple[str, float | None, int] | None:
+        """获取未过期的条目并标记为最近访问（调用方持有锁）"""
+        entry = self._store.get(key)
+        if entry is None:
+            return None
+        if self._is_expired(entry[1], now):
+            self._remove(key)
+            return None
+        self._store.move_to_end(key)
+        return entry
+
+    def _purge_expired(self, now: float) -> None:
+        """清除所有已过期条目（调用方持有锁）"""
+        expired = [key for key, (_, expires_at, _) in self._store.items() if self._is_expired(expires_at, now)]
+        for key in expired:
+            self._remove(key)
+
+    def _evict(self, now: float) -> None:
+        """超出上限时先清除过期条目，再按 LRU 顺序淘汰（调用方持有锁）"""
+        if len(self._store) <= self.max_entries and self._memory_bytes <= self.max_memory_bytes:
+            return
+
+        self._purge_expired(now)
+        while self._store and (len(self._store) > self.max_entries or self._memory_bytes > self.max_memory_bytes):
+            key = next(iter(self._store))
+            self._remove(key)
+            self._evictions += 1
+
+    def _set(self, key: str, value: str, ttl: int | None, now: float) -> bool:
+        """写入条目（调用方持有锁）"""
+        size = self._entry_size(key, value)
+        if size > self.max_memory_bytes:
+            logger.warning(f"缓存值超过内存上限，跳过写入 (key={key}, size={size})")
+            self._remove(key)
+            return False
+
+        self._remove(key)
+        expires_at = now + ttl if ttl is not None else None
+        self._store[key] = (value, expires_at, size)
+        self._memory_bytes += size
+        self._evict(now)
+        return True
+
+    # 同步接口：供同步代码（实体缓存、同步缓存失效）直接调用，异步接口复用同一实现
+
+    def get_sync(self, key: str) -> str | None:
+        """获取缓存值（同步）"""
+        with self._lock:
+            entry = self._get_live(key, time.monotonic())
+            return entry[0] if entry is not None else None
+
+    def set_sync(self, key: str, value: str, ttl: int | None = None) -> bool:
+        """设置缓存值（同步）"""
+        with self._lock:
+            return self._set(key, value, ttl, time.monotonic())
+
+    def get_or_set_sync(self, key: str, value: str, ttl: int | None = None) -> str:
+        """键不存在时写入 value，返回键的当前值（同步）"""
+        with self._lock:
+            now = time.monotonic()
+            entry = self._get_live(key, now)
+            if entry is not None:
+                return entry[0]
+            self._set(key, value, ttl, now)
+            return value
+
+    def delete_sync(self, key: str) -> bool:
+        """删除缓存键（同步）"""
+        with self._lock:
+            entry = self._store.get(key)
+            if entry is None:
+                return False
+            self._remove(key)
+            return not self._is_expired(entry[1], time.monotonic())
+
+    def delete_pattern_sync(self, pattern: str) -> int:
+        """批量删除匹配模式的键（同步）"""
+        with self._lock:
+            now = time.monotonic()
+            deleted_count = 0
+            for key in [key for key in self._store if fnmatch.fnmatchcase(key, pattern)]:
+                expires_at = self._store[key][1]
+                self._remove(key)
+                if not self._is_expired(expires_at, now):
+                    deleted_count += 1
+            return deleted_count
+
+    def delete_patterns_sync(self, patterns: list[str]) -> int:
+        """批量删除匹配任一模式的键（同步）"""
+        return sum(self.delete_pattern_sync(pattern) for pattern in patterns)
+
+    def call_sync(self, operation: Callable[[Any], T]) -> T:
+        """内存后端没有阻塞式客户端，同步操作使用上面的 *_sync 方法"""
+        raise NotImplementedError("MemoryCacheBackend 不提供阻塞式客户端")
+
+    def delete_many_sync(self, keys: list[str]) -> int:
+        """批量删除缓存键（同步）"""
+        with self._lock:
+            now = time.monotonic()
+            deleted_count = 0
+            for key in keys:
+                entry = self._store.get(key)
+                if entry is None:
+                    continue
+                self._remove(key)
+                if not self._is_expired(entry[1], now):
+                    deleted_count += 1
+            return deleted_count
+
+    async def get(self, key: str) -> str | None:
+        """获取缓存值
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            缓存值，不存在或已过期则返回 None
+        """
+        return self.get_sync(key)
+
+    async def set(self, key: str, value: str, ttl: int | None = None) -> bool:
+        """设置缓存值
+
+        Args:
+            key: 缓存键
+            value: 缓存值
+            ttl: 过期时间（秒），None 表示永不过期
+
+        Returns:
+            操作是否成功（单个值超过内存上限时返回 False）
+        """
+        return self.set_sync(key, value, ttl)
+
+    async def get_or_set(self, key: str, value: str, ttl: int | None = None) -> str:
+        """键不存在时写入 value，返回键的当前值
+
+        Args:
+            key: 缓存键
+            value: 键不存在时写入的值
+            ttl: 过期时间（秒），None 表示永不过期
+
+        Returns:
+            键的当前值
+        """
+        return self.get_or_set_sync(key, value, ttl)
+
+    async def delete(self, key: str) -> bool:
+        """删除缓存键
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            键存在且被删除返回 True
+        """
+        return self.delete_sync(key)
+
+    async def exists(self, key: str) -> bool:
+        """检查键是否存在
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            键是否存在且未过期
+        """
+        with self._lock:
+            return self._get_live(key, time.monotonic()) is not None
+
+    async def expire(self, key: str, ttl: int) -> bool:
+        """设置键的过期时间
+
+        Args:
+            key: 缓存键
+            ttl: 过期时间（秒）
+
+        Returns:
+            键存在且设置成功返回 True
+        """
+        with self._lock:
+            now = time.monotonic()
+            entry = self._get_live(key, now)
+            if entry is None:
+                return False
+            self._store[key] = (entry[0], now + ttl, entry[2])
+            return True
+
+    async def delete_pattern(self, pattern: str) -> int:
+        """批量删除匹配模式的键
+
+        Args:
+            pattern: 键模式（支持 Redis 风格的 *、? 和 [...] 通配符）
+
+        Returns:
+            删除的键数量（不含已过期的键）
+        """
+        deleted_count = self.delete_pattern_sync(pattern)
+        logger.info(f"批量删除缓存: pattern={pattern}, count={deleted_count}")
+        return deleted_count
+
+    async def mget(self, keys: list[str]) -> list[str | None]:
+        """批量获取缓存值
+
+        Args:
+            keys: 缓存键列表
+
+        Returns:
+            与 keys 顺序一致的值列表，不存在的键对应 None
+        """
+        with self._lock:
+            now = time.monotonic()
+            results = []
+            for key in keys:
+                entry = self._get_live(key, now)
+                results.append(entry[0] if entry is not None else None)
+            return results
+
+    async def mset_with_ttl(self, mapping: dict[str, str], ttl: int | None = None) -> bool:
+        """批量设置缓存值并统一设置过期时间
+
+        Args:
+            mapping: 键值映射
+            ttl: 过期时间（秒），None 表示永不过期
+
+        Returns:
+            是否全部设置成功
+        """
+        with self._lock:
+            now = time.monotonic()
+            results = [self._set(key, value, ttl, now) for key, value in mapping.items()]
+            return all(results)
+
+    async def delete_many(self, keys: list[str]) -> int:
+        """批量删除缓存键
+
+        Args:
+            keys: 缓存键列表
+
+        Returns:
+            实际删除的键数量（不含已过期的键）
+        """
+        return self.delete_many_sync(keys)
+
+    async def ping(self) -> bool:
+        """健康检查
+
+        Returns:
+            始终为 True
+        """
+        return True
+
+    async def close(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._store.clear()
+            self._memory_bytes = 0
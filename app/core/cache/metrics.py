@@ -32,6 +32,78 @@ cache_operation_duration = Histogram(
     buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
 )
 
+# 失效总线事件传播延迟（发布到各 worker 处理完成）
+cache_bus_propagation_seconds = Histogram(
+    "cache_bus_propagation_seconds",
+    "失效总线事件端到端传播延迟（秒）",
+    ["event", "transport"],  # transport: redis, loopback
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+
+# 后台失效队列
+cache_invalidation_queue_depth = Gauge("cache_invalidation_queue_depth", "等待执行的缓存失效模式数量")
+
+cache_invalidation_lag_seconds = Histogram(
+    "cache_invalidation_lag_seconds",
+    "缓存失效从提交到执行完成的延迟（秒）",
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+
+cache_invalidation_batches_total = Counter(
+    "cache_invalidation_batches_total", "缓存失效批次总数", ["status"]  # status: success, retry, dropped
+)
+
+# 不存在 ID 过滤器（布隆过滤器）
+cache_id_filter_checks_total = Counter(
+    "cache_id_filter_checks_total", "ID 过滤器判定总次数", ["resource", "result"]  # result: absent, maybe
+)
+
+cache_id_filter_false_positives_total = Counter(
+    "cache_id_filter_false_positives_total", "ID 过滤器判定可能存在但数据库中不存在的次数", ["resource"]
+)
+
+cache_id_filter_false_positive_rate = Gauge(
+    "cache_id_filter_false_positive_rate", "ID 过滤器按当前元素数量估算的假阳性率", ["resource"]
+)
+
+# Redis 熔断器
+cache_circuit_breaker_transitions_total = Counter(
+    "cache_circuit_breaker_transitions_total",
+    "熔断器状态转换总次数",
+    ["name", "from_state", "to_state"],  # state: closed, open, half_open
+)
+
+cache_circuit_breaker_state = Gauge("cache_circuit_breaker_state", "熔断器当前状态（0=关闭，1=打开，2=半开）", ["name"])
+
+
+# 按键前缀 / 路由模板细分的缓存分析指标
+cache_prefix_requests_total = Counter(
+    "cache_prefix_requests_total", "按键前缀统计的缓存读取次数", ["prefix", "result"]  # result: hit, miss
+)
+
+cache_route_requests_total = Counter(
+    "cache_route_requests_total",
+    "按路由模板统计的响应缓存查询次数",
+    ["route", "result"],  # result: hit, stale, not_modified, miss
+)
+
+_SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+cache_object_size_bytes = Histogram(
+    "cache_object_size_bytes", "按键前缀统计的缓存对象序列化大小（字节）", ["prefix"], buckets=_SIZE_BUCKETS
+)
+
+cache_route_object_size_bytes = Histogram(
+    "cache_route_object_size_bytes", "按路由模板统计的响应缓存条目大小（字节）", ["route"], buckets=_SIZE_BUCKETS
+)
+
+cache_ttl_remaining_seconds = Histogram(
+    "cache_ttl_remaining_seconds",
+    "响应缓存命中时条目的剩余有效期（秒），过期（SWR）条目为 0",
+    ["route"],
+    buckets=(0, 5, 15, 30, 60, 120, 300, 600, 1800, 3600, 86400),
+)
+
 
 class CacheMetrics:
     """缓存指标记录器
@@ -88,6 +160,136 @@ class CacheMetrics:
         """
         cache_operation_duration.labels(operation=operation, status=status).observe(duration_seconds)
 
+    @staticmethod
+    def record_bus_propagation(event: str, transport: str, latency_seconds: float) -> None:
+        """记录失效总线事件传播延迟
+
+        Args:
+            event: 事件类型（cache.invalidate, ws.message_update）
+            transport: 传输方式（redis, loopback）
+            latency_seconds: 从发布到处理完成的耗时（秒）
+        """
+        cache_bus_propagation_seconds.labels(event=event, transport=transport).observe(max(latency_seconds, 0.0))
+
+    @staticmethod
+    def set_invalidation_queue_depth(depth: int) -> None:
+        """设置后台失效队列深度
+
+        Args:
+            depth: 等待执行的失效模式数量
+        """
+        cache_invalidation_queue_depth.set(depth)
+
+    @staticmethod
+    def record_invalidation_lag(lag_seconds: float) -> None:
+        """记录缓存失效延迟
+
+        Args:
+            lag_seconds: 从提交到执行完成的耗时（秒）
+        """
+        cache_invalidation_lag_seconds.observe(max(lag_seconds, 0.0))
+
+    @staticmethod
+    def record_invalidation_batch(status: str) -> None:
+        """记录缓存失效批次
+
+        Args:
+            status: 批次状态（success, retry, dropped）
+        """
+        cache_invalidation_batches_total.labels(status=status).inc()
+
+    @staticmethod
+    def record_id_filter_check(resource: str, result: str) -> None:
+        """记录 ID 过滤器判定
+
+        Args:
+            resource: 资源名（knowledge, persona, user）
+            result: 判定结果（absent, maybe）
+        """
+        cache_id_filter_checks_total.labels(resource=resource, result=result).inc()
+
+    @staticmethod
+    def record_id_filter_false_positive(resource: str) -> None:
+        """记录 ID 过滤器假阳性
+
+        Args:
+            resource: 资源名
+        """
+        cache_id_filter_false_positives_total.labels(resource=resource).inc()
+
+    @staticmethod
+    def set_id_filter_false_positive_rate(resource: str, rate: float) -> None:
+        """设置 ID 过滤器估算假阳性率
+
+        Args:
+            resource: 资源名
+            rate: 估算假阳性率（0-1）
+        """
+        cache_id_filter_false_positive_rate.labels(resource=resource).set(rate)
+
+    @staticmethod
+    def record_circuit_transition(name: str, from_state: str, to_state: str, state_value: int) -> None:
+        """记录熔断器状态转换
+
+        Args:
+            name: 熔断器名称
+            from_state: 原状态（closed, open, half_open）
+            to_state: 新状态
+            state_value: 新状态对应的数值（0=关闭，1=打开，2=半开）
+        """
+        cache_circuit_breaker_transitions_total.labels(name=name, from_state=from_state, to_state=to_state).inc()
+        cache_circuit_breaker_state.labels(name=name).set(state_value)
+
+    @staticmethod
+    def record_prefix_request(prefix: str, result: str) -> None:
+        """记录按键前缀的缓存读取
+
+        Args:
+            prefix: 键前缀（如 user, star_target, http）
+            result: 读取结果（hit, miss）
+        """
+        cache_prefix_requests_total.labels(prefix=prefix, result=result).inc()
+
+    @staticmethod
+    def record_route_request(route: str, result: str) -> None:
+        """记录按路由模板的响应缓存查询
+
+        Args:
+            route: 路由模板
+            result: 查询结果（hit, stale, not_modified, miss）
+        """
+        cache_route_requests_total.labels(route=route, result=result).inc()
+
+    @staticmethod
+    def record_object_size(prefix: str, size_bytes: int) -> None:
+        """记录缓存对象序列化大小
+
+        Args:
+            prefix: 键前缀
+            size_bytes: 大小（字节）
+        """
+        cache_object_size_bytes.labels(prefix=prefix).observe(size_bytes)
+
+    @staticmethod
+    def record_route_object_size(route: str, size_bytes: int) -> None:
+        """记录响应缓存条目大小
+
+        Args:
+            route: 路由模板
+            size_bytes: 大小（字节）
+        """
+        cache_route_object_size_bytes.labels(route=route).observe(size_bytes)
+
+    @staticmethod
+    def record_ttl_remaining(route: str, ttl_remaining: float) -> None:
+        """记录响应缓存命中时的剩余有效期
+
+        Args:
+            route: 路由模板
+            ttl_remaining: 剩余有效期（秒）
+        """
+        cache_ttl_remaining_seconds.labels(route=route).observe(max(ttl_remaining, 0.0))
+
     @staticmethod
     def get_cache_hit_rate() -> float:
         """计算缓存命中率
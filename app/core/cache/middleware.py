@@ -3,6 +3,11 @@ FastAPI 缓存中间件
 
 在 FastAPI 请求处理流程中自动处理缓存，支持自动降级。
 自动缓存 GET 请求响应，处理缓存头（Cache-Control、ETag）。
+配置策略注册表后，按路由声明的策略（TTL、vary、标签、SWR）缓存，未声明策略的路由不缓存。
+声明了 versioned 的路由使用实体版本生成 ETag / Last-Modified，条件请求在执行端点之前直接返回 304。
+
+以纯 ASGI 中间件实现：响应体边发送给客户端边收集到缓存缓冲区，不缓冲、不重建响应，
+流式响应（如文件下载）保持流式；超过大小上限的响应只透传不缓存。
 """
 
 import asyncio
@@ -10,19 +15,86 @@ import hashlib
 import json
 import logging
 import time
+from collections.abc import Coroutine
 from typing import Any
 
 from fastapi import Request, Response
-from starlette.datastructures import Headers
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+from app.core.cache.analytics import OTHER_LABEL, get_cache_analytics, serialized_size
+from app.core.cache.id_filter import get_existence_filter
 from app.core.cache.manager import CacheManager
 from app.core.cache.metrics import get_cache_metrics
+from app.core.cache.policy import (
+    CachePolicyRegistry,
+    PolicyMatch,
+    build_vary_parts,
+    render_tags,
+    resolve_identity,
+)
+from app.core.cache.versioning import EntityValidators, resolve_validators
 
 logger = logging.getLogger(__name__)
 
+# 默认可缓存的最大响应体（字节），超过时只透传不缓存
+DEFAULT_MAX_BODY_SIZE = 1024 * 1024
+
+
+class _ResponseTee:
+    """在响应流经中间件时收集状态码、响应头和响应体分片
 
-class CacheMiddleware(BaseHTTPMiddleware):
+    只保存分片引用，响应结束后拼接一次；响应体超过上限或状态码不是 2xx 时停止收集。
+    """
+
+    __slots__ = ("max_body_size", "status_code", "raw_headers", "chunks", "size", "cacheable", "complete", "etag")
+
+    def __init__(self, max_body_size: int):
+        self.max_body_size = max_body_size
+        self.status_code = 0
+        self.raw_headers: list[tuple[bytes, bytes]] = []
+        self.chunks: list[bytes] = []
+        self.size = 0
+        self.cacheable = False
+        self.complete = False
+        self.etag: str | None = None
+
+    def start(self, message: Message) -> None:
+        """记录响应起始消息"""
+        self.status_code = message["status"]
+        self.raw_headers = list(message.get("headers", []))
+        self.cacheable = 200 <= self.status_code < 300
+
+        content_length = Headers(raw=self.raw_headers).get("content-length", "")
+        if content_length.isdigit() and int(content_length) > self.max_body_size:
+            self.cacheable = False
+
+    def feed(self, body: bytes, more_body: bool) -> None:
+        """记录一个响应体分片"""
+        if not more_body:
+            self.complete = True
+        if not self.cacheable:
+            return
+
+        self.size += len(body)
+        if self.size > self.max_body_size:
+            self.cacheable = False
+            self.chunks.clear()
+        elif body:
+            self.chunks.append(body)
+
+    @property
+    def headers(self) -> Headers:
+        """原始响应头（不含中间件追加的头）"""
+        return Headers(raw=self.raw_headers)
+
+    @property
+    def body(self) -> bytes:
+        """完整响应体（单分片时不产生拷贝）"""
+        return b"".join(self.chunks)
+
+
+class CacheMiddleware:
     """FastAPI 缓存中间件
 
     自动缓存 GET 请求的响应，支持缓存头处理和自动降级。
@@ -35,11 +107,13 @@ class CacheMiddleware(BaseHTTPMiddleware):
 
     def __init__(
         self,
-        app,
+        app: ASGIApp,
         cache_manager: CacheManager,
         default_ttl: int = 300,
         cache_query_params: bool = True,
         excluded_paths: list | None = None,
+        policy_registry: CachePolicyRegistry | None = None,
+        max_body_size: int = DEFAULT_MAX_BODY_SIZE,
     ):
         """初始化缓存中间件
 
@@ -49,13 +123,23 @@ class CacheMiddleware(BaseHTTPMiddleware):
             default_ttl: 默认缓存时间（秒），默认 5 分钟
             cache_query_params: 是否将查询参数纳入缓存键
             excluded_paths: 排除的路径列表（不缓存）
+            policy_registry: 路由缓存策略注册表，提供时只缓存声明了策略的路由
+            max_body_size: 可缓存的最大响应体（字节），超过时只透传不缓存
         """
-        super().__init__(app)
+        self.app = app
         self.cache_manager = cache_manager
         self.default_ttl = default_ttl
         self.cache_query_params = cache_query_params
         self.excluded_paths = excluded_paths or []
+        self.policy_registry = policy_registry
+        self.max_body_size = max_body_size
         self.metrics = get_cache_metrics()
+        self.analytics = get_cache_analytics()
+
+        # 正在后台刷新的缓存键（避免同一键重复刷新）
+        self._revalidating: set[str] = set()
+        # 后台任务的强引用（事件循环只保存弱引用，未完成的任务可能被回收）
+        self._background_tasks: set[asyncio.Task] = set()
 
         # 缓存统计信息
         self._stats: dict[str, Any] = {
@@ -63,6 +147,8 @@ class CacheMiddleware(BaseHTTPMiddleware):
             "misses": 0,
             "errors": 0,
             "bypassed": 0,
+            "stale": 0,  # 返回过期数据（SWR）次数
+            "not_modified": 0,  # 按实体版本直接返回 304 的次数
             "degraded": 0,  # 降级次数
             "degradation_reasons": {},  # 降级原因统计 {reason: count}
         }
@@ -114,13 +200,18 @@ class CacheMiddleware(BaseHTTPMiddleware):
 
         return True
 
-    def _build_cache_key(self, request: Request) -> str:
+    def _build_cache_key(
+        self, request: Request, vary_parts: list[str] | None = None, tags: list[str] | None = None
+    ) -> str:
         """构建缓存键
 
-        根据请求路径和参数生成唯一的缓存键。
+        根据请求路径、参数和策略区分维度生成唯一的缓存键。
+        标签以 "#tag#" 形式追加在哈希之后，便于按标签模式失效。
 
         Args:
             request: FastAPI 请求对象
+            vary_parts: 策略区分片段（用户、角色、请求头）
+            tags: 渲染后的缓存标签
 
         Returns:
             str: 缓存键
@@ -137,12 +228,53 @@ class CacheMiddleware(BaseHTTPMiddleware):
         else:
             cache_key_base = path
 
+        if vary_parts:
+            cache_key_base = f"{cache_key_base}|{'|'.join(vary_parts)}"
+
         # 使用 MD5 哈希生成短键（避免键过长）
         key_hash = hashlib.md5(cache_key_base.encode()).hexdigest()
 
+        if tags:
+            key_hash = f"{key_hash}#{'#'.join(tags)}#"
+
         # 构建标准化缓存键
         return self.cache_manager.build_key("http", key_hash)
 
+    def _resolve_policy(self, request: Request) -> tuple[PolicyMatch, list[str], list[str]] | None:
+        """根据注册表解析请求的缓存策略
+
+        Args:
+            request: FastAPI 请求对象
+
+        Returns:
+            tuple: (策略匹配结果, 区分片段, 标签)，请求不可缓存时返回 None
+        """
+        match = self.policy_registry.match(request.url.path) if self.policy_registry else None
+        if match is None:
+            return None
+
+        identity = resolve_identity(request.headers) if match.policy.vary_by or match.policy.tags else None
+        # 按用户区分的策略只缓存携带有效令牌的请求，匿名或无效令牌请求交由路由自行处理
+        if match.policy.is_per_user and identity is None:
+            return None
+
+        vary_parts = build_vary_parts(match.policy, request.headers, identity)
+        tags = render_tags(match.policy, match.path_params, identity)
+        return match, vary_parts, tags
+
+    @staticmethod
+    def _is_definitely_absent(request: Request, policy_match: PolicyMatch) -> bool:
+        """按策略的 must_exist 检查路径参数是否一定不存在（结果保存在请求中，端点直接复用）"""
+        if not policy_match.policy.must_exist:
+            return False
+
+        id_filter = get_existence_filter()
+        for param, resource in policy_match.policy.must_exist:
+            entity_id = policy_match.path_params.get(param)
+            if entity_id and not id_filter.might_exist_in_request(request, resource, entity_id):
+                return True
+        return False
+
     def _parse_cache_control(self, headers: Headers) -> dict[str, Any]:
         """解析 Cache-Control 头
 
@@ -165,22 +297,38 @@ class CacheMiddleware(BaseHTTPMiddleware):
 
         return directives
 
-    def _get_ttl_from_response(self, response: Response) -> int | None:
+    def _get_ttl_from_response(self, response: Response, policy_match: PolicyMatch | None = None) -> int | None:
         """从响应头中提取 TTL
 
         Args:
             response: FastAPI 响应对象
+            policy_match: 路由缓存策略，提供时以策略 TTL 为准（响应禁止缓存时除外）
+
+        Returns:
+            int: TTL（秒），如果未指定则返回 None
+        """
+        return self._get_ttl_from_headers(response.headers, policy_match)
+
+    def _get_ttl_from_headers(self, headers: Headers, policy_match: PolicyMatch | None = None) -> int | None:
+        """从响应头中提取 TTL
+
+        Args:
+            headers: 响应头
+            policy_match: 路由缓存策略，提供时以策略 TTL 为准（响应禁止缓存时除外）
 
         Returns:
             int: TTL（秒），如果未指定则返回 None
         """
         # 解析 Cache-Control 头
-        cache_control = self._parse_cache_control(response.headers)
+        cache_control = self._parse_cache_control(headers)
 
         # 检查是否禁止缓存
         if cache_control.get("no-store") or cache_control.get("no-cache"):
             return None
 
+        if policy_match is not None:
+            return policy_match.policy.ttl
+
         # 提取 max-age
         if "max-age" in cache_control:
             try:
@@ -202,7 +350,7 @@ class CacheMiddleware(BaseHTTPMiddleware):
         """
         return hashlib.md5(content).hexdigest()
 
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """处理请求，自动缓存 GET 请求响应
 
         降级行为：
@@ -211,43 +359,130 @@ class CacheMiddleware(BaseHTTPMiddleware):
         - 降级过程对客户端透明
 
         Args:
-            request: FastAPI 请求对象
-            call_next: 下一个中间件或路由处理器
-
-        Returns:
-            Response: FastAPI 响应对象
+            scope: ASGI scope
+            receive: ASGI receive 通道
+            send: ASGI send 通道
         """
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+
         # 检查是否应该缓存
         if not self._should_cache_request(request):
             self._stats["bypassed"] += 1
-            return await call_next(request)
+            await self.app(scope, receive, send)
+            return
+
+        # 按路由策略解析（配置了注册表时，未声明策略的路由不缓存）
+        policy_match, vary_parts, tags = None, None, None
+        if self.policy_registry is not None:
+            resolved = self._resolve_policy(request)
+            if resolved is None:
+                self._stats["bypassed"] += 1
+                await self.app(scope, receive, send)
+                return
+            policy_match, vary_parts, tags = resolved
+
+            # ID 过滤器判定路径参数一定不存在，不查缓存，由端点直接返回 404
+            if self._is_definitely_absent(request, policy_match):
+                self._stats["bypassed"] += 1
+                await self.app(scope, receive, send)
+                return
 
         # 缓存禁用，直接转发请求
         if not self.cache_manager.is_enabled():
             self._stats["bypassed"] += 1
             self._record_degradation("cache_disabled")
-            return await call_next(request)
+            await self.app(scope, receive, send)
+            return
 
         # 构建缓存键
-        cache_key = self._build_cache_key(request)
+        cache_key = self._build_cache_key(request, vary_parts, tags)
+
+        # 实体版本校验器：条件请求命中时不执行端点、不查缓存
+        validators = await self._resolve_validators(cache_key, policy_match)
+        if validators is not None and validators.is_not_modified(request.headers):
+            await self._not_modified_response(request, validators, policy_match)(scope, receive, send)
+            return
+
+        if policy_match is not None and not policy_match.policy.store:
+            self._stats["bypassed"] += 1
+            await self._forward_with_validators(scope, receive, send, validators)
+            return
 
         # 尝试从缓存获取
-        cached_response = await self._try_get_cached_response(request, cache_key)
+        cached_response = await self._try_get_cached_response(request, cache_key, policy_match, validators)
         if cached_response is not None:
-            return cached_response
+            await cached_response(scope, receive, send)
+            return
 
         # 缓存未命中，执行实际请求
-        return await self._handle_cache_miss(request, call_next, cache_key)
+        await self._handle_cache_miss(scope, receive, send, cache_key, policy_match, validators)
+
+    async def _resolve_validators(self, cache_key: str, policy_match: PolicyMatch | None) -> EntityValidators | None:
+        """按策略的 versioned 读取实体版本，生成本次请求的校验器
+
+        缓存键已包含路径、查询参数与 vary 片段，作为表示标识参与 ETag 计算。
+        """
+        if policy_match is None or not policy_match.policy.versioned:
+            return None
 
-    async def _try_get_cached_response(self, request: Request, cache_key: str) -> Response | None:
+        entities = []
+        for param, resource in policy_match.policy.versioned:
+            entity_id = policy_match.path_params.get(param)
+            if not entity_id:
+                return None
+            entities.append((resource, entity_id))
+        return await resolve_validators(self.cache_manager, entities, cache_key)
+
+    def _not_modified_response(
+        self, request: Request, validators: EntityValidators, policy_match: PolicyMatch | None
+    ) -> Response:
+        """构建按实体版本应答的 304 响应"""
+        self._stats["not_modified"] += 1
+        self.metrics.record_cache_hit("conditional")
+        self.analytics.record_route_lookup(self._route_label(policy_match), request.url.path, "not_modified")
+        response = Response(status_code=304, headers=validators.headers())
+        response.headers["X-Cache"] = "NOT_MODIFIED"
+        return response
+
+    async def _forward_with_validators(
+        self, scope: Scope, receive: Receive, send: Send, validators: EntityValidators | None
+    ) -> None:
+        """转发不缓存响应体的请求，为 200 响应追加版本校验器"""
+        if validators is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                message["headers"] = list(message.get("headers", []))
+                headers = MutableHeaders(scope=message)
+                for name, value in validators.headers().items():
+                    headers[name] = value
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def _try_get_cached_response(
+        self,
+        request: Request,
+        cache_key: str,
+        policy_match: PolicyMatch | None = None,
+        validators: EntityValidators | None = None,
+    ) -> Response | None:
         """尝试从缓存获取响应"""
         try:
             cached_data = await self.cache_manager.get_cached(cache_key)
 
             if cached_data is not None:
-                self._stats["hits"] += 1
-                self.metrics.record_cache_hit("middleware")
-                return self._build_cached_response(request, cached_data, cache_key)
+                response = self._build_cached_response(request, cached_data, cache_key, policy_match, validators)
+                if response is not None:
+                    self._stats["hits"] += 1
+                    self.metrics.record_cache_hit("middleware")
+                return response
 
         except Exception as e:
             logger.warning(f"缓存读取失败，降级到正常请求处理 (key={cache_key}): {e}")
@@ -256,16 +491,41 @@ class CacheMiddleware(BaseHTTPMiddleware):
 
         return None
 
-    def _build_cached_response(self, request: Request, cached_data: str, cache_key: str) -> Response | None:
-        """构建缓存的响应"""
+    def _build_cached_response(
+        self,
+        request: Request,
+        cached_data: str,
+        cache_key: str,
+        policy_match: PolicyMatch | None = None,
+        validators: EntityValidators | None = None,
+    ) -> Response | None:
+        """构建缓存的响应
+
+        缓存条目超过新鲜期但仍在 SWR 窗口内时，返回旧数据（X-Cache: STALE）并触发后台刷新。
+        有版本校验器时，条目必须由同一版本生成，否则视为未命中（避免旧数据带上新版本的 ETag）。
+        """
         try:
             cached_response = json.loads(cached_data)
+            if validators is not None and cached_response.get("version_etag") != validators.etag:
+                logger.debug(f"缓存条目版本已过期，视为未命中: {request.url.path}")
+                return None
+
+            is_stale = self._is_stale(cached_response)
+            if is_stale and policy_match is not None:
+                self._stats["stale"] += 1
+                self._schedule_revalidation(request, cache_key, policy_match)
+            self.analytics.record_route_lookup(
+                self._route_label(policy_match),
+                request.url.path,
+                "stale" if is_stale else "hit",
+                self._ttl_remaining(cached_response),
+            )
 
-            # 检查 ETag
+            # 检查 ETag（有版本校验器时，条件请求已在查缓存之前处理）
             if_none_match = request.headers.get("If-None-Match")
-            etag = cached_response.get("etag")
+            etag = validators.etag if validators is not None else cached_response.get("etag")
 
-            if if_none_match and etag and if_none_match == etag:
+            if validators is None and if_none_match and etag and if_none_match == etag:
                 return Response(status_code=304, headers={"ETag": etag})
 
             # 构建响应
@@ -275,91 +535,196 @@ class CacheMiddleware(BaseHTTPMiddleware):
                 headers=cached_response["headers"],
                 media_type=cached_response.get("media_type"),
             )
-            response.headers["X-Cache"] = "HIT"
+            if etag:
+                response.headers["ETag"] = etag
+            if validators is not None:
+                response.headers["Last-Modified"] = validators.last_modified_header
+            response.headers["X-Cache"] = "STALE" if is_stale else "HIT"
             logger.debug(f"缓存命中: {request.url.path}")
             return response
 
         except (json.JSONDecodeError, KeyError, TypeError) as e:
             logger.error(f"缓存数据解析失败 (key={cache_key}): {e}")
-            asyncio.create_task(self.cache_manager.invalidate(cache_key))
+            self._run_in_background(self.cache_manager.invalidate(cache_key))
             return None
 
-    async def _handle_cache_miss(self, request: Request, call_next, cache_key: str) -> Response:
-        """处理缓存未命中"""
-        self._stats["misses"] += 1
-        self.metrics.record_cache_miss("middleware")
-
-        start_time = time.time()
-        response = await call_next(request)
-        response_time = time.time() - start_time
-
-        # 只缓存成功的响应
-        if 200 <= response.status_code < 300:
-            response = await self._cache_response(request, response, cache_key)
+    @staticmethod
+    def _route_label(policy_match: PolicyMatch | None) -> str:
+        """分析统计使用的路由标签（路由模板；未配置策略注册表时不区分路由）"""
+        return policy_match.route_path if policy_match is not None else OTHER_LABEL
+
+    @staticmethod
+    def _ttl_remaining(cached_response: dict[str, Any]) -> float | None:
+        """计算缓存条目新鲜期的剩余时间（秒），过期条目为 0，旧格式条目返回 None"""
+        ttl = cached_response.get("fresh_ttl") or cached_response.get("ttl")
+        cached_at = cached_response.get("cached_at")
+        if not ttl or not cached_at:
+            return None
+        return max(cached_at + ttl - time.time(), 0.0)
 
-        # 添加响应头
-        response.headers["X-Cache"] = "MISS"
-        response.headers["X-Response-Time"] = f"{response_time:.3f}s"
+    def _is_stale(self, cached_response: dict[str, Any]) -> bool:
+        """判断缓存条目是否已超过新鲜期
 
-        return response
+        旧格式条目没有 fresh_ttl 字段，视为始终新鲜（由 Redis TTL 控制过期）。
+        """
+        fresh_ttl = cached_response.get("fresh_ttl")
+        cached_at = cached_response.get("cached_at")
+        if not fresh_ttl or not cached_at:
+            return False
+        return time.time() > cached_at + fresh_ttl
+
+    def _schedule_revalidation(self, request: Request, cache_key: str, policy_match: PolicyMatch) -> None:
+        """调度后台刷新过期缓存（同一缓存键同时只刷新一次）"""
+        if cache_key in self._revalidating:
+            return
+        self._revalidating.add(cache_key)
+        self._run_in_background(self._revalidate(dict(request.scope), cache_key, policy_match))
+
+    def _run_in_background(self, coro: Coroutine[Any, Any, Any]) -> None:
+        """创建后台任务，完成前保留引用"""
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def _revalidate(self, scope: Scope, cache_key: str, policy_match: PolicyMatch) -> None:
+        """在后台重新执行下游处理器并刷新缓存"""
+        tee = _ResponseTee(self.max_body_size)
+
+        async def receive() -> Message:
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                tee.start(message)
+            elif message["type"] == "http.response.body":
+                tee.feed(message.get("body", b""), message.get("more_body", False))
 
-    async def _cache_response(self, request: Request, response: Response, cache_key: str) -> Response:
-        """缓存响应"""
         try:
-            response_body = await self._read_response_body(response)
-            if response_body is None:
-                response.headers["X-Cache"] = "MISS"
-                return response
+            validators = await self._resolve_validators(cache_key, policy_match)
+            await self.app(scope, receive, send)
+            await self._store_response(cache_key, tee, policy_match, scope.get("path", ""), validators)
+        except Exception as e:
+            logger.warning(f"后台刷新缓存失败 (key={cache_key}): {e}")
+            self._stats["errors"] += 1
+        finally:
+            self._revalidating.discard(cache_key)
 
-            etag = self._generate_etag(response_body)
-            ttl = self._get_ttl_from_response(response)
+    async def _handle_cache_miss(
+        self,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+        cache_key: str,
+        policy_match: PolicyMatch | None = None,
+        validators: EntityValidators | None = None,
+    ) -> None:
+        """处理缓存未命中
 
-            if ttl is not None and ttl > 0:
-                await self._save_to_cache(cache_key, response, response_body, etag, ttl, request)
+        响应起始消息延迟到首个响应体分片到达后再发送：单分片响应（绝大多数 JSON 响应）
+        可以在发送响应头前计算出 ETag；多分片的流式响应不带 ETag，分片到达即转发。
+        """
+        self._stats["misses"] += 1
+        self.metrics.record_cache_miss("middleware")
+        self.analytics.record_route_lookup(self._route_label(policy_match), scope.get("path", ""), "miss")
 
-            # 重新构建响应
-            response = Response(
-                content=response_body,
-                status_code=response.status_code,
-                headers=dict(response.headers),
-                media_type=response.media_type,
-            )
-            response.headers["ETag"] = etag
+        start_time = time.time()
+        tee = _ResponseTee(self.max_body_size)
+        pending_start: Message | None = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal pending_start
+            if message["type"] == "http.response.start":
+                tee.start(message)
+                pending_start = message
+                return
+
+            if message["type"] == "http.response.body" and pending_start is not None:
+                body = message.get("body", b"")
+                more_body = message.get("more_body", False)
+                if tee.cacheable and not more_body:
+                    tee.etag = self._generate_etag(body)
+                if validators is not None and tee.status_code == 200:
+                    self._add_miss_headers(pending_start, time.time() - start_time, None, validators)
+                else:
+                    self._add_miss_headers(pending_start, time.time() - start_time, tee.etag)
+                await send(pending_start)
+                pending_start = None
+                tee.feed(body, more_body)
+            elif message["type"] == "http.response.body":
+                tee.feed(message.get("body", b""), message.get("more_body", False))
+
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+        await self._store_response(cache_key, tee, policy_match, scope.get("path", ""), validators)
+
+    def _add_miss_headers(
+        self, message: Message, response_time: float, etag: str | None, validators: EntityValidators | None = None
+    ) -> None:
+        """为未命中的响应追加缓存相关响应头（有版本校验器时使用版本 ETag 和 Last-Modified）"""
+        message["headers"] = list(message.get("headers", []))
+        headers = MutableHeaders(scope=message)
+        if validators is not None:
+            for name, value in validators.headers().items():
+                headers[name] = value
+        elif etag:
+            headers["ETag"] = etag
+        headers["X-Cache"] = "MISS"
+        headers["X-Response-Time"] = f"{response_time:.3f}s"
+
+    def _swr_window(self, policy_match: PolicyMatch | None) -> int:
+        """获取策略的 SWR 窗口（秒）"""
+        return policy_match.policy.stale_while_revalidate if policy_match is not None else 0
+
+    async def _store_response(
+        self,
+        cache_key: str,
+        tee: _ResponseTee,
+        policy_match: PolicyMatch | None,
+        path: str,
+        validators: EntityValidators | None = None,
+    ) -> None:
+        """将收集到的完整响应写入缓存
 
-        except Exception as e:
-            logger.error(f"缓存响应时出错 (key={cache_key}): {e}")
-            self._stats["errors"] += 1
+        启用 SWR 时，缓存后端 TTL 为新鲜期加 SWR 窗口，条目内记录新鲜期用于判断是否过期。
+        有版本校验器时，条目内记录执行端点前读取的版本 ETag。
+        非 UTF-8 文本的响应体不缓存。
+        """
+        if not tee.complete or not tee.cacheable:
+            return
 
-        return response
+        headers = tee.headers
+        ttl = self._get_ttl_from_headers(headers, policy_match)
+        if ttl is None or ttl <= 0:
+            return
 
-    async def _read_response_body(self, response: Response) -> bytes | None:
-        """读取响应体"""
-        response_body = b""
-        if hasattr(response, "body_iterator"):
-            async for chunk in response.body_iterator:  # type: ignore
-                response_body += chunk
-        elif hasattr(response, "body"):
-            response_body = response.body  # type: ignore
-        else:
-            return None
-        return response_body
+        body = tee.body
+        try:
+            content = body.decode("utf-8")
+        except UnicodeDecodeError:
+            logger.debug(f"响应体不是 UTF-8 文本，跳过缓存: {path}")
+            return
 
-    async def _save_to_cache(
-        self, cache_key: str, response: Response, response_body: bytes, etag: str, ttl: int, request: Request
-    ) -> None:
-        """保存响应到缓存"""
+        swr = self._swr_window(policy_match)
         cache_data = {
-            "content": response_body.decode("utf-8", errors="ignore"),
-            "status_code": response.status_code,
-            "headers": dict(response.headers),
-            "media_type": response.media_type,
-            "etag": etag,
+            "content": content,
+            "status_code": tee.status_code,
+            "headers": dict(headers),
+            "media_type": headers.get("content-type"),
+            "etag": tee.etag or self._generate_etag(body),
             "cached_at": time.time(),
+            "ttl": ttl,
         }
+        if swr > 0:
+            cache_data["fresh_ttl"] = ttl
+        if validators is not None:
+            cache_data["version_etag"] = validators.etag
 
         try:
-            await self.cache_manager.set_cached(cache_key, json.dumps(cache_data, ensure_ascii=False), ttl=ttl)
-            logger.debug(f"响应已缓存: {request.url.path}, ttl={ttl}s, size={len(response_body)} bytes")
+            serialized = json.dumps(cache_data, ensure_ascii=False)
+            await self.cache_manager.set_cached(cache_key, serialized, ttl=ttl + swr)
+            self.analytics.record_route_write(self._route_label(policy_match), serialized_size(serialized))
+            logger.debug(f"响应已缓存: {path}, ttl={ttl}s, swr={swr}s, size={len(body)} bytes")
         except Exception as e:
             logger.warning(f"缓存写入失败 (key={cache_key}): {e}")
             self._stats["errors"] += 1
@@ -378,14 +743,27 @@ class CacheMiddleware(BaseHTTPMiddleware):
             "misses": self._stats["misses"],
             "errors": self._stats["errors"],
             "bypassed": self._stats["bypassed"],
+            "stale": self._stats["stale"],
+            "not_modified": self._stats["not_modified"],
             "degraded": self._stats["degraded"],
             "degradation_reasons": dict(self._stats["degradation_reasons"]),
             "total_cached_requests": total_requests,
             "hit_rate": f"{hit_rate:.2f}%",
             "cache_enabled": self.cache_manager.is_enabled(),
+            "analytics": self.analytics.get_stats(),
         }
 
     def reset_stats(self) -> None:
         """重置缓存统计信息"""
-        self._stats = {"hits": 0, "misses": 0, "errors": 0, "bypassed": 0, "degraded": 0, "degradation_reasons": {}}
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "errors": 0,
+            "bypassed": 0,
+            "stale": 0,
+            "not_modified": 0,
+            "degraded": 0,
+            "degradation_reasons": {},
+        }
+        self.analytics.reset()
         logger.info("缓存统计信息已重置")
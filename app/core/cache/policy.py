@@ -0,0 +1,330 @@
+"""
+路由缓存策略注册表
+
+以声明式方式为每个 GET 端点配置缓存策略（TTL、按调用方区分、标签、SWR 窗口），
+CacheMiddleware 通过注册表决定是否缓存以及如何构建缓存键，取代硬编码的路径前缀列表。
+"""
+
+import logging
+import re
+from collections.abc import Callable
+from typing import Any
+
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+from starlette.datastructures import Headers
+from starlette.routing import compile_path
+
+logger = logging.getLogger(__name__)
+
+# 端点函数上保存策略的属性名
+POLICY_ATTR = "__cache_policy__"
+
+# 支持的 vary_by 取值（header:<name> 形式单独处理）
+_VARY_KEYWORDS = {"user", "role"}
+
+# 标签中的通配符转义为只含该字符的字符集（Redis SCAN MATCH 和 fnmatch 都按字面匹配）
+_GLOB_ESCAPES = str.maketrans({"*": "[*]", "?": "[?]", "[": "[[]", "\\": "[\\\\]"})
+
+
+class CachePolicy(BaseModel):
+    """单个端点的缓存策略
+
+    vary_by 支持：
+    - "user": 按 JWT 中的用户 ID 区分（仅对携带有效令牌的请求缓存）
+    - "role": 按 JWT 中的角色区分
+    - "header:<name>": 按请求头区分，如 "header:Accept-Language"
+
+    tags 为标签模板，可引用路径参数（如 "knowledge:{kb_id}"）和当前用户（"{user}"），
+    用于写操作后按标签批量失效。
+
+    must_exist 为 (路径参数, 资源名) 列表：ID 过滤器判定路径参数一定不存在时，
+    中间件跳过缓存查找，直接交给端点返回 404。
+
+    versioned 为 (路径参数, 资源名) 列表：响应的 ETag / Last-Modified 由实体版本键生成，
+    条件请求在执行端点之前按版本键返回 304。store=False 时只处理条件请求，不缓存响应体（如二进制文件）。
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    ttl: int = Field(default=300, description="新鲜期（秒）")
+    vary_by: tuple[str, ...] = Field(default=(), description="缓存键区分维度")
+    tags: tuple[str, ...] = Field(default=(), description="缓存标签模板")
+    stale_while_revalidate: int = Field(default=0, description="过期后仍可返回旧数据并后台刷新的窗口（秒）")
+    must_exist: tuple[tuple[str, str], ...] = Field(default=(), description="需存在的 (路径参数, 资源名)")
+    versioned: tuple[tuple[str, str], ...] = Field(default=(), description="生成版本校验器的 (路径参数, 资源名)")
+    store: bool = Field(default=True, description="是否缓存响应体")
+
+    @field_validator("ttl")
+    @classmethod
+    def validate_ttl(cls, v: int) -> int:
+        """验证 TTL"""
+        if v <= 0:
+            raise ValueError("TTL 必须为正整数")
+        return v
+
+    @field_validator("stale_while_revalidate")
+    @classmethod
+    def validate_swr(cls, v: int) -> int:
+        """验证 SWR 窗口"""
+        if v < 0:
+            raise ValueError("SWR 窗口不能为负数")
+        return v
+
+    @field_validator("vary_by")
+    @classmethod
+    def validate_vary_by(cls, v: tuple[str, ...]) -> tuple[str, ...]:
+        """验证 vary_by 取值"""
+        for item in v:
+            if item in _VARY_KEYWORDS:
+                continue
+            if item.startswith("header:") and item[len("header:") :].strip():
+                continue
+            raise ValueError(f"不支持的 vary_by 取值: {item}")
+        return v
+
+    @property
+    def is_per_user(self) -> bool:
+        """是否按用户区分（需要有效令牌才可缓存）"""
+        return "user" in self.vary_by or "role" in self.vary_by
+
+    @property
+    def storage_ttl(self) -> int:
+        """写入缓存后端的 TTL（新鲜期 + SWR 窗口）"""
+        return self.ttl + self.stale_while_revalidate
+
+
+def cache_policy(
+    ttl: int = 300,
+    vary_by: list[str] | None = None,
+    tags: list[str] | None = None,
+    stale_while_revalidate: int = 0,
+    must_exist: dict[str, str] | None = None,
+    versioned: dict[str, str] | None = None,
+    store: bool = True,
+) -> Callable:
+    """为路由端点声明缓存策略
+
+    装饰器只在端点函数上附加策略，不改变函数本身，需放在 @router.get 之下。
+
+    Args:
+        ttl: 新鲜期（秒）
+        vary_by: 缓存键区分维度（user / role / header:<name>）
+        tags: 缓存标签模板，可引用路径参数与 {user}
+        stale_while_revalidate: SWR 窗口（秒）
+        must_exist: 路径参数 -> 资源名（knowledge / persona / user），一定不存在的 ID 不查缓存
+        versioned: 路径参数 -> 资源名，按实体版本生成 ETag / Last-Modified 并直接应答条件请求
+        store: 是否缓存响应体，False 时只应答条件请求
+
+    Returns:
+        装饰器函数
+
+    Example:
+        @router.get("/{kb_id}")
+        @cache_policy(ttl=300, tags=["knowledge:{kb_id}"])
+        async def get_knowledge_base(kb_id: str): ...
+    """
+    policy = CachePolicy(
+        ttl=ttl,
+        vary_by=tuple(vary_by or ()),
+        tags=tuple(tags or ()),
+        stale_while_revalidate=stale_while_revalidate,
+        must_exist=tuple((must_exist or {}).items()),
+        versioned=tuple((versioned or {}).items()),
+        store=store,
+    )
+
+    def decorator(func: Callable) -> Callable:
+        setattr(func, POLICY_ATTR, policy)
+        return func
+
+    return decorator
+
+
+class PolicyMatch:
+    """策略匹配结果"""
+
+    __slots__ = ("policy", "path_params", "route_path")
+
+    def __init__(self, policy: CachePolicy, path_params: dict[str, str], route_path: str):
+        self.policy = policy
+        self.path_params = path_params
+        self.route_path = route_path
+
+
+class CachePolicyRegistry:
+    """缓存策略注册表
+
+    按应用的路由注册顺序保存 (路径模板, 策略)，匹配时与 Starlette 路由规则保持一致：
+    第一个匹配的路由生效，未声明策略的路由返回 None（不缓存）。
+    """
+
+    def __init__(self):
+        self._routes: list[tuple[re.Pattern, str, CachePolicy | None]] = []
+        self._loaded = False
+
+    @property
+    def loaded(self) -> bool:
+        """是否已从应用加载路由"""
+        return self._loaded
+
+    def register(self, path: str, policy: CachePolicy | None) -> None:
+        """注册单个 GET 路由的策略
+
+        Args:
+            path: 路由路径模板（含前缀），如 "/api/knowledge/{kb_id}"
+            policy: 缓存策略，None 表示该路由不缓存
+        """
+        path_regex, _, _ = compile_path(path)
+        self._routes.append((path_regex, path, policy))
+        self._loaded = True
+
+    def load_from_app(self, app: Any) -> int:
+        """扫描应用路由，加载端点上声明的缓存策略
+
+        Args:
+            app: FastAPI 应用实例
+
+        Returns:
+            int: 声明了缓存策略的路由数量
+        """
+        self._routes.clear()
+        count = 0
+        for route in getattr(app, "routes", []):
+            methods = getattr(route, "methods", None) or set()
+            if "GET" not in methods:
+                continue
+            policy = getattr(getattr(route, "endpoint", None), POLICY_ATTR, None)
+            self.register(route.path, policy)
+            if policy is not None:
+                count += 1
+
+        self._loaded = True
+        logger.info(f"缓存策略注册表已加载: {count} 个路由声明了缓存策略")
+        return count
+
+    def match(self, path: str) -> PolicyMatch | None:
+        """查找请求路径对应的缓存策略
+
+        Args:
+            path: 请求路径
+
+        Returns:
+            PolicyMatch: 匹配结果，未匹配或路由未声明策略时返回 None
+        """
+        for path_regex, route_path, policy in self._routes:
+            matched = path_regex.match(path)
+            if matched is None:
+                continue
+            if policy is None:
+                return None
+            return PolicyMatch(policy, matched.groupdict(), route_path)
+        return None
+
+    def clear(self) -> None:
+        """清空注册表"""
+        self._routes.clear()
+        self._loaded = False
+
+
+def resolve_identity(headers: Headers) -> dict[str, str] | None:
+    """从 Authorization 头解析调用方身份
+
+    只做令牌签名与过期校验，不访问数据库。
+
+    Args:
+        headers: 请求头
+
+    Returns:
+        dict: 包含 user 与 role 的字典，令牌缺失或无效时返回 None
+    """
+    authorization = headers.get("Authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+
+    from app.core.security import verify_token
+
+    payload = verify_token(token.strip())
+    if not payload or payload.get("type", "access") != "access" or not payload.get("sub"):
+        return None
+
+    return {"user": str(payload["sub"]), "role": str(payload.get("role", "user"))}
+
+
+def build_vary_parts(policy: CachePolicy, headers: Headers, identity: dict[str, str] | None) -> list[str]:
+    """根据策略构建缓存键的区分部分
+
+    Args:
+        policy: 缓存策略
+        headers: 请求头
+        identity: 调用方身份（resolve_identity 的结果）
+
+    Returns:
+        list[str]: 区分片段列表
+    """
+    parts = []
+    for item in policy.vary_by:
+        if item == "user":
+            parts.append(f"u={identity['user'] if identity else ''}")
+        elif item == "role":
+            parts.append(f"r={identity['role'] if identity else ''}")
+        else:
+            header_name = item[len("header:") :].strip()
+            parts.append(f"h:{header_name.lower()}={headers.get(header_name, '')}")
+    return parts
+
+
+def render_tags(policy: CachePolicy, path_params: dict[str, str], identity: dict[str, str] | None) -> list[str]:
+    """渲染策略中的标签模板
+
+    无法渲染的标签（引用了不存在的参数）会被跳过并记录日志。
+
+    Args:
+        policy: 缓存策略
+        path_params: 路径参数
+        identity: 调用方身份
+
+    Returns:
+        list[str]: 渲染后的标签列表
+    """
+    values = dict(path_params)
+    if identity:
+        values.setdefault("user", identity["user"])
+
+    tags = []
+    for template in policy.tags:
+        try:
+            tags.append(template.format(**values))
+        except (KeyError, IndexError) as e:
+            logger.warning(f"缓存标签渲染失败 (template={template}): {e}")
+    return tags
+
+
+def tag_key_pattern(key_prefix: str, tag: str) -> str:
+    """构建按标签匹配 HTTP 缓存键的模式
+
+    HTTP 缓存键格式为 "{prefix}:http:{hash}#tag1#tag2#"，标签以 # 分隔，
+    因此可以使用 SCAN 模式 "*#tag#*" 精确匹配某个标签。
+    标签来自路径参数，其中的 *、?、[ 和反斜杠会被转义，不会匹配到其他条目的缓存键。
+
+    Args:
+        key_prefix: 缓存键前缀
+        tag: 标签
+
+    Returns:
+        str: 键模式
+    """
+    return f"{key_prefix}:http:*#{tag.translate(_GLOB_ESCAPES)}#*"
+
+
+# 全局策略注册表
+_global_registry = CachePolicyRegistry()
+
+
+def get_cache_policy_registry() -> CachePolicyRegistry:
+    """获取全局缓存策略注册表
+
+    Returns:
+        CachePolicyRegistry: 注册表实例
+    """
+    return _global_registry
@@ -2,10 +2,17 @@
 Redis 客户端封装
 
 提供统一的 Redis 连接管理和基础操作接口，支持异步操作和自动重连。
+所有发往 Redis 的操作经过熔断器（circuit_breaker.py）：Redis 不可用时直接抛出 CircuitOpenError，
+不再等待 socket 超时。
 """
 
 import logging
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+from functools import wraps
+from typing import TypeVar, cast
 
+import redis
 from redis import asyncio as aioredis
 from redis.exceptions import (
     AuthenticationError,
@@ -18,10 +25,61 @@ from redis.exceptions import (
     TimeoutError as RedisTimeoutError,
 )
 
+from app.core.cache.backend import CacheBackend
+from app.core.cache.circuit_breaker import CircuitBreaker, CircuitOpenError
+
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+
+def _circuit_guarded(func: Callable) -> Callable:
+    """经熔断器执行异步 Redis 操作
+
+    熔断器拒绝时直接抛出 CircuitOpenError（不进入被装饰的方法，不记录错误日志）；
+    连接错误和超时计为失败，正常返回或其他 Redis 错误计为成功。
+    """
+
+    @wraps(func)
+    async def wrapper(self: "RedisClient", *args, **kwargs):
+        breaker = self.circuit_breaker
+        breaker.before_call()
+        try:
+            result = await func(self, *args, **kwargs)
+        except (RedisConnectionError, RedisTimeoutError):
+            breaker.record_failure()
+            raise
+        except RedisError:
+            breaker.record_success()
+            raise
+        breaker.record_success()
+        return result
+
+    return wrapper
+
+
+def _circuit_guarded_sync(func: Callable) -> Callable:
+    """经熔断器执行同步 Redis 操作，行为与 _circuit_guarded 一致"""
+
+    @wraps(func)
+    def wrapper(self: "RedisClient", *args, **kwargs):
+        breaker = self.circuit_breaker
+        breaker.before_call()
+        try:
+            result = func(self, *args, **kwargs)
+        except (RedisConnectionError, RedisTimeoutError):
+            breaker.record_failure()
+            raise
+        except RedisError:
+            breaker.record_success()
+            raise
+        breaker.record_success()
+        return result
+
+    return wrapper
 
-class RedisClient:
+
+class RedisClient(CacheBackend):
     """Redis 客户端封装类
 
     提供异步 Redis 操作接口，支持连接池管理、健康检查和自动重连。
@@ -38,6 +96,7 @@ class RedisClient:
         socket_connect_timeout: int = 5,
         retry_on_timeout: bool = True,
         decode_responses: bool = True,
+        circuit_breaker: CircuitBreaker | None = None,
     ):
         """初始化 Redis 客户端
 
@@ -51,6 +110,7 @@ class RedisClient:
             socket_connect_timeout: 连接超时时间（秒）
             retry_on_timeout: 超时时是否重试
             decode_responses: 是否自动解码响应为字符串
+            circuit_breaker: 熔断器（可选，默认使用默认参数创建）
         """
         self.host = host
         self.port = port
@@ -61,10 +121,12 @@ class RedisClient:
         self.socket_connect_timeout = socket_connect_timeout
         self.retry_on_timeout = retry_on_timeout
         self.decode_responses = decode_responses
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
 
         self._client: aioredis.Redis | None = None
         self._connection_pool: aioredis.ConnectionPool | None = None
         self._is_connected = False
+        self._sync_client: redis.Redis | None = None
 
         logger.info(f"Redis 客户端初始化: {host}:{port}, db={db}, " f"max_connections={max_connections}")
 
@@ -116,6 +178,7 @@ class RedisClient:
             self._is_connected = False
             raise RedisConnectionError(f"Redis 连接失败: {e}") from e
 
+    @_circuit_guarded
     async def get(self, key: str) -> str | None:
         """获取缓存值
 
@@ -141,6 +204,7 @@ class RedisClient:
             logger.error(f"Redis GET 操作异常 (key={key}): {e}")
             raise RedisError(f"GET 操作失败: {e}") from e
 
+    @_circuit_guarded
     async def set(self, key: str, value: str, ttl: int | None = None) -> bool:
         """设置缓存值
 
@@ -173,6 +237,40 @@ class RedisClient:
             logger.error(f"Redis SET 操作异常 (key={key}): {e}")
             raise RedisError(f"SET 操作失败: {e}") from e
 
+    @_circuit_guarded
+    async def get_or_set(self, key: str, value: str, ttl: int | None = None) -> str:
+        """键不存在时写入 value，返回键的当前值
+
+        使用 SET NX 写入，键已存在时再读取一次当前值。
+
+        Args:
+            key: 缓存键
+            value: 键不存在时写入的值
+            ttl: 过期时间（秒），None 表示永不过期
+
+        Returns:
+            键的当前值
+
+        Raises:
+            ConnectionError: 连接失败
+            TimeoutError: 操作超时
+        """
+        try:
+            await self._ensure_connection()
+            if await self._client.set(key, value, ex=ttl, nx=True):
+                return value
+            current = await self._client.get(key)
+            # 键在两次操作之间过期时返回本次的值（未写入，下次请求重新写入）
+            return current if current is not None else value
+        except (RedisConnectionError, RedisTimeoutError) as e:
+            logger.error(f"Redis SET NX 操作失败 (key={key}): {e}")
+            self._is_connected = False
+            raise
+        except Exception as e:
+            logger.error(f"Redis SET NX 操作异常 (key={key}): {e}")
+            raise RedisError(f"SET NX 操作失败: {e}") from e
+
+    @_circuit_guarded
     async def delete(self, key: str) -> bool:
         """删除缓存键
 
@@ -198,6 +296,7 @@ class RedisClient:
             logger.error(f"Redis DELETE 操作异常 (key={key}): {e}")
             raise RedisError(f"DELETE 操作失败: {e}") from e
 
+    @_circuit_guarded
     async def exists(self, key: str) -> bool:
         """检查键是否存在
 
@@ -223,6 +322,7 @@ class RedisClient:
             logger.error(f"Redis EXISTS 操作异常 (key={key}): {e}")
             raise RedisError(f"EXISTS 操作失败: {e}") from e
 
+    @_circuit_guarded
     async def expire(self, key: str, ttl: int) -> bool:
         """设置键的过期时间
 
@@ -249,6 +349,7 @@ class RedisClient:
             logger.error(f"Redis EXPIRE 操作异常 (key={key}): {e}")
             raise RedisError(f"EXPIRE 操作失败: {e}") from e
 
+    @_circuit_guarded
     async def delete_pattern(self, pattern: str) -> int:
         """批量删除匹配模式的键
 
@@ -294,6 +395,297 @@ class RedisClient:
             logger.error(f"Redis DELETE_PATTERN 操作异常 (pattern={pattern}): {e}")
             raise RedisError(f"DELETE_PATTERN 操作失败: {e}") from e
 
+    @_circuit_guarded
+    async def mget(self, keys: list[str]) -> list[str | None]:
+        """批量获取缓存值（单次往返）
+
+        Args:
+            keys: 缓存键列表
+
+        Returns:
+            与 keys 顺序一致的值列表，不存在的键对应 None
+
+        Raises:
+            ConnectionError: 连接失败
+            TimeoutError: 操作超时
+        """
+        if not keys:
+            return []
+
+        try:
+            await self._ensure_connection()
+            return list(await self._client.mget(keys))
+        except (RedisConnectionError, RedisTimeoutError) as e:
+            logger.error(f"Redis MGET 操作失败 (count={len(keys)}): {e}")
+            self._is_connected = False
+            raise
+        except Exception as e:
+            logger.error(f"Redis MGET 操作异常 (count={len(keys)}): {e}")
+            raise RedisError(f"MGET 操作失败: {e}") from e
+
+    async def mset_with_ttl(self, mapping: dict[str, str], ttl: int | None = None) -> bool:
+        """批量设置缓存值并统一设置过期时间
+
+        Redis 的 MSET 不支持过期时间，这里通过非事务管道批量发送 SETEX，单次往返完成。
+
+        Args:
+            mapping: 键值映射
+            ttl: 过期时间（秒），None 表示永不过期
+
+        Returns:
+            是否全部设置成功
+
+        Raises:
+            ConnectionError: 连接失败
+            TimeoutError: 操作超时
+        """
+        if not mapping:
+            return True
+
+        try:
+            async with self.pipeline() as pipe:
+                for key, value in mapping.items():
+                    if ttl is not None:
+                        pipe.setex(key, ttl, value)
+                    else:
+                        pipe.set(key, value)
+                results = await pipe.execute()
+            return all(bool(result) for result in results)
+        except CircuitOpenError:
+            raise
+        except (RedisConnectionError, RedisTimeoutError) as e:
+            logger.error(f"Redis MSET 操作失败 (count={len(mapping)}): {e}")
+            raise
+        except Exception as e:
+            logger.error(f"Redis MSET 操作异常 (count={len(mapping)}): {e}")
+            raise RedisError(f"MSET 操作失败: {e}") from e
+
+    @_circuit_guarded
+    async def delete_many(self, keys: list[str]) -> int:
+        """批量删除缓存键（单次往返）
+
+        Args:
+            keys: 缓存键列表
+
+        Returns:
+            实际删除的键数量
+
+        Raises:
+            ConnectionError: 连接失败
+            TimeoutError: 操作超时
+        """
+        if not keys:
+            return 0
+
+        try:
+            await self._ensure_connection()
+            return await self._client.delete(*keys)
+        except (RedisConnectionError, RedisTimeoutError) as e:
+            logger.error(f"Redis DELETE_MANY 操作失败 (count={len(keys)}): {e}")
+            self._is_connected = False
+            raise
+        except Exception as e:
+            logger.error(f"Redis DELETE_MANY 操作异常 (count={len(keys)}): {e}")
+            raise RedisError(f"DELETE_MANY 操作失败: {e}") from e
+
+    @asynccontextmanager
+    async def pipeline(self, transaction: bool = False) -> AsyncIterator[aioredis.client.Pipeline]:
+        """获取管道上下文，批量发送命令以减少往返
+
+        调用方在上下文中排队命令并调用 execute()，退出上下文时自动重置管道。
+
+        Args:
+            transaction: 是否使用 MULTI/EXEC 事务包裹
+
+        Yields:
+            Pipeline: Redis 管道对象
+
+        Raises:
+            ConnectionError: 连接失败（熔断器打开时为 CircuitOpenError）
+            TimeoutError: 操作超时
+
+        Example:
+            async with redis_client.pipeline() as pipe:
+                pipe.get("a")
+                pipe.incr("b")
+                results = await pipe.execute()
+        """
+        breaker = self.circuit_breaker
+        breaker.before_call()
+        try:
+            await self._ensure_connection()
+            async with self._client.pipeline(transaction=transaction) as pipe:
+                yield pipe
+        except (RedisConnectionError, RedisTimeoutError):
+            self._is_connected = False
+            breaker.record_failure()
+            raise
+        breaker.record_success()
+
+    @_circuit_guarded
+    async def publish(self, channel: str, message: str) -> int:
+        """向频道发布消息
+
+        Args:
+            channel: 频道名
+            message: 消息内容
+
+        Returns:
+            收到消息的订阅者数量
+
+        Raises:
+            ConnectionError: 连接失败
+            TimeoutError: 操作超时
+        """
+        try:
+            await self._ensure_connection()
+            return await self._client.publish(channel, message)
+        except (RedisConnectionError, RedisTimeoutError) as e:
+            logger.error(f"Redis PUBLISH 操作失败 (channel={channel}): {e}")
+            self._is_connected = False
+            raise
+        except Exception as e:
+            logger.error(f"Redis PUBLISH 操作异常 (channel={channel}): {e}")
+            raise RedisError(f"PUBLISH 操作失败: {e}") from e
+
+    async def pubsub(self) -> aioredis.client.PubSub:
+        """创建发布/订阅对象
+
+        PubSub 占用连接池中的一个独立连接，调用方使用完毕后需调用 aclose()。
+
+        Returns:
+            PubSub: Redis 发布/订阅对象
+
+        Raises:
+            ConnectionError: 连接失败
+        """
+        await self._ensure_connection()
+        return self._client.pubsub()
+
+    def get_sync_client(self) -> redis.Redis:
+        """获取阻塞式 Redis 客户端
+
+        供同步代码（同步服务方法）使用，与异步客户端使用相同的连接参数但独立的连接池。
+        redis.Redis 是线程安全的，可在线程池中共享。
+
+        Returns:
+            redis.Redis: 阻塞式 Redis 客户端
+        """
+        if self._sync_client is None:
+            self._sync_client = redis.Redis(
+                host=self.host,
+                port=self.port,
+                db=self.db,
+                password=self.password,
+                max_connections=self.max_connections,
+                socket_timeout=self.socket_timeout,
+                socket_connect_timeout=self.socket_connect_timeout,
+                retry_on_timeout=self.retry_on_timeout,
+                decode_responses=self.decode_responses,
+            )
+        return self._sync_client
+
+    @_circuit_guarded_sync
+    def call_sync(self, operation: Callable[[redis.Redis], T]) -> T:
+        """经熔断器在阻塞式客户端上执行操作
+
+        同步缓存路径（CacheManager 的 *_sync 方法）通过该方法访问 Redis，熔断器打开时立即失败。
+
+        Args:
+            operation: 接收 redis.Redis 并执行命令的函数
+
+        Returns:
+            operation 的返回值
+
+        Raises:
+            ConnectionError: 连接失败（熔断器打开时为 CircuitOpenError）
+            TimeoutError: 操作超时
+        """
+        return operation(self.get_sync_client())
+
+    def set_sync(self, key: str, value: str, ttl: int | None = None) -> bool:
+        """设置缓存值（同步）
+
+        Args:
+            key: 缓存键
+            value: 缓存值
+            ttl: 过期时间（秒），None 表示永不过期
+
+        Returns:
+            是否设置成功
+        """
+        return bool(
+            self.call_sync(lambda client: client.setex(key, ttl, value) if ttl is not None else client.set(key, value))
+        )
+
+    def delete_sync(self, key: str) -> bool:
+        """删除缓存键（同步）
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            键存在且被删除返回 True
+        """
+        return bool(self.call_sync(lambda client: client.delete(key)))
+
+    def delete_pattern_sync(self, pattern: str) -> int:
+        """批量删除匹配模式的键（同步）
+
+        Args:
+            pattern: 键模式（支持 *、? 和 [...] 通配符）
+
+        Returns:
+            删除的键数量
+        """
+        return self.delete_patterns_sync([pattern])
+
+    @_circuit_guarded_sync
+    def delete_patterns_sync(self, patterns: list[str], batch_size: int = 500) -> int:
+        """批量删除多个模式匹配的键（同步）
+
+        每个模式通过 SCAN 收集匹配的键（不含通配符的模式直接作为键），
+        去重后按 batch_size 分批 UNLINK，多个模式共用删除往返。
+
+        Args:
+            patterns: 键模式列表（支持 *、? 和 [...] 通配符）
+            batch_size: 每条 UNLINK 命令携带的最大键数
+
+        Returns:
+            删除的键数量
+
+        Raises:
+            ConnectionError: 连接失败
+            TimeoutError: 操作超时
+        """
+        if not patterns:
+            return 0
+
+        try:
+            client = self.get_sync_client()
+            keys: set[str] = set()
+            for pattern in patterns:
+                if any(char in pattern for char in "*?["):
+                    keys.update(client.scan_iter(match=pattern, count=100))
+                else:
+                    keys.add(pattern)
+
+            key_list = list(keys)
+            deleted_count = 0
+            for start in range(0, len(key_list), batch_size):
+                # 阻塞式客户端返回 int（类型标注为同步 / 异步客户端共用的 ResponseT）
+                deleted_count += cast(int, client.unlink(*key_list[start : start + batch_size]))
+
+            logger.info(f"批量删除缓存: patterns={len(patterns)}, count={deleted_count}")
+            return deleted_count
+
+        except (RedisConnectionError, RedisTimeoutError) as e:
+            logger.error(f"Redis DELETE_PATTERNS 操作失败 (patterns={patterns}): {e}")
+            raise
+        except Exception as e:
+            logger.error(f"Redis DELETE_PATTERNS 操作异常 (patterns={patterns}): {e}")
+            raise RedisError(f"DELETE_PATTERNS 操作失败: {e}") from e
+
     async def ping(self) -> bool:
         """健康检查
 
@@ -301,14 +693,17 @@ class RedisClient:
             连接是否正常
         """
         try:
-            await self._ensure_connection()
-            result = await self._client.ping()
-            return result is True
+            return await self._ping()
         except Exception as e:
             logger.warning(f"Redis PING 失败: {e}")
             self._is_connected = False
             return False
 
+    @_circuit_guarded
+    async def _ping(self) -> bool:
+        await self._ensure_connection()
+        return await self._client.ping() is True
+
     async def close(self) -> None:
         """关闭连接
 
@@ -332,6 +727,14 @@ class RedisClient:
             finally:
                 self._connection_pool = None
 
+        if self._sync_client is not None:
+            try:
+                self._sync_client.close()
+            except Exception as e:
+                logger.error(f"关闭阻塞式 Redis 客户端时出错: {e}")
+            finally:
+                self._sync_client = None
+
     def __del__(self):
         """析构函数，确保连接被关闭"""
         if self._client is not None or self._connection_pool is not None:
@@ -0,0 +1,339 @@
+"""
+收藏集合缓存
+
+列表页对每张卡片单独调用 "是否已 Star" 接口，每次都查询一次 StarRecord。
+StarredSetCache 按用户和目标类型缓存完整的已收藏 ID 集合，批量检查只需一次往返：
+- Redis 后端：集合键 "{prefix}:starred:{type}:{user_id}"，用 SMISMEMBER 一次检查全部 ID；
+  集合中的空字符串成员表示已从数据库完整加载（区分 "没有收藏" 和 "未加载"）
+- 内存后端：进程内按用户保存集合，超过 max_users 时淘汰最久未使用的用户；
+  修改经失效事件总线（attach_bus）通知其他 worker 删除各自的集合，总线重连后清空全部集合
+- 未加载时由 loader(None) 按 (user_id, target_type) 查询全部收藏并写入集合
+- 收藏和取消收藏提交后由服务层调用 add / discard 原地更新集合；未加载的集合不会因此被标记为已加载
+- 缓存禁用或 Redis 不可用时降级为 loader(target_ids)，即一次带 IN 条件的查询
+
+加载与并发的收藏交错时，集合可能缺少这次修改，最长保留 ttl 秒。
+"""
+
+import fnmatch
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Iterable
+from typing import Any
+
+from app.core.cache.memory_backend import MemoryCacheBackend
+
+logger = logging.getLogger(__name__)
+
+# 默认的集合过期时间（秒）
+DEFAULT_STARRED_TTL = 3600
+
+# 内存后端最多保存的用户集合数
+DEFAULT_MAX_USERS = 10000
+
+# 批量检查一次最多的目标 ID 数
+MAX_BATCH_IDS = 100
+
+# 表示集合已完整加载的成员
+LOADED_MARKER = ""
+
+
+def starred_key(key_prefix: str, target_type: str, user_id: str) -> str:
+    """构建收藏集合键
+
+    Args:
+        key_prefix: 全局缓存键前缀
+        target_type: 收藏目标类型（knowledge, persona）
+        user_id: 用户 ID
+
+    Returns:
+        str: 缓存键
+    """
+    return f"{key_prefix}:starred:{target_type}:{user_id}"
+
+
+class StarredSetCache:
+    """按用户缓存已收藏目标 ID 集合"""
+
+    def __init__(
+        self,
+        cache_manager=None,
+        ttl: int = DEFAULT_STARRED_TTL,
+        max_users: int = DEFAULT_MAX_USERS,
+        enabled: bool = True,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """初始化收藏集合缓存
+
+        Args:
+            cache_manager: 缓存管理器（可选，默认使用全局实例）
+            ttl: 集合过期时间（秒）
+            max_users: 内存后端最多保存的用户集合数
+            enabled: 是否启用（禁用时每次调用 loader 查询请求的 ID）
+            clock: 单调时钟（测试时可替换）
+        """
+        self.ttl = ttl
+        self.max_users = max(1, max_users)
+        self.enabled = enabled
+
+        self._cache_manager = cache_manager
+        self._clock = clock
+        self._lock = threading.Lock()
+        # (target_type, user_id) -> (已收藏 ID 集合, 过期时间)
+        self._local: OrderedDict[tuple[str, str], tuple[set[str], float]] = OrderedDict()
+        self._bus = None
+
+    @property
+    def cache_manager(self):
+        """缓存管理器"""
+        if self._cache_manager is None:
+            from app.core.cache.factory import get_cache_manager
+
+            return get_cache_manager()
+        return self._cache_manager
+
+    def _uses_local(self, cache_manager) -> bool:
+        return isinstance(cache_manager.redis_client, MemoryCacheBackend)
+
+    def attach_bus(self, bus) -> None:
+        """订阅失效事件总线
+
+        使用内存后端时，本进程的收藏修改经总线广播，其他 worker 收到后删除各自的集合。
+
+        Args:
+            bus: 失效事件总线
+        """
+        from app.core.cache.bus import EVENT_BUS_RECONNECTED, EVENT_CACHE_INVALIDATE
+
+        self._bus = bus
+        bus.subscribe(EVENT_CACHE_INVALIDATE, self.handle_cache_invalidate)
+        bus.subscribe(EVENT_BUS_RECONNECTED, self.handle_bus_reconnected)
+
+    def handle_cache_invalidate(self, event: dict[str, Any]) -> None:
+        """处理其他 worker 广播的缓存失效事件：删除匹配的进程内集合"""
+        if self._bus is not None and event.get("origin") == self._bus.worker_id:
+            return
+
+        key_prefix = self.cache_manager.key_prefix
+        set_prefix = f"{key_prefix}:starred:"
+        with self._lock:
+            for pattern in event.get("data", {}).get("patterns", []):
+                # 只有前缀可能匹配收藏集合键的模式才需要处理；不含通配符的模式直接定位集合
+                literal = re.split(r"[*?\[]", pattern, maxsplit=1)[0]
+                if not (literal.startswith(set_prefix) or set_prefix.startswith(literal)):
+                    continue
+                if literal == pattern:
+                    target_type, _, user_id = pattern[len(set_prefix) :].partition(":")
+                    self._local.pop((target_type, user_id), None)
+                    continue
+                for target_type, user_id in list(self._local):
+                    if fnmatch.fnmatchcase(starred_key(key_prefix, target_type, user_id), pattern):
+                        del self._local[(target_type, user_id)]
+
+    def handle_bus_reconnected(self, event: dict[str, Any]) -> None:
+        """总线重连期间可能丢失了其他 worker 的修改，清空全部进程内集合"""
+        with self._lock:
+            self._local.clear()
+
+    def _publish_local_change(self, key: str) -> None:
+        """通知其他 worker 删除该集合"""
+        if self._bus is None:
+            return
+        try:
+            self._bus.publish_cache_invalidation([key])
+        except Exception as e:
+            logger.warning(f"发布收藏集合失效事件失败 (key={key}): {e}")
+
+    def get_starred(
+        self,
+        user_id: str,
+        target_type: str,
+        target_ids: list[str],
+        loader: Callable[[list[str] | None], Iterable[str]],
+    ) -> set[str]:
+        """返回 target_ids 中已被用户收藏的 ID
+
+        Args:
+            user_id: 用户 ID
+            target_type: 收藏目标类型
+            target_ids: 要检查的目标 ID
+            loader: 查询数据库的函数，参数为 None 时返回用户该类型的全部收藏 ID，
+                否则只返回参数中已收藏的 ID
+
+        Returns:
+            set[str]: 已收藏的目标 ID
+        """
+        target_ids = [target_id for target_id in dict.fromkeys(target_ids) if target_id]
+        if not target_ids or not user_id:
+            return set()
+
+        cache_manager = self.cache_manager
+        if not self.enabled or not cache_manager.is_enabled():
+            return set(loader(target_ids))
+
+        if self._uses_local(cache_manager):
+            starred = self._get_local(target_type, user_id)
+            if starred is None:
+                starred = set(loader(None))
+                self._set_local(target_type, user_id, starred)
+            return starred.intersection(target_ids)
+
+        key = starred_key(cache_manager.key_prefix, target_type, user_id)
+        try:
+            flags = cache_manager.redis_client.call_sync(
+                lambda client: client.smismember(key, [LOADED_MARKER, *target_ids])
+            )
+        except Exception as e:
+            logger.warning(f"读取收藏集合失败，降级到数据库 (key={key}): {e}")
+            return set(loader(target_ids))
+
+        if flags and flags[0]:
+            return {target_id for target_id, flag in zip(target_ids, flags[1:], strict=True) if flag}
+
+        starred = set(loader(None))
+        self._store_remote(cache_manager, key, starred)
+        return starred.intersection(target_ids)
+
+    def _store_remote(self, cache_manager, key: str, starred: set[str]) -> None:
+        """把完整加载的集合写入 Redis（覆盖未加载状态下 add / discard 留下的部分集合）"""
+
+        def replace(client) -> None:
+            pipe = client.pipeline(transaction=True)
+            pipe.delete(key)
+            pipe.sadd(key, LOADED_MARKER, *starred)
+            pipe.expire(key, self.ttl)
+            pipe.execute()
+
+        try:
+            cache_manager.redis_client.call_sync(replace)
+        except Exception as e:
+            logger.warning(f"写入收藏集合失败 (key={key}): {e}")
+
+    def _get_local(self, target_type: str, user_id: str) -> set[str] | None:
+        with self._lock:
+            entry = self._local.get((target_type, user_id))
+            if entry is None:
+                return None
+            starred, expires_at = entry
+            if self._clock() >= expires_at:
+                del self._local[(target_type, user_id)]
+                return None
+            self._local.move_to_end((target_type, user_id))
+            return set(starred)
+
+    def _set_local(self, target_type: str, user_id: str, starred: set[str]) -> None:
+        with self._lock:
+            self._local[(target_type, user_id)] = (set(starred), self._clock() + self.ttl)
+            self._local.move_to_end((target_type, user_id))
+            while len(self._local) > self.max_users:
+                self._local.popitem(last=False)
+
+    def add(self, user_id: str, target_type: str, target_id: str) -> None:
+        """收藏提交后把目标加入已加载的集合
+
+        Args:
+            user_id: 用户 ID
+            target_type: 收藏目标类型
+            target_id: 目标 ID
+        """
+        self._update(user_id, target_type, target_id, added=True)
+
+    def discard(self, user_id: str, target_type: str, target_id: str) -> None:
+        """取消收藏提交后把目标移出已加载的集合
+
+        Args:
+            user_id: 用户 ID
+            target_type: 收藏目标类型
+            target_id: 目标 ID
+        """
+        self._update(user_id, target_type, target_id, added=False)
+
+    def _update(self, user_id: str, target_type: str, target_id: str, added: bool) -> None:
+        cache_manager = self.cache_manager
+        if not self.enabled or not cache_manager.is_enabled() or not user_id or not target_id:
+            return
+
+        key = starred_key(cache_manager.key_prefix, target_type, user_id)
+        if self._uses_local(cache_manager):
+            with self._lock:
+                entry = self._local.get((target_type, user_id))
+                if entry is not None:
+                    if added:
+                        entry[0].add(target_id)
+                    else:
+                        entry[0].discard(target_id)
+            self._publish_local_change(key)
+            return
+
+        def update(client) -> None:
+            pipe = client.pipeline(transaction=True)
+            if added:
+                # 集合不存在时 SADD 创建的集合没有加载标记，下次读取仍会完整加载
+                pipe.sadd(key, target_id)
+            else:
+                pipe.srem(key, target_id)
+            pipe.expire(key, self.ttl)
+            pipe.execute()
+
+        try:
+            cache_manager.redis_client.call_sync(update)
+        except Exception as e:
+            # 更新失败时删除集合，避免保留修改前的状态；删除也失败时由 ttl 兜底
+            logger.warning(f"更新收藏集合失败，尝试删除 (key={key}): {e}")
+            self.invalidate(user_id, target_type)
+
+    def invalidate(self, user_id: str, target_type: str) -> None:
+        """删除用户的收藏集合，下次读取时重新加载
+
+        Args:
+            user_id: 用户 ID
+            target_type: 收藏目标类型
+        """
+        cache_manager = self.cache_manager
+        if not cache_manager.is_enabled():
+            return
+        key = starred_key(cache_manager.key_prefix, target_type, user_id)
+        if self._uses_local(cache_manager):
+            with self._lock:
+                self._local.pop((target_type, user_id), None)
+            self._publish_local_change(key)
+            return
+        try:
+            cache_manager.invalidate_sync(key)
+        except Exception as e:
+            logger.warning(f"删除收藏集合失败 ({target_type}:{user_id}): {e}")
+
+
+# 全局收藏集合缓存实例（延迟初始化）
+_global_starred_cache: StarredSetCache | None = None
+
+
+def get_starred_cache() -> StarredSetCache:
+    """获取全局收藏集合缓存实例
+
+    Returns:
+        StarredSetCache 实例
+    """
+    global _global_starred_cache
+
+    if _global_starred_cache is None:
+        from app.core.config import settings
+
+        _global_starred_cache = StarredSetCache(
+            ttl=settings.CACHE_STARRED_TTL,
+            max_users=settings.CACHE_STARRED_MAX_USERS,
+            enabled=settings.CACHE_STARRED_ENABLED,
+        )
+
+    return _global_starred_cache
+
+
+def reset_starred_cache() -> None:
+    """重置全局收藏集合缓存
+
+    用于测试或重新加载配置时重置收藏集合缓存。
+    """
+    global _global_starred_cache
+    _global_starred_cache = None
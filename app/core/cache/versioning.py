@@ -0,0 +1,144 @@
+"""
+实体版本校验器
+
+为实体详情端点（知识库、人设卡、用户头像）生成基于版本的 ETag / Last-Modified，
+条件请求（If-None-Match / If-Modified-Since）只需读取一个很小的版本键即可返回 304，
+不执行端点、不查询数据库。
+
+版本键格式为 "{prefix}:ver:{resource}:{id}"，值为 "{随机令牌}:{创建时间戳}"：
+- 键不存在时由首个请求原子创建（在执行端点之前），随后的响应都带该版本的校验器
+- 实体写入后随业务失效函数一起删除，下一个请求创建新令牌，旧 ETag 不再匹配
+- 版本在执行端点之前读取，写入与读取交错时旧数据只会带上旧版本，不会带上新版本
+"""
+
+import hashlib
+import logging
+import time
+import uuid
+from email.utils import formatdate, parsedate_to_datetime
+
+from starlette.datastructures import Headers
+
+logger = logging.getLogger(__name__)
+
+# 版本键的过期时间（秒），过期后下一个请求创建新版本，客户端重新下载一次
+VERSION_TTL = 7 * 24 * 3600
+
+
+def version_key(key_prefix: str, resource: str, entity_id: str) -> str:
+    """构建实体版本键
+
+    Args:
+        key_prefix: 全局缓存键前缀
+        resource: 资源名（knowledge, persona, user）
+        entity_id: 实体 ID（可为 "*"，用于批量失效）
+
+    Returns:
+        str: 版本键
+    """
+    return f"{key_prefix}:ver:{resource}:{entity_id}"
+
+
+def _new_version() -> str:
+    return f"{uuid.uuid4().hex[:16]}:{int(time.time())}"
+
+
+class EntityValidators:
+    """一次请求的条件请求校验器"""
+
+    __slots__ = ("etag", "last_modified")
+
+    def __init__(self, etag: str, last_modified: int):
+        """初始化
+
+        Args:
+            etag: 弱 ETag（W/"..."）
+            last_modified: 最后修改时间（Unix 秒，取各实体版本创建时间的最大值）
+        """
+        self.etag = etag
+        self.last_modified = last_modified
+
+    @property
+    def last_modified_header(self) -> str:
+        """HTTP 日期格式的 Last-Modified"""
+        return formatdate(self.last_modified, usegmt=True)
+
+    def headers(self) -> dict[str, str]:
+        """校验器响应头"""
+        return {"ETag": self.etag, "Last-Modified": self.last_modified_header}
+
+    def is_not_modified(self, headers: Headers) -> bool:
+        """判断条件请求是否可以返回 304
+
+        同时携带 If-None-Match 时忽略 If-Modified-Since（RFC 9110 13.2.2）。
+        HTTP 日期精度为 1 秒，同一秒内的多次修改只能通过 ETag 区分。
+
+        Args:
+            headers: 请求头
+
+        Returns:
+            bool: 客户端持有的表示仍是最新的
+        """
+        if_none_match = headers.get("If-None-Match")
+        if if_none_match is not None:
+            return etag_matches(if_none_match, self.etag)
+
+        if_modified_since = headers.get("If-Modified-Since")
+        if if_modified_since:
+            try:
+                return self.last_modified <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """按弱比较判断 If-None-Match 是否匹配 ETag
+
+    Args:
+        if_none_match: If-None-Match 请求头（可包含多个 ETag 或 "*"）
+        etag: 当前 ETag
+
+    Returns:
+        bool: 是否匹配
+    """
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+
+async def resolve_validators(
+    cache_manager, entities: list[tuple[str, str]], representation: str
+) -> EntityValidators | None:
+    """读取（或创建）实体版本并生成校验器
+
+    Args:
+        cache_manager: 缓存管理器
+        entities: (资源名, 实体 ID) 列表
+        representation: 区分同一实体不同表示的字符串（路径、查询参数、vary 片段）
+
+    Returns:
+        EntityValidators，缓存禁用或后端失败时返回 None（退化为正常处理请求）
+    """
+    if not entities or not cache_manager.is_enabled():
+        return None
+
+    backend = cache_manager.redis_client
+    keys = [version_key(cache_manager.key_prefix, resource, entity_id) for resource, entity_id in entities]
+    try:
+        versions = await backend.mget(keys)
+        for index, version in enumerate(versions):
+            if version is None:
+                versions[index] = await backend.get_or_set(keys[index], _new_version(), ttl=VERSION_TTL)
+    except Exception as e:
+        logger.warning(f"读取实体版本失败，跳过条件请求校验 (keys={keys}): {e}")
+        return None
+
+    last_modified = 0
+    for version in versions:
+        _, _, created_at = version.partition(":")
+        last_modified = max(last_modified, int(created_at) if created_at.isdigit() else int(time.time()))
+
+    digest = hashlib.md5(f"{representation}|{'|'.join(versions)}".encode()).hexdigest()[:20]
+    return EntityValidators(f'W/"{digest}"', last_modified)
@@ -0,0 +1,300 @@
+"""
+启动缓存预热
+
+应用启动（部署或 Redis 清空）后，按配置预先请求热门公开端点，使首批流量命中缓存而不是直接访问数据库：
+- 公开知识库、人设卡列表的前 N 页（每种排序方式）
+- 收藏数最高的知识库、人设卡详情
+- 翻译字典
+
+预热请求直接在进程内调用 ASGI 应用，经过 CacheMiddleware 写入与真实请求相同的缓存键。
+预热期间 /ready 返回 503，完成后返回 200；/health 不受影响。
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any
+from urllib.parse import urlencode
+
+from pydantic import BaseModel, Field, field_validator
+from starlette.types import ASGIApp, Message
+
+from app.core.cache.factory import get_cache_manager
+
+logger = logging.getLogger(__name__)
+
+# 预热状态
+STATE_PENDING = "pending"
+STATE_RUNNING = "running"
+STATE_READY = "ready"
+STATE_SKIPPED = "skipped"
+STATE_TIMEOUT = "timeout"
+STATE_FAILED = "failed"
+
+
+class CacheWarmupConfig(BaseModel):
+    """缓存预热配置"""
+
+    enabled: bool = Field(default=True, description="是否在启动时预热缓存")
+    pages: int = Field(default=2, description="每种排序方式预热的列表页数")
+    page_size: int = Field(default=20, description="列表每页数量（需与前端请求一致才能命中）")
+    sort_by: list[str] = Field(default=["created_at", "star_count"], description="预热的列表排序字段")
+    top_starred: int = Field(default=10, description="预热收藏数最高的详情页数量（知识库、人设卡各取）")
+    include_translation: bool = Field(default=True, description="是否预热翻译字典")
+    concurrency: int = Field(default=4, description="并发预热的工作协程数")
+    timeout: int = Field(default=60, description="预热总超时时间（秒），超时后直接标记就绪")
+
+    @field_validator("pages", "top_starred")
+    @classmethod
+    def validate_non_negative(cls, v: int) -> int:
+        """验证数量非负"""
+        if v < 0:
+            raise ValueError("预热数量不能为负数")
+        return v
+
+    @field_validator("page_size", "concurrency", "timeout")
+    @classmethod
+    def validate_positive(cls, v: int) -> int:
+        """验证取值为正"""
+        if v <= 0:
+            raise ValueError("取值必须大于 0")
+        return v
+
+
+def create_warmup_config_from_settings() -> CacheWarmupConfig:
+    """从应用配置创建缓存预热配置"""
+    from app.core.config import settings
+
+    return CacheWarmupConfig(
+        enabled=settings.CACHE_WARMUP_ENABLED,
+        pages=settings.CACHE_WARMUP_PAGES,
+        page_size=settings.CACHE_WARMUP_PAGE_SIZE,
+        sort_by=settings.CACHE_WARMUP_SORT_BY,
+        top_starred=settings.CACHE_WARMUP_TOP_STARRED,
+        include_translation=settings.CACHE_WARMUP_INCLUDE_TRANSLATION,
+        concurrency=settings.CACHE_WARMUP_CONCURRENCY,
+        timeout=settings.CACHE_WARMUP_TIMEOUT,
+    )
+
+
+def load_top_starred_ids(limit: int) -> dict[str, list[str]]:
+    """查询收藏数最高的公开知识库和人设卡 ID
+
+    Args:
+        limit: 每种资源的数量
+
+    Returns:
+        dict[str, list[str]]: {"knowledge": [...], "persona": [...]}
+    """
+    from app.core.database import get_db_context
+    from app.models.database import KnowledgeBase, PersonaCard
+
+    result: dict[str, list[str]] = {"knowledge": [], "persona": []}
+    if limit <= 0:
+        return result
+
+    with get_db_context() as db:
+        for resource, model in (("knowledge", KnowledgeBase), ("persona", PersonaCard)):
+            rows = (
+                db.query(model.id)
+                .filter(model.is_public.is_(True), model.is_pending.is_(False))
+                .order_by(model.star_count.desc())
+                .limit(limit)
+                .all()
+            )
+            result[resource] = [row[0] for row in rows]
+    return result
+
+
+class CacheWarmer:
+    """启动缓存预热器
+
+    由 lifespan 调用 start() 在后台执行预热，stop() 在关闭时取消未完成的预热。
+    预热失败或超时不会阻止服务，只记录日志并标记就绪。
+    """
+
+    def __init__(self, app: ASGIApp, config: CacheWarmupConfig, cache_manager=None, id_loader=None):
+        """初始化预热器
+
+        Args:
+            app: 要预热的 ASGI 应用
+            config: 预热配置
+            cache_manager: 缓存管理器（可选，默认使用全局实例）
+            id_loader: 收藏数最高资源 ID 的加载函数（可选，默认查询数据库）
+        """
+        self.app = app
+        self.config = config
+        self._cache_manager = cache_manager
+        self._id_loader = id_loader or load_top_starred_ids
+        self._task: asyncio.Task | None = None
+        self._ready = asyncio.Event()
+        self.state = STATE_PENDING
+        self.total = 0
+        self.warmed = 0
+        self.failed = 0
+        self.duration: float | None = None
+
+    @property
+    def is_ready(self) -> bool:
+        """预热是否已结束（成功、跳过、超时或失败均视为就绪）"""
+        return self._ready.is_set()
+
+    def status(self) -> dict[str, Any]:
+        """获取预热状态"""
+        return {
+            "status": "ready" if self.is_ready else "warming",
+            "warmup": {
+                "state": self.state,
+                "total": self.total,
+                "warmed": self.warmed,
+                "failed": self.failed,
+                "duration": round(self.duration, 3) if self.duration is not None else None,
+            },
+        }
+
+    def start(self) -> None:
+        """在后台启动预热"""
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """取消未完成的预热"""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def wait_ready(self) -> None:
+        """等待预热结束"""
+        await self._ready.wait()
+
+    async def run(self) -> None:
+        """执行预热并在结束后标记就绪"""
+        start_time = time.time()
+        try:
+            if not await self._should_warm():
+                self.state = STATE_SKIPPED
+                return
+
+            self.state = STATE_RUNNING
+            targets = await self.build_targets()
+            self.total = len(targets)
+            await asyncio.wait_for(self._warm_all(targets), timeout=self.config.timeout)
+            self.state = STATE_READY
+            logger.info(f"缓存预热完成: {self.warmed}/{self.total} 成功, 耗时 {time.time() - start_time:.2f}s")
+
+        except asyncio.TimeoutError:
+            self.state = STATE_TIMEOUT
+            logger.warning(f"缓存预热超时 ({self.config.timeout}s)，已预热 {self.warmed}/{self.total}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.state = STATE_FAILED
+            logger.warning(f"缓存预热失败，跳过预热: {e}")
+        finally:
+            self.duration = time.time() - start_time
+            self._ready.set()
+
+    async def _should_warm(self) -> bool:
+        """检查是否需要预热（预热禁用、缓存禁用或 Redis 不可用时跳过）"""
+        if not self.config.enabled:
+            logger.info("缓存预热已禁用")
+            return False
+
+        cache_manager = self._cache_manager or get_cache_manager()
+        if not cache_manager.is_enabled():
+            logger.info("缓存未启用，跳过缓存预热")
+            return False
+
+        if not await cache_manager.redis_client.ping():
+            logger.warning("Redis 不可用，跳过缓存预热")
+            return False
+
+        return True
+
+    async def build_targets(self) -> list[str]:
+        """构建预热请求列表（路径 + 查询字符串）"""
+        targets = []
+        for resource_path in ("/api/knowledge/public", "/api/persona/public"):
+            for sort_by in self.config.sort_by:
+                for page in range(1, self.config.pages + 1):
+                    query = {
+                        "page": page,
+                        "page_size": self.config.page_size,
+                        "sort_by": sort_by,
+                        "sort_order": "desc",
+                    }
+                    targets.append(f"{resource_path}?{urlencode(query)}")
+
+        top_ids = await asyncio.to_thread(self._id_loader, self.config.top_starred)
+        targets.extend(f"/api/knowledge/{kb_id}" for kb_id in top_ids.get("knowledge", []))
+        targets.extend(f"/api/persona/{pc_id}" for pc_id in top_ids.get("persona", []))
+
+        if self.config.include_translation:
+            targets.append("/api/dictionary/translation")
+
+        return targets
+
+    async def _warm_all(self, targets: list[str]) -> None:
+        """使用固定数量的工作协程并发预热"""
+        queue: asyncio.Queue[str] = asyncio.Queue()
+        for target in targets:
+            queue.put_nowait(target)
+
+        async def worker() -> None:
+            while True:
+                try:
+                    target = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                if await self._warm_one(target):
+                    self.warmed += 1
+                else:
+                    self.failed += 1
+
+        worker_count = min(self.config.concurrency, len(targets))
+        await asyncio.gather(*(worker() for _ in range(worker_count)))
+
+    async def _warm_one(self, target: str) -> bool:
+        """在进程内发起一次 GET 请求
+
+        Returns:
+            bool: 响应状态码是否为 2xx
+        """
+        path, _, query_string = target.partition("?")
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "root_path": "",
+            "query_string": query_string.encode(),
+            "headers": [(b"host", b"cache-warmup"), (b"user-agent", b"cache-warmup")],
+            "client": ("127.0.0.1", 0),
+            "server": ("cache-warmup", 80),
+        }
+        status_code = 0
+
+        async def receive() -> Message:
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+
+        try:
+            await self.app(scope, receive, send)
+        except Exception as e:
+            logger.debug(f"缓存预热请求失败: {target}: {e}")
+            return False
+
+        if not 200 <= status_code < 300:
+            logger.debug(f"缓存预热请求未成功: {target} (status={status_code})")
+            return False
+        return True
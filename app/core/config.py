@@ -65,6 +65,51 @@ class Settings(BaseSettings):
     # 上传配置
     MAX_FILE_SIZE_MB: int = config_manager.get_int("upload.max_file_size_mb", 100, env_var="MAX_FILE_SIZE_MB")
     UPLOAD_DIR: str = config_manager.get("upload.base_dir", "uploads", env_var="UPLOAD_DIR")
+    # 文件 I/O 线程池的工作线程数（上传、删除和打包在该线程池中执行，不占用事件循环）
+    FILE_IO_MAX_WORKERS: int = config_manager.get_int("upload.io.max_workers", 4, env_var="FILE_IO_MAX_WORKERS")
+    # 一次上传的多个文件同时接收、计算哈希和写入的文件数
+    UPLOAD_MAX_PARALLEL_FILES: int = config_manager.get_int(
+        "upload.io.max_parallel_files", 4, env_var="UPLOAD_MAX_PARALLEL_FILES"
+    )
+    # 无引用的 blob 超过该时间（秒）后才会被垃圾回收删除
+    FILE_BLOB_GC_GRACE_SECONDS: int = config_manager.get_int(
+        "upload.blobs.gc_grace_seconds", 3600, env_var="FILE_BLOB_GC_GRACE_SECONDS"
+    )
+    # 打包下载缓存的容量上限（MB），超出后删除最久未下载的压缩包；0 表示不缓存
+    ARCHIVE_CACHE_MAX_SIZE_MB: int = config_manager.get_int(
+        "upload.archive_cache.max_size_mb", 1024, env_var="ARCHIVE_CACHE_MAX_SIZE_MB"
+    )
+    # 可续传上传会话：分块大小（MB）、无上传活动后的过期时间（小时）和每个用户同时进行的会话数上限
+    UPLOAD_SESSION_CHUNK_SIZE_MB: int = config_manager.get_int(
+        "upload.sessions.chunk_size_mb", 8, env_var="UPLOAD_SESSION_CHUNK_SIZE_MB"
+    )
+    UPLOAD_SESSION_TTL_HOURS: int = config_manager.get_int(
+        "upload.sessions.ttl_hours", 24, env_var="UPLOAD_SESSION_TTL_HOURS"
+    )
+    UPLOAD_SESSION_MAX_ACTIVE: int = config_manager.get_int(
+        "upload.sessions.max_active", 5, env_var="UPLOAD_SESSION_MAX_ACTIVE"
+    )
+    # 知识库文件的静态压缩：none / gzip / zstd（需要安装 zstandard），压缩级别，小于 min_size 字节的文件不压缩
+    UPLOAD_COMPRESSION: str = config_manager.get("upload.compression.algorithm", "gzip", env_var="UPLOAD_COMPRESSION")
+    UPLOAD_COMPRESSION_LEVEL: int = config_manager.get_int("upload.compression.level", 6)
+    UPLOAD_COMPRESSION_MIN_SIZE: int = config_manager.get_int("upload.compression.min_size", 1024)
+
+    # 文件存储配置（知识库 / 人设卡文件内容保存在本地上传目录或 S3 兼容对象存储）
+    STORAGE_BACKEND: str = config_manager.get("storage.backend", "local", env_var="STORAGE_BACKEND")
+    STORAGE_S3_ENDPOINT: str = config_manager.get("storage.s3.endpoint", "", env_var="STORAGE_S3_ENDPOINT")
+    STORAGE_S3_BUCKET: str = config_manager.get("storage.s3.bucket", "", env_var="STORAGE_S3_BUCKET")
+    STORAGE_S3_REGION: str = config_manager.get("storage.s3.region", "us-east-1", env_var="STORAGE_S3_REGION")
+    STORAGE_S3_PREFIX: str = config_manager.get("storage.s3.prefix", "", env_var="STORAGE_S3_PREFIX")
+    STORAGE_S3_ADDRESSING_STYLE: str = config_manager.get("storage.s3.addressing_style", "path")
+    STORAGE_S3_TIMEOUT: int = config_manager.get_int("storage.s3.timeout", 30)
+    STORAGE_S3_ACCESS_KEY: str = Field(default_factory=lambda: os.getenv("STORAGE_S3_ACCESS_KEY", ""))  # 从环境变量读取
+    STORAGE_S3_SECRET_KEY: str = Field(default_factory=lambda: os.getenv("STORAGE_S3_SECRET_KEY", ""))  # 同上
+    # 下载方式：proxy（应用进程发送）、redirect（预签名地址）、x-accel-redirect（nginx）、x-sendfile
+    STORAGE_DOWNLOAD_MODE: str = config_manager.get("storage.download.mode", "proxy", env_var="STORAGE_DOWNLOAD_MODE")
+    STORAGE_PRESIGN_EXPIRES_SECONDS: int = config_manager.get_int("storage.download.presign_expires_seconds", 300)
+    STORAGE_ACCEL_PREFIX: str = config_manager.get(
+        "storage.download.accel_prefix", "/protected/", env_var="STORAGE_ACCEL_PREFIX"
+    )
 
     # 安全配置
     BCRYPT_ROUNDS: int = config_manager.get_int("security.bcrypt_rounds", 12, env_var="BCRYPT_ROUNDS")
@@ -88,6 +133,7 @@ class Settings(BaseSettings):
 
     # 缓存配置
     CACHE_ENABLED: bool = config_manager.get_bool("cache.enabled", True, env_var="CACHE_ENABLED")
+    CACHE_BACKEND: str = config_manager.get("cache.backend", "redis", env_var="CACHE_BACKEND")
     CACHE_HOST: str = config_manager.get("cache.host", "localhost", env_var="CACHE_HOST")
     CACHE_PORT: int = config_manager.get_int("cache.port", 6379, env_var="CACHE_PORT")
     CACHE_DB: int = config_manager.get_int("cache.db", 0, env_var="CACHE_DB")
@@ -102,6 +148,60 @@ class Settings(BaseSettings):
     CACHE_RETRY_ON_TIMEOUT: bool = config_manager.get_bool(
         "cache.retry_on_timeout", True, env_var="CACHE_RETRY_ON_TIMEOUT"
     )
+    CACHE_MEMORY_MAX_ENTRIES: int = config_manager.get_int("cache.memory_max_entries", 10000)
+    CACHE_MEMORY_MAX_BYTES: int = config_manager.get_int("cache.memory_max_bytes", 64 * 1024 * 1024)
+
+    # 失效事件总线配置（Redis 发布/订阅，在多个 worker 之间同步进程内状态）
+    CACHE_BUS_ENABLED: bool = config_manager.get_bool("cache.bus.enabled", True, env_var="CACHE_BUS_ENABLED")
+
+    # 后台缓存失效队列配置
+    CACHE_INVALIDATION_COALESCE_MS: int = config_manager.get_int("cache.invalidation.coalesce_ms", 50)
+    CACHE_INVALIDATION_MAX_RETRIES: int = config_manager.get_int("cache.invalidation.max_retries", 3)
+
+    # 不存在 ID 过滤器配置（布隆过滤器，对一定不存在的 ID 直接返回 404）
+    CACHE_ID_FILTER_ENABLED: bool = config_manager.get_bool(
+        "cache.id_filter.enabled", True, env_var="CACHE_ID_FILTER_ENABLED"
+    )
+    CACHE_ID_FILTER_ERROR_RATE: float = config_manager.get_float("cache.id_filter.error_rate", 0.01)
+    CACHE_ID_FILTER_MIN_CAPACITY: int = config_manager.get_int("cache.id_filter.min_capacity", 10000)
+    CACHE_ID_FILTER_REBUILD_INTERVAL: int = config_manager.get_int("cache.id_filter.rebuild_interval", 3600)
+    CACHE_ID_FILTER_ALLOW_WITHOUT_BUS: bool = config_manager.get_bool("cache.id_filter.allow_without_bus", False)
+
+    # 缓存分析配置（按键前缀 / 路由模板统计命中率、对象大小、剩余 TTL 与热点键）
+    CACHE_ANALYTICS_ENABLED: bool = config_manager.get_bool("cache.analytics.enabled", True)
+    CACHE_ANALYTICS_TOP_K: int = config_manager.get_int("cache.analytics.top_k", 20)
+
+    # 实体读穿缓存配置（按主键读取的用户、知识库、人设卡列快照，实体更新后自动更换版本）
+    CACHE_ENTITY_ENABLED: bool = config_manager.get_bool("cache.entity.enabled", True, env_var="CACHE_ENTITY_ENABLED")
+    CACHE_ENTITY_TTL: int = config_manager.get_int("cache.entity.ttl", 3600)
+
+    # 收藏集合缓存配置（按用户缓存已收藏的知识库 / 人设卡 ID，列表页批量检查 Star 状态）
+    CACHE_STARRED_ENABLED: bool = config_manager.get_bool(
+        "cache.starred.enabled", True, env_var="CACHE_STARRED_ENABLED"
+    )
+    CACHE_STARRED_TTL: int = config_manager.get_int("cache.starred.ttl", 3600)
+    CACHE_STARRED_MAX_USERS: int = config_manager.get_int("cache.starred.max_users", 10000)
+
+    # Redis 熔断器配置（Redis 不可用时缓存操作立即降级，不等待 socket 超时）
+    CACHE_CIRCUIT_BREAKER_ENABLED: bool = config_manager.get_bool(
+        "cache.circuit_breaker.enabled", True, env_var="CACHE_CIRCUIT_BREAKER_ENABLED"
+    )
+    CACHE_CIRCUIT_BREAKER_FAILURE_RATE: float = config_manager.get_float("cache.circuit_breaker.failure_rate", 0.5)
+    CACHE_CIRCUIT_BREAKER_WINDOW: int = config_manager.get_int("cache.circuit_breaker.window", 10)
+    CACHE_CIRCUIT_BREAKER_MINIMUM_CALLS: int = config_manager.get_int("cache.circuit_breaker.minimum_calls", 20)
+    CACHE_CIRCUIT_BREAKER_OPEN_SECONDS: float = config_manager.get_float("cache.circuit_breaker.open_seconds", 5.0)
+    CACHE_CIRCUIT_BREAKER_JITTER: float = config_manager.get_float("cache.circuit_breaker.jitter", 0.2)
+    CACHE_CIRCUIT_BREAKER_HALF_OPEN_CALLS: int = config_manager.get_int("cache.circuit_breaker.half_open_calls", 1)
+
+    # 缓存预热配置
+    CACHE_WARMUP_ENABLED: bool = config_manager.get_bool("cache.warmup.enabled", True, env_var="CACHE_WARMUP_ENABLED")
+    CACHE_WARMUP_PAGES: int = config_manager.get_int("cache.warmup.pages", 2)
+    CACHE_WARMUP_PAGE_SIZE: int = config_manager.get_int("cache.warmup.page_size", 20)
+    CACHE_WARMUP_SORT_BY: list[str] = config_manager.get_list("cache.warmup.sort_by", ["created_at", "star_count"])
+    CACHE_WARMUP_TOP_STARRED: int = config_manager.get_int("cache.warmup.top_starred", 10)
+    CACHE_WARMUP_INCLUDE_TRANSLATION: bool = config_manager.get_bool("cache.warmup.include_translation", True)
+    CACHE_WARMUP_CONCURRENCY: int = config_manager.get_int("cache.warmup.concurrency", 4)
+    CACHE_WARMUP_TIMEOUT: int = config_manager.get_int("cache.warmup.timeout", 60)
 
     # 测试配置（可选）
     MAIMNP_BASE_URL: str | None = None
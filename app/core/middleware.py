@@ -38,8 +38,12 @@ def setup_middlewares(app: FastAPI) -> None:
         try:
             from app.core.cache.factory import get_cache_manager
             from app.core.cache.middleware import CacheMiddleware
+            from app.core.cache.policy import get_cache_policy_registry
 
             cache_manager = get_cache_manager()
+            # 路由缓存策略注册表：只缓存通过 @cache_policy 声明了策略的 GET 路由，
+            # 路由注册完成后由 load_cache_policies 加载
+            policy_registry = get_cache_policy_registry()
 
             # 创建缓存中间件实例
             cache_middleware = CacheMiddleware(
@@ -47,13 +51,7 @@ def setup_middlewares(app: FastAPI) -> None:
                 cache_manager=cache_manager,
                 default_ttl=300,  # 默认 5 分钟
                 cache_query_params=True,
-                excluded_paths=[
-                    "/api/admin",
-                    "/api/auth",
-                    "/api/ws",
-                    "/api/review",
-                    "/api/users/me",
-                ],  # 排除管理、认证、WebSocket、审核和用户个人信息路径
+                policy_registry=policy_registry,
             )
 
             # 将中间件实例保存到 app.state，以便 API 端点访问
@@ -65,7 +63,7 @@ def setup_middlewares(app: FastAPI) -> None:
                 cache_manager=cache_manager,
                 default_ttl=300,
                 cache_query_params=True,
-                excluded_paths=["/api/admin", "/api/auth", "/api/ws", "/api/review", "/api/users/me"],
+                policy_registry=policy_registry,
             )
 
             if cache_manager.is_enabled():
@@ -97,3 +95,18 @@ def setup_middlewares(app: FastAPI) -> None:
     except Exception as e:
         app_logger.error(f"中间件配置失败: {str(e)}")
         raise
+
+
+def load_cache_policies(app: FastAPI) -> None:
+    """
+    从应用路由中加载缓存策略（需在所有路由注册完成后调用）。
+
+    Args:
+        app: FastAPI 应用实例
+    """
+    try:
+        from app.core.cache.policy import get_cache_policy_registry
+
+        get_cache_policy_registry().load_from_app(app)
+    except Exception as e:
+        app_logger.warning(f"缓存策略加载失败，路由缓存将被跳过: {str(e)}")
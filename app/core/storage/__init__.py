@@ -0,0 +1,29 @@
+"""
+文件存储模块
+
+知识库和人设卡文件内容（blob）通过存储后端读写：默认保存在本地上传目录，
+也可以保存在 S3 兼容对象存储中，使多个节点无需共享磁盘。
+"""
+
+from app.core.storage.backend import STORAGE_CHUNK_SIZE, StorageBackend, StorageError, StorageObject
+from app.core.storage.factory import (
+    STORAGE_BACKEND_LOCAL,
+    STORAGE_BACKEND_S3,
+    create_storage_backend,
+    get_storage_backend,
+    reset_storage_backend,
+)
+from app.core.storage.local import LocalStorageBackend
+
+__all__ = [
+    "STORAGE_BACKEND_LOCAL",
+    "STORAGE_BACKEND_S3",
+    "STORAGE_CHUNK_SIZE",
+    "LocalStorageBackend",
+    "StorageBackend",
+    "StorageError",
+    "StorageObject",
+    "create_storage_backend",
+    "get_storage_backend",
+    "reset_storage_backend",
+]
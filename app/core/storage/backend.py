@@ -0,0 +1,87 @@
+"""
+文件存储后端接口
+
+定义 blob 内容依赖的对象存储操作，本地文件系统和 S3 兼容对象存储都实现该接口。
+对象按键（"/" 分隔的相对路径，例如 blobs/ab/cd/<sha256>）寻址，所有方法都是阻塞调用，
+应在文件 I/O 线程池中执行。
+"""
+
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from typing import BinaryIO, NamedTuple
+
+# 流式读取的默认块大小
+STORAGE_CHUNK_SIZE = 1024 * 1024
+
+
+class StorageObject(NamedTuple):
+    """存储中的一个对象"""
+
+    key: str
+    size: int
+    mtime: float
+
+
+class StorageError(OSError):
+    """存储后端操作失败（网络错误、权限不足、服务端错误等），与本地文件系统错误一样按 OSError 处理"""
+
+
+class StorageBackend(ABC):
+    """文件存储后端抽象基类"""
+
+    # 后端名称（local / s3），用于日志和指标
+    name: str = ""
+
+    @abstractmethod
+    def stat(self, key: str) -> StorageObject | None:
+        """获取对象的大小和修改时间，对象不存在返回 None"""
+
+    def exists(self, key: str) -> bool:
+        """检查对象是否存在"""
+        return self.stat(key) is not None
+
+    @abstractmethod
+    def put_file(self, key: str, source_path: str, sha256: str | None = None) -> None:
+        """把本地文件保存为对象，成功后源文件不再存在（本地后端原子移动，远程后端流式上传后删除）
+
+        Args:
+            key: 对象键
+            source_path: 本地文件路径
+            sha256: 文件内容的 SHA-256（可选，远程后端用于服务端校验）
+        """
+
+    @abstractmethod
+    def put_bytes(self, key: str, data: bytes) -> None:
+        """把内存中的内容保存为对象（读者不会看到写了一半的对象）"""
+
+    @abstractmethod
+    def open(self, key: str) -> BinaryIO:
+        """打开对象用于流式读取（调用方负责关闭），对象不存在时抛出 FileNotFoundError"""
+
+    @abstractmethod
+    def iter_range(
+        self, key: str, start: int = 0, end: int | None = None, chunk_size: int = STORAGE_CHUNK_SIZE
+    ) -> Iterator[bytes]:
+        """逐块读取对象的 [start, end] 字节（end 包含在内，None 表示读到末尾）"""
+
+    @abstractmethod
+    def delete(self, key: str) -> bool:
+        """删除对象，对象存在且被删除返回 True"""
+
+    @abstractmethod
+    def list(self, prefix: str) -> Iterator[StorageObject]:
+        """遍历键以 prefix 开头的所有对象"""
+
+    def local_path(self, key: str) -> str | None:
+        """对象在本机文件系统中的路径（可交给 FileResponse / X-Sendfile），远程后端返回 None"""
+        return None
+
+    def presigned_url(self, key: str, expires_in: int, filename: str | None = None) -> str | None:
+        """生成有时效的直接下载地址，不支持的后端返回 None
+
+        Args:
+            key: 对象键
+            expires_in: 有效期（秒）
+            filename: 下载文件名（可选，写入响应的 Content-Disposition）
+        """
+        return None
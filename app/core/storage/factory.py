@@ -0,0 +1,89 @@
+"""
+存储后端工厂函数
+
+按配置（[storage]）创建全局存储后端。
+"""
+
+import logging
+import os
+import threading
+
+from app.core.storage.backend import StorageBackend
+from app.core.storage.local import LocalStorageBackend
+
+logger = logging.getLogger(__name__)
+
+STORAGE_BACKEND_LOCAL = "local"
+STORAGE_BACKEND_S3 = "s3"
+
+
+def create_storage_backend(upload_dir: str) -> StorageBackend:
+    """根据配置创建存储后端
+
+    Args:
+        upload_dir: 上传目录（本地后端的根目录）
+
+    Returns:
+        backend 为 s3 时返回 S3StorageBackend，否则返回 LocalStorageBackend
+    """
+    from app.core.config import settings
+
+    if settings.STORAGE_BACKEND == STORAGE_BACKEND_S3:
+        from app.core.storage.s3 import S3StorageBackend
+
+        logger.info(f"使用 S3 存储后端 (endpoint={settings.STORAGE_S3_ENDPOINT}, bucket={settings.STORAGE_S3_BUCKET})")
+        return S3StorageBackend(
+            endpoint_url=settings.STORAGE_S3_ENDPOINT,
+            bucket=settings.STORAGE_S3_BUCKET,
+            access_key=settings.STORAGE_S3_ACCESS_KEY,
+            secret_key=settings.STORAGE_S3_SECRET_KEY,
+            region=settings.STORAGE_S3_REGION,
+            prefix=settings.STORAGE_S3_PREFIX,
+            addressing_style=settings.STORAGE_S3_ADDRESSING_STYLE,
+            timeout=settings.STORAGE_S3_TIMEOUT,
+        )
+
+    if settings.STORAGE_BACKEND != STORAGE_BACKEND_LOCAL:
+        logger.warning(f"未知的存储后端 {settings.STORAGE_BACKEND!r}，使用本地存储")
+    return LocalStorageBackend(upload_dir)
+
+
+# 全局存储后端实例（延迟初始化）
+_global_storage: StorageBackend | None = None
+_global_lock = threading.Lock()
+
+
+def get_storage_backend(upload_dir: str) -> StorageBackend:
+    """获取存储后端
+
+    远程后端全局共用一个实例（复用连接）。本地后端以上传目录为根目录：
+    上传目录与全局实例不同时（测试等）返回以该目录为根的新实例。
+
+    Args:
+        upload_dir: 上传目录
+
+    Returns:
+        StorageBackend 实例
+    """
+    global _global_storage
+
+    if _global_storage is None:
+        with _global_lock:
+            if _global_storage is None:
+                _global_storage = create_storage_backend(upload_dir)
+
+    storage = _global_storage
+    if isinstance(storage, LocalStorageBackend) and os.path.abspath(upload_dir) != os.path.abspath(storage.root):
+        return LocalStorageBackend(upload_dir)
+    return storage
+
+
+def reset_storage_backend() -> None:
+    """重置全局存储后端
+
+    用于测试或重新加载配置。
+    """
+    global _global_storage
+
+    with _global_lock:
+        _global_storage = None
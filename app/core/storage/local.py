@@ -0,0 +1,105 @@
+"""
+本地文件系统存储后端
+
+对象保存在 {root}/{key}，根目录默认为上传目录，blob 的磁盘布局与引入存储后端之前相同，无需迁移。
+多个节点需要共享同一目录（NFS 等）才能水平扩展；否则请使用 S3 兼容后端。
+"""
+
+import os
+import tempfile
+from collections.abc import Iterator
+from typing import BinaryIO
+
+from app.core.storage.backend import STORAGE_CHUNK_SIZE, StorageBackend, StorageObject
+
+
+class LocalStorageBackend(StorageBackend):
+    """本地文件系统存储后端"""
+
+    name = "local"
+
+    def __init__(self, root: str):
+        """初始化本地存储后端
+
+        Args:
+            root: 根目录
+        """
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        parts = key.split("/")
+        if not key or any(part in ("", ".", "..") for part in parts):
+            raise ValueError(f"非法的对象键: {key!r}")
+        return os.path.join(self.root, *parts)
+
+    def local_path(self, key: str) -> str | None:
+        return self._path(key)
+
+    def stat(self, key: str) -> StorageObject | None:
+        try:
+            st = os.stat(self._path(key))
+        except FileNotFoundError:
+            return None
+        return StorageObject(key, st.st_size, st.st_mtime)
+
+    def put_file(self, key: str, source_path: str, sha256: str | None = None) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(source_path, path)
+
+    def put_bytes(self, key: str, data: bytes) -> None:
+        # 先写入同目录的临时文件再原子替换
+        path = self._path(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(prefix=".blob-", suffix=".part", dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def open(self, key: str) -> BinaryIO:
+        return open(self._path(key), "rb")
+
+    def iter_range(
+        self, key: str, start: int = 0, end: int | None = None, chunk_size: int = STORAGE_CHUNK_SIZE
+    ) -> Iterator[bytes]:
+        with open(self._path(key), "rb") as f:
+            f.seek(start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                chunk = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    def delete(self, key: str) -> bool:
+        try:
+            os.remove(self._path(key))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def list(self, prefix: str) -> Iterator[StorageObject]:
+        # 按 prefix 中最后一个 "/" 之前的部分确定起始目录
+        directory = prefix.rpartition("/")[0]
+        start = os.path.join(self.root, *directory.split("/")) if directory else self.root
+        if not os.path.isdir(start):
+            return
+        for dirpath, _dirs, files in os.walk(start):
+            for name in files:
+                path = os.path.join(dirpath, name)
+                key = os.path.relpath(path, self.root).replace(os.sep, "/")
+                if not key.startswith(prefix):
+                    continue
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield StorageObject(key, st.st_size, st.st_mtime)
@@ -0,0 +1,329 @@
+"""
+S3 兼容对象存储后端
+
+通过 HTTP 直接访问 S3 兼容服务（AWS S3、MinIO、Ceph RGW、Cloudflare R2 等），使用 AWS Signature V4 签名，
+不依赖 boto3：
+- 上传时从文件流式发送，blob 的 SHA-256 作为 x-amz-content-sha256，由服务端校验内容
+- 读取时流式返回响应体，支持按字节范围读取
+- presigned_url 生成有时效的下载地址，客户端直接从对象存储下载，不经过应用进程
+多个节点使用同一个存储桶即可共享文件，无需共享磁盘。
+"""
+
+import hashlib
+import hmac
+import logging
+import os
+import xml.etree.ElementTree as ET
+from collections.abc import Iterator
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
+from typing import BinaryIO, cast
+from urllib.parse import quote, urlsplit
+
+import requests
+
+from app.core.storage.backend import STORAGE_CHUNK_SIZE, StorageBackend, StorageError, StorageObject
+from app.utils.zip_stream import content_disposition
+
+logger = logging.getLogger(__name__)
+
+# 空内容的 SHA-256
+EMPTY_SHA256 = hashlib.sha256(b"").hexdigest()
+
+# 不计算内容哈希时的 x-amz-content-sha256
+UNSIGNED_PAYLOAD = "UNSIGNED-PAYLOAD"
+
+_ALGORITHM = "AWS4-HMAC-SHA256"
+
+
+def _quote(value: str, safe: str = "-_.~") -> str:
+    return quote(value, safe=safe)
+
+
+def _canonical_query(params: dict[str, str]) -> str:
+    return "&".join(f"{_quote(k)}={_quote(v)}" for k, v in sorted(params.items()))
+
+
+def _signing_key(secret_key: str, date: str, region: str) -> bytes:
+    key = f"AWS4{secret_key}".encode()
+    for part in (date, region, "s3", "aws4_request"):
+        key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+    return key
+
+
+def _signature(
+    secret_key: str,
+    region: str,
+    amz_date: str,
+    method: str,
+    path: str,
+    query: str,
+    headers: dict[str, str],
+    payload_hash: str,
+) -> tuple[str, str]:
+    """计算签名，返回 (签名, 参与签名的请求头列表)"""
+    canonical_headers = {k.lower(): " ".join(str(v).split()) for k, v in headers.items()}
+    signed_headers = ";".join(sorted(canonical_headers))
+    canonical_request = "\n".join(
+        [
+            method,
+            path,
+            query,
+            "".join(f"{k}:{canonical_headers[k]}\n" for k in sorted(canonical_headers)),
+            signed_headers,
+            payload_hash,
+        ]
+    )
+    scope = f"{amz_date[:8]}/{region}/s3/aws4_request"
+    string_to_sign = "\n".join([_ALGORITHM, amz_date, scope, hashlib.sha256(canonical_request.encode()).hexdigest()])
+    key = _signing_key(secret_key, amz_date[:8], region)
+    return hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest(), signed_headers
+
+
+def sign_request(
+    method: str,
+    url: str,
+    headers: dict[str, str],
+    payload_hash: str,
+    access_key: str,
+    secret_key: str,
+    region: str,
+    now: datetime | None = None,
+) -> dict[str, str]:
+    """按 AWS Signature V4 为请求签名（Authorization 请求头）
+
+    Args:
+        method: HTTP 方法
+        url: 请求地址（路径和查询参数已编码）
+        headers: 需要签名的请求头（不含 Host）
+        payload_hash: 请求体的 SHA-256 或 UNSIGNED-PAYLOAD
+        access_key: 访问密钥 ID
+        secret_key: 访问密钥
+        region: 区域
+        now: 签名时间（可选，默认为当前时间）
+
+    Returns:
+        dict: 带有 Host、x-amz-date、x-amz-content-sha256 和 Authorization 的请求头
+    """
+    amz_date = (now or datetime.now(UTC)).strftime("%Y%m%dT%H%M%SZ")
+    parts = urlsplit(url)
+    signed = {**headers, "host": parts.netloc, "x-amz-date": amz_date, "x-amz-content-sha256": payload_hash}
+    query = "&".join(sorted(parts.query.split("&"), key=lambda item: item.partition("=")[::2]))
+    signature, signed_headers = _signature(
+        secret_key, region, amz_date, method, parts.path or "/", query, signed, payload_hash
+    )
+    signed["Authorization"] = (
+        f"{_ALGORITHM} Credential={access_key}/{amz_date[:8]}/{region}/s3/aws4_request,"
+        f"SignedHeaders={signed_headers},Signature={signature}"
+    )
+    return signed
+
+
+def presign_url(
+    method: str,
+    url: str,
+    expires_in: int,
+    access_key: str,
+    secret_key: str,
+    region: str,
+    params: dict[str, str] | None = None,
+    now: datetime | None = None,
+) -> str:
+    """按 AWS Signature V4 生成预签名地址（签名放在查询参数中）
+
+    Args:
+        method: HTTP 方法
+        url: 对象地址（路径已编码，不含查询参数）
+        expires_in: 有效期（秒）
+        access_key: 访问密钥 ID
+        secret_key: 访问密钥
+        region: 区域
+        params: 额外的查询参数（可选，例如 response-content-disposition）
+        now: 签名时间（可选，默认为当前时间）
+
+    Returns:
+        str: 预签名地址
+    """
+    amz_date = (now or datetime.now(UTC)).strftime("%Y%m%dT%H%M%SZ")
+    parts = urlsplit(url)
+    query_params = {
+        **(params or {}),
+        "X-Amz-Algorithm": _ALGORITHM,
+        "X-Amz-Credential": f"{access_key}/{amz_date[:8]}/{region}/s3/aws4_request",
+        "X-Amz-Date": amz_date,
+        "X-Amz-Expires": str(expires_in),
+        "X-Amz-SignedHeaders": "host",
+    }
+    query = _canonical_query(query_params)
+    signature, _ = _signature(
+        secret_key, region, amz_date, method, parts.path or "/", query, {"host": parts.netloc}, UNSIGNED_PAYLOAD
+    )
+    return f"{parts.scheme}://{parts.netloc}{parts.path}?{query}&X-Amz-Signature={signature}"
+
+
+class S3StorageBackend(StorageBackend):
+    """S3 兼容对象存储后端"""
+
+    name = "s3"
+
+    def __init__(
+        self,
+        endpoint_url: str,
+        bucket: str,
+        access_key: str,
+        secret_key: str,
+        region: str = "us-east-1",
+        prefix: str = "",
+        addressing_style: str = "path",
+        timeout: float = 30,
+        session: requests.Session | None = None,
+    ):
+        """初始化 S3 存储后端
+
+        Args:
+            endpoint_url: 服务地址（例如 https://s3.us-east-1.amazonaws.com、http://minio:9000）
+            bucket: 存储桶
+            access_key: 访问密钥 ID
+            secret_key: 访问密钥
+            region: 区域
+            prefix: 对象键前缀（可选，多个应用共用一个存储桶时使用）
+            addressing_style: path（{endpoint}/{bucket}/{key}）或 virtual（{bucket}.{endpoint host}/{key}）
+            timeout: 请求超时时间（秒）
+            session: HTTP 会话（可选，复用连接）
+        """
+        if not endpoint_url or not bucket:
+            raise ValueError("S3 存储后端需要配置 endpoint 和 bucket")
+        self.endpoint_url = endpoint_url.rstrip("/")
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.prefix = prefix.strip("/")
+        self.addressing_style = addressing_style
+        self.timeout = timeout
+        self.session = session or requests.Session()
+
+    def _full_key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def _bucket_url(self) -> str:
+        if self.addressing_style == "virtual":
+            parts = urlsplit(self.endpoint_url)
+            return f"{parts.scheme}://{self.bucket}.{parts.netloc}"
+        return f"{self.endpoint_url}/{_quote(self.bucket)}"
+
+    def object_url(self, key: str) -> str:
+        """对象地址（路径已编码）"""
+        return f"{self._bucket_url()}/{_quote(self._full_key(key), safe='/-_.~')}"
+
+    def _request(
+        self,
+        method: str,
+        url: str,
+        headers: dict[str, str] | None = None,
+        data: bytes | BinaryIO | None = None,
+        payload_hash: str = EMPTY_SHA256,
+        stream: bool = False,
+    ) -> requests.Response:
+        signed = sign_request(method, url, headers or {}, payload_hash, self.access_key, self.secret_key, self.region)
+        try:
+            return self.session.request(method, url, headers=signed, data=data, stream=stream, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise StorageError(f"S3 请求失败 ({method} {url}): {e}") from e
+
+    @staticmethod
+    def _check(response: requests.Response, action: str, key: str) -> None:
+        if response.status_code >= 300:
+            detail = response.text[:200]
+            response.close()
+            raise StorageError(f"S3 {action}失败 ({key}): HTTP {response.status_code} {detail}".rstrip())
+
+    def stat(self, key: str) -> StorageObject | None:
+        response = self._request("HEAD", self.object_url(key))
+        if response.status_code == 404:
+            return None
+        self._check(response, "查询对象", key)
+        last_modified = response.headers.get("Last-Modified")
+        mtime = parsedate_to_datetime(last_modified).timestamp() if last_modified else 0.0
+        return StorageObject(key, int(response.headers.get("Content-Length", 0)), mtime)
+
+    def put_file(self, key: str, source_path: str, sha256: str | None = None) -> None:
+        size = os.path.getsize(source_path)
+        with open(source_path, "rb") as f:
+            response = self._request(
+                "PUT",
+                self.object_url(key),
+                headers={"Content-Length": str(size)},
+                data=f if size else b"",
+                payload_hash=sha256 or UNSIGNED_PAYLOAD,
+            )
+        self._check(response, "上传对象", key)
+        os.remove(source_path)
+
+    def put_bytes(self, key: str, data: bytes) -> None:
+        response = self._request(
+            "PUT",
+            self.object_url(key),
+            headers={"Content-Length": str(len(data))},
+            data=data,
+            payload_hash=hashlib.sha256(data).hexdigest(),
+        )
+        self._check(response, "上传对象", key)
+
+    def _get(self, key: str, headers: dict[str, str] | None = None) -> requests.Response:
+        response = self._request("GET", self.object_url(key), headers=headers, stream=True)
+        if response.status_code == 404:
+            response.close()
+            raise FileNotFoundError(key)
+        self._check(response, "读取对象", key)
+        return response
+
+    def open(self, key: str) -> BinaryIO:
+        raw = self._get(key).raw
+        raw.decode_content = True
+        # urllib3 的 HTTPResponse 是可读的 io.IOBase，按二进制文件对象使用
+        return cast(BinaryIO, raw)
+
+    def iter_range(
+        self, key: str, start: int = 0, end: int | None = None, chunk_size: int = STORAGE_CHUNK_SIZE
+    ) -> Iterator[bytes]:
+        headers = None
+        if start or end is not None:
+            headers = {"Range": f"bytes={start}-{'' if end is None else end}"}
+        response = self._get(key, headers)
+        with response:
+            yield from response.iter_content(chunk_size)
+
+    def delete(self, key: str) -> bool:
+        # S3 删除不存在的对象同样返回 204，先查询以便返回是否存在
+        if self.stat(key) is None:
+            return False
+        response = self._request("DELETE", self.object_url(key))
+        self._check(response, "删除对象", key)
+        return True
+
+    def list(self, prefix: str) -> Iterator[StorageObject]:
+        full_prefix = self._full_key(prefix)
+        strip = len(self._full_key(""))
+        params = {"list-type": "2", "prefix": full_prefix}
+        while True:
+            url = f"{self._bucket_url()}/?{_canonical_query(params)}"
+            response = self._request("GET", url)
+            self._check(response, "列出对象", prefix)
+            root = ET.fromstring(response.content)
+            for element in root.iter():
+                element.tag = element.tag.rpartition("}")[2]  # 去掉命名空间，兼容不带 xmlns 的实现
+            for item in root.iter("Contents"):
+                last_modified = item.findtext("LastModified")
+                mtime = datetime.fromisoformat(last_modified).timestamp() if last_modified else 0.0
+                yield StorageObject(item.findtext("Key", "")[strip:], int(item.findtext("Size", "0")), mtime)
+            token = root.findtext("NextContinuationToken")
+            if root.findtext("IsTruncated") != "true" or not token:
+                return
+            params["continuation-token"] = token
+
+    def presigned_url(self, key: str, expires_in: int, filename: str | None = None) -> str | None:
+        params = {"response-content-disposition": content_disposition(filename)} if filename else None
+        return presign_url(
+            "GET", self.object_url(key), expires_in, self.access_key, self.secret_key, self.region, params
+        )
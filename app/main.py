@@ -4,6 +4,7 @@ MaiMNP Backend Application
 FastAPI 应用主入口文件，负责应用初始化、路由注册、中间件配置等。
 """
 
+import asyncio
 import os
 import sys
 import traceback
@@ -12,14 +13,24 @@ from pathlib import Path
 
 import uvicorn
 from dotenv import load_dotenv
-from fastapi import FastAPI, WebSocket
+from fastapi import FastAPI, Request, WebSocket
+from fastapi.responses import JSONResponse
 
 from app.api import api_router
 from app.api.websocket import message_websocket_endpoint
+from app.core.cache.bus import EVENT_MESSAGE_UPDATE, get_invalidation_bus
+from app.core.cache.change_tracker import get_change_tracker, reset_change_tracker
+from app.core.cache.entity_cache import get_entity_cache, reset_entity_cache
+from app.core.cache.id_filter import get_existence_filter
+from app.core.cache.invalidation_queue import get_invalidation_queue
+from app.core.cache.starred import get_starred_cache
+from app.core.cache.warmup import CacheWarmer, create_warmup_config_from_settings
 from app.core.config import settings
 from app.core.error_handlers import setup_exception_handlers
 from app.core.logging import app_logger
-from app.core.middleware import setup_middlewares
+from app.core.middleware import load_cache_policies, setup_middlewares
+from app.utils.file_io import reset_file_io_executor
+from app.utils.websocket import message_ws_manager
 
 # 加载环境变量
 load_dotenv()
@@ -45,9 +56,40 @@ async def lifespan(app: FastAPI):
     app_logger.info(f"应用启动: {settings.APP_NAME} v{settings.APP_VERSION}")
     app_logger.debug(f"数据库: {settings.DATABASE_URL}")
 
+    # 订阅失效事件总线，在多个 worker 之间同步进程内缓存和 WebSocket 推送
+    invalidation_bus = get_invalidation_bus()
+    invalidation_bus.subscribe(EVENT_MESSAGE_UPDATE, message_ws_manager.handle_message_update_event)
+    get_starred_cache().attach_bus(invalidation_bus)
+    await invalidation_bus.start()
+
+    # 后台构建不存在 ID 过滤器（需要总线同步新插入的 ID）
+    existence_filter = get_existence_filter()
+    await existence_filter.start(invalidation_bus)
+
+    # 注册实体更新事件，本进程内的实体更新都会更换实体缓存版本
+    get_entity_cache()
+
+    # 注册会话变更跟踪，事务提交后按变更的实体失效缓存并推送消息更新
+    get_change_tracker()
+
+    # 后台预热热门端点缓存，预热结束前 /ready 返回 503
+    cache_warmer = CacheWarmer(app, create_warmup_config_from_settings())
+    app.state.cache_warmer = cache_warmer
+    cache_warmer.start()
+
     yield
 
     # 关闭时执行
+    await cache_warmer.stop()
+    await existence_filter.stop()
+    # 移除全局 Session 事件监听，之后的提交不再产生失效任务
+    reset_change_tracker()
+    reset_entity_cache()
+    # 先执行完排队的缓存失效（需要时经总线广播），再停止总线
+    await asyncio.to_thread(get_invalidation_queue().stop)
+    await invalidation_bus.stop()
+    # 等待文件 I/O 线程池中的操作执行完成
+    await asyncio.to_thread(reset_file_io_executor)
     app_logger.info("应用已关闭")
 
 
@@ -71,7 +113,7 @@ try:
     setup_static_routes(app)
 except ImportError:
     # 如果 static_routes 不存在，使用内联实现
-    from fastapi import HTTPException, Request
+    from fastapi import HTTPException
     from fastapi.responses import FileResponse
 
     @app.get("/uploads/avatars/{file_path:path}")
@@ -112,6 +154,18 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/ready")
+async def readiness_check(request: Request):
+    """就绪检查端点
+
+    启动缓存预热结束前返回 503，结束后返回 200。
+    """
+    cache_warmer = getattr(request.app.state, "cache_warmer", None)
+    if cache_warmer is None:
+        return JSONResponse(status_code=503, content={"status": "starting", "warmup": None})
+    return JSONResponse(status_code=200 if cache_warmer.is_ready else 503, content=cache_warmer.status())
+
+
 # 注册 WebSocket 端点
 @app.websocket("/api/ws/{token}")
 async def websocket_endpoint(websocket: WebSocket, token: str):
@@ -125,6 +179,10 @@ async def websocket_endpoint(websocket: WebSocket, token: str):
     await message_websocket_endpoint(websocket, token)
 
 
+# 所有路由注册完成后加载路由缓存策略
+load_cache_policies(app)
+
+
 if __name__ == "__main__":
     """直接运行此文件时的入口点"""
     exit_code = 0
@@ -170,6 +170,12 @@ class KnowledgeBaseFile(Base):
     file_path = Column(String, nullable=False)
     file_type = Column(String, nullable=False)
     file_size = Column(Integer, default=0)
+    # 文件内容的 SHA-256（十六进制），同时指向 file_blobs 中的 blob；为空表示文件存放在 base_path 下
+    content_hash = Column(String, nullable=True)
+    # 静态压缩的编码（gzip / zstd），为空表示保存原始内容；file_size 始终是原始大小
+    content_encoding = Column(String, nullable=True)
+    # 存储中的字节数（压缩后的大小），为空表示与 file_size 相同
+    stored_size = Column(Integer, nullable=True)
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
 
@@ -180,6 +186,7 @@ class KnowledgeBaseFile(Base):
         Index("idx_kb_file_file_size", "file_size"),
         Index("idx_kb_file_created_at", "created_at"),
         Index("idx_kb_file_updated_at", "updated_at"),
+        Index("idx_kb_file_content_hash", "content_hash"),
     )
 
 
@@ -259,6 +266,8 @@ class PersonaCardFile(Base):
     file_path = Column(String, nullable=False)
     file_type = Column(String, nullable=False)
     file_size = Column(Integer, default=0)
+    # 文件内容的 SHA-256（十六进制），同时指向 file_blobs 中的 blob；为空表示文件存放在 base_path 下
+    content_hash = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
 
@@ -269,6 +278,57 @@ class PersonaCardFile(Base):
         Index("idx_pc_file_file_size", "file_size"),
         Index("idx_pc_file_created_at", "created_at"),
         Index("idx_pc_file_updated_at", "updated_at"),
+        Index("idx_pc_file_content_hash", "content_hash"),
+    )
+
+
+class FileBlob(Base):
+    """按内容寻址的文件 blob 模型
+
+    知识库和人设卡文件按 SHA-256 存放在 uploads/blobs 下，相同内容只保存一份。
+    ref_count 为引用该 blob 的文件记录数，降为 0 的 blob 由垃圾回收删除。
+    """
+
+    __tablename__ = "file_blobs"
+
+    hash = Column(String, primary_key=True)  # 内容的 SHA-256（十六进制）
+    size = Column(Integer, nullable=False, default=0)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+    __table_args__ = (Index("idx_file_blob_ref_count", "ref_count"),)
+
+
+class UploadSession(Base):
+    """可续传的知识库上传会话模型
+
+    客户端先声明文件清单（文件名、大小、可选的 SHA-256），再按固定的块大小分块上传，
+    已收到的块保存在 uploads/upload_sessions/{id} 下，全部收到后提交为普通的知识库。
+    过期（超过 expires_at 未再上传）的会话由垃圾回收删除。
+    """
+
+    __tablename__ = "upload_sessions"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(String, nullable=False)
+    name = Column(String, nullable=False)
+    description = Column(Text, nullable=False)
+    copyright_owner = Column(String, nullable=True)
+    content = Column(Text, nullable=True)
+    tags = Column(Text, nullable=True)
+    is_public = Column(Boolean, default=False)
+    files = Column(Text, nullable=False, default="[]")  # JSON：[{"name", "size", "sha256"}]
+    chunk_size = Column(Integer, nullable=False)
+    status = Column(String, nullable=False, default="active")  # active / committed
+    knowledge_base_id = Column(String, nullable=True)  # 提交后创建的知识库
+    expires_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+    __table_args__ = (
+        Index("idx_upload_session_user_id", "user_id"),
+        Index("idx_upload_session_expires_at", "expires_at"),
     )
 
 
@@ -147,6 +147,26 @@ class KnowledgeBasePaginatedResponse(BaseModel):
     page_size: int
 
 
+class UploadSessionFile(BaseModel):
+    """上传会话中声明的文件"""
+
+    name: str = Field(..., min_length=1)
+    size: int = Field(..., ge=0)
+    sha256: str | None = Field(None, description="整个文件的 SHA-256（十六进制，可选），提交时校验")
+
+
+class UploadSessionCreate(BaseModel):
+    """创建可续传上传会话请求模型"""
+
+    name: str
+    description: str
+    copyright_owner: str | None = None
+    content: str | None = None
+    tags: str | None = None
+    is_public: bool = False
+    files: list[UploadSessionFile] = Field(..., min_length=1)
+
+
 # 人设卡相关模型
 class PersonaCardCreate(BaseModel):
     """人设卡创建请求模型"""
@@ -281,6 +301,12 @@ class StarResponse(BaseModel):
     created_at: datetime
 
 
+class StarredBatchRequest(BaseModel):
+    """批量检查收藏状态请求模型"""
+
+    ids: list[str] = Field(..., min_length=1, max_length=100, description="要检查的目标 ID，最多 100 个")
+
+
 # 通用响应模型
 T = TypeVar("T")
 
@@ -0,0 +1,420 @@
+"""
+打包下载缓存
+
+热门知识库和人设卡会被反复下载，每次下载都要重新读取、压缩所有文件并生成说明文件。
+ArchiveCache 把生成的压缩包保存在 {upload_dir}/archive_cache/{kind}/{item_id}/{version}.zip：
+- version 由 archive_version 根据元数据、上传者和文件列表计算，内容变化后自然换成新版本，同时用作 ETag
+- 未命中时边发送边写入缓存，全部发送完成后才放入缓存，客户端中途断开则丢弃不完整的文件
+- 写入新版本时删除同一条目的旧版本；条目或文件的变更提交后由会话变更跟踪器调用 invalidate
+- 命中时更新压缩包的修改时间，超出容量上限时按修改时间删除最久未下载的压缩包（LRU）
+- 不在内存中保存索引，多个 worker 进程可共享同一目录；写入后按本进程估算的总大小判断是否超出上限，
+  只在超出或距上次扫描超过 EVICT_SCAN_INTERVAL_SECONDS 时遍历缓存目录
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections.abc import AsyncIterator, Iterable, Iterator
+from typing import Any, BinaryIO
+
+from prometheus_client import Counter
+
+from app.services.blob_store import resolve_upload_dir
+from app.utils.file_io import aiter_file_io
+from app.utils.zip_stream import ZipEntry, aiter_zip, iter_zip
+
+logger = logging.getLogger(__name__)
+
+# 缓存目录名（位于上传目录下）
+ARCHIVE_CACHE_DIR_NAME = "archive_cache"
+
+# 缓存的条目类型
+ARCHIVE_KIND_KNOWLEDGE = "knowledge"
+ARCHIVE_KIND_PERSONA = "persona"
+
+# 压缩包内容的格式版本（修改打包方式或说明文件格式时递增，使已缓存的压缩包全部失效）
+ARCHIVE_FORMAT_VERSION = 2
+
+# 写入中断遗留的临时文件超过该时间（秒）后删除
+STALE_TEMP_SECONDS = 3600
+
+# 两次遍历缓存目录的最长间隔（秒），期间按本进程的写入估算总大小（其他 worker 的写入在下次遍历时计入）
+EVICT_SCAN_INTERVAL_SECONDS = 60
+
+archive_cache_lookups_total = Counter(
+    "archive_cache_lookups_total", "打包下载缓存查询总次数", ["kind", "result"]  # result: hit, miss
+)
+
+
+def archive_version(item: Any, files: Iterable[Any], uploader_name: str) -> str:
+    """计算打包内容的版本（也用作 ETag）
+
+    压缩包中的所有内容都参与计算：说明文件中的名称、描述、版权所有者和时间，上传者名称，
+    以及每个文件的 ID、文件名、内容哈希（旧记录为文件路径）和大小。
+
+    Args:
+        item: 知识库或人设卡
+        files: 文件记录（按打包顺序）
+        uploader_name: 上传者名称
+
+    Returns:
+        str: 32 位十六进制版本号
+    """
+    payload = [
+        ARCHIVE_FORMAT_VERSION,
+        item.id,
+        item.name,
+        item.description,
+        item.copyright_owner,
+        str(item.created_at),
+        str(item.updated_at),
+        uploader_name,
+        [[f.id, f.original_name, f.content_hash or f.file_path, f.file_size, str(f.updated_at)] for f in files],
+    ]
+    encoded = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()[:32]
+
+
+def archive_etag(version: str) -> str:
+    """版本号对应的 ETag"""
+    return f'"{version}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """If-None-Match 请求头是否与 ETag 匹配（按 RFC 9110 使用弱比较）"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+
+def is_resume_request(range_header: str | None) -> bool:
+    """是否为断点续传的后续请求（Range 的第一个范围不从 0 开始）"""
+    if not range_header:
+        return False
+    unit, _, ranges = range_header.partition("=")
+    if unit.strip().lower() != "bytes":
+        return False
+    return not ranges.split(",")[0].strip().startswith("0-")
+
+
+def _remove(path: str) -> bool:
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+class ArchiveCache:
+    """按版本缓存打包下载的压缩包，容量有限，按最近下载时间淘汰"""
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        """初始化打包下载缓存
+
+        Args:
+            cache_dir: 缓存目录
+            max_bytes: 容量上限（字节），0 表示不缓存
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max(0, max_bytes)
+        self._evict_lock = threading.Lock()
+        # 估算的总大小（None 表示尚未遍历）和上次遍历的时间
+        self._total_bytes: int | None = None
+        self._scanned_at = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        """是否启用缓存"""
+        return self.max_bytes > 0
+
+    def archive_path(self, kind: str, item_id: str, version: str) -> str:
+        """压缩包的缓存路径"""
+        return os.path.join(self.cache_dir, kind, item_id, f"{version}.zip")
+
+    def get(self, kind: str, item_id: str, version: str) -> str | None:
+        """查找已缓存的压缩包
+
+        Args:
+            kind: 条目类型（knowledge / persona）
+            item_id: 知识库或人设卡 ID
+            version: 打包内容的版本
+
+        Returns:
+            Optional[str]: 命中时返回压缩包路径，否则返回 None
+        """
+        if not self.enabled:
+            return None
+
+        path = self.archive_path(kind, item_id, version)
+        try:
+            # 更新修改时间，记录最近一次下载（淘汰时按修改时间排序）
+            os.utime(path)
+        except OSError:
+            archive_cache_lookups_total.labels(kind=kind, result="miss").inc()
+            return None
+        archive_cache_lookups_total.labels(kind=kind, result="hit").inc()
+        return path
+
+    def iter_and_store(self, kind: str, item_id: str, version: str, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """原样产出压缩包数据，同时写入缓存
+
+        全部产出后才放入缓存；生成出错或调用方提前关闭（客户端断开）时删除不完整的临时文件。
+        超过容量上限的压缩包只产出不缓存，写入缓存失败不影响产出。
+
+        Args:
+            kind: 条目类型（knowledge / persona）
+            item_id: 知识库或人设卡 ID
+            version: 打包内容的版本
+            chunks: 压缩包数据
+
+        Yields:
+            bytes: 压缩包数据
+        """
+        path = self.archive_path(kind, item_id, version)
+        temp_path = f"{path}.{uuid.uuid4().hex}.part"
+        temp_file = None
+        written = 0
+        try:
+            temp_file = self._open_temp(kind, item_id, temp_path)
+            for chunk in chunks:
+                if temp_file is not None:
+                    written += len(chunk)
+                    error = self._write_temp(temp_file, chunk, written)
+                    if error is not None:
+                        logger.info(f"压缩包不缓存 ({kind}/{item_id}): {error}")
+                        temp_file.close()
+                        temp_file = None
+                        _remove(temp_path)
+                yield chunk
+
+            if temp_file is not None:
+                temp_file.close()
+                temp_file = None
+                self._commit(kind, item_id, version, temp_path)
+        finally:
+            if temp_file is not None:
+                temp_file.close()
+                _remove(temp_path)
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+
+    def _open_temp(self, kind: str, item_id: str, temp_path: str) -> BinaryIO | None:
+        """创建临时文件，失败时返回 None（本次不缓存）"""
+        try:
+            os.makedirs(os.path.dirname(temp_path), exist_ok=True)
+            return open(temp_path, "wb")
+        except OSError as e:
+            logger.warning(f"创建打包缓存文件失败，本次不缓存 ({kind}/{item_id}): {e}")
+            return None
+
+    def _write_temp(self, temp_file: BinaryIO, chunk: bytes, written: int) -> str | None:
+        """写入一块数据，返回不缓存的原因（可以缓存时返回 None）"""
+        if written > self.max_bytes:
+            return f"超过容量上限 ({self.max_bytes} 字节)"
+        try:
+            temp_file.write(chunk)
+        except OSError as e:
+            return str(e)
+        return None
+
+    def _commit(self, kind: str, item_id: str, version: str, temp_path: str) -> None:
+        path = self.archive_path(kind, item_id, version)
+        try:
+            os.replace(temp_path, path)
+            added = os.path.getsize(path)
+            # 同一条目只保留当前版本
+            for entry in os.scandir(os.path.dirname(path)):
+                if entry.name.endswith(".zip") and entry.path != path:
+                    size = entry.stat().st_size
+                    if _remove(entry.path):
+                        added -= size
+            self._record_write(added)
+        except OSError as e:
+            _remove(temp_path)
+            logger.warning(f"保存打包缓存失败 ({kind}/{item_id}): {e}")
+
+    def _record_write(self, added: int) -> None:
+        """累计写入的大小，估算超出容量上限或距上次遍历过久时执行淘汰"""
+        with self._evict_lock:
+            if self._total_bytes is not None:
+                self._total_bytes += added
+            due = (
+                self._total_bytes is None
+                or self._total_bytes > self.max_bytes
+                or time.monotonic() - self._scanned_at >= EVICT_SCAN_INTERVAL_SECONDS
+            )
+        if due:
+            self.evict()
+
+    def stream(self, kind: str, item_id: str, version: str, entries: Iterable[ZipEntry]) -> AsyncIterator[bytes]:
+        """在文件 I/O 线程池中生成压缩包并写入缓存（用于 StreamingResponse）
+
+        Args:
+            kind: 条目类型（knowledge / persona）
+            item_id: 知识库或人设卡 ID
+            version: 打包内容的版本
+            entries: 压缩包条目
+
+        Returns:
+            AsyncIterator[bytes]: 压缩包数据
+        """
+        if not self.enabled:
+            return aiter_zip(entries)
+        return aiter_file_io("stream_zip", self.iter_and_store(kind, item_id, version, iter_zip(entries)))
+
+    def build(self, kind: str, item_id: str, version: str, entries: Iterable[ZipEntry]) -> str | None:
+        """完整生成压缩包并写入缓存（Range 请求需要完整的文件，缓存未命中时先生成）
+
+        同一版本的压缩包逐字节相同，中途断开的下载可以从重新生成的文件续传。
+
+        Args:
+            kind: 条目类型（knowledge / persona）
+            item_id: 知识库或人设卡 ID
+            version: 打包内容的版本
+            entries: 压缩包条目
+
+        Returns:
+            Optional[str]: 压缩包路径；未启用缓存或压缩包超过容量上限时返回 None
+        """
+        if not self.enabled:
+            return None
+
+        for _chunk in self.iter_and_store(kind, item_id, version, iter_zip(entries)):
+            pass
+        path = self.archive_path(kind, item_id, version)
+        return path if os.path.exists(path) else None
+
+    def invalidate(self, kind: str, item_id: str) -> int:
+        """删除条目的所有缓存压缩包（正在写入的临时文件由写入方自行处理）
+
+        Args:
+            kind: 条目类型（knowledge / persona）
+            item_id: 知识库或人设卡 ID
+
+        Returns:
+            int: 删除的压缩包数量
+        """
+        item_dir = os.path.join(self.cache_dir, kind, item_id)
+        try:
+            entries = list(os.scandir(item_dir))
+        except FileNotFoundError:
+            return 0
+
+        removed = sum(1 for entry in entries if entry.name.endswith(".zip") and _remove(entry.path))
+        try:
+            os.rmdir(item_dir)
+        except OSError:
+            pass
+        if removed:
+            logger.debug(f"打包缓存已失效 ({kind}/{item_id}, removed={removed})")
+        return removed
+
+    def evict(self) -> int:
+        """按修改时间删除最久未下载的压缩包，直到总大小不超过容量上限
+
+        同时删除写入中断遗留的过期临时文件。
+
+        Returns:
+            int: 删除的压缩包数量
+        """
+        with self._evict_lock:
+            archives, total = self._scan()
+            removed = 0
+            for _mtime, size, path in sorted(archives):
+                if total <= self.max_bytes:
+                    break
+                if _remove(path):
+                    removed += 1
+                total -= size
+            self._total_bytes = total
+            self._scanned_at = time.monotonic()
+
+        if removed:
+            logger.info(f"打包缓存超出容量上限，删除 {removed} 个最久未下载的压缩包")
+        return removed
+
+    def _scan(self) -> tuple[list[tuple[float, int, str]], int]:
+        """遍历缓存目录，删除过期的临时文件
+
+        Returns:
+            tuple: 压缩包列表 [(修改时间, 大小, 路径)] 和总大小
+        """
+        now = time.time()
+        archives = []
+        total = 0
+        for root, _dirs, names in os.walk(self.cache_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if name.endswith(".part"):
+                    if now - stat.st_mtime > STALE_TEMP_SECONDS:
+                        _remove(path)
+                    continue
+                archives.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        return archives, total
+
+    def get_stats(self) -> dict[str, int]:
+        """获取缓存状态
+
+        Returns:
+            dict: 压缩包数量、总大小和容量上限（字节）
+        """
+        files = 0
+        total = 0
+        for root, _dirs, names in os.walk(self.cache_dir):
+            for name in names:
+                if name.endswith(".zip"):
+                    try:
+                        total += os.path.getsize(os.path.join(root, name))
+                        files += 1
+                    except FileNotFoundError:
+                        continue
+        return {"files": files, "bytes": total, "max_bytes": self.max_bytes}
+
+
+# 全局打包下载缓存实例（延迟初始化）
+_global_archive_cache: ArchiveCache | None = None
+_global_lock = threading.Lock()
+
+
+def get_archive_cache() -> ArchiveCache:
+    """获取全局打包下载缓存实例
+
+    Returns:
+        ArchiveCache 实例
+    """
+    global _global_archive_cache
+
+    if _global_archive_cache is None:
+        with _global_lock:
+            if _global_archive_cache is None:
+                from app.core.config import settings
+
+                _global_archive_cache = ArchiveCache(
+                    os.path.join(resolve_upload_dir(), ARCHIVE_CACHE_DIR_NAME),
+                    settings.ARCHIVE_CACHE_MAX_SIZE_MB * 1024 * 1024,
+                )
+
+    return _global_archive_cache
+
+
+def reset_archive_cache() -> None:
+    """重置全局打包下载缓存实例
+
+    用于测试或重新加载配置（缓存目录中的文件保留）。
+    """
+    global _global_archive_cache
+
+    with _global_lock:
+        _global_archive_cache = None
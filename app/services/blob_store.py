@@ -0,0 +1,514 @@
+"""
+按内容寻址的文件存储
+
+知识库和人设卡文件按 SHA-256 以 blobs/{hash[:2]}/{hash[2:4]}/{hash} 为键保存在存储后端中
+（本地后端即 {upload_dir}/blobs/...，也可以是 S3 兼容对象存储），
+相同内容无论被多少个知识库、人设卡或用户上传，只保存一份：
+- 文件记录的 content_hash 指向 blob；content_hash 为空的旧记录仍从 base_path/file_path 读取
+- file_blobs 表按 blob 记录引用计数，store 在调用方的事务中加一，release 减一
+- 已存在的内容不再写入（流式上传的临时文件直接删除）
+- 引用计数降为 0 的 blob 不立即删除，由 collect_garbage 在宽限期之后删除；
+  事务回滚留下的无记录 blob 同样由宽限期之后的回收删除
+- 回收在锁定 blob 记录的事务中删除文件：并发上传增加引用计数时等待回收提交，之后重新写入内容，
+  不会引用已被删除的文件
+- 知识库文件按 [upload.compression] 压缩保存，键加上编码后缀（blobs/.../{hash}.gz），
+  引用计数仍按内容的 SHA-256 记录；已保存的原始或压缩内容直接复用，不重复写入
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+import time
+from collections.abc import Iterable
+from datetime import datetime, timedelta
+from functools import partial
+from typing import NamedTuple, cast
+
+from sqlalchemy import CursorResult, func, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.storage import StorageBackend, StorageObject, get_storage_backend
+from app.models.database import FileBlob, KnowledgeBase, KnowledgeBaseFile, PersonaCard, PersonaCardFile
+from app.utils.compression import ENCODING_SUFFIXES, compress_bytes, compress_file, encoded_path, resolve_encoding
+from app.utils.file import StagedUpload
+from app.utils.zip_stream import ZipEntry, zip_entry_from_file, zip_entry_from_stream
+
+logger = logging.getLogger(__name__)
+
+# blob 目录名（位于上传目录下），也是 blob 对象键的前缀
+BLOB_DIR_NAME = "blobs"
+
+# 默认的垃圾回收宽限期（秒）
+DEFAULT_GC_GRACE_SECONDS = 3600
+
+# 回收时锁定的 blob 记录的引用计数（与记录的删除在同一事务中提交，其他事务看不到）
+GC_CLAIM_REF_COUNT = -1
+
+# 压缩后大于原始大小的该比例时保存原始内容（收益不足以抵消下载时解压的开销）
+MAX_COMPRESSED_RATIO = 0.9
+
+
+def resolve_upload_dir() -> str:
+    """按 UPLOAD_DIR 环境变量解析上传目录（与 FileService 一致）"""
+    base_dir = os.getenv("UPLOAD_DIR", "uploads") or "uploads"
+    if not (base_dir.startswith("/") or base_dir.startswith(".")):
+        base_dir = "./" + base_dir
+    return base_dir
+
+
+class StoredBlob(NamedTuple):
+    """写入存储后端的 blob"""
+
+    key: str
+    # 保存的编码（gzip / zstd），None 表示原始内容
+    encoding: str | None
+    # 存储中的字节数
+    stored_size: int
+
+
+class BlobStore:
+    """按 SHA-256 去重的文件存储，引用计数保存在 file_blobs 表"""
+
+    def __init__(self, db: Session, upload_dir: str | None = None, storage: StorageBackend | None = None):
+        """初始化 blob 存储
+
+        Args:
+            db: 数据库会话（引用计数的修改随调用方的事务提交）
+            upload_dir: 上传目录（可选，默认按 UPLOAD_DIR 解析）
+            storage: 存储后端（可选，默认按 [storage] 配置创建）
+        """
+        self.db = db
+        upload_dir = upload_dir or resolve_upload_dir()
+        self.blob_dir = os.path.join(upload_dir, BLOB_DIR_NAME)
+        self.storage = storage or get_storage_backend(upload_dir)
+
+    @staticmethod
+    def blob_key(content_hash: str, encoding: str | None = None) -> str:
+        """blob 在存储后端中的对象键
+
+        Args:
+            content_hash: 内容的 SHA-256
+            encoding: 压缩编码（可选，压缩保存的内容带有编码后缀）
+
+        Returns:
+            str: 对象键
+        """
+        return encoded_path(f"{BLOB_DIR_NAME}/{content_hash[:2]}/{content_hash[2:4]}/{content_hash}", encoding)
+
+    def blob_path(self, content_hash: str, encoding: str | None = None) -> str:
+        """blob 在本地存储后端中的文件路径
+
+        Args:
+            content_hash: 内容的 SHA-256
+            encoding: 压缩编码（可选）
+
+        Returns:
+            str: 文件路径
+        """
+        return encoded_path(os.path.join(self.blob_dir, content_hash[:2], content_hash[2:4], content_hash), encoding)
+
+    def resolve(
+        self, base_path: str, file_path: str, content_hash: str | None, encoding: str | None = None
+    ) -> str | None:
+        """文件记录对应的本机文件路径
+
+        Args:
+            base_path: 知识库 / 人设卡目录
+            file_path: 文件记录的 file_path
+            content_hash: 文件记录的 content_hash
+            encoding: 文件记录的 content_encoding（可选，压缩保存时返回压缩文件的路径）
+
+        Returns:
+            str | None: blob 路径，blob 保存在远程存储后端时为 None；旧记录为 base_path/file_path
+        """
+        if content_hash:
+            return self.storage.local_path(self.blob_key(content_hash, encoding))
+        return os.path.join(base_path, file_path)
+
+    def file_exists(
+        self, base_path: str, file_path: str, content_hash: str | None, encoding: str | None = None
+    ) -> bool:
+        """文件记录对应的内容是否存在（阻塞，远程后端会发出请求）
+
+        Args:
+            base_path: 知识库 / 人设卡目录
+            file_path: 文件记录的 file_path
+            content_hash: 文件记录的 content_hash
+            encoding: 文件记录的 content_encoding（可选）
+
+        Returns:
+            bool: 内容是否存在
+        """
+        if content_hash:
+            return self.storage.exists(self.blob_key(content_hash, encoding))
+        return os.path.exists(os.path.join(base_path, file_path))
+
+    def zip_entry(
+        self,
+        base_path: str,
+        file_path: str,
+        content_hash: str | None,
+        arcname: str,
+        mtime: float | None = None,
+        encoding: str | None = None,
+        size: int | None = None,
+    ) -> ZipEntry:
+        """文件记录对应的压缩包条目（阻塞，读取文件信息）
+
+        Args:
+            base_path: 知识库 / 人设卡目录
+            file_path: 文件记录的 file_path
+            content_hash: 文件记录的 content_hash
+            arcname: 压缩包中的文件名
+            mtime: 修改时间（可选，默认为文件 / 对象的修改时间）
+            encoding: 文件记录的 content_encoding（可选，压缩保存的内容由 iter_zip 复用或解压）
+            size: 原始大小（压缩保存时必需）
+
+        Returns:
+            ZipEntry: 压缩包条目
+
+        Raises:
+            FileNotFoundError: 内容不存在
+        """
+        local_path = self.resolve(base_path, file_path, content_hash, encoding)
+        if local_path is not None:
+            entry = zip_entry_from_file(local_path, arcname, mtime)
+        else:
+            key = self.blob_key(content_hash, encoding)
+            stat = self.storage.stat(key)
+            if stat is None:
+                raise FileNotFoundError(key)
+            entry = zip_entry_from_stream(
+                partial(self.storage.open, key), arcname, stat.size, stat.mtime if mtime is None else mtime
+            )
+        if encoding:
+            # 条目大小为原始大小，保存的压缩内容由 iter_zip 复用或解压
+            entry = entry._replace(size=size or 0, encoding=encoding)
+        return entry
+
+    def store(self, content: bytes | StagedUpload, content_hash: str | None = None) -> tuple[str, int]:
+        """保存文件内容并增加引用计数
+
+        引用计数随调用方的事务提交；blob 已存在时不写入磁盘。
+
+        Args:
+            content: 文件内容（字节，或已写入临时文件的 StagedUpload）
+            content_hash: 内容的 SHA-256（可选，默认使用 StagedUpload 的结果或现场计算）
+
+        Returns:
+            tuple: (内容的 SHA-256, 文件大小)
+        """
+        if content_hash is None:
+            content_hash = content.sha256 if isinstance(content, StagedUpload) else hashlib.sha256(content).hexdigest()
+        size = len(content)
+
+        self.acquire(content_hash, size)
+        self.put(content, content_hash)
+        return content_hash, size
+
+    def acquire(self, content_hash: str, size: int) -> None:
+        """引用计数加一，blob 记录不存在时创建（随调用方的事务提交）
+
+        必须在 put 之前调用：正在回收同一 blob 时会等待回收提交，put 随后发现内容已删除并重新写入。
+
+        Args:
+            content_hash: 内容的 SHA-256
+            size: 文件大小
+        """
+        now = datetime.now()
+        if self.db.get_bind().dialect.name == "sqlite":
+            stmt = sqlite_insert(FileBlob).values(
+                hash=content_hash, size=size, ref_count=1, created_at=now, updated_at=now
+            )
+            self.db.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[FileBlob.hash],
+                    set_={"ref_count": FileBlob.ref_count + 1, "updated_at": now},
+                )
+            )
+            return
+
+        result = cast(
+            CursorResult,
+            self.db.execute(
+                update(FileBlob)
+                .where(FileBlob.hash == content_hash)
+                .values(ref_count=FileBlob.ref_count + 1, updated_at=now)
+            ),
+        )
+        if result.rowcount == 0:
+            self.db.add(FileBlob(hash=content_hash, size=size, ref_count=1, created_at=now, updated_at=now))
+            self.db.flush()
+
+    def put(self, content: bytes | StagedUpload, content_hash: str, compress: bool = False) -> StoredBlob:
+        """把内容写入存储后端，不修改引用计数（只访问存储，可在文件 I/O 线程中执行）
+
+        压缩保存时 StagedUpload.path 为 None（存储中没有原始内容）。
+
+        Args:
+            content: 文件内容（字节，或已写入临时文件的 StagedUpload）
+            content_hash: 内容的 SHA-256
+            compress: 是否按 [upload.compression] 配置压缩保存（已保存的原始内容直接复用）
+
+        Returns:
+            StoredBlob: blob 的对象键、编码和存储中的大小
+        """
+        size = len(content)
+        encoding = resolve_encoding(settings.UPLOAD_COMPRESSION) if compress else None
+        if encoding and size < settings.UPLOAD_COMPRESSION_MIN_SIZE:
+            encoding = None
+
+        if encoding:
+            key = self.blob_key(content_hash, encoding)
+            stat = self.storage.stat(key)
+            if stat is not None:
+                self._reuse(content, content_hash, None)
+                return StoredBlob(key, encoding, stat.size)
+
+        key = self.blob_key(content_hash)
+        if self.storage.exists(key):
+            self._reuse(content, content_hash, self.storage.local_path(key))
+            return StoredBlob(key, None, size)
+
+        if encoding:
+            stored = self._put_compressed(content, content_hash, encoding)
+            if stored is not None:
+                return stored
+
+        if isinstance(content, StagedUpload):
+            # 本地后端原子移动临时文件，远程后端上传后删除临时文件
+            self.storage.put_file(key, content.temp_path, content_hash)
+            content.path = self.storage.local_path(key)
+        else:
+            self.storage.put_bytes(key, content)
+        return StoredBlob(key, None, size)
+
+    @staticmethod
+    def _reuse(content: bytes | StagedUpload, content_hash: str, path: str | None) -> None:
+        if isinstance(content, StagedUpload):
+            # 临时文件不再需要，之后从已有的 blob 读取
+            content.discard()
+            content.path = path
+        logger.debug(f"blob 已存在，跳过写入 (hash={content_hash})")
+
+    def _put_compressed(self, content: bytes | StagedUpload, content_hash: str, encoding: str) -> StoredBlob | None:
+        """压缩后写入存储后端，压缩收益不足时返回 None（由调用方保存原始内容）"""
+        size = len(content)
+        level = settings.UPLOAD_COMPRESSION_LEVEL
+        key = self.blob_key(content_hash, encoding)
+        if not isinstance(content, StagedUpload):
+            data = compress_bytes(content, encoding, level)
+            if len(data) > size * MAX_COMPRESSED_RATIO:
+                return None
+            self.storage.put_bytes(key, data)
+            return StoredBlob(key, encoding, len(data))
+
+        # 压缩结果写到临时文件旁边，与临时文件一样以 "." 开头
+        fd, compressed_path = tempfile.mkstemp(
+            prefix=".compress-", suffix=ENCODING_SUFFIXES[encoding], dir=os.path.dirname(content.temp_path)
+        )
+        os.close(fd)
+        try:
+            stored_size = compress_file(content.temp_path, compressed_path, encoding, level)
+            if stored_size > size * MAX_COMPRESSED_RATIO:
+                return None
+            self.storage.put_file(key, compressed_path)
+        finally:
+            if os.path.exists(compressed_path):
+                os.remove(compressed_path)
+        content.discard()
+        content.path = None
+        return StoredBlob(key, encoding, stored_size)
+
+    def release(self, content_hash: str | None) -> None:
+        """引用计数减一（随调用方的事务提交，磁盘文件由 collect_garbage 删除）
+
+        Args:
+            content_hash: 内容的 SHA-256（为空时忽略）
+        """
+        if not content_hash:
+            return
+        self.db.execute(
+            update(FileBlob)
+            .where(FileBlob.hash == content_hash, FileBlob.ref_count > 0)
+            .values(ref_count=FileBlob.ref_count - 1, updated_at=datetime.now())
+        )
+
+    def release_file(self, base_path: str | None, file_path: str, content_hash: str | None) -> None:
+        """删除文件记录对应的内容：blob 减少引用计数，旧记录直接删除磁盘文件
+
+        Args:
+            base_path: 知识库 / 人设卡目录
+            file_path: 文件记录的 file_path
+            content_hash: 文件记录的 content_hash
+        """
+        if content_hash:
+            self.release(content_hash)
+            return
+        if base_path:
+            # 旧记录的文件始终在本地上传目录中
+            legacy_path = os.path.join(base_path, file_path)
+            if os.path.exists(legacy_path):
+                os.remove(legacy_path)
+
+    def release_all(self, content_hashes: Iterable[str | None]) -> None:
+        """对每个 content_hash 减少一次引用计数
+
+        Args:
+            content_hashes: 被删除的文件记录的 content_hash
+        """
+        for content_hash in content_hashes:
+            self.release(content_hash)
+
+    def recount(self) -> int:
+        """按现存的文件记录重新计算引用计数（修正直接删除记录等造成的偏差）
+
+        只统计所属知识库 / 人设卡仍存在的文件记录。
+
+        Returns:
+            int: 引用计数被修正的 blob 数量
+        """
+        counts: dict[str, int] = {}
+        queries = (
+            self.db.query(KnowledgeBaseFile.content_hash, func.count())
+            .join(KnowledgeBase, KnowledgeBase.id == KnowledgeBaseFile.knowledge_base_id)
+            .filter(KnowledgeBaseFile.content_hash.isnot(None))
+            .group_by(KnowledgeBaseFile.content_hash),
+            self.db.query(PersonaCardFile.content_hash, func.count())
+            .join(PersonaCard, PersonaCard.id == PersonaCardFile.persona_card_id)
+            .filter(PersonaCardFile.content_hash.isnot(None))
+            .group_by(PersonaCardFile.content_hash),
+        )
+        for query in queries:
+            for content_hash, count in query:
+                counts[content_hash] = counts.get(content_hash, 0) + count
+
+        fixed = 0
+        for blob in self.db.query(FileBlob).all():
+            expected = counts.pop(blob.hash, 0)
+            if blob.ref_count != expected:
+                blob.ref_count = expected
+                fixed += 1
+        # 有文件记录但缺少 blob 记录（例如从备份恢复的数据库）
+        for content_hash, count in counts.items():
+            stat = self.storage.stat(self.blob_key(content_hash))
+            self.db.add(FileBlob(hash=content_hash, size=stat.size if stat else 0, ref_count=count))
+            fixed += 1
+
+        self.db.commit()
+        return fixed
+
+    def collect_garbage(self, grace_seconds: int = DEFAULT_GC_GRACE_SECONDS) -> dict[str, int]:
+        """删除无引用的 blob
+
+        删除引用计数为 0 且超过宽限期未被引用的 blob 记录和文件，
+        以及超过宽限期仍没有记录的 blob 文件（事务回滚或中断留下）。
+
+        Args:
+            grace_seconds: 宽限期（秒）
+
+        Returns:
+            dict: 删除的记录数、文件数和释放的字节数
+        """
+        cutoff = datetime.now() - timedelta(seconds=grace_seconds)
+        removed_records = removed_files = freed_bytes = 0
+
+        candidates = [
+            content_hash
+            for (content_hash,) in self.db.query(FileBlob.hash).filter(
+                FileBlob.ref_count <= 0, FileBlob.updated_at < cutoff
+            )
+        ]
+        for content_hash in candidates:
+            removed, freed = self._collect_blob(content_hash, cutoff)
+            removed_records += removed
+            if freed is not None:
+                removed_files += 1
+                freed_bytes += freed
+
+        known = {content_hash for (content_hash,) in self.db.query(FileBlob.hash)}
+        orphan_cutoff = time.time() - grace_seconds
+        for obj in self.storage.list(f"{BLOB_DIR_NAME}/"):
+            # 压缩内容去掉编码后缀后匹配记录；写入中断留下的临时文件以 "." 开头，不会与记录匹配，同样超过宽限期后删除
+            if obj.key.rpartition("/")[2].partition(".")[0] in known or obj.mtime >= orphan_cutoff:
+                continue
+            if self._collect_orphan(obj):
+                freed_bytes += obj.size
+                removed_files += 1
+
+        if removed_records or removed_files:
+            logger.info(
+                f"blob 垃圾回收: 删除记录 {removed_records} 条，文件 {removed_files} 个，释放 {freed_bytes} 字节"
+            )
+        return {"removed_records": removed_records, "removed_files": removed_files, "freed_bytes": freed_bytes}
+
+    def _collect_blob(self, content_hash: str, cutoff: datetime) -> tuple[bool, int | None]:
+        """删除无引用的 blob 记录和文件（同一事务）
+
+        先锁定记录（行锁，SQLite 为写锁）再删除文件，最后删除记录并提交：
+        期间被重新引用的 blob 不满足条件，不会被删除；锁定之后的上传等待提交，之后创建新记录并重新写入内容。
+
+        Returns:
+            tuple: (是否删除了记录, 释放的字节数，没有删除任何文件时为 None)
+        """
+        try:
+            claimed = cast(
+                CursorResult,
+                self.db.execute(
+                    update(FileBlob)
+                    .where(FileBlob.hash == content_hash, FileBlob.ref_count <= 0, FileBlob.updated_at < cutoff)
+                    .values(ref_count=GC_CLAIM_REF_COUNT)
+                ),
+            ).rowcount
+            if not claimed:
+                self.db.rollback()
+                return False, None
+            freed = self._remove_blob_file(content_hash)
+            self.db.query(FileBlob).filter(FileBlob.hash == content_hash).delete(synchronize_session=False)
+            self.db.commit()
+        except SQLAlchemyError as e:
+            self.db.rollback()
+            logger.warning(f"回收 blob 失败，下次重试 (hash={content_hash}): {e}")
+            return False, None
+        return True, freed
+
+    def _collect_orphan(self, obj: StorageObject) -> bool:
+        """删除没有记录的 blob 对象，返回是否已删除
+
+        以内容 hash 命名的对象先插入占位记录再删除，与上传创建同一 blob 的记录互斥：
+        上传已创建记录（尚未提交时等待其提交）时插入冲突，不删除。
+        """
+        content_hash = obj.key.rpartition("/")[2].partition(".")[0]
+        try:
+            if content_hash:
+                self.db.add(FileBlob(hash=content_hash, size=obj.size, ref_count=GC_CLAIM_REF_COUNT))
+                self.db.flush()
+            deleted = self.storage.delete(obj.key)
+            if content_hash:
+                self.db.query(FileBlob).filter(FileBlob.hash == content_hash).delete(synchronize_session=False)
+            self.db.commit()
+        except IntegrityError:
+            self.db.rollback()
+            return False
+        except (SQLAlchemyError, OSError) as e:
+            self.db.rollback()
+            logger.warning(f"删除无记录的 blob 失败 ({obj.key}): {e}")
+            return False
+        return deleted
+
+    def _remove_blob_file(self, content_hash: str) -> int | None:
+        """删除 blob 的原始内容和所有压缩内容，返回释放的字节数（没有删除任何对象时为 None）"""
+        freed = None
+        for encoding in (None, *ENCODING_SUFFIXES):
+            key = self.blob_key(content_hash, encoding)
+            try:
+                stat = self.storage.stat(key)
+                if stat is not None and self.storage.delete(key):
+                    freed = (freed or 0) + stat.size
+            except OSError as e:
+                logger.warning(f"删除 blob 失败 ({key}): {e}")
+        return freed
@@ -3,10 +3,10 @@
 处理文件上传、下载、删除等业务逻辑
 """
 
+import hashlib
+import logging
 import os
 import shutil
-import tempfile
-import zipfile
 from datetime import datetime
 from typing import Any
 
@@ -17,6 +17,21 @@ from werkzeug.utils import secure_filename
 from app.core.config import settings
 from app.core.config_manager import config_manager
 from app.models.database import KnowledgeBase, KnowledgeBaseFile, PersonaCard, PersonaCardFile, User
+from app.services.archive_cache import (
+    ARCHIVE_KIND_KNOWLEDGE,
+    ARCHIVE_KIND_PERSONA,
+    archive_version,
+    get_archive_cache,
+)
+from app.services.blob_store import BlobStore, StoredBlob
+from app.utils.file import StagedUpload
+from app.utils.file_io import StageTimer, map_file_io
+from app.utils.zip_stream import zip_entry_from_bytes
+
+logger = logging.getLogger(__name__)
+
+# 上传文件内容：内存中的字节，或路由层通过 stage_upload 流式写入临时文件的 StagedUpload
+FileContent = bytes | StagedUpload
 
 
 class FileValidationError(Exception):
@@ -37,6 +52,11 @@ class FileDatabaseError(Exception):
         super().__init__(self.message)
 
 
+def _timestamp(record: Any) -> float | None:
+    """压缩包条目的修改时间：使用记录的更新时间，同一版本的压缩包逐字节相同（强 ETag、断点续传依赖这一点）"""
+    return record.updated_at.timestamp() if record.updated_at else None
+
+
 class FileService:
     """文件服务类"""
 
@@ -46,6 +66,7 @@ class FileService:
     MAX_PERSONA_FILES = config_manager.get_int("upload.persona.max_files", 1)
     ALLOWED_KNOWLEDGE_TYPES = config_manager.get_list("upload.knowledge.allowed_types", [".txt", ".json"])
     ALLOWED_PERSONA_TYPES = config_manager.get_list("upload.persona.allowed_types", [".toml"])
+    MAX_PARALLEL_FILES = settings.UPLOAD_MAX_PARALLEL_FILES
 
     def __init__(self, db: Session):
         """初始化文件服务
@@ -64,17 +85,21 @@ class FileService:
         self.upload_dir = base_dir
         self.knowledge_dir = os.path.join(self.upload_dir, "knowledge")
         self.persona_dir = os.path.join(self.upload_dir, "persona")
+        # 上传文件流式写入的临时目录，与最终目录位于同一文件系统以便原子移动
+        self.staging_dir = os.path.join(self.upload_dir, ".staging")
+        # 文件内容按 SHA-256 去重存放在 blob 目录
+        self.blob_store = BlobStore(db, self.upload_dir)
 
         # 确保目录存在
         os.makedirs(self.upload_dir, exist_ok=True)
         os.makedirs(self.knowledge_dir, exist_ok=True)
         os.makedirs(self.persona_dir, exist_ok=True)
 
-    def _save_file(self, file_content: bytes, filename: str, target_dir: str) -> tuple[str, int]:
+    def _save_file(self, file_content: FileContent, filename: str, target_dir: str) -> tuple[str, int]:
         """保存文件到目标目录
 
         Args:
-            file_content: 文件内容（字节）
+            file_content: 文件内容（字节，或已写入临时文件的 StagedUpload）
             filename: 文件名
             target_dir: 目标目录
 
@@ -82,6 +107,10 @@ class FileService:
             tuple: (文件路径, 文件大小)
         """
         try:
+            if isinstance(file_content, StagedUpload):
+                # 临时文件原子地移动到位，不再读入内存
+                return file_content.commit(target_dir, filename), file_content.size
+
             # 确保目录存在
             os.makedirs(target_dir, exist_ok=True)
 
@@ -107,6 +136,81 @@ class FileService:
         except Exception as e:
             raise FileDatabaseError(f"文件保存失败: {str(e)}") from e
 
+    @staticmethod
+    def _content_hash(file_content: FileContent) -> str:
+        """文件内容的 SHA-256（StagedUpload 使用写入时计算的结果）"""
+        if isinstance(file_content, StagedUpload):
+            return file_content.sha256
+        return hashlib.sha256(file_content).hexdigest()
+
+    def _store_file(self, file_content: FileContent) -> tuple[str, int]:
+        """把文件内容保存到 blob 存储（内容已存在时只增加引用计数）
+
+        Args:
+            file_content: 文件内容（字节，或已写入临时文件的 StagedUpload）
+
+        Returns:
+            tuple: (内容的 SHA-256, 文件大小)
+        """
+        try:
+            return self.blob_store.store(file_content, self._content_hash(file_content))
+        except Exception as e:
+            raise FileDatabaseError(f"文件保存失败: {str(e)}") from e
+
+    def _store_files(
+        self, contents: list[FileContent], timer: StageTimer, compress: bool = False
+    ) -> list[tuple[str, int, StoredBlob]]:
+        """把多个文件内容保存到 blob 存储
+
+        计算哈希（字节内容）和写入磁盘（包括压缩）按 MAX_PARALLEL_FILES 并行执行；引用计数在当前线程中
+        按顺序更新（数据库会话不能跨线程使用），并在写入之前完成，与 BlobStore.store 的顺序一致。
+
+        Args:
+            contents: 文件内容列表
+            timer: 阶段计时器（记录 hash、register、write 三个阶段）
+            compress: 是否按 [upload.compression] 配置压缩保存
+
+        Returns:
+            list: 每个文件的 (内容的 SHA-256, 文件大小, 写入的 blob)
+        """
+        try:
+            with timer.stage("hash"):
+                hashes = map_file_io("upload-hash", self._content_hash, contents, self.MAX_PARALLEL_FILES)
+            with timer.stage("register"):
+                for content_hash, file_content in zip(hashes, contents, strict=True):
+                    self.blob_store.acquire(content_hash, len(file_content))
+            with timer.stage("write"):
+                sizes = [len(file_content) for file_content in contents]
+                stored = map_file_io(
+                    "upload-write",
+                    lambda item: self.blob_store.put(*item, compress=compress),
+                    list(zip(contents, hashes, strict=True)),
+                    self.MAX_PARALLEL_FILES,
+                )
+        except Exception as e:
+            raise FileDatabaseError(f"文件保存失败: {str(e)}") from e
+        return list(zip(hashes, sizes, stored, strict=True))
+
+    def validate_knowledge_file_types(self, filenames: list[str]) -> None:
+        """在接收文件内容之前按文件名检查知识库文件的数量和类型
+
+        Args:
+            filenames: 文件名列表
+
+        Raises:
+            FileValidationError: 文件数量超过限制或类型不支持
+        """
+        if len(filenames) > self.MAX_KNOWLEDGE_FILES:
+            raise FileValidationError(
+                f"文件数量超过限制，最多允许{self.MAX_KNOWLEDGE_FILES}个文件", code="FILE_COUNT_EXCEEDED"
+            )
+        for filename in filenames:
+            if not self._validate_file_type(filename, self.ALLOWED_KNOWLEDGE_TYPES):
+                raise FileValidationError(
+                    f"不支持的文件类型: {filename}。仅支持{', '.join(self.ALLOWED_KNOWLEDGE_TYPES)}文件",
+                    code="INVALID_FILE_TYPE",
+                )
+
     def _validate_file_type(self, filename: str, allowed_types: list[str]) -> bool:
         """验证文件类型
 
@@ -263,16 +367,20 @@ class FileService:
 
     def upload_knowledge_base(
         self,
-        files: list[tuple[str, bytes]],  # List of (filename, content)
+        files: list[tuple[str, FileContent]],  # List of (filename, content)
         name: str,
         description: str,
         uploader_id: str,
         copyright_owner: str | None = None,
         content: str | None = None,
         tags: str | None = None,
+        timer: StageTimer | None = None,
     ) -> KnowledgeBase:
         """上传知识库
 
+        所有文件先完成校验；哈希和写入在多个文件之间并行执行（见 _store_files），
+        任一步骤失败时回滚事务并删除知识库目录，不会留下部分上传的知识库。
+
         Args:
             files: 文件列表，每个元素为(文件名, 文件内容)元组
             name: 知识库名称
@@ -281,28 +389,20 @@ class FileService:
             copyright_owner: 版权所有者
             content: 内容
             tags: 标签
+            timer: 阶段计时器（可选，记录 validate、hash、register、write、commit 各阶段耗时）
 
         Returns:
             KnowledgeBase: 创建的知识库对象
         """
-        # 验证文件数量
-        if len(files) > self.MAX_KNOWLEDGE_FILES:
-            raise FileValidationError(
-                f"文件数量超过限制，最多允许{self.MAX_KNOWLEDGE_FILES}个文件", code="FILE_COUNT_EXCEEDED"
-            )
+        timer = timer or StageTimer("upload_knowledge_base")
 
-        # 验证文件类型和大小
-        for filename, file_content in files:
-            if not self._validate_file_type(filename, self.ALLOWED_KNOWLEDGE_TYPES):
+        # 验证文件数量、类型和大小
+        with timer.stage("validate"):
+            if len(files) > self.MAX_KNOWLEDGE_FILES:
                 raise FileValidationError(
-                    f"不支持的文件类型: {filename}。仅支持{', '.join(self.ALLOWED_KNOWLEDGE_TYPES)}文件",
-                    code="INVALID_FILE_TYPE",
-                )
-
-            if not self._validate_file_size(len(file_content)):
-                raise FileValidationError(
-                    f"文件过大: {filename}。最大允许{self.MAX_FILE_SIZE // (1024*1024)}MB", code="FILE_SIZE_EXCEEDED"
+                    f"文件数量超过限制，最多允许{self.MAX_KNOWLEDGE_FILES}个文件", code="FILE_COUNT_EXCEEDED"
                 )
+            self._validate_knowledge_base_files_type_and_size(files)
 
         # 创建知识库目录
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -326,23 +426,11 @@ class FileService:
             self.db.flush()  # 获取ID
 
             # 保存文件
-            for filename, file_content in files:
-                file_path, file_size = self._save_file(file_content, filename, kb_dir)
-                file_ext = os.path.splitext(filename)[1].lower()
-
-                # 创建文件记录
-                kb_file = KnowledgeBaseFile(
-                    knowledge_base_id=kb.id,
-                    file_name=filename,
-                    original_name=filename,
-                    file_path=os.path.basename(file_path),
-                    file_type=file_ext,
-                    file_size=file_size,
-                )
-                self.db.add(kb_file)
+            self._save_knowledge_base_files(kb.id, files, kb_dir, timer)
 
-            self.db.commit()
-            self.db.refresh(kb)
+            with timer.stage("commit"):
+                self.db.commit()
+                self.db.refresh(kb)
             return kb
 
         except Exception as e:
@@ -354,7 +442,7 @@ class FileService:
 
     def upload_persona_card(
         self,
-        files: list[tuple[str, bytes]],  # List of (filename, content)
+        files: list[tuple[str, FileContent]],  # List of (filename, content)
         name: str,
         description: str,
         uploader_id: str,
@@ -380,11 +468,13 @@ class FileService:
         pc_dir = self._create_persona_card_directory(uploader_id)
 
         try:
-            file_path, file_size, persona_version = self._process_persona_card_file(file_content, filename, pc_dir)
+            content_hash, file_size, persona_version = self._process_persona_card_file(file_content)
             pc = self._create_persona_card_record(
                 name, description, uploader_id, copyright_owner, content, tags, pc_dir, persona_version
             )
-            self._create_persona_card_file_record(pc.id, filename, file_path, file_size)
+            self._create_persona_card_file_record(
+                pc.id, filename, secure_filename(filename), file_size, content_hash=content_hash
+            )
 
             self.db.commit()
             self.db.refresh(pc)
@@ -397,7 +487,7 @@ class FileService:
                 raise
             raise FileDatabaseError(f"人设卡保存失败: {str(e)}") from e
 
-    def _validate_persona_card_files(self, files: list[tuple[str, bytes]]) -> tuple[str, bytes]:
+    def _validate_persona_card_files(self, files: list[tuple[str, FileContent]]) -> tuple[str, FileContent]:
         """验证人设卡文件
 
         Args:
@@ -453,36 +543,29 @@ class FileService:
         os.makedirs(pc_dir, exist_ok=True)
         return pc_dir
 
-    def _process_persona_card_file(
-        self, file_content: bytes, filename: str, pc_dir: str
-    ) -> tuple[str, int, str | None]:
-        """处理人设卡文件
+    def _process_persona_card_file(self, file_content: FileContent) -> tuple[str, int, str]:
+        """处理人设卡文件（文件名已验证为 bot_config.toml）
 
         Args:
             file_content: 文件内容
-            filename: 文件名
-            pc_dir: 人设卡目录
 
         Returns:
-            (文件路径, 文件大小, 版本号) 元组
+            (内容的 SHA-256, 文件大小, 版本号) 元组
 
         Raises:
             FileValidationError: 文件处理失败
         """
-        file_path, file_size = self._save_file(file_content, filename, pc_dir)
-        file_ext = os.path.splitext(filename)[1].lower()
-
-        persona_version = None
-        if file_ext == ".toml":
-            persona_version = self._parse_persona_card_version(file_path)
+        # 先解析再保存，解析失败时不写入存储
+        persona_version = self._parse_persona_card_version(file_content)
+        content_hash, file_size = self._store_file(file_content)
 
-        return file_path, file_size, persona_version
+        return content_hash, file_size, persona_version
 
-    def _parse_persona_card_version(self, file_path: str) -> str:
+    def _parse_persona_card_version(self, file_content: FileContent) -> str:
         """解析人设卡版本号
 
         Args:
-            file_path: TOML 文件路径
+            file_content: TOML 文件内容（字节，或已写入临时文件的 StagedUpload）
 
         Returns:
             版本号
@@ -491,8 +574,11 @@ class FileService:
             FileValidationError: 解析失败
         """
         try:
-            with open(file_path, encoding="utf-8") as f:
-                toml_data = toml.load(f)
+            if isinstance(file_content, StagedUpload):
+                with open(file_content.path or file_content.temp_path, encoding="utf-8") as f:
+                    toml_data = toml.load(f)
+            else:
+                toml_data = toml.loads(file_content.decode("utf-8"))
             persona_version = self._extract_version_from_toml(toml_data)
             if not persona_version:
                 raise FileValidationError(
@@ -551,7 +637,7 @@ class FileService:
         return pc
 
     def _create_persona_card_file_record(
-        self, persona_card_id: str, filename: str, file_path: str, file_size: int
+        self, persona_card_id: str, filename: str, file_path: str, file_size: int, content_hash: str | None = None
     ) -> None:
         """创建人设卡文件记录
 
@@ -560,6 +646,7 @@ class FileService:
             filename: 文件名
             file_path: 文件路径
             file_size: 文件大小
+            content_hash: 文件内容的 SHA-256
         """
         file_ext = os.path.splitext(filename)[1].lower()
         pc_file = PersonaCardFile(
@@ -569,6 +656,7 @@ class FileService:
             file_path=os.path.basename(file_path),
             file_type=file_ext,
             file_size=file_size,
+            content_hash=content_hash,
         )
         self.db.add(pc_file)
 
@@ -662,28 +750,35 @@ class FileService:
             ],
         }
 
-    def add_files_to_knowledge_base(self, kb_id: str, files: list[tuple[str, bytes]], user_id: str) -> KnowledgeBase:
+    def add_files_to_knowledge_base(
+        self, kb_id: str, files: list[tuple[str, FileContent]], user_id: str, timer: StageTimer | None = None
+    ) -> KnowledgeBase:
         """向知识库添加文件
 
         Args:
             kb_id: 知识库ID
             files: 文件列表，每个元素为(文件名, 文件内容)元组
             user_id: 用户ID
+            timer: 阶段计时器（可选，记录 validate、hash、register、write、commit 各阶段耗时）
 
         Returns:
             KnowledgeBase: 更新后的知识库对象
         """
-        kb = self._get_knowledge_base_for_file_addition(kb_id)
-        current_files = self._get_current_knowledge_base_files(kb_id)
+        timer = timer or StageTimer("add_knowledge_base_files")
 
-        self._validate_knowledge_base_file_addition(files, current_files)
-        kb_dir = self._get_knowledge_base_directory(kb)
+        with timer.stage("validate"):
+            kb = self._get_knowledge_base_for_file_addition(kb_id)
+            current_files = self._get_current_knowledge_base_files(kb_id)
+
+            self._validate_knowledge_base_file_addition(files, current_files)
+            kb_dir = self._get_knowledge_base_directory(kb)
 
         try:
-            self._save_knowledge_base_files(kb_id, files, kb_dir)
+            self._save_knowledge_base_files(kb_id, files, kb_dir, timer)
             kb.updated_at = datetime.now()
-            self.db.commit()
-            self.db.refresh(kb)
+            with timer.stage("commit"):
+                self.db.commit()
+                self.db.refresh(kb)
             return kb
 
         except Exception as e:
@@ -720,7 +815,7 @@ class FileService:
         """
         return self.db.query(KnowledgeBaseFile).filter(KnowledgeBaseFile.knowledge_base_id == kb_id).all()
 
-    def _validate_knowledge_base_file_addition(self, files: list[tuple[str, bytes]], current_files: list) -> None:
+    def _validate_knowledge_base_file_addition(self, files: list[tuple[str, FileContent]], current_files: list) -> None:
         """验证知识库文件添加
 
         Args:
@@ -750,7 +845,9 @@ class FileService:
                 code="FILE_COUNT_EXCEEDED",
             )
 
-    def _check_knowledge_base_duplicate_filenames(self, files: list[tuple[str, bytes]], current_files: list) -> None:
+    def _check_knowledge_base_duplicate_filenames(
+        self, files: list[tuple[str, FileContent]], current_files: list
+    ) -> None:
         """检查知识库重复文件名
 
         Args:
@@ -765,7 +862,7 @@ class FileService:
             if filename in existing_file_names:
                 raise FileValidationError(f"文件名已存在: {filename}", code="DUPLICATE_FILENAME")
 
-    def _validate_knowledge_base_files_type_and_size(self, files: list[tuple[str, bytes]]) -> None:
+    def _validate_knowledge_base_files_type_and_size(self, files: list[tuple[str, FileContent]]) -> None:
         """验证知识库文件类型和大小
 
         Args:
@@ -803,25 +900,32 @@ class FileService:
             raise FileDatabaseError("知识库目录不存在")
         return kb_dir
 
-    def _save_knowledge_base_files(self, kb_id: str, files: list[tuple[str, bytes]], kb_dir: str) -> None:
-        """保存知识库文件
+    def _save_knowledge_base_files(
+        self, kb_id: str, files: list[tuple[str, FileContent]], kb_dir: str, timer: StageTimer
+    ) -> None:
+        """保存知识库文件并创建文件记录（随调用方的事务提交）
 
         Args:
             kb_id: 知识库ID
             files: 文件列表
             kb_dir: 知识库目录
+            timer: 阶段计时器
         """
-        for filename, file_content in files:
-            file_path, file_size = self._save_file(file_content, filename, kb_dir)
+        stored = self._store_files([file_content for _, file_content in files], timer, compress=True)
+        for (filename, _), (content_hash, file_size, blob) in zip(files, stored, strict=True):
             file_ext = os.path.splitext(filename)[1].lower()
 
+            # 创建文件记录（内容在 blob 存储中，file_path 只保留安全的文件名）
             kb_file = KnowledgeBaseFile(
                 knowledge_base_id=kb_id,
                 file_name=filename,
                 original_name=filename,
-                file_path=os.path.basename(file_path),
+                file_path=secure_filename(filename),
                 file_type=file_ext,
                 file_size=file_size,
+                content_hash=content_hash,
+                content_encoding=blob.encoding,
+                stored_size=blob.stored_size,
             )
             self.db.add(kb_file)
 
@@ -856,10 +960,8 @@ class FileService:
             raise FileDatabaseError("知识库目录不存在")
 
         try:
-            # 删除物理文件
-            file_full_path = os.path.join(kb_dir, kb_file.file_path)
-            if os.path.exists(file_full_path):
-                os.remove(file_full_path)
+            # 删除物理文件（blob 只减少引用计数）
+            self.blob_store.release_file(kb_dir, kb_file.file_path, kb_file.content_hash)
 
             # 删除数据库记录
             self.db.delete(kb_file)
@@ -888,6 +990,19 @@ class FileService:
         if not kb:
             return False
 
+        # 删除文件记录并减少 blob 引用计数
+        kb_files = self.db.query(KnowledgeBaseFile).filter(KnowledgeBaseFile.knowledge_base_id == kb_id).all()
+        if kb_files:
+            try:
+                self.blob_store.release_all(kb_file.content_hash for kb_file in kb_files)
+                for kb_file in kb_files:
+                    self.db.delete(kb_file)
+                self.db.commit()
+            except Exception as e:
+                self.db.rollback()
+                print(f"删除知识库文件记录失败 {kb_id}: {str(e)}")
+                return False
+
         # 获取知识库目录
         kb_dir = kb.base_path
         if kb_dir and os.path.exists(kb_dir):
@@ -901,13 +1016,16 @@ class FileService:
         return True
 
     def create_knowledge_base_zip(self, kb_id: str) -> dict:
-        """创建知识库的ZIP文件
+        """准备知识库的ZIP压缩包
+
+        内容未变化时返回已缓存的压缩包，否则返回压缩包条目，由 ArchiveCache.stream 边生成边发送并写入缓存。
 
         Args:
             kb_id: 知识库ID
 
         Returns:
-            dict: 包含zip_path和zip_filename的字典
+            dict: 包含zip_filename、version（打包内容的版本，用作 ETag），
+                以及 archive_path（已缓存的压缩包）或 entries（压缩包条目）的字典
         """
         # 获取知识库
         kb = self.db.query(KnowledgeBase).filter(KnowledgeBase.id == kb_id).first()
@@ -921,31 +1039,28 @@ class FileService:
         uploader = self.db.query(User).filter(User.id == kb.uploader_id).first()
         uploader_name = uploader.username if uploader else "未知用户"
 
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        zip_filename = f"{kb.name}-{uploader_name}_{timestamp}.zip"
+
+        # 内容未变化时直接使用已缓存的压缩包
+        version = archive_version(kb, kb_files, uploader_name)
+        archive_path = get_archive_cache().get(ARCHIVE_KIND_KNOWLEDGE, kb.id, version)
+        if archive_path:
+            return {"zip_filename": zip_filename, "version": version, "archive_path": archive_path}
+
         # 检查文件是否存在
         missing_files = []
         for kb_file in kb_files:
-            file_full_path = os.path.join(kb.base_path, kb_file.file_path)
-            if not os.path.exists(file_full_path):
+            if not self.blob_store.file_exists(
+                kb.base_path, kb_file.file_path, kb_file.content_hash, kb_file.content_encoding
+            ):
                 missing_files.append(kb_file.original_name)
 
         if missing_files:
             raise FileValidationError(f"以下文件不存在: {', '.join(missing_files)}", code="FILES_MISSING")
 
-        # 创建临时ZIP文件
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        zip_filename = f"{kb.name}-{uploader_name}_{timestamp}.zip"
-        temp_dir = tempfile.gettempdir()
-        zip_path = os.path.join(temp_dir, zip_filename)
-
-        try:
-            with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zipf:
-                # 添加知识库文件
-                for kb_file in kb_files:
-                    file_full_path = os.path.join(kb.base_path, kb_file.file_path)
-                    zipf.write(file_full_path, kb_file.original_name)
-
-                # 创建说明文件
-                readme_content = f"""知识库下载包
+        # 创建说明文件
+        readme_content = f"""知识库下载包
 ==================
 
 知识库名称: {kb.name}
@@ -957,33 +1072,49 @@ class FileService:
 
 包含文件:
 """
-                for kb_file in kb_files:
-                    file_size_b = kb_file.file_size or 0
-                    readme_content += f"- {kb_file.original_name} ({file_size_b} B)\n"
+        for kb_file in kb_files:
+            file_size_b = kb_file.file_size or 0
+            readme_content += f"- {kb_file.original_name} ({file_size_b} B)\n"
 
-                readme_content += """
+        readme_content += """
 注意事项:
 - 本压缩包包含知识库的所有文件
 - 请遵守相关的版权协议
 """
-                zipf.writestr("README.txt", readme_content)
-
-            return {"zip_path": zip_path, "zip_filename": zip_filename}
 
+        entries = []
+        try:
+            for f in kb_files:
+                entries.append(
+                    self.blob_store.zip_entry(
+                        kb.base_path,
+                        f.file_path,
+                        f.content_hash,
+                        f.original_name,
+                        _timestamp(f),
+                        encoding=f.content_encoding,
+                        size=f.file_size,
+                    )
+                )
         except Exception as e:
-            # 清理临时文件
-            if os.path.exists(zip_path):
-                os.remove(zip_path)
-            raise FileDatabaseError(f"创建压缩包失败: {str(e)}") from e
+            # 读取文件信息失败的原因（路径、系统错误）只记录日志，不返回给客户端
+            logger.error(f"创建压缩包失败 (知识库 {kb.id}): {e}")
+            raise FileDatabaseError("创建压缩包失败") from e
+        entries.append(zip_entry_from_bytes(readme_content.encode("utf-8"), "README.txt", _timestamp(kb)))
+
+        return {"zip_filename": zip_filename, "version": version, "entries": entries}
 
     def create_persona_card_zip(self, pc_id: str) -> dict:
-        """创建人设卡的ZIP文件
+        """准备人设卡的ZIP压缩包
+
+        内容未变化时返回已缓存的压缩包，否则返回压缩包条目，由 ArchiveCache.stream 边生成边发送并写入缓存。
 
         Args:
             pc_id: 人设卡ID
 
         Returns:
-            dict: 包含zip_path和zip_filename的字典
+            dict: 包含zip_filename、version（打包内容的版本，用作 ETag），
+                以及 archive_path（已缓存的压缩包）或 entries（压缩包条目）的字典
         """
         # 获取人设卡
         pc = self.db.query(PersonaCard).filter(PersonaCard.id == pc_id).first()
@@ -997,31 +1128,26 @@ class FileService:
         uploader = self.db.query(User).filter(User.id == pc.uploader_id).first()
         uploader_name = uploader.username if uploader else "未知用户"
 
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        zip_filename = f"{pc.name}-{uploader_name}_{timestamp}.zip"
+
+        # 内容未变化时直接使用已缓存的压缩包
+        version = archive_version(pc, pc_files, uploader_name)
+        archive_path = get_archive_cache().get(ARCHIVE_KIND_PERSONA, pc.id, version)
+        if archive_path:
+            return {"zip_filename": zip_filename, "version": version, "archive_path": archive_path}
+
         # 检查文件是否存在
         missing_files = []
         for pc_file in pc_files:
-            file_full_path = os.path.join(pc.base_path, pc_file.file_path)
-            if not os.path.exists(file_full_path):
+            if not self.blob_store.file_exists(pc.base_path, pc_file.file_path, pc_file.content_hash):
                 missing_files.append(pc_file.original_name)
 
         if missing_files:
             raise FileValidationError(f"以下文件不存在: {', '.join(missing_files)}", code="FILES_MISSING")
 
-        # 创建临时ZIP文件
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        zip_filename = f"{pc.name}-{uploader_name}_{timestamp}.zip"
-        temp_dir = tempfile.gettempdir()
-        zip_path = os.path.join(temp_dir, zip_filename)
-
-        try:
-            with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zipf:
-                # 添加人设卡文件
-                for pc_file in pc_files:
-                    file_full_path = os.path.join(pc.base_path, pc_file.file_path)
-                    zipf.write(file_full_path, pc_file.original_name)
-
-                # 创建说明文件
-                readme_content = f"""人设卡下载包
+        # 创建说明文件
+        readme_content = f"""人设卡下载包
 ==================
 
 人设卡名称: {pc.name}
@@ -1033,24 +1159,29 @@ class FileService:
 
 包含文件:
 """
-                for pc_file in pc_files:
-                    file_size_b = pc_file.file_size or 0
-                    readme_content += f"- {pc_file.original_name} ({file_size_b} B)\n"
+        for pc_file in pc_files:
+            file_size_b = pc_file.file_size or 0
+            readme_content += f"- {pc_file.original_name} ({file_size_b} B)\n"
 
-                readme_content += """
+        readme_content += """
 注意事项:
 - 本压缩包包含人设卡的所有文件
 - 请遵守相关的版权协议
 """
-                zipf.writestr("README.txt", readme_content)
-
-            return {"zip_path": zip_path, "zip_filename": zip_filename}
 
+        entries = []
+        try:
+            for f in pc_files:
+                entries.append(
+                    self.blob_store.zip_entry(pc.base_path, f.file_path, f.content_hash, f.original_name, _timestamp(f))
+                )
         except Exception as e:
-            # 清理临时文件
-            if os.path.exists(zip_path):
-                os.remove(zip_path)
-            raise FileDatabaseError(f"创建压缩包失败: {str(e)}") from e
+            # 读取文件信息失败的原因（路径、系统错误）只记录日志，不返回给客户端
+            logger.error(f"创建压缩包失败 (人设卡 {pc.id}): {e}")
+            raise FileDatabaseError("创建压缩包失败") from e
+        entries.append(zip_entry_from_bytes(readme_content.encode("utf-8"), "README.txt", _timestamp(pc)))
+
+        return {"zip_filename": zip_filename, "version": version, "entries": entries}
 
     def get_knowledge_base_file_path(self, kb_id: str, file_id: str) -> dict | None:
         """获取知识库中指定文件的完整路径
@@ -1060,7 +1191,9 @@ class FileService:
             file_id: 文件ID
 
         Returns:
-            Optional[dict]: 包含file_name和file_path的字典，如果不存在则返回None
+            Optional[dict]: 包含file_name、file_path、full_path（本机路径，blob 在远程存储中时为None）、
+                content_hash、storage_key（blob 的对象键，旧记录为None）、content_encoding（静态压缩的编码）、
+                file_size（原始大小）和stored_size（存储中的大小）的字典，如果不存在则返回None
         """
         # 获取知识库
         kb = self.db.query(KnowledgeBase).filter(KnowledgeBase.id == kb_id).first()
@@ -1077,7 +1210,22 @@ class FileService:
         if not kb_file:
             return None
 
-        return {"file_name": kb_file.original_name, "file_path": kb_file.file_path}
+        return {
+            "file_name": kb_file.original_name,
+            "file_path": kb_file.file_path,
+            "full_path": self.blob_store.resolve(
+                kb.base_path, kb_file.file_path, kb_file.content_hash, kb_file.content_encoding
+            ),
+            "content_hash": kb_file.content_hash,
+            "storage_key": (
+                self.blob_store.blob_key(kb_file.content_hash, kb_file.content_encoding)
+                if kb_file.content_hash
+                else None
+            ),
+            "content_encoding": kb_file.content_encoding,
+            "file_size": kb_file.file_size,
+            "stored_size": kb_file.stored_size,
+        }
 
     def get_persona_card_file_path(self, pc_id: str, file_id: str) -> dict | None:
         """获取人设卡中指定文件的信息
@@ -1087,7 +1235,8 @@ class FileService:
             file_id: 文件ID
 
         Returns:
-            Optional[dict]: 包含file_id、file_name和file_path的字典，如果不存在则返回None
+            Optional[dict]: 包含file_id、file_name、file_path、full_path（本机路径，blob 在远程存储中时为None）、
+                content_hash和storage_key（blob 的对象键，旧记录为None）的字典，如果不存在则返回None
         """
         # 获取人设卡
         pc = self.db.query(PersonaCard).filter(PersonaCard.id == pc_id).first()
@@ -1104,4 +1253,11 @@ class FileService:
         if not pc_file:
             return None
 
-        return {"file_id": pc_file.id, "file_name": pc_file.original_name, "file_path": pc_file.file_path}
+        return {
+            "file_id": pc_file.id,
+            "file_name": pc_file.original_name,
+            "file_path": pc_file.file_path,
+            "full_path": self.blob_store.resolve(pc.base_path, pc_file.file_path, pc_file.content_hash),
+            "content_hash": pc_file.content_hash,
+            "storage_key": self.blob_store.blob_key(pc_file.content_hash) if pc_file.content_hash else None,
+        }
@@ -6,8 +6,6 @@
 import json
 import os
 import shutil
-import tempfile
-import zipfile
 from datetime import datetime
 from typing import Any
 
@@ -27,10 +25,53 @@ from app.models.database import (
     PersonaCardFile,
     User,
 )
+from app.services.blob_store import BlobStore, StoredBlob
+from app.utils.file import StagedUpload, UploadTooLargeError, discard_staged, measure_upload_size, stage_upload
+from app.utils.file_io import run_file_io
+from app.utils.zip_stream import ZipEntry, zip_entry_from_bytes
 
 load_dotenv()
 
 
+def _zip_entries(blob_store: BlobStore, base_path: str, files: list[Any], readme_content: str) -> list[ZipEntry]:
+    """生成流式 ZIP 的压缩包条目（读取文件信息，阻塞，在文件 I/O 线程池中执行）
+
+    Args:
+        blob_store: blob 存储
+        base_path: 知识库 / 人设卡目录
+        files: 文件记录（KnowledgeBaseFile 或 PersonaCardFile，人设卡文件不压缩保存）
+        readme_content: README.txt 内容
+
+    Returns:
+        压缩包条目列表
+    """
+    zip_entries = [
+        blob_store.zip_entry(
+            base_path,
+            f.file_path,
+            f.content_hash,
+            f.original_name,
+            encoding=getattr(f, "content_encoding", None),
+            size=f.file_size,
+        )
+        for f in files
+    ]
+    zip_entries.append(zip_entry_from_bytes(readme_content.encode("utf-8"), "README.txt"))
+    return zip_entries
+
+
+def _remove_if_exists(path: str) -> None:
+    """删除存在的文件（阻塞，在文件 I/O 线程池中执行）"""
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def _rmtree_if_exists(path: str) -> None:
+    """删除存在的目录（阻塞，在文件 I/O 线程池中执行）"""
+    if os.path.exists(path):
+        shutil.rmtree(path)
+
+
 class FileUploadService:
     """文件上传服务 - 使用 SQLAlchemy Session"""
 
@@ -61,6 +102,8 @@ class FileUploadService:
         self.upload_dir = base_dir
         self.knowledge_dir = os.path.join(self.upload_dir, "knowledge")
         self.persona_dir = os.path.join(self.upload_dir, "persona")
+        # 上传文件流式写入的临时目录，与最终目录位于同一文件系统以便原子移动
+        self.staging_dir = os.path.join(self.upload_dir, ".staging")
         os.makedirs(self.upload_dir, exist_ok=True)
         os.makedirs(self.knowledge_dir, exist_ok=True)
         os.makedirs(self.persona_dir, exist_ok=True)
@@ -76,6 +119,38 @@ class FileUploadService:
             "或使用 with get_db_context() as db: service = FileUploadService(db)"
         )
 
+    def _get_blob_store(self, db: Session) -> BlobStore:
+        """获取使用该数据库会话的 blob 存储"""
+        return BlobStore(db, self.upload_dir)
+
+    async def _store_blob(self, db: Session, staged: StagedUpload, compress: bool = False) -> StoredBlob:
+        """增加 blob 引用计数并把临时文件保存到存储后端（内容已存在时只删除临时文件）
+
+        Args:
+            db: 数据库会话（引用计数随该会话的事务提交）
+            staged: 已写入临时文件的上传文件
+            compress: 是否按 [upload.compression] 配置压缩保存（知识库文件）
+
+        Returns:
+            写入的 blob（对象键、编码和存储中的大小）
+        """
+        blob_store = self._get_blob_store(db)
+        blob_store.acquire(staged.sha256, staged.size)
+        return await run_file_io("store_blob", blob_store.put, staged, staged.sha256, compress=compress)
+
+    async def _release_file(self, db: Session, base_path: str | None, file_record) -> None:
+        """删除文件记录对应的内容：blob 减少引用计数，旧记录删除磁盘文件
+
+        Args:
+            db: 数据库会话
+            base_path: 知识库 / 人设卡目录
+            file_record: KnowledgeBaseFile 或 PersonaCardFile
+        """
+        if file_record.content_hash:
+            self._get_blob_store(db).release(file_record.content_hash)
+        elif base_path:
+            await run_file_io("remove_file", _remove_if_exists, os.path.join(base_path, file_record.file_path))
+
     async def _save_uploaded_file(self, file: UploadFile, target_dir: str) -> str:
         """保存上传的文件到目标目录"""
         try:
@@ -84,10 +159,13 @@ class FileUploadService:
             file_name = f"{timestamp}_{file.filename}"
             file_path = os.path.join(target_dir, file_name)
 
-            # 保存文件
-            with open(file_path, "wb") as buffer:
-                content = await file.read()
-                buffer.write(content)
+            # 按块写入临时文件后移动到位
+            staged = await stage_upload(file, target_dir)
+            try:
+                await run_file_io("commit_upload", os.replace, staged.temp_path, file_path)
+            except OSError:
+                staged.discard()
+                raise
 
             return file_path
         except Exception as e:
@@ -98,29 +176,11 @@ class FileUploadService:
     async def _save_uploaded_file_with_size(self, file: UploadFile, directory: str) -> tuple:
         """保存上传的文件到指定目录，并返回文件路径和文件大小(B)"""
         try:
-            # 确保目录存在
-            os.makedirs(directory, exist_ok=True)
-
-            # 生成安全的文件名
-            filename = secure_filename(file.filename)
-            file_path = os.path.join(directory, filename)
-
-            # 如果文件已存在，添加时间戳
-            if os.path.exists(file_path):
-                name, ext = os.path.splitext(filename)
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                filename = f"{name}_{timestamp}{ext}"
-                file_path = os.path.join(directory, filename)
+            # 按块写入临时文件，再以安全的文件名原子移动到目标目录（文件已存在时添加时间戳）
+            staged = await stage_upload(file, directory)
+            file_path = await run_file_io("commit_upload", staged.commit, directory)
 
-            # 保存文件并计算大小
-            with open(file_path, "wb") as buffer:
-                content = await file.read()
-                buffer.write(content)
-
-            # 计算文件大小(B)
-            file_size_b = len(content)  # 保持字节单位
-
-            return file_path, file_size_b
+            return file_path, staged.size  # 保持字节单位
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"文件保存失败: {str(e)}"
@@ -150,19 +210,49 @@ class FileUploadService:
 
     async def _validate_file_content(self, file: UploadFile) -> bool:
         """验证文件内容大小"""
-        # 读取文件内容以验证实际大小
-        content = await file.read()
+        # 按块读取以验证实际大小，超限后立即停止，不在内存中保留内容
+        size = await measure_upload_size(file, self.MAX_FILE_SIZE)
         await file.seek(0)  # 重置文件指针
 
-        return len(content) <= self.MAX_FILE_SIZE
+        return size <= self.MAX_FILE_SIZE
 
     async def _validate_persona_toml_content(self, file: UploadFile) -> bool:
         """验证人设卡 TOML 文件内容大小（5MB 限制）"""
-        # 读取文件内容以验证实际大小
-        content = await file.read()
+        # 按块读取以验证实际大小，超限后立即停止，不在内存中保留内容
+        size = await measure_upload_size(file, self.MAX_PERSONA_TOML_SIZE)
         await file.seek(0)  # 重置文件指针
 
-        return len(content) <= self.MAX_PERSONA_TOML_SIZE
+        return size <= self.MAX_PERSONA_TOML_SIZE
+
+    async def _stage_uploads(self, files: list[UploadFile], max_size: int) -> list[StagedUpload]:
+        """把上传文件逐个流式写入临时目录，同时校验实际大小并计算 SHA-256
+
+        写入过程中超过 max_size 立即停止；任一文件失败时删除已写入的临时文件。
+
+        Args:
+            files: 上传的文件列表
+            max_size: 单个文件的最大字节数
+
+        Returns:
+            与 files 一一对应的临时文件
+
+        Raises:
+            UploadTooLargeError: 文件内容超过 max_size
+            HTTPException: 写入临时文件失败
+        """
+        staged_files: list[StagedUpload] = []
+        try:
+            for file in files:
+                staged_files.append(await stage_upload(file, self.staging_dir, max_size=max_size))
+        except UploadTooLargeError:
+            discard_staged(staged_files)
+            raise
+        except Exception as e:
+            discard_staged(staged_files)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"文件保存失败: {str(e)}"
+            ) from e
+        return staged_files
 
     def _extract_version_from_toml(self, data: dict[str, Any]) -> str | None:
         """从TOML数据中提取版本号
@@ -342,12 +432,14 @@ class FileUploadService:
                     detail=f"文件过大: {file.filename}。最大允许{self.MAX_FILE_SIZE // (1024*1024)}MB",
                 )
 
-            # 验证实际文件内容大小
-            if not await self._validate_file_content(file):
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"文件内容过大: {file.filename}。最大允许{self.MAX_FILE_SIZE // (1024*1024)}MB",
-                )
+        # 流式写入临时文件，同时验证实际文件内容大小
+        try:
+            staged_files = await self._stage_uploads(files, self.MAX_FILE_SIZE)
+        except UploadTooLargeError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"文件内容过大: {e.filename}。最大允许{self.MAX_FILE_SIZE // (1024*1024)}MB",
+            ) from e
 
         # 创建知识库目录
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -376,20 +468,23 @@ class FileUploadService:
             db.add(kb)
             db.flush()  # 获取 ID 但不提交
 
-            # 保存上传的文件并创建文件记录
-            for file in files:
-                file_path, file_size_b = await self._save_uploaded_file_with_size(file, kb_dir)
+            # 把临时文件移动到 blob 目录并创建文件记录
+            for file, staged in zip(files, staged_files, strict=True):
+                blob = await self._store_blob(db, staged, compress=True)
                 file_ext = os.path.splitext(file.filename)[1].lower()
 
-                # 创建文件记录
+                # 创建文件记录（内容在 blob 存储中，file_path 只保留安全的文件名）
                 kb_file = KnowledgeBaseFile(
                     id=str(uuid.uuid4()),
                     knowledge_base_id=kb.id,
                     file_name=file.filename,
                     original_name=file.filename,
-                    file_path=os.path.basename(file_path),  # 只存储文件名，相对于知识库目录
+                    file_path=secure_filename(file.filename),
                     file_type=file_ext,
-                    file_size=file_size_b,
+                    file_size=staged.size,
+                    content_hash=staged.sha256,
+                    content_encoding=blob.encoding,
+                    stored_size=blob.stored_size,
                     created_at=datetime.now(),
                 )
                 db.add(kb_file)
@@ -400,9 +495,9 @@ class FileUploadService:
 
         except Exception as e:
             db.rollback()
-            # 清理已创建的目录
-            if os.path.exists(kb_dir):
-                shutil.rmtree(kb_dir)
+            # 清理临时文件和已创建的目录
+            await run_file_io("discard_upload", discard_staged, staged_files)
+            await run_file_io("rmtree", _rmtree_if_exists, kb_dir)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"知识库保存失败: {str(e)}"
             ) from e
@@ -437,7 +532,7 @@ class FileUploadService:
 
                 cache_manager = get_cache_manager()
                 if cache_manager.is_enabled():
-                    invalidate_persona_cache(pc.id)
+                    invalidate_persona_cache(pc.id, uploader_id=pc.uploader_id)
             except Exception as cache_error:
                 import logging
 
@@ -446,8 +541,7 @@ class FileUploadService:
 
             return pc
         except Exception as e:
-            if os.path.exists(pc_dir):
-                shutil.rmtree(pc_dir)
+            await run_file_io("rmtree", _rmtree_if_exists, pc_dir)
             raise e
 
     def _validate_persona_files(self, files: list[UploadFile]) -> None:
@@ -511,17 +605,12 @@ class FileUploadService:
         persona_version: str | None = None
 
         for file in files:
-            if not await self._validate_persona_toml_content(file):
-                raise ValidationError(
-                    message=f"人设卡配置错误：文件内容过大 {file.filename}，单个文件最大允许{self.MAX_PERSONA_TOML_SIZE // (1024*1024)}MB",
-                    details={"code": "PERSONA_FILE_CONTENT_SIZE_EXCEEDED", "filename": file.filename},
-                )
-
-            file_path, file_size_b = await self._save_uploaded_file_with_size(file, pc_dir)
+            staged = await self._stage_persona_file(file)
+            file_path = await run_file_io("commit_upload", staged.commit, pc_dir)
             file_ext = os.path.splitext(file.filename)[1].lower()
 
             if file_ext == ".toml":
-                persona_version = self._extract_persona_version(file_path)
+                persona_version = await run_file_io("parse_toml", self._extract_persona_version, file_path)
 
         if not persona_version:
             raise ValidationError(
@@ -665,8 +754,16 @@ class FileUploadService:
         await self._validate_kb_file_addition(files, current_files)
         kb_dir = self._get_kb_directory(kb)
 
+        # 流式写入临时文件，同时验证实际文件内容大小
         try:
-            await self._save_kb_files(db, kb_id, files, kb_dir)
+            staged_files = await self._stage_uploads(files, self.MAX_FILE_SIZE)
+        except UploadTooLargeError as e:
+            raise ValidationError(
+                message=f"文件内容过大: {e.filename}。最大允许{self.MAX_FILE_SIZE // (1024*1024)}MB"
+            ) from e
+
+        try:
+            await self._save_kb_files(db, kb_id, files, staged_files, kb_dir)
             kb.updated_at = datetime.now()
             db.commit()
             db.refresh(kb)
@@ -674,6 +771,7 @@ class FileUploadService:
 
         except Exception as e:
             db.rollback()
+            await run_file_io("discard_upload", discard_staged, staged_files)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"添加文件失败: {str(e)}"
             ) from e
@@ -720,7 +818,7 @@ class FileUploadService:
         """
         self._check_kb_file_count_limit(len(files), len(current_files))
         self._check_kb_duplicate_filenames(files, current_files)
-        await self._validate_kb_files_type_and_size(files)
+        self._validate_kb_files_type_and_size(files)
 
     def _check_kb_file_count_limit(self, new_file_count: int, current_file_count: int) -> None:
         """检查知识库文件数量限制
@@ -752,8 +850,8 @@ class FileUploadService:
             if file.filename in existing_file_names:
                 raise ValidationError(message=f"文件名已存在: {file.filename}")
 
-    async def _validate_kb_files_type_and_size(self, files: list[UploadFile]) -> None:
-        """验证知识库文件类型和大小
+    def _validate_kb_files_type_and_size(self, files: list[UploadFile]) -> None:
+        """验证知识库文件类型和声明的大小（实际内容大小在写入临时文件时校验）
 
         Args:
             files: 文件列表
@@ -772,11 +870,6 @@ class FileUploadService:
                     message=f"文件过大: {file.filename}。最大允许{self.MAX_FILE_SIZE // (1024*1024)}MB"
                 )
 
-            if not await self._validate_file_content(file):
-                raise ValidationError(
-                    message=f"文件内容过大: {file.filename}。最大允许{self.MAX_FILE_SIZE // (1024*1024)}MB"
-                )
-
     def _get_kb_directory(self, kb: KnowledgeBase) -> str:
         """获取知识库目录
 
@@ -794,19 +887,22 @@ class FileUploadService:
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="知识库目录不存在")
         return kb_dir
 
-    async def _save_kb_files(self, db, kb_id: str, files: list[UploadFile], kb_dir: str) -> None:
-        """保存知识库文件
+    async def _save_kb_files(
+        self, db, kb_id: str, files: list[UploadFile], staged_files: list[StagedUpload], kb_dir: str
+    ) -> None:
+        """把临时文件移动到 blob 目录并创建文件记录
 
         Args:
             db: 数据库会话
             kb_id: 知识库ID
             files: 文件列表
+            staged_files: 与 files 一一对应的临时文件
             kb_dir: 知识库目录
         """
         import uuid
 
-        for file in files:
-            file_path, file_size_b = await self._save_uploaded_file_with_size(file, kb_dir)
+        for file, staged in zip(files, staged_files, strict=True):
+            blob = await self._store_blob(db, staged, compress=True)
             file_ext = os.path.splitext(file.filename)[1].lower()
 
             kb_file = KnowledgeBaseFile(
@@ -814,9 +910,12 @@ class FileUploadService:
                 knowledge_base_id=kb_id,
                 file_name=file.filename,
                 original_name=file.filename,
-                file_path=os.path.basename(file_path),
+                file_path=secure_filename(file.filename),
                 file_type=file_ext,
-                file_size=file_size_b,
+                file_size=staged.size,
+                content_hash=staged.sha256,
+                content_encoding=blob.encoding,
+                stored_size=blob.stored_size,
                 created_at=datetime.now(),
             )
             db.add(kb_file)
@@ -847,10 +946,8 @@ class FileUploadService:
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="知识库目录不存在")
 
         try:
-            # 删除物理文件
-            file_full_path = os.path.join(kb_dir, kb_file.file_path)
-            if os.path.exists(file_full_path):
-                os.remove(file_full_path)
+            # 删除物理文件（blob 只减少引用计数）
+            await self._release_file(db, kb_dir, kb_file)
 
             # 删除数据库记录
             db.delete(kb_file)
@@ -881,7 +978,9 @@ class FileUploadService:
         kb_dir = kb.base_path
 
         try:
-            # 删除数据库中的文件记录
+            # 删除数据库中的文件记录并减少 blob 引用计数
+            kb_files = db.query(KnowledgeBaseFile).filter(KnowledgeBaseFile.knowledge_base_id == kb_id).all()
+            self._get_blob_store(db).release_all(kb_file.content_hash for kb_file in kb_files)
             db.query(KnowledgeBaseFile).filter(KnowledgeBaseFile.knowledge_base_id == kb_id).delete()
 
             # 删除知识库记录
@@ -889,8 +988,8 @@ class FileUploadService:
             db.commit()
 
             # 删除整个知识库目录
-            if kb_dir and os.path.exists(kb_dir):
-                shutil.rmtree(kb_dir)
+            if kb_dir:
+                await run_file_io("rmtree", _rmtree_if_exists, kb_dir)
 
             return True
 
@@ -900,7 +999,7 @@ class FileUploadService:
             return False
 
     async def create_knowledge_base_zip(self, kb_id: str) -> dict:
-        """创建知识库的ZIP文件，返回ZIP文件路径和文件名"""
+        """准备知识库的ZIP压缩包，返回文件名和压缩包条目（由 aiter_zip 流式生成，不写临时文件）"""
         db = self._get_db()
 
         # 获取知识库信息
@@ -918,9 +1017,16 @@ class FileUploadService:
 
         # 检查文件是否存在
         missing_files = []
+        blob_store = self._get_blob_store(db)
         for kb_file in kb_files:
-            file_full_path = os.path.join(kb.base_path, kb_file.file_path)
-            if not os.path.exists(file_full_path):
+            if not await run_file_io(
+                "stat_file",
+                blob_store.file_exists,
+                kb.base_path,
+                kb_file.file_path,
+                kb_file.content_hash,
+                kb_file.content_encoding,
+            ):
                 missing_files.append(kb_file.original_name)
 
         if missing_files:
@@ -928,21 +1034,11 @@ class FileUploadService:
                 status_code=status.HTTP_404_NOT_FOUND, detail=f"以下文件不存在: {', '.join(missing_files)}"
             )
 
-        # 创建临时ZIP文件
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         zip_filename = f"{kb.name}-{uploader_name}_{timestamp}.zip"
-        temp_dir = tempfile.gettempdir()
-        zip_path = os.path.join(temp_dir, zip_filename)
 
-        try:
-            with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zipf:
-                # 添加知识库文件
-                for kb_file in kb_files:
-                    file_full_path = os.path.join(kb.base_path, kb_file.file_path)
-                    zipf.write(file_full_path, kb_file.original_name)
-
-                # 创建说明文件
-                readme_content = f"""知识库下载包
+        # 创建说明文件
+        readme_content = f"""知识库下载包
 ==================
 
 知识库名称: {kb.name}
@@ -954,24 +1050,24 @@ class FileUploadService:
 
 包含文件:
 """
-                for kb_file in kb_files:
-                    file_size_b = kb_file.file_size or 0
-                    readme_content += f"- {kb_file.original_name} ({file_size_b} B)\n"
+        for kb_file in kb_files:
+            file_size_b = kb_file.file_size or 0
+            readme_content += f"- {kb_file.original_name} ({file_size_b} B)\n"
 
-                readme_content += """
+        readme_content += """
 注意事项:
 - 本压缩包包含知识库的所有文件
 - 请遵守相关的版权协议
 """
 
-                zipf.writestr("README.txt", readme_content)
+        try:
+            zip_entries = await run_file_io(
+                "create_zip", _zip_entries, blob_store, kb.base_path, kb_files, readme_content
+            )
 
-            return {"zip_path": zip_path, "zip_filename": zip_filename}
+            return {"zip_filename": zip_filename, "entries": zip_entries}
 
         except Exception as e:
-            # 清理临时文件
-            if os.path.exists(zip_path):
-                os.remove(zip_path)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"创建压缩包失败: {str(e)}"
             ) from e
@@ -996,7 +1092,14 @@ class FileUploadService:
         if not kb_file:
             return None
 
-        return {"file_name": kb_file.original_name, "file_path": kb_file.file_path}
+        return {
+            "file_name": kb_file.original_name,
+            "file_path": kb_file.file_path,
+            "full_path": self._get_blob_store(db).resolve(
+                kb.base_path, kb_file.file_path, kb_file.content_hash, kb_file.content_encoding
+            ),
+            "content_encoding": kb_file.content_encoding,
+        }
 
     async def add_files_to_persona_card(self, pc_id: str, files: list[UploadFile]) -> PersonaCard | None:
         """向人设卡添加文件"""
@@ -1011,29 +1114,38 @@ class FileUploadService:
         pc_dir = self._get_persona_card_directory(pc)
         new_file = files[0]
 
+        staged: StagedUpload | None = None
         try:
-            file_path, file_size_b, persona_version = await self._save_and_validate_persona_file(new_file, pc_dir)
-            pc_file = self._create_persona_file_record(new_file, file_path, file_size_b, pc_id)
+            staged = await self._stage_persona_file(new_file)
+            # 先解析再保存，解析失败时不写入存储
+            persona_version = await run_file_io(
+                "parse_toml", self._validate_persona_file_version, staged.temp_path, new_file.filename
+            )
+            await self._store_blob(db, staged)
+            pc_file = self._create_persona_file_record(
+                new_file, secure_filename(new_file.filename), staged.size, pc_id, content_hash=staged.sha256
+            )
 
             db.add(pc_file)
             db.flush()
 
-            self._remove_old_persona_files(db, current_files, pc_dir)
+            await self._remove_old_persona_files(db, current_files, pc_dir)
             self._update_persona_card_metadata(pc, persona_version)
 
             db.commit()
             db.refresh(pc)
             return pc
 
-        except HTTPException:
+        # 回滚撤销引用计数；已写入的 blob 可能被其他记录共享，留给垃圾回收处理
+        except (HTTPException, ValidationError):
             db.rollback()
-            if os.path.exists(file_path):
-                os.remove(file_path)
+            if staged:
+                await run_file_io("discard_upload", staged.discard)
             raise
         except Exception:
             db.rollback()
-            if os.path.exists(file_path):
-                os.remove(file_path)
+            if staged:
+                await run_file_io("discard_upload", staged.discard)
             raise ValidationError(
                 message="人设卡配置解析失败：TOML 语法错误，请检查 bot_config.toml 格式是否正确",
                 details={"code": "PERSONA_TOML_PARSE_ERROR"},
@@ -1043,13 +1155,16 @@ class FileUploadService:
         """获取人设卡信息"""
         return db.query(PersonaCard).filter(PersonaCard.id == pc_id).first()
 
-    async def _validate_persona_file_content(self, file: UploadFile) -> None:
-        """验证人设卡文件内容大小"""
-        if not await self._validate_persona_toml_content(file):
+    async def _stage_persona_file(self, file: UploadFile) -> StagedUpload:
+        """流式写入人设卡文件的临时文件，内容超过 TOML 大小限制时抛出 ValidationError"""
+        try:
+            [staged] = await self._stage_uploads([file], self.MAX_PERSONA_TOML_SIZE)
+        except UploadTooLargeError:
             raise ValidationError(
                 message=f"人设卡配置错误：文件内容过大 {file.filename}，单个文件最大允许{self.MAX_PERSONA_TOML_SIZE // (1024*1024)}MB",
                 details={"code": "PERSONA_FILE_CONTENT_SIZE_EXCEEDED", "filename": file.filename},
-            )
+            ) from None
+        return staged
 
     def _get_persona_card_directory(self, pc: PersonaCard) -> str:
         """获取人设卡目录"""
@@ -1058,29 +1173,28 @@ class FileUploadService:
             raise DatabaseError(message="人设卡目录不存在，请稍后重试或联系管理员")
         return pc_dir
 
-    async def _save_and_validate_persona_file(self, file: UploadFile, pc_dir: str) -> tuple:
-        """保存并验证人设卡文件，返回 (file_path, file_size, version)"""
-        await self._validate_persona_file_content(file)
-
-        file_path, file_size_b = await self._save_uploaded_file_with_size(file, pc_dir)
-        file_ext = os.path.splitext(file.filename)[1].lower()
-        persona_version: str | None = None
+    def _validate_persona_file_version(self, file_path: str, filename: str | None = None) -> str | None:
+        """解析已保存的人设卡文件并返回版本号（非 TOML 文件返回 None）
 
-        if file_ext == ".toml":
-            with open(file_path, encoding="utf-8") as f:
-                toml_data = toml.load(f)
-            parsed_version = self._extract_version_from_toml(toml_data)
-            if not parsed_version:
-                raise ValidationError(
-                    message="人设卡配置错误：TOML 中未找到版本号字段，请在 bot_config.toml 中添加 version 等版本字段后重试",
-                    details={"code": "PERSONA_TOML_VERSION_MISSING"},
-                )
-            persona_version = parsed_version
+        Args:
+            file_path: 文件路径
+            filename: 原始文件名（可选，用于判断类型；blob 路径没有扩展名）
+        """
+        if os.path.splitext(filename or file_path)[1].lower() != ".toml":
+            return None
 
-        return file_path, file_size_b, persona_version
+        with open(file_path, encoding="utf-8") as f:
+            toml_data = toml.load(f)
+        parsed_version = self._extract_version_from_toml(toml_data)
+        if not parsed_version:
+            raise ValidationError(
+                message="人设卡配置错误：TOML 中未找到版本号字段，请在 bot_config.toml 中添加 version 等版本字段后重试",
+                details={"code": "PERSONA_TOML_VERSION_MISSING"},
+            )
+        return parsed_version
 
     def _create_persona_file_record(
-        self, file: UploadFile, file_path: str, file_size: int, pc_id: str
+        self, file: UploadFile, file_path: str, file_size: int, pc_id: str, content_hash: str | None = None
     ) -> PersonaCardFile:
         """创建人设卡文件记录"""
         import uuid
@@ -1094,16 +1208,15 @@ class FileUploadService:
             file_path=os.path.basename(file_path),
             file_type=file_ext,
             file_size=file_size,
+            content_hash=content_hash,
             created_at=datetime.now(),
         )
 
-    def _remove_old_persona_files(self, db, current_files: list[PersonaCardFile], pc_dir: str) -> None:
+    async def _remove_old_persona_files(self, db, current_files: list[PersonaCardFile], pc_dir: str) -> None:
         """删除旧的人设卡文件"""
         for old_file in current_files:
             try:
-                old_full_path = os.path.join(pc_dir, old_file.file_path)
-                if os.path.exists(old_full_path):
-                    os.remove(old_full_path)
+                await self._release_file(db, pc_dir, old_file)
                 db.delete(old_file)
             except Exception as e:
                 raise DatabaseError(message=f"删除旧人设卡文件失败：{old_file.original_name}，错误：{str(e)}") from e
@@ -1140,10 +1253,8 @@ class FileUploadService:
             return False
 
         try:
-            # 删除物理文件
-            file_full_path = os.path.join(pc_dir, pc_file.file_path)
-            if os.path.exists(file_full_path):
-                os.remove(file_full_path)
+            # 删除物理文件（blob 只减少引用计数）
+            await self._release_file(db, pc_dir, pc_file)
 
             # 删除数据库记录
             db.delete(pc_file)
@@ -1180,10 +1291,15 @@ class FileUploadService:
         if not pc_file:
             return None
 
-        return {"file_id": pc_file.id, "file_name": pc_file.original_name, "file_path": pc_file.file_path}
+        return {
+            "file_id": pc_file.id,
+            "file_name": pc_file.original_name,
+            "file_path": pc_file.file_path,
+            "full_path": self._get_blob_store(db).resolve(pc.base_path, pc_file.file_path, pc_file.content_hash),
+        }
 
     async def create_persona_card_zip(self, pc_id: str) -> dict:
-        """创建人设卡的ZIP文件，返回ZIP文件路径和文件名"""
+        """准备人设卡的ZIP压缩包，返回文件名和压缩包条目（由 aiter_zip 流式生成，不写临时文件）"""
         db = self._get_db()
 
         # 获取人设卡信息
@@ -1201,9 +1317,11 @@ class FileUploadService:
 
         # 检查文件是否存在
         missing_files = []
+        blob_store = self._get_blob_store(db)
         for pc_file in pc_files:
-            file_full_path = os.path.join(pc.base_path, pc_file.file_path)
-            if not os.path.exists(file_full_path):
+            if not await run_file_io(
+                "stat_file", blob_store.file_exists, pc.base_path, pc_file.file_path, pc_file.content_hash
+            ):
                 missing_files.append(pc_file.original_name)
 
         if missing_files:
@@ -1211,21 +1329,11 @@ class FileUploadService:
                 status_code=status.HTTP_404_NOT_FOUND, detail=f"以下文件不存在: {', '.join(missing_files)}"
             )
 
-        # 创建临时ZIP文件
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         zip_filename = f"{pc.name}-{uploader_name}_{timestamp}.zip"
-        temp_dir = tempfile.gettempdir()
-        zip_path = os.path.join(temp_dir, zip_filename)
 
-        try:
-            with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zipf:
-                # 添加人设卡文件
-                for pc_file in pc_files:
-                    file_full_path = os.path.join(pc.base_path, pc_file.file_path)
-                    zipf.write(file_full_path, pc_file.original_name)
-
-                # 创建说明文件
-                readme_content = f"""人设卡下载包
+        # 创建说明文件
+        readme_content = f"""人设卡下载包
     ==================
 
     人设卡名称: {pc.name}
@@ -1237,24 +1345,24 @@ class FileUploadService:
 
     包含文件:
     """
-                for pc_file in pc_files:
-                    file_size_b = pc_file.file_size or 0
-                    readme_content += f"- {pc_file.original_name} ({file_size_b} B)\n"
+        for pc_file in pc_files:
+            file_size_b = pc_file.file_size or 0
+            readme_content += f"- {pc_file.original_name} ({file_size_b} B)\n"
 
-                readme_content += """
+        readme_content += """
     注意事项:
     - 本压缩包包含人设卡的所有文件
     - 请遵守相关的版权协议
     """
 
-                zipf.writestr("README.txt", readme_content)
+        try:
+            zip_entries = await run_file_io(
+                "create_zip", _zip_entries, blob_store, pc.base_path, pc_files, readme_content
+            )
 
-            return {"zip_path": zip_path, "zip_filename": zip_filename}
+            return {"zip_filename": zip_filename, "entries": zip_entries}
 
         except Exception as e:
-            # 清理临时文件
-            if os.path.exists(zip_path):
-                os.remove(zip_path)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"创建压缩包失败: {str(e)}"
             ) from e
@@ -10,6 +10,7 @@ from typing import Any
 
 from sqlalchemy.orm import Session
 
+from app.core.cache.entity_cache import get_entity_cache
 from app.models.database import KnowledgeBase, KnowledgeBaseFile, UploadRecord, User
 
 logger = logging.getLogger(__name__)
@@ -35,18 +36,27 @@ class KnowledgeService:
 
         self.cache_manager = get_cache_manager()
 
-    def get_knowledge_base_by_id(self, kb_id: str, include_files: bool = False) -> KnowledgeBase | None:
+    def get_knowledge_base_by_id(
+        self, kb_id: str, include_files: bool = False, cached: bool = False
+    ) -> KnowledgeBase | None:
         """
         根据 ID 获取知识库。
 
         Args:
             kb_id: 知识库 ID
             include_files: 是否包含文件信息
+            cached: 是否经实体缓存读取（命中时返回游离状态的只读快照，仅用于不修改知识库、不访问关系属性的场景）
 
         Returns:
             找到返回知识库对象，否则返回 None
         """
         try:
+            if cached:
+                return get_entity_cache().get(
+                    "knowledge",
+                    kb_id,
+                    lambda: self.db.query(KnowledgeBase).filter(KnowledgeBase.id == kb_id).first(),
+                )
             kb = self.db.query(KnowledgeBase).filter(KnowledgeBase.id == kb_id).first()
             return kb
         except Exception as e:
@@ -480,6 +490,38 @@ class KnowledgeService:
             logger.error(f"检查收藏状态失败: {str(e)}")
             return False
 
+    def get_starred_ids(self, user_id: str, kb_ids: list[str]) -> set[str]:
+        """
+        批量检查用户收藏了哪些知识库（读取收藏集合缓存）。
+
+        Args:
+            user_id: 用户 ID
+            kb_ids: 知识库 ID 列表
+
+        Returns:
+            kb_ids 中已收藏的 ID 集合，查询失败时返回空集合
+        """
+        try:
+            from app.core.cache.starred import get_starred_cache
+
+            return get_starred_cache().get_starred(
+                user_id, "knowledge", kb_ids, lambda target_ids: self._query_starred_ids(user_id, target_ids)
+            )
+        except Exception as e:
+            logger.error(f"批量检查收藏状态失败: {str(e)}")
+            return set()
+
+    def _query_starred_ids(self, user_id: str, kb_ids: list[str] | None) -> set[str]:
+        """查询用户收藏的知识库 ID（kb_ids 为 None 时返回全部收藏，否则使用一次 IN 查询）"""
+        from app.models.database import StarRecord
+
+        query = self.db.query(StarRecord.target_id).filter(
+            StarRecord.user_id == user_id, StarRecord.target_type == "knowledge"
+        )
+        if kb_ids is not None:
+            query = query.filter(StarRecord.target_id.in_(kb_ids))
+        return {target_id for (target_id,) in query.all()}
+
     def add_star(self, user_id: str, kb_id: str) -> bool:
         """
         收藏知识库。
@@ -516,12 +558,20 @@ class KnowledgeService:
 
             self.db.commit()
 
+            try:
+                from app.core.cache.starred import get_starred_cache
+
+                get_starred_cache().add(user_id, "knowledge", kb_id)
+            except Exception as cache_error:
+                logger.warning(f"更新收藏集合失败: {cache_error}")
+
             # 清除知识库相关缓存（因为 star_count 变化）
             try:
-                from app.core.cache.invalidation import invalidate_knowledge_cache
+                from app.core.cache.invalidation import invalidate_knowledge_cache, invalidate_star_cache
 
                 if self.cache_manager.is_enabled():
-                    invalidate_knowledge_cache(kb_id=kb_id, uploader_id=kb.uploader_id)
+                    invalidate_knowledge_cache(kb_id=kb_id, uploader_id=kb.uploader_id if kb else None)
+                    invalidate_star_cache(user_id)
             except Exception as cache_error:
                 logger.warning(f"清除缓存失败: {cache_error}")
 
@@ -566,12 +616,20 @@ class KnowledgeService:
 
             self.db.commit()
 
+            try:
+                from app.core.cache.starred import get_starred_cache
+
+                get_starred_cache().discard(user_id, "knowledge", kb_id)
+            except Exception as cache_error:
+                logger.warning(f"更新收藏集合失败: {cache_error}")
+
             # 清除知识库相关缓存（因为 star_count 变化）
             try:
-                from app.core.cache.invalidation import invalidate_knowledge_cache
+                from app.core.cache.invalidation import invalidate_knowledge_cache, invalidate_star_cache
 
                 if self.cache_manager.is_enabled():
-                    invalidate_knowledge_cache(kb_id=kb_id, uploader_id=kb.uploader_id)
+                    invalidate_knowledge_cache(kb_id=kb_id, uploader_id=kb.uploader_id if kb else None)
+                    invalidate_star_cache(user_id)
             except Exception as cache_error:
                 logger.warning(f"清除缓存失败: {cache_error}")
 
@@ -598,6 +656,8 @@ class KnowledgeService:
                 return False
 
             kb.downloads = (kb.downloads or 0) + 1
+            # 下载不算修改，保持 updated_at 不变（否则会改变按更新时间的排序和打包下载缓存的版本）
+            kb.updated_at = KnowledgeBase.updated_at
             self.db.commit()
 
             logger.info(f"下载次数已递增: kb_id={kb_id}, count={kb.downloads}")
@@ -11,8 +11,10 @@ from typing import Any
 from sqlalchemy.orm import Session
 
 from app.core.cache.decorators import cache_invalidate
-from app.core.cache.invalidation import invalidate_persona_cache
+from app.core.cache.entity_cache import get_entity_cache
+from app.core.cache.invalidation import invalidate_persona_cache, invalidate_star_cache
 from app.models.database import PersonaCard, PersonaCardFile, UploadRecord, User
+from app.services.blob_store import BlobStore
 
 logger = logging.getLogger(__name__)
 
@@ -35,18 +37,27 @@ class PersonaService:
         """
         self.db = db
 
-    def get_persona_card_by_id(self, pc_id: str, include_files: bool = False) -> PersonaCard | None:
+    def get_persona_card_by_id(
+        self, pc_id: str, include_files: bool = False, cached: bool = False
+    ) -> PersonaCard | None:
         """
         根据 ID 获取人设卡。
 
         Args:
             pc_id: 人设卡 ID
             include_files: 是否包含文件信息
+            cached: 是否经实体缓存读取（命中时返回游离状态的只读快照，仅用于不修改人设卡、不访问关系属性的场景）
 
         Returns:
             找到返回人设卡对象，否则返回 None
         """
         try:
+            if cached:
+                return get_entity_cache().get(
+                    "persona",
+                    pc_id,
+                    lambda: self.db.query(PersonaCard).filter(PersonaCard.id == pc_id).first(),
+                )
             pc = self.db.query(PersonaCard).filter(PersonaCard.id == pc_id).first()
             return pc
         except Exception as e:
@@ -292,7 +303,7 @@ class PersonaService:
 
                 cache_manager = get_cache_manager()
                 if cache_manager.is_enabled():
-                    invalidate_persona_cache(pc.id)
+                    invalidate_persona_cache(pc.id, uploader_id=pc.uploader_id)
             except Exception as cache_error:
                 logger.warning(f"清除缓存失败: {cache_error}")
 
@@ -352,7 +363,7 @@ class PersonaService:
 
                 cache_manager = get_cache_manager()
                 if cache_manager.is_enabled():
-                    invalidate_persona_cache(pc_id)
+                    invalidate_persona_cache(pc_id, uploader_id=pc.uploader_id)
             except Exception as cache_error:
                 logger.warning(f"清除缓存失败: {cache_error}")
 
@@ -420,6 +431,7 @@ class PersonaService:
             if not pc:
                 return False
 
+            uploader_id = pc.uploader_id
             self.db.delete(pc)
             self.db.commit()
 
@@ -429,7 +441,7 @@ class PersonaService:
 
                 cache_manager = get_cache_manager()
                 if cache_manager.is_enabled():
-                    invalidate_persona_cache(pc_id)
+                    invalidate_persona_cache(pc_id, uploader_id=uploader_id)
             except Exception as cache_error:
                 logger.warning(f"清除缓存失败: {cache_error}")
 
@@ -466,6 +478,38 @@ class PersonaService:
             logger.error(f"检查收藏状态失败: {str(e)}")
             return False
 
+    def get_starred_ids(self, user_id: str, pc_ids: list[str]) -> set[str]:
+        """
+        批量检查用户收藏了哪些人设卡（读取收藏集合缓存）。
+
+        Args:
+            user_id: 用户 ID
+            pc_ids: 人设卡 ID 列表
+
+        Returns:
+            pc_ids 中已收藏的 ID 集合，查询失败时返回空集合
+        """
+        try:
+            from app.core.cache.starred import get_starred_cache
+
+            return get_starred_cache().get_starred(
+                user_id, "persona", pc_ids, lambda target_ids: self._query_starred_ids(user_id, target_ids)
+            )
+        except Exception as e:
+            logger.error(f"批量检查收藏状态失败: {str(e)}")
+            return set()
+
+    def _query_starred_ids(self, user_id: str, pc_ids: list[str] | None) -> set[str]:
+        """查询用户收藏的人设卡 ID（pc_ids 为 None 时返回全部收藏，否则使用一次 IN 查询）"""
+        from app.models.database import StarRecord
+
+        query = self.db.query(StarRecord.target_id).filter(
+            StarRecord.user_id == user_id, StarRecord.target_type == "persona"
+        )
+        if pc_ids is not None:
+            query = query.filter(StarRecord.target_id.in_(pc_ids))
+        return {target_id for (target_id,) in query.all()}
+
     def add_star(self, user_id: str, pc_id: str) -> bool:
         """
         收藏人设卡。
@@ -496,13 +540,21 @@ class PersonaService:
 
             self.db.commit()
 
+            try:
+                from app.core.cache.starred import get_starred_cache
+
+                get_starred_cache().add(user_id, "persona", pc_id)
+            except Exception as cache_error:
+                logger.warning(f"更新收藏集合失败: {cache_error}")
+
             # 清除人设卡相关缓存（因为 star_count 变化）
             try:
                 from app.core.cache.factory import get_cache_manager
 
                 cache_manager = get_cache_manager()
                 if cache_manager.is_enabled():
-                    invalidate_persona_cache(pc_id)
+                    invalidate_persona_cache(pc_id, uploader_id=pc.uploader_id if pc else None)
+                    invalidate_star_cache(user_id)
             except Exception as cache_error:
                 logger.warning(f"清除缓存失败: {cache_error}")
 
@@ -546,13 +598,21 @@ class PersonaService:
 
             self.db.commit()
 
+            try:
+                from app.core.cache.starred import get_starred_cache
+
+                get_starred_cache().discard(user_id, "persona", pc_id)
+            except Exception as cache_error:
+                logger.warning(f"更新收藏集合失败: {cache_error}")
+
             # 清除人设卡相关缓存（因为 star_count 变化）
             try:
                 from app.core.cache.factory import get_cache_manager
 
                 cache_manager = get_cache_manager()
                 if cache_manager.is_enabled():
-                    invalidate_persona_cache(pc_id)
+                    invalidate_persona_cache(pc_id, uploader_id=pc.uploader_id if pc else None)
+                    invalidate_star_cache(user_id)
             except Exception as cache_error:
                 logger.warning(f"清除缓存失败: {cache_error}")
 
@@ -579,6 +639,8 @@ class PersonaService:
                 return False
 
             pc.downloads = (pc.downloads or 0) + 1
+            # 下载不算修改，保持 updated_at 不变（否则会改变按更新时间的排序和打包下载缓存的版本）
+            pc.updated_at = PersonaCard.updated_at
             self.db.commit()
 
             logger.info(f"下载次数已递增: pc_id={pc_id}, count={pc.downloads}")
@@ -616,6 +678,14 @@ class PersonaService:
             成功返回 True，否则返回 False
         """
         try:
+            # 先减少文件内容的 blob 引用计数，与删除记录在同一事务中提交
+            content_hashes = [
+                content_hash
+                for (content_hash,) in self.db.query(PersonaCardFile.content_hash)
+                .filter(PersonaCardFile.persona_card_id == pc_id)
+                .all()
+            ]
+            BlobStore(self.db).release_all(content_hashes)
             self.db.query(PersonaCardFile).filter(PersonaCardFile.persona_card_id == pc_id).delete()
             self.db.commit()
 
@@ -0,0 +1,566 @@
+"""
+可续传的知识库上传会话
+
+一次 multipart 请求上传大量大文件时，任何网络中断都会让整个上传失败，并长时间占用 worker。
+上传会话把上传拆成多个可以单独重试的小请求：
+- 创建会话时声明文件清单（文件名、大小、可选的 SHA-256），按现有的知识库规则校验，服务端确定分块大小
+- 每个文件按分块大小切分，第 n 块的偏移量为 n * chunk_size；每块附带 SHA-256，校验通过后
+  写入 {upload_dir}/upload_sessions/{session_id}/{file_index}/{chunk_index}.chunk（原子替换，重试幂等，可并行上传）
+- 已收到的块以磁盘上的文件为准，查询进度时列出缺少的块，客户端只需补传这些块
+- 提交时把各文件的块依次拼接为临时文件（同时计算 SHA-256），再按普通上传创建知识库和文件记录
+- 会话在最后一次上传分块 TTL 之后过期，过期会话的记录和分块由 collect_expired 删除
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Any
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.database import UploadSession
+from app.services.blob_store import resolve_upload_dir
+from app.services.file_service import FileService, FileValidationError
+from app.utils.file import StagedUpload, discard_staged
+
+logger = logging.getLogger(__name__)
+
+# 会话目录名（位于上传目录下）
+UPLOAD_SESSION_DIR_NAME = "upload_sessions"
+
+# 会话状态
+SESSION_STATUS_ACTIVE = "active"
+SESSION_STATUS_COMMITTING = "committing"
+SESSION_STATUS_COMMITTED = "committed"
+
+# 拼接分块时每次读取的字节数
+ASSEMBLE_BUFFER_SIZE = 1024 * 1024
+
+_SHA256_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+_CHUNK_SUFFIX = ".chunk"
+
+
+class UploadSessionNotFoundError(Exception):
+    """上传会话不存在、已过期或不属于当前用户"""
+
+    def __init__(self, message: str = "上传会话不存在或已过期"):
+        self.message = message
+        super().__init__(self.message)
+
+
+class UploadSessionConflictError(Exception):
+    """上传会话的状态不允许该操作（已提交、正在提交或分块不完整）"""
+
+    def __init__(self, message: str, details: dict | None = None):
+        self.message = message
+        self.details = details or {}
+        super().__init__(self.message)
+
+
+def parse_upload_checksum(header: str | None) -> str:
+    """解析 Upload-Checksum 请求头
+
+    Args:
+        header: 请求头的值，格式为 "sha256 <十六进制摘要>"
+
+    Returns:
+        str: 小写的十六进制摘要
+
+    Raises:
+        FileValidationError: 缺少请求头或格式错误
+    """
+    algorithm, _, digest = (header or "").strip().partition(" ")
+    digest = digest.strip().lower()
+    if algorithm.lower() != "sha256" or not _SHA256_PATTERN.match(digest):
+        raise FileValidationError('Upload-Checksum 格式错误，应为 "sha256 <十六进制摘要>"', code="INVALID_CHECKSUM")
+    return digest
+
+
+class UploadSessionService:
+    """可续传上传会话服务"""
+
+    def __init__(
+        self,
+        db: Session,
+        upload_dir: str | None = None,
+        chunk_size: int | None = None,
+        ttl_seconds: int | None = None,
+    ):
+        """初始化上传会话服务
+
+        Args:
+            db: 数据库会话
+            upload_dir: 上传目录（可选，默认按 UPLOAD_DIR 解析）
+            chunk_size: 新建会话的分块大小（字节，可选，默认按配置）
+            ttl_seconds: 会话在最后一次上传之后的有效期（秒，可选，默认按配置）
+        """
+        self.db = db
+        upload_dir = upload_dir or resolve_upload_dir()
+        self.session_root = os.path.join(upload_dir, UPLOAD_SESSION_DIR_NAME)
+        # 拼接结果写入上传临时目录，与 blob 目录位于同一文件系统以便原子移动
+        self.staging_dir = os.path.join(upload_dir, ".staging")
+        self.chunk_size = chunk_size or settings.UPLOAD_SESSION_CHUNK_SIZE_MB * 1024 * 1024
+        self.ttl = timedelta(seconds=ttl_seconds or settings.UPLOAD_SESSION_TTL_HOURS * 3600)
+
+    # ------------------------------------------------------------------
+    # 会话
+    # ------------------------------------------------------------------
+
+    def create_session(
+        self,
+        user_id: str,
+        name: str,
+        description: str,
+        files: list[dict[str, Any]],
+        copyright_owner: str | None = None,
+        content: str | None = None,
+        tags: str | None = None,
+        is_public: bool = False,
+    ) -> UploadSession:
+        """创建上传会话
+
+        先清理已过期的会话，再按知识库上传规则校验文件清单。
+
+        Args:
+            user_id: 上传者ID
+            name: 知识库名称
+            description: 描述
+            files: 文件清单，每个元素包含 name、size 和可选的 sha256
+            copyright_owner: 版权所有者
+            content: 内容
+            tags: 标签
+            is_public: 是否申请公开
+
+        Returns:
+            UploadSession: 创建的会话
+
+        Raises:
+            FileValidationError: 文件清单不符合上传规则，或进行中的会话过多
+        """
+        self.collect_expired()
+
+        manifest = self._validate_manifest(files)
+
+        active_count = (
+            self.db.query(UploadSession)
+            .filter(
+                UploadSession.user_id == user_id,
+                UploadSession.status != SESSION_STATUS_COMMITTED,
+                UploadSession.expires_at > datetime.now(),
+            )
+            .count()
+        )
+        if active_count >= settings.UPLOAD_SESSION_MAX_ACTIVE:
+            raise FileValidationError(
+                f"进行中的上传会话过多，最多允许{settings.UPLOAD_SESSION_MAX_ACTIVE}个",
+                code="TOO_MANY_UPLOAD_SESSIONS",
+            )
+
+        upload_session = UploadSession(
+            user_id=user_id,
+            name=name,
+            description=description,
+            copyright_owner=copyright_owner,
+            content=content,
+            tags=tags,
+            is_public=bool(is_public),
+            files=json.dumps(manifest, ensure_ascii=False),
+            chunk_size=self.chunk_size,
+            status=SESSION_STATUS_ACTIVE,
+            expires_at=datetime.now() + self.ttl,
+        )
+        self.db.add(upload_session)
+        self.db.commit()
+        self.db.refresh(upload_session)
+        return upload_session
+
+    def _validate_manifest(self, files: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """按知识库上传规则校验文件清单，返回规范化的清单"""
+        if not files:
+            raise FileValidationError("至少需要上传一个文件")
+        if len(files) > FileService.MAX_KNOWLEDGE_FILES:
+            raise FileValidationError(
+                f"文件数量超过限制，最多允许{FileService.MAX_KNOWLEDGE_FILES}个文件", code="FILE_COUNT_EXCEEDED"
+            )
+
+        manifest = []
+        seen_names = set()
+        for file in files:
+            filename = str(file.get("name") or "")
+            size = file.get("size")
+            sha256 = (file.get("sha256") or "").lower() or None
+
+            ext = os.path.splitext(filename)[1].lower()
+            if ext not in FileService.ALLOWED_KNOWLEDGE_TYPES:
+                raise FileValidationError(
+                    f"不支持的文件类型: {filename}。仅支持{', '.join(FileService.ALLOWED_KNOWLEDGE_TYPES)}文件",
+                    code="INVALID_FILE_TYPE",
+                )
+            if not isinstance(size, int) or size < 0:
+                raise FileValidationError(f"文件大小无效: {filename}", code="INVALID_FILE_SIZE")
+            if size > FileService.MAX_FILE_SIZE:
+                raise FileValidationError(
+                    f"文件过大: {filename}。最大允许{FileService.MAX_FILE_SIZE // (1024*1024)}MB",
+                    code="FILE_SIZE_EXCEEDED",
+                )
+            if sha256 is not None and not _SHA256_PATTERN.match(sha256):
+                raise FileValidationError(f"SHA-256 格式错误: {filename}", code="INVALID_CHECKSUM")
+            if filename in seen_names:
+                raise FileValidationError(f"文件名重复: {filename}", code="DUPLICATE_FILE_NAME")
+            seen_names.add(filename)
+
+            manifest.append({"name": filename, "size": size, "sha256": sha256})
+        return manifest
+
+    def get_session(self, session_id: str, user_id: str) -> UploadSession:
+        """获取当前用户的上传会话
+
+        Args:
+            session_id: 会话ID
+            user_id: 当前用户ID
+
+        Returns:
+            UploadSession: 会话
+
+        Raises:
+            UploadSessionNotFoundError: 会话不存在、不属于该用户，或未提交且已过期
+        """
+        upload_session = self.db.query(UploadSession).filter(UploadSession.id == session_id).first()
+        if upload_session is None or upload_session.user_id != user_id:
+            raise UploadSessionNotFoundError()
+        if upload_session.status != SESSION_STATUS_COMMITTED and upload_session.expires_at <= datetime.now():
+            raise UploadSessionNotFoundError("上传会话已过期")
+        return upload_session
+
+    def delete_session(self, upload_session: UploadSession) -> None:
+        """取消上传会话，删除记录和已收到的分块
+
+        Args:
+            upload_session: 会话
+        """
+        if upload_session.status == SESSION_STATUS_COMMITTING:
+            raise UploadSessionConflictError("上传会话正在提交")
+        session_id = upload_session.id
+        self.db.delete(upload_session)
+        self.db.commit()
+        shutil.rmtree(self.session_dir(session_id), ignore_errors=True)
+
+    @staticmethod
+    def session_files(upload_session: UploadSession) -> list[dict[str, Any]]:
+        """会话的文件清单"""
+        return json.loads(upload_session.files or "[]")
+
+    # ------------------------------------------------------------------
+    # 分块
+    # ------------------------------------------------------------------
+
+    def session_dir(self, session_id: str) -> str:
+        """会话的分块目录"""
+        return os.path.join(self.session_root, session_id)
+
+    def chunk_path(self, session_id: str, file_index: int, chunk_index: int) -> str:
+        """分块的文件路径"""
+        return os.path.join(self.session_dir(session_id), str(file_index), f"{chunk_index:06d}{_CHUNK_SUFFIX}")
+
+    @staticmethod
+    def chunk_count(size: int, chunk_size: int) -> int:
+        """文件按分块大小切分后的块数（空文件为 0 块）"""
+        return (size + chunk_size - 1) // chunk_size
+
+    def put_chunk(
+        self, upload_session: UploadSession, file_index: int, chunk_index: int, offset: int, data: bytes, checksum: str
+    ) -> dict[str, Any]:
+        """写入一个分块
+
+        偏移量、长度和 SHA-256 都校验通过后才写入；重复上传同一块会原样替换，可以放心重试。
+        每次写入都会把会话的过期时间顺延一个 TTL。
+
+        Args:
+            upload_session: 会话
+            file_index: 文件在清单中的序号（从 0 开始）
+            chunk_index: 块序号（从 0 开始）
+            offset: 块在文件中的偏移量（必须等于 chunk_index * chunk_size）
+            data: 块内容
+            checksum: 块内容的 SHA-256（十六进制）
+
+        Returns:
+            dict: 该文件的上传进度
+
+        Raises:
+            UploadSessionConflictError: 会话已提交或正在提交
+            FileValidationError: 序号、偏移量、长度或校验和不正确
+        """
+        if upload_session.status != SESSION_STATUS_ACTIVE:
+            raise UploadSessionConflictError("上传会话已提交，不能再上传分块")
+
+        files = self.session_files(upload_session)
+        if not 0 <= file_index < len(files):
+            raise FileValidationError(f"文件序号无效: {file_index}", code="INVALID_FILE_INDEX")
+        size = files[file_index]["size"]
+        chunk_size = upload_session.chunk_size
+        if not 0 <= chunk_index < self.chunk_count(size, chunk_size):
+            raise FileValidationError(f"分块序号无效: {chunk_index}", code="INVALID_CHUNK_INDEX")
+
+        expected_offset = chunk_index * chunk_size
+        if offset != expected_offset:
+            raise FileValidationError(
+                f"分块偏移量错误: 第{chunk_index}块的偏移量应为{expected_offset}",
+                code="CHUNK_OFFSET_MISMATCH",
+                details={"expected_offset": expected_offset},
+            )
+        expected_length = min(chunk_size, size - expected_offset)
+        if len(data) != expected_length:
+            raise FileValidationError(
+                f"分块长度错误: 第{chunk_index}块应为{expected_length}字节，实际{len(data)}字节",
+                code="CHUNK_SIZE_MISMATCH",
+                details={"expected_length": expected_length},
+            )
+        if hashlib.sha256(data).hexdigest() != checksum:
+            raise FileValidationError(
+                f"分块校验失败: 第{chunk_index}块的 SHA-256 不匹配", code="CHUNK_CHECKSUM_MISMATCH"
+            )
+
+        path = self.chunk_path(upload_session.id, file_index, chunk_index)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(prefix=".chunk-", suffix=".part", dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        upload_session.expires_at = datetime.now() + self.ttl
+        self.db.commit()
+        return self._file_progress(upload_session, file_index, files[file_index])
+
+    def _received_chunks(self, session_id: str, file_index: int) -> set[int]:
+        """磁盘上已收到的块序号"""
+        try:
+            names = os.listdir(os.path.join(self.session_dir(session_id), str(file_index)))
+        except FileNotFoundError:
+            return set()
+        return {int(name[: -len(_CHUNK_SUFFIX)]) for name in names if name.endswith(_CHUNK_SUFFIX)}
+
+    def _file_progress(self, upload_session: UploadSession, file_index: int, file: dict[str, Any]) -> dict[str, Any]:
+        chunk_size = upload_session.chunk_size
+        total_chunks = self.chunk_count(file["size"], chunk_size)
+        received = self._received_chunks(upload_session.id, file_index)
+        missing = [i for i in range(total_chunks) if i not in received]
+        received_bytes = file["size"] - sum(min(chunk_size, file["size"] - i * chunk_size) for i in missing)
+        return {
+            "index": file_index,
+            "name": file["name"],
+            "size": file["size"],
+            "chunk_count": total_chunks,
+            "received_chunks": total_chunks - len(missing),
+            "missing_chunks": missing,
+            "received_bytes": received_bytes,
+        }
+
+    def get_progress(self, upload_session: UploadSession) -> dict[str, Any]:
+        """查询上传进度
+
+        Args:
+            upload_session: 会话
+
+        Returns:
+            dict: 会话信息和每个文件已收到 / 缺少的块
+        """
+        committed = upload_session.status == SESSION_STATUS_COMMITTED
+        files = [
+            (
+                {"index": i, "name": f["name"], "size": f["size"], "missing_chunks": [], "received_bytes": f["size"]}
+                if committed
+                else self._file_progress(upload_session, i, f)
+            )
+            for i, f in enumerate(self.session_files(upload_session))
+        ]
+        total_bytes = sum(f["size"] for f in files)
+        received_bytes = sum(f["received_bytes"] for f in files)
+        return {
+            "session_id": upload_session.id,
+            "status": upload_session.status,
+            "chunk_size": upload_session.chunk_size,
+            "expires_at": upload_session.expires_at.isoformat() if upload_session.expires_at else None,
+            "knowledge_base_id": upload_session.knowledge_base_id,
+            "total_bytes": total_bytes,
+            "received_bytes": received_bytes,
+            "complete": all(not f["missing_chunks"] for f in files),
+            "files": files,
+        }
+
+    # ------------------------------------------------------------------
+    # 提交
+    # ------------------------------------------------------------------
+
+    def begin_commit(self, upload_session: UploadSession) -> list[tuple[str, StagedUpload]]:
+        """开始提交：把会话标记为提交中，并把各文件的分块拼接为临时文件
+
+        状态按条件更新，同一会话的并发提交只有一个能继续。调用方创建知识库后调用 finish_commit，
+        失败时调用 abort_commit；返回的临时文件都应通过 discard_staged 清理。
+
+        Args:
+            upload_session: 会话
+
+        Returns:
+            list: (文件名, 临时文件) 列表，可直接传给 FileService.upload_knowledge_base
+
+        Raises:
+            UploadSessionConflictError: 会话已提交、正在提交，或还有未收到的分块
+            FileValidationError: 拼接后的文件与声明的 SHA-256 不一致
+        """
+        progress = self.get_progress(upload_session)
+        if upload_session.status != SESSION_STATUS_ACTIVE:
+            raise UploadSessionConflictError("上传会话已提交或正在提交")
+        if not progress["complete"]:
+            missing = {f["index"]: f["missing_chunks"] for f in progress["files"] if f["missing_chunks"]}
+            raise UploadSessionConflictError("还有未上传的分块", details={"missing_chunks": missing})
+
+        claimed = (
+            self.db.query(UploadSession)
+            .filter(UploadSession.id == upload_session.id, UploadSession.status == SESSION_STATUS_ACTIVE)
+            .update({UploadSession.status: SESSION_STATUS_COMMITTING}, synchronize_session=False)
+        )
+        self.db.commit()
+        if not claimed:
+            raise UploadSessionConflictError("上传会话已提交或正在提交")
+        self.db.refresh(upload_session)
+
+        staged_files: list[StagedUpload] = []
+        try:
+            for file_index, file in enumerate(self.session_files(upload_session)):
+                staged_files.append(self._assemble_file(upload_session, file_index, file))
+        except BaseException:
+            discard_staged(staged_files)
+            self.abort_commit(upload_session)
+            raise
+        return [(staged.filename, staged) for staged in staged_files]
+
+    def _assemble_file(self, upload_session: UploadSession, file_index: int, file: dict[str, Any]) -> StagedUpload:
+        """按块序号拼接一个文件，同时计算 SHA-256"""
+        os.makedirs(self.staging_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(prefix=".upload-", suffix=".part", dir=self.staging_dir)
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as out:
+                for chunk_index in range(self.chunk_count(file["size"], upload_session.chunk_size)):
+                    with open(self.chunk_path(upload_session.id, file_index, chunk_index), "rb") as f:
+                        for block in iter(lambda: f.read(ASSEMBLE_BUFFER_SIZE), b""):
+                            digest.update(block)
+                            out.write(block)
+                            size += len(block)
+            if size != file["size"] or (file.get("sha256") and digest.hexdigest() != file["sha256"]):
+                raise FileValidationError(
+                    f"文件校验失败: {file['name']} 的内容与声明不一致", code="FILE_CHECKSUM_MISMATCH"
+                )
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        return StagedUpload(file["name"], temp_path, size, digest.hexdigest())
+
+    def finish_commit(self, upload_session: UploadSession, knowledge_base_id: str) -> None:
+        """完成提交：记录创建的知识库并删除分块
+
+        会话记录保留到过期，期间重复提交（例如客户端没收到响应）返回同一个知识库。
+
+        Args:
+            upload_session: 会话
+            knowledge_base_id: 创建的知识库ID
+        """
+        upload_session.status = SESSION_STATUS_COMMITTED
+        upload_session.knowledge_base_id = knowledge_base_id
+        upload_session.expires_at = datetime.now() + self.ttl
+        self.db.commit()
+        shutil.rmtree(self.session_dir(upload_session.id), ignore_errors=True)
+
+    def abort_commit(self, upload_session: UploadSession) -> None:
+        """提交失败：恢复为可继续上传的状态（已收到的分块保留）
+
+        Args:
+            upload_session: 会话
+        """
+        self.db.rollback()
+        self.db.query(UploadSession).filter(
+            UploadSession.id == upload_session.id, UploadSession.status == SESSION_STATUS_COMMITTING
+        ).update({UploadSession.status: SESSION_STATUS_ACTIVE}, synchronize_session=False)
+        self.db.commit()
+
+    # ------------------------------------------------------------------
+    # 垃圾回收
+    # ------------------------------------------------------------------
+
+    def collect_expired(self) -> dict[str, int]:
+        """删除过期的会话
+
+        删除已过期的会话记录及其分块目录，
+        以及超过 TTL 仍没有记录的分块目录（删除记录后进程中断留下）。
+
+        Returns:
+            dict: 删除的会话数和目录数
+        """
+        removed_sessions, removed_dirs = self._collect_expired_sessions()
+        removed_dirs += self._collect_orphan_dirs()
+
+        if removed_sessions or removed_dirs:
+            logger.info(f"上传会话清理: 删除会话 {removed_sessions} 个，分块目录 {removed_dirs} 个")
+        return {"removed_sessions": removed_sessions, "removed_dirs": removed_dirs}
+
+    def _collect_expired_sessions(self) -> tuple[int, int]:
+        """删除过期的会话记录及其分块目录，返回删除的会话数和目录数"""
+        now = datetime.now()
+        # 提交中的会话再多保留一个 TTL（提交过程中进程退出会让会话停留在提交中）
+        expired = or_(
+            and_(UploadSession.status != SESSION_STATUS_COMMITTING, UploadSession.expires_at <= now),
+            UploadSession.expires_at <= now - self.ttl,
+        )
+        expired_ids = [session_id for (session_id,) in self.db.query(UploadSession.id).filter(expired)]
+        removed_sessions = removed_dirs = 0
+        for session_id in expired_ids:
+            # 条件删除：期间又上传了分块（过期时间已顺延）的会话不会被删除
+            deleted = (
+                self.db.query(UploadSession)
+                .filter(UploadSession.id == session_id, expired)
+                .delete(synchronize_session=False)
+            )
+            self.db.commit()
+            if deleted:
+                removed_sessions += 1
+                if os.path.isdir(self.session_dir(session_id)):
+                    shutil.rmtree(self.session_dir(session_id), ignore_errors=True)
+                    removed_dirs += 1
+        return removed_sessions, removed_dirs
+
+    def _collect_orphan_dirs(self) -> int:
+        """删除超过 TTL 仍没有会话记录的分块目录，返回删除的目录数"""
+        try:
+            session_dirs = os.listdir(self.session_root)
+        except FileNotFoundError:
+            return 0
+        if not session_dirs:
+            return 0
+
+        known = {session_id for (session_id,) in self.db.query(UploadSession.id)}
+        orphan_cutoff = time.time() - self.ttl.total_seconds()
+        removed_dirs = 0
+        for session_id in session_dirs:
+            path = self.session_dir(session_id)
+            try:
+                if session_id in known or os.path.getmtime(path) >= orphan_cutoff:
+                    continue
+            except OSError:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            removed_dirs += 1
+        return removed_dirs
@@ -12,6 +12,7 @@ from typing import Any
 from sqlalchemy.orm import Session
 
 from app.core.cache.decorators import cache_invalidate
+from app.core.cache.entity_cache import get_entity_cache
 from app.core.cache.invalidation import invalidate_user_cache
 from app.core.config_manager import config_manager
 from app.core.security import get_password_hash, verify_password
@@ -35,17 +36,23 @@ class UserService:
         """
         self.db = db
 
-    def get_user_by_id(self, user_id: str) -> User | None:
+    def get_user_by_id(self, user_id: str, cached: bool = False) -> User | None:
         """
         根据 ID 获取用户。
 
         Args:
             user_id: 用户 ID
+            cached: 是否经实体缓存读取（命中时返回游离状态的只读快照，不含 hashed_password，
+                仅用于不修改用户、不访问关系属性的场景）
 
         Returns:
             找到返回用户对象，否则返回 None
         """
         try:
+            if cached:
+                return get_entity_cache().get(
+                    "user", user_id, lambda: self.db.query(User).filter(User.id == user_id).first()
+                )
             return self.db.query(User).filter(User.id == user_id).first()
         except Exception as e:
             logger.error(f"Error getting user by ID {user_id}: {str(e)}")
@@ -16,16 +16,39 @@ from app.utils.avatar import (
     validate_image_file,
 )
 from app.utils.file import (
+    StagedUpload,
+    UploadTooLargeError,
     delete_file,
+    discard_staged,
     ensure_directory_exists,
     generate_unique_filename,
     get_file_extension,
+    measure_upload_size,
     save_uploaded_file,
     save_uploaded_file_with_size,
+    stage_upload,
+    stage_uploads,
     validate_file_content_size,
     validate_file_size,
     validate_file_type,
 )
+from app.utils.file_io import (
+    FileIOExecutor,
+    StageTimer,
+    aiter_file_io,
+    get_file_io_executor,
+    map_file_io,
+    reset_file_io_executor,
+    run_file_io,
+)
+from app.utils.zip_stream import (
+    ZipEntry,
+    aiter_zip,
+    content_disposition,
+    iter_zip,
+    zip_entry_from_bytes,
+    zip_entry_from_file,
+)
 
 # WebSocket manager
 from app.utils.websocket import (
@@ -44,6 +67,27 @@ __all__ = [
     "delete_file",
     "get_file_extension",
     "generate_unique_filename",
+    "stage_upload",
+    "stage_uploads",
+    "discard_staged",
+    "measure_upload_size",
+    "StagedUpload",
+    "UploadTooLargeError",
+    # File I/O thread pool
+    "FileIOExecutor",
+    "get_file_io_executor",
+    "reset_file_io_executor",
+    "run_file_io",
+    "aiter_file_io",
+    "map_file_io",
+    "StageTimer",
+    # Streaming ZIP
+    "ZipEntry",
+    "iter_zip",
+    "aiter_zip",
+    "zip_entry_from_file",
+    "zip_entry_from_bytes",
+    "content_disposition",
     # Avatar utilities
     "ensure_avatar_dir",
     "validate_image_file",
@@ -0,0 +1,225 @@
+"""
+文件内容的静态压缩
+
+知识库文件（.txt / .json）通常能压缩到原来的 1/5 到 1/10，按 [upload.compression] 配置压缩后保存：
+- gzip 写出固定的 10 字节头（无文件名、修改时间为 0），其中的 DEFLATE 数据可以直接作为 ZIP 条目的内容
+- zstd 需要安装可选依赖 zstandard，未安装时回退到 gzip
+- 下载时客户端接受该编码则直接发送保存的内容，否则边读边解压
+"""
+
+import io
+import logging
+import struct
+import zlib
+from collections.abc import Iterable, Iterator
+from functools import lru_cache
+from typing import BinaryIO
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - 可选依赖
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# 支持的编码（与 HTTP Content-Encoding 的取值一致）
+ENCODING_GZIP = "gzip"
+ENCODING_ZSTD = "zstd"
+
+# 压缩后的对象键后缀
+ENCODING_SUFFIXES = {ENCODING_GZIP: ".gz", ENCODING_ZSTD: ".zst"}
+
+# 读取源数据的块大小
+COMPRESSION_CHUNK_SIZE = 1024 * 1024
+
+# gzip 头：ID1 ID2、CM=8（DEFLATE）、FLG=0、MTIME=0、XFL=0、OS=255（未知）
+GZIP_HEADER = b"\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff"
+
+# gzip 尾：CRC32 和原始大小（模 2^32），小端序
+GZIP_TRAILER = struct.Struct("<II")
+
+
+@lru_cache(maxsize=8)
+def resolve_encoding(algorithm: str | None) -> str | None:
+    """把配置的压缩算法解析为编码（结果被缓存，回退的警告只记录一次）
+
+    Args:
+        algorithm: none / gzip / zstd
+
+    Returns:
+        str | None: 编码，None 表示不压缩；zstd 不可用和未知的算法回退到 gzip
+    """
+    algorithm = (algorithm or "").strip().lower()
+    if algorithm in ("", "none"):
+        return None
+    if algorithm == ENCODING_ZSTD:
+        if zstandard is not None:
+            return ENCODING_ZSTD
+        logger.warning("未安装 zstandard，知识库文件改用 gzip 压缩")
+        return ENCODING_GZIP
+    if algorithm != ENCODING_GZIP:
+        logger.warning(f"未知的压缩算法 {algorithm}，知识库文件改用 gzip 压缩")
+    return ENCODING_GZIP
+
+
+def _iter_gzip(chunks: Iterable[bytes], level: int) -> Iterator[bytes]:
+    compressor = zlib.compressobj(min(max(level, 1), 9), zlib.DEFLATED, -zlib.MAX_WBITS)
+    crc = size = 0
+    yield GZIP_HEADER
+    for chunk in chunks:
+        crc = zlib.crc32(chunk, crc)
+        size += len(chunk)
+        if data := compressor.compress(chunk):
+            yield data
+    yield compressor.flush() + GZIP_TRAILER.pack(crc, size & 0xFFFFFFFF)
+
+
+def iter_compress(chunks: Iterable[bytes], encoding: str, level: int = 6) -> Iterator[bytes]:
+    """逐块压缩
+
+    Args:
+        chunks: 原始数据块
+        encoding: gzip / zstd
+        level: 压缩级别
+
+    Yields:
+        bytes: 压缩后的数据
+    """
+    if encoding == ENCODING_GZIP:
+        yield from _iter_gzip(chunks, level)
+        return
+    if encoding != ENCODING_ZSTD or zstandard is None:
+        raise ValueError(f"不支持的压缩编码: {encoding}")
+    compressor = zstandard.ZstdCompressor(level=level).compressobj()
+    for chunk in chunks:
+        if data := compressor.compress(chunk):
+            yield data
+    yield compressor.flush()
+
+
+def iter_decompress(chunks: Iterable[bytes], encoding: str) -> Iterator[bytes]:
+    """逐块解压
+
+    Args:
+        chunks: 压缩后的数据块
+        encoding: gzip / zstd
+
+    Yields:
+        bytes: 原始数据
+    """
+    if encoding == ENCODING_GZIP:
+        # wbits=31 解析 gzip 头并校验 CRC32
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    elif encoding == ENCODING_ZSTD and zstandard is not None:
+        decompressor = zstandard.ZstdDecompressor().decompressobj()
+    else:
+        raise ValueError(f"不支持的压缩编码: {encoding}")
+    for chunk in chunks:
+        if data := decompressor.decompress(chunk):
+            yield data
+    if encoding == ENCODING_GZIP:
+        if data := decompressor.flush():
+            yield data
+        if not decompressor.eof:
+            raise zlib.error("gzip 数据不完整")
+
+
+def compress_bytes(data: bytes, encoding: str, level: int = 6) -> bytes:
+    """压缩内存中的内容"""
+    return b"".join(iter_compress((data,), encoding, level))
+
+
+def compress_file(source_path: str, dest_path: str, encoding: str, level: int = 6) -> int:
+    """把文件压缩写入另一个文件（阻塞，在文件 I/O 线程池中执行）
+
+    Args:
+        source_path: 原始文件路径
+        dest_path: 压缩文件路径
+        encoding: gzip / zstd
+        level: 压缩级别
+
+    Returns:
+        int: 压缩后的大小
+    """
+    with open(source_path, "rb") as src, open(dest_path, "wb") as dest:
+        for data in iter_compress(iter(lambda: src.read(COMPRESSION_CHUNK_SIZE), b""), encoding, level):
+            dest.write(data)
+        return dest.tell()
+
+
+class _DecompressReader(io.RawIOBase):
+    """从压缩数据流读取原始内容，关闭时关闭源数据流"""
+
+    def __init__(self, src: BinaryIO, encoding: str):
+        self._src = src
+        self._chunks = iter_decompress(iter(lambda: src.read(COMPRESSION_CHUNK_SIZE), b""), encoding)
+        self._buffer = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._buffer:
+            self._buffer = next(self._chunks, b"")
+            if not self._buffer:
+                return 0
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+    def close(self) -> None:
+        if not self.closed:
+            self._src.close()
+        super().close()
+
+
+def open_decompressed(src: BinaryIO, encoding: str) -> BinaryIO:
+    """包装压缩数据流，读取时解压（关闭时同时关闭 src）
+
+    Args:
+        src: 压缩数据流
+        encoding: gzip / zstd
+
+    Returns:
+        BinaryIO: 原始内容的数据流
+    """
+    return io.BufferedReader(_DecompressReader(src, encoding), COMPRESSION_CHUNK_SIZE)
+
+
+def accepts_encoding(accept_encoding: str | None, encoding: str) -> bool:
+    """客户端的 Accept-Encoding 是否接受该编码（q=0 表示不接受）
+
+    Args:
+        accept_encoding: Accept-Encoding 请求头
+        encoding: gzip / zstd
+
+    Returns:
+        bool: 是否接受
+    """
+    if not accept_encoding:
+        return False
+    wildcard = False
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name == "x-gzip":
+            name = ENCODING_GZIP
+        if name == encoding:
+            return quality > 0
+        if name == "*":
+            wildcard = quality > 0
+    return wildcard
+
+
+def encoded_path(path: str, encoding: str | None) -> str:
+    """压缩内容对应的文件路径 / 对象键（原始内容不变）"""
+    return path + ENCODING_SUFFIXES[encoding] if encoding else path
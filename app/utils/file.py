@@ -4,12 +4,248 @@
 提供通用的文件处理功能，包括文件验证、保存、删除等操作。
 """
 
+import asyncio
+import hashlib
 import os
+import tempfile
+from collections.abc import Iterable, Sequence
 from datetime import datetime
+from typing import Any, BinaryIO
 
 from fastapi import HTTPException, UploadFile, status
 from werkzeug.utils import secure_filename
 
+from app.utils.file_io import run_file_io
+
+# 流式读取上传文件的块大小（字节）
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLargeError(Exception):
+    """上传文件的实际内容超过大小限制"""
+
+    def __init__(self, filename: str | None, max_size: int):
+        self.filename = filename
+        self.max_size = max_size
+        super().__init__(f"文件内容过大: {filename}，最大允许 {max_size} 字节")
+
+
+class StagedUpload:
+    """已流式写入临时文件的上传文件
+
+    临时文件与目标目录位于同一上传目录下，commit 时通过 os.replace 原子地移动到位，
+    读者不会看到写了一半的文件。len() 返回文件大小，可与字节内容同样参与大小校验。
+    """
+
+    def __init__(self, filename: str, temp_path: str, size: int, sha256: str):
+        self.filename = filename
+        self.temp_path = temp_path
+        self.size = size
+        self.sha256 = sha256
+        self.path: str | None = None
+
+    def __len__(self) -> int:
+        return self.size
+
+    def read_bytes(self) -> bytes:
+        """读取全部内容（仅用于需要解析的小文件）"""
+        with open(self.path or self.temp_path, "rb") as f:
+            return f.read()
+
+    def commit(self, directory: str, filename: str | None = None) -> str:
+        """把临时文件原子地移动到目标目录
+
+        文件名经 secure_filename 处理，目标文件已存在时添加时间戳。
+
+        Args:
+            directory: 目标目录
+            filename: 目标文件名（可选，默认为上传时的文件名）
+
+        Returns:
+            str: 文件最终路径
+        """
+        if self.path is not None:
+            return self.path
+
+        os.makedirs(directory, exist_ok=True)
+        safe_filename = secure_filename(filename or self.filename)
+        file_path = os.path.join(directory, safe_filename)
+        if os.path.exists(file_path):
+            name, ext = os.path.splitext(safe_filename)
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            file_path = os.path.join(directory, f"{name}_{timestamp}{ext}")
+
+        return self.move_to(file_path)
+
+    def move_to(self, file_path: str) -> str:
+        """把临时文件原子地移动到指定路径（已存在的文件被替换）
+
+        Args:
+            file_path: 目标路径
+
+        Returns:
+            str: 目标路径
+        """
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        os.replace(self.temp_path, file_path)
+        self.path = file_path
+        return file_path
+
+    def discard(self) -> None:
+        """删除未提交的临时文件"""
+        if self.path is None and os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+
+def _open_staging_file(staging_dir: str) -> tuple[BinaryIO, str]:
+    """在临时文件目录中创建临时文件，返回 (文件对象, 路径)"""
+    os.makedirs(staging_dir, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix=".upload-", suffix=".part", dir=staging_dir)
+    return os.fdopen(fd, "wb"), temp_path
+
+
+def _write_chunk(buffer: BinaryIO, digest: Any, chunk: bytes) -> None:
+    """写入一个块并更新摘要（hashlib 处理大块数据时释放 GIL）"""
+    digest.update(chunk)
+    buffer.write(chunk)
+
+
+async def stage_upload(
+    file: UploadFile, staging_dir: str, max_size: int | None = None, chunk_size: int = UPLOAD_CHUNK_SIZE
+) -> StagedUpload:
+    """
+    把上传文件按固定大小的块复制到临时文件
+
+    复制过程中累计大小并计算 SHA-256，超过 max_size 时立即停止并删除临时文件，
+    任何时候内存中最多只有一个块。UploadFile 由临时文件支持，读取不足一个块即表示已到末尾。
+    写入和摘要计算在文件 I/O 线程池中执行，不阻塞事件循环。
+
+    Args:
+        file: 上传的文件对象
+        staging_dir: 临时文件目录（应与最终目录位于同一文件系统，以便原子移动）
+        max_size: 最大文件大小（字节，可选）
+        chunk_size: 每次读取的字节数
+
+    Returns:
+        StagedUpload: 临时文件、大小和 SHA-256
+
+    Raises:
+        UploadTooLargeError: 内容超过 max_size
+
+    Example:
+        >>> staged = await stage_upload(file, "uploads/.staging", max_size=10 * 1024 * 1024)
+        >>> file_path = staged.commit("uploads/knowledge/kb1")
+    """
+    buffer, temp_path = await run_file_io("stage_upload", _open_staging_file, staging_dir)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with buffer:
+            while True:
+                chunk = await file.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_size is not None and size > max_size:
+                    raise UploadTooLargeError(file.filename, max_size)
+                await run_file_io("stage_upload", _write_chunk, buffer, digest, chunk)
+                if len(chunk) < chunk_size:
+                    break
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+    return StagedUpload(file.filename, temp_path, size, digest.hexdigest())
+
+
+async def stage_uploads(
+    files: Sequence[UploadFile],
+    staging_dir: str,
+    max_size: int | None = None,
+    concurrency: int = 1,
+) -> list[StagedUpload]:
+    """
+    以有界并发把多个上传文件复制到临时文件
+
+    最多 concurrency 个文件同时读取、计算 SHA-256 和写入，一个文件等待磁盘时其他文件继续处理。
+    任一文件失败（例如超过 max_size）时其余尚未开始的文件不再处理，等正在处理的文件结束后
+    删除所有已写入的临时文件并抛出最先发生的异常，不会留下部分完成的上传。
+
+    Args:
+        files: 上传的文件列表
+        staging_dir: 临时文件目录
+        max_size: 单个文件的最大大小（字节，可选）
+        concurrency: 同时处理的文件数
+
+    Returns:
+        list[StagedUpload]: 与 files 顺序一致的临时文件
+
+    Raises:
+        UploadTooLargeError: 某个文件的内容超过 max_size
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    staged_files: dict[int, StagedUpload] = {}
+    errors: list[Exception] = []
+
+    async def stage(index: int, file: UploadFile) -> None:
+        async with semaphore:
+            if errors:
+                # 已有文件失败，尚未开始的文件不再处理
+                return
+            try:
+                staged_files[index] = await stage_upload(file, staging_dir, max_size=max_size)
+            except Exception as e:
+                errors.append(e)
+
+    try:
+        await asyncio.gather(*(stage(index, file) for index, file in enumerate(files)))
+    except BaseException:
+        # 请求被取消
+        discard_staged(staged_files.values())
+        raise
+    if errors:
+        # 正在处理的文件执行完后才清理，避免删除仍在写入的临时文件
+        discard_staged(staged_files.values())
+        raise errors[0]
+    return [staged_files[index] for index in range(len(files))]
+
+
+def discard_staged(staged_files: Iterable[StagedUpload]) -> None:
+    """
+    删除未提交的临时文件（已提交的文件不受影响）
+
+    Args:
+        staged_files: stage_upload 返回的对象
+    """
+    for staged in staged_files:
+        try:
+            staged.discard()
+        except OSError:
+            pass
+
+
+async def measure_upload_size(file: UploadFile, limit: int, chunk_size: int = UPLOAD_CHUNK_SIZE) -> int:
+    """
+    按块读取上传文件并累计大小，超过 limit 后立即停止（不保留内容）
+
+    Args:
+        file: 上传的文件对象
+        limit: 大小上限（字节）
+        chunk_size: 每次读取的字节数
+
+    Returns:
+        int: 文件大小；超过上限时为已读取的字节数（大于 limit）
+    """
+    size = 0
+    while size <= limit:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+        size += len(chunk)
+        if len(chunk) < chunk_size:
+            break
+    return size
+
 
 def validate_file_type(file: UploadFile, allowed_types: list[str]) -> bool:
     """
@@ -72,11 +308,11 @@ async def validate_file_content_size(file: UploadFile, max_size: int) -> bool:
         >>> await validate_file_content_size(file, 10 * 1024 * 1024)
         True
     """
-    # 读取文件内容以验证实际大小
-    content = await file.read()
+    # 按块读取以验证实际大小，不在内存中保留内容
+    size = await measure_upload_size(file, max_size)
     await file.seek(0)  # 重置文件指针
 
-    return len(content) <= max_size
+    return size <= max_size
 
 
 async def save_uploaded_file(file: UploadFile, target_dir: str) -> str:
@@ -104,10 +340,13 @@ async def save_uploaded_file(file: UploadFile, target_dir: str) -> str:
         file_name = f"{timestamp}_{file.filename}"
         file_path = os.path.join(target_dir, file_name)
 
-        # 保存文件
-        with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
+        # 按块写入临时文件后移动到位
+        staged = await stage_upload(file, target_dir)
+        try:
+            await run_file_io("commit_upload", os.replace, staged.temp_path, file_path)
+        except OSError:
+            staged.discard()
+            raise
 
         return file_path
     except Exception as e:
@@ -135,29 +374,11 @@ async def save_uploaded_file_with_size(file: UploadFile, directory: str) -> tupl
         >>> print(f"Saved {file_size} bytes to {file_path}")
     """
     try:
-        # 确保目录存在
-        os.makedirs(directory, exist_ok=True)
-
-        # 生成安全的文件名
-        filename = secure_filename(file.filename)
-        file_path = os.path.join(directory, filename)
-
-        # 如果文件已存在，添加时间戳
-        if os.path.exists(file_path):
-            name, ext = os.path.splitext(filename)
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"{name}_{timestamp}{ext}"
-            file_path = os.path.join(directory, filename)
-
-        # 保存文件并计算大小
-        with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
-
-        # 计算文件大小（字节）
-        file_size_b = len(content)
+        # 按块写入临时文件，再以安全的文件名原子移动到目标目录（文件已存在时添加时间戳）
+        staged = await stage_upload(file, directory)
+        file_path = await run_file_io("commit_upload", staged.commit, directory)
 
-        return file_path, file_size_b
+        return file_path, staged.size
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"文件保存失败: {str(e)}") from e
 
@@ -0,0 +1,307 @@
+"""
+文件 I/O 线程池
+
+上传、删除和打包都是阻塞的磁盘操作，在 async 路由中直接执行会占住事件循环线程，
+磁盘变慢或删除大目录时所有请求和 WebSocket 推送都会一起停顿。
+FileIOExecutor 把这些操作提交到独立的有界线程池：
+- 与 FastAPI / asyncio 的默认线程池分开，大量文件操作不会占满同步端点和 to_thread 的线程
+- max_workers 限制同时访问磁盘的线程数，超出的操作排队等待
+- 提交时复制 contextvars，日志上下文在线程中保持不变
+- 按操作名记录排队时间和执行时间（Prometheus），并统计排队和执行中的操作数
+
+一次上传的多个文件通过 map_file_io 在临时的有界线程池中并行处理，StageTimer 记录上传各阶段的耗时。
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import threading
+import time
+from collections.abc import AsyncIterator, Callable, Iterator, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, TypeVar
+
+from prometheus_client import Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# 默认的工作线程数
+DEFAULT_MAX_WORKERS = 4
+
+file_io_wait_seconds = Histogram(
+    "file_io_wait_seconds",
+    "文件 I/O 操作在线程池中的排队时间（秒）",
+    ["operation"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+file_io_duration_seconds = Histogram(
+    "file_io_duration_seconds",
+    "文件 I/O 操作执行耗时（秒）",
+    ["operation", "status"],  # status: success, failed
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
+file_io_queued = Gauge("file_io_queued", "等待文件 I/O 线程的操作数")
+
+file_io_active = Gauge("file_io_active", "正在执行的文件 I/O 操作数")
+
+file_upload_stage_seconds = Histogram(
+    "file_upload_stage_seconds",
+    "多文件上传各阶段的耗时（秒）",
+    ["operation", "stage"],  # stage: receive, validate, hash, register, write, commit 等
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+
+
+class FileIOExecutor:
+    """执行阻塞文件操作的有界线程池"""
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS, name: str = "file-io"):
+        """初始化文件 I/O 线程池
+
+        Args:
+            max_workers: 最大工作线程数
+            name: 线程名前缀
+        """
+        self.max_workers = max(1, max_workers)
+        self.name = name
+
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._completed = 0
+        self._failed = 0
+
+    async def run(self, operation: str, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """在线程池中执行阻塞的文件操作并等待结果
+
+        Args:
+            operation: 操作名（指标标签和日志）
+            func: 要执行的函数
+            *args: 位置参数
+            **kwargs: 关键字参数
+
+        Returns:
+            func 的返回值（func 抛出的异常原样传播）
+
+        调用方被取消时，已开始执行的操作仍会在线程中执行完成。
+        """
+        loop = asyncio.get_running_loop()
+        call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+        self._update(queued=1)
+        try:
+            future = loop.run_in_executor(self._executor, self._execute, operation, call, time.perf_counter())
+        except RuntimeError:
+            # 线程池已关闭
+            self._update(queued=-1)
+            raise
+        return await future
+
+    def _execute(self, operation: str, call: Callable[[], T], submitted_at: float) -> T:
+        started_at = time.perf_counter()
+        file_io_wait_seconds.labels(operation=operation).observe(started_at - submitted_at)
+        self._update(queued=-1, active=1)
+        status = "success"
+        try:
+            return call()
+        except BaseException:
+            status = "failed"
+            raise
+        finally:
+            elapsed = time.perf_counter() - started_at
+            file_io_duration_seconds.labels(operation=operation, status=status).observe(elapsed)
+            self._update(active=-1, completed=status == "success", failed=status == "failed")
+            if elapsed >= 1.0:
+                logger.info(f"文件 I/O 操作耗时较长 (operation={operation}, elapsed={elapsed:.2f}s)")
+
+    def _update(self, queued: int = 0, active: int = 0, completed: bool = False, failed: bool = False) -> None:
+        with self._lock:
+            self._queued += queued
+            self._active += active
+            self._completed += int(completed)
+            self._failed += int(failed)
+            file_io_queued.set(self._queued)
+            file_io_active.set(self._active)
+
+    def get_stats(self) -> dict[str, int]:
+        """获取线程池状态
+
+        Returns:
+            dict: 最大线程数、排队和执行中的操作数、已完成和失败的操作数
+        """
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "queued": self._queued,
+                "active": self._active,
+                "completed": self._completed,
+                "failed": self._failed,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """关闭线程池
+
+        Args:
+            wait: 是否等待已提交的操作执行完成
+        """
+        self._executor.shutdown(wait=wait)
+
+
+# 全局文件 I/O 线程池实例（延迟初始化）
+_global_file_io_executor: FileIOExecutor | None = None
+_global_lock = threading.Lock()
+
+
+def get_file_io_executor() -> FileIOExecutor:
+    """获取全局文件 I/O 线程池实例
+
+    Returns:
+        FileIOExecutor 实例
+    """
+    global _global_file_io_executor
+
+    if _global_file_io_executor is None:
+        with _global_lock:
+            if _global_file_io_executor is None:
+                from app.core.config import settings
+
+                _global_file_io_executor = FileIOExecutor(max_workers=settings.FILE_IO_MAX_WORKERS)
+
+    return _global_file_io_executor
+
+
+def reset_file_io_executor() -> None:
+    """关闭并重置全局文件 I/O 线程池
+
+    等待已提交的操作执行完成，用于应用关闭、测试或重新加载配置。
+    """
+    global _global_file_io_executor
+
+    with _global_lock:
+        executor, _global_file_io_executor = _global_file_io_executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+async def run_file_io(operation: str, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """在全局文件 I/O 线程池中执行阻塞的文件操作
+
+    Args:
+        operation: 操作名（指标标签和日志）
+        func: 要执行的函数
+        *args: 位置参数
+        **kwargs: 关键字参数
+
+    Returns:
+        func 的返回值
+
+    Example:
+        >>> await run_file_io("rmtree", shutil.rmtree, kb_dir)
+    """
+    return await get_file_io_executor().run(operation, func, *args, **kwargs)
+
+
+async def aiter_file_io(operation: str, chunks: Iterator[T]) -> AsyncIterator[T]:
+    """在全局文件 I/O 线程池中逐个取出同步迭代器的元素（用于 StreamingResponse）
+
+    Args:
+        operation: 操作名（指标标签和日志）
+        chunks: 执行阻塞读写的同步迭代器（生成器）
+
+    Yields:
+        迭代器的元素
+
+    客户端断开（任务被取消）时，先等待线程中正在执行的 next() 结束，再在线程池中关闭生成器，
+    释放其中打开的文件；直接关闭仍在执行的生成器会抛出 ValueError 且不会执行它的清理代码。
+    """
+    sentinel = object()
+    pending: asyncio.Future | None = None
+    try:
+        while True:
+            pending = asyncio.ensure_future(run_file_io(operation, next, chunks, sentinel))
+            # shield：取消只中断等待，不影响已提交的 next()
+            chunk = await asyncio.shield(pending)
+            pending = None
+            if chunk is sentinel:
+                return
+            yield chunk
+    finally:
+        if pending is not None:
+            await asyncio.wait((pending,))
+            if not pending.cancelled():
+                pending.exception()
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            try:
+                await run_file_io(operation, close)
+            except RuntimeError:
+                # 线程池已关闭
+                close()
+
+
+def map_file_io(operation: str, func: Callable[[T], R], items: Sequence[T], max_workers: int) -> list[R]:
+    """在临时的有界线程池中并行执行阻塞的文件操作，按输入顺序返回结果
+
+    用于已经在文件 I/O 线程中执行的操作内部（例如同时保存一次上传的多个文件）：
+    不向全局线程池提交，避免工作线程等待排在自己后面的任务而死锁。
+    任一调用失败时取消尚未开始的调用，等待已开始的调用结束后抛出第一个异常。
+
+    Args:
+        operation: 操作名（线程名前缀）
+        func: 对每个元素执行的函数
+        items: 元素列表
+        max_workers: 最大并行数（不超过 1 或只有一个元素时在当前线程中依次执行）
+
+    Returns:
+        list: 每个元素的结果
+    """
+    if max_workers <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items)), thread_name_prefix=operation) as executor:
+        futures = [executor.submit(contextvars.copy_context().run, func, item) for item in items]
+        try:
+            return [future.result() for future in futures]
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+
+class StageTimer:
+    """按阶段累计上传耗时，同时记录到 file_upload_stage_seconds 指标"""
+
+    def __init__(self, operation: str):
+        """初始化阶段计时器
+
+        Args:
+            operation: 操作名（指标标签）
+        """
+        self.operation = operation
+        self._durations: dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """记录一个阶段的耗时（同名阶段累加，失败的阶段同样计入）
+
+        Args:
+            name: 阶段名
+        """
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started_at
+            self._durations[name] = self._durations.get(name, 0.0) + elapsed
+            file_upload_stage_seconds.labels(operation=self.operation, stage=name).observe(elapsed)
+
+    def as_dict(self) -> dict[str, float]:
+        """各阶段的耗时（毫秒，保留一位小数），按阶段开始的先后排列"""
+        return {name: round(seconds * 1000, 1) for name, seconds in self._durations.items()}
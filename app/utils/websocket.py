@@ -2,6 +2,7 @@
 WebSocket 管理器模块
 
 提供 WebSocket 连接管理和消息推送功能。
+多 worker 部署时，用户的连接可能位于其他 worker，消息更新通过失效事件总线广播到所有 worker。
 """
 
 from collections.abc import Iterable
@@ -9,6 +10,7 @@ from collections.abc import Iterable
 from fastapi import WebSocket
 from fastapi.encoders import jsonable_encoder
 
+from app.core.cache.bus import EVENT_MESSAGE_UPDATE, get_invalidation_bus
 from app.core.database import get_db_context
 from app.core.logging import app_logger
 from app.models.database import Message
@@ -142,6 +144,7 @@ class MessageWebSocketManager:
 
         批量向多个用户发送消息更新通知。
         会自动去重用户ID列表。
+        失效事件总线通过 Redis 分发时发布事件，由持有连接的 worker 各自推送；否则直接在本进程推送。
 
         Args:
             user_ids: 用户ID的可迭代对象
@@ -150,9 +153,30 @@ class MessageWebSocketManager:
             >>> await manager.broadcast_user_update(["user123", "user456", "user789"])
         """
         unique_ids = {str(uid) for uid in user_ids if uid}
+        if not unique_ids:
+            return
+
+        bus = get_invalidation_bus()
+        if bus.is_distributed:
+            await bus.publish(EVENT_MESSAGE_UPDATE, {"user_ids": sorted(unique_ids)})
+            return
+
         for uid in unique_ids:
             await self.send_message_update(uid)
 
+    async def handle_message_update_event(self, event: dict) -> None:
+        """
+        处理失效事件总线的消息更新事件
+
+        只向本 worker 持有连接的用户推送。
+
+        Args:
+            event: 总线事件，data 中包含 user_ids
+        """
+        for uid in event.get("data", {}).get("user_ids", []):
+            if str(uid) in self.connections:
+                await self.send_message_update(str(uid))
+
 
 # 创建全局 WebSocket 管理器实例
 message_ws_manager = MessageWebSocketManager()
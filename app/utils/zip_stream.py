@@ -0,0 +1,300 @@
+"""
+流式 ZIP 生成
+
+知识库和人设卡的打包下载不再先在临时目录写出完整的压缩包：
+- iter_zip 边读取文件边压缩，每累积 flush_size 字节就产出一块，首字节不再随压缩包大小增长
+- 输出流不可回退，文件大小和 CRC 写在每个文件之后的数据描述符中（ZIP 标准格式，常见解压工具均支持）
+- 已压缩的格式和很小的文件使用 STORED，其余使用 DEFLATED
+- 以 gzip 保存的文件直接写入其中的 DEFLATE 数据，不再解压和重新压缩；其他编码解压后重新压缩
+  （依赖 zipfile 的内部实现，首次使用时在内存中自检，不可用时同样解压后重新压缩）
+- aiter_zip 在文件 I/O 线程池中逐块生成，可直接交给 StreamingResponse，不产生任何临时文件
+"""
+
+import io
+import logging
+import os
+import time
+import zipfile
+import zlib
+from collections.abc import AsyncIterator, Callable, Iterable, Iterator
+from functools import lru_cache
+from typing import IO, BinaryIO, NamedTuple
+from urllib.parse import quote
+
+from app.utils.compression import ENCODING_GZIP, GZIP_HEADER, GZIP_TRAILER, compress_bytes, open_decompressed
+from app.utils.file_io import aiter_file_io
+
+logger = logging.getLogger(__name__)
+
+# 读取源文件的块大小
+ZIP_CHUNK_SIZE = 1024 * 1024
+
+# 输出缓冲达到该大小时产出一块
+ZIP_FLUSH_SIZE = 64 * 1024
+
+# 小于该大小的文件不压缩（压缩收益小于 DEFLATE 的开销）
+MIN_DEFLATE_SIZE = 512
+
+# 本身已压缩的格式，再次压缩只浪费 CPU
+STORED_EXTENSIONS = frozenset(
+    {
+        ".zip", ".gz", ".tgz", ".bz2", ".xz", ".7z", ".rar", ".zst",
+        ".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif",
+        ".mp3", ".mp4", ".ogg", ".webm",
+        ".docx", ".xlsx", ".pptx",
+    }
+)  # fmt: skip
+
+# ZIP 时间戳不能早于 1980 年
+_MIN_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+# 直接写入 DEFLATE 数据时替换的 zipfile._ZipWriteFile 内部属性
+_PASSTHROUGH_ATTRS = ("_compressor", "_crc", "_file_size")
+
+
+class ZipEntry(NamedTuple):
+    """压缩包中的一个文件（path、data 和 opener 三选一）"""
+
+    arcname: str
+    path: str | None = None
+    data: bytes | None = None
+    size: int = 0
+    mtime: float = 0.0
+    # 打开源数据流（远程存储中的对象等），读取完后关闭
+    opener: Callable[[], BinaryIO] | None = None
+    # 源数据的压缩编码（gzip / zstd），此时 size 为原始大小
+    encoding: str | None = None
+
+
+def zip_entry_from_file(path: str, arcname: str, mtime: float | None = None) -> ZipEntry:
+    """读取磁盘文件的大小和修改时间，生成压缩包条目
+
+    Args:
+        path: 文件路径
+        arcname: 压缩包中的文件名
+        mtime: 修改时间（可选，默认为文件的修改时间）
+
+    Returns:
+        ZipEntry: 压缩包条目
+    """
+    stat = os.stat(path)
+    return ZipEntry(arcname=arcname, path=path, size=stat.st_size, mtime=stat.st_mtime if mtime is None else mtime)
+
+
+def zip_entry_from_bytes(data: bytes, arcname: str, mtime: float | None = None) -> ZipEntry:
+    """生成内容在内存中的压缩包条目（说明文件等）
+
+    Args:
+        data: 文件内容
+        arcname: 压缩包中的文件名
+        mtime: 修改时间（可选，默认为当前时间；固定时间可使相同内容生成相同的压缩包）
+
+    Returns:
+        ZipEntry: 压缩包条目
+    """
+    return ZipEntry(arcname=arcname, data=data, size=len(data), mtime=time.time() if mtime is None else mtime)
+
+
+def zip_entry_from_stream(
+    opener: Callable[[], BinaryIO], arcname: str, size: int, mtime: float | None = None
+) -> ZipEntry:
+    """生成从数据流读取的压缩包条目（远程存储中的对象等，生成压缩包时才打开）
+
+    Args:
+        opener: 打开数据流的函数
+        arcname: 压缩包中的文件名
+        size: 文件大小
+        mtime: 修改时间（可选，默认为当前时间）
+
+    Returns:
+        ZipEntry: 压缩包条目
+    """
+    return ZipEntry(arcname=arcname, size=size, mtime=time.time() if mtime is None else mtime, opener=opener)
+
+
+def compress_type_for(arcname: str, size: int) -> int:
+    """选择压缩方式：已压缩的格式和很小的文件使用 STORED"""
+    if size < MIN_DEFLATE_SIZE or os.path.splitext(arcname)[1].lower() in STORED_EXTENSIONS:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def content_disposition(filename: str) -> str:
+    """附件下载的 Content-Disposition（非 ASCII 文件名按 RFC 5987 编码）"""
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
+class _ZipSink:
+    """只能追加写入的输出缓冲
+
+    只实现 zipfile 写入需要的 write / flush / close，没有 tell / seek，zipfile 会使用数据描述符。
+    """
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+        self.pending = 0
+
+    def write(self, data: bytes) -> int:
+        if data:
+            self._chunks.append(bytes(data))
+            self.pending += len(data)
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        self.pending = 0
+        return data
+
+
+class _PassthroughCompressor:
+    """代替 DEFLATE 压缩器，原样写出已压缩的数据"""
+
+    def compress(self, data: bytes) -> bytes:
+        return bytes(data)
+
+    def flush(self) -> bytes:
+        return b""
+
+
+def _zip_info(entry: ZipEntry) -> zipfile.ZipInfo:
+    date_time = time.localtime(entry.mtime)[:6] if entry.mtime else time.localtime()[:6]
+    zinfo = zipfile.ZipInfo(entry.arcname, date_time=max(date_time, _MIN_DATE_TIME))
+    if entry.encoding == ENCODING_GZIP:
+        # gzip 中的 DEFLATE 数据直接作为条目内容
+        zinfo.compress_type = zipfile.ZIP_DEFLATED
+    else:
+        zinfo.compress_type = compress_type_for(entry.arcname, entry.size)
+    zinfo.external_attr = 0o644 << 16
+    # 预先给出大小，超过 4GB 的文件会写入 ZIP64 扩展字段
+    zinfo.file_size = entry.size
+    return zinfo
+
+
+def iter_zip(
+    entries: Iterable[ZipEntry], chunk_size: int = ZIP_CHUNK_SIZE, flush_size: int = ZIP_FLUSH_SIZE
+) -> Iterator[bytes]:
+    """逐块生成 ZIP 压缩包
+
+    内存中最多保存一个读取块和一个输出块。
+
+    Args:
+        entries: 压缩包条目
+        chunk_size: 读取源文件的块大小
+        flush_size: 输出缓冲达到该大小时产出一块
+
+    Yields:
+        bytes: 压缩包数据
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, "w") as zf:
+        for entry in entries:
+            with zf.open(_zip_info(entry), "w") as dest:
+                if entry.data is not None:
+                    dest.write(entry.data)
+                elif entry.encoding == ENCODING_GZIP and gzip_passthrough_supported():
+                    yield from _copy_gzip_deflate(entry, dest, sink, chunk_size, flush_size)
+                else:
+                    src = entry.opener() if entry.opener else open(entry.path, "rb")
+                    if entry.encoding:
+                        src = open_decompressed(src, entry.encoding)
+                    with src:
+                        while chunk := src.read(chunk_size):
+                            dest.write(chunk)
+                            if sink.pending >= flush_size:
+                                yield sink.take()
+            if sink.pending >= flush_size:
+                yield sink.take()
+    # 中央目录
+    if sink.pending:
+        yield sink.take()
+
+
+def _copy_gzip_deflate(
+    entry: ZipEntry, dest: IO[bytes], sink: _ZipSink, chunk_size: int, flush_size: int
+) -> Iterator[bytes]:
+    """把 gzip 中的 DEFLATE 数据原样写入 ZIP 条目，CRC32 和原始大小取自 gzip 尾
+
+    只支持 compression.iter_compress 写出的固定 10 字节头（没有文件名等可选字段）。
+    调用前需确认 gzip_passthrough_supported() 为 True。
+    """
+    # zipfile 没有写入已压缩数据的接口：替换条目的压缩器，写完后把 CRC 和大小改为原始内容的值
+    dest._compressor = _PassthroughCompressor()  # type: ignore[attr-defined]
+    with entry.opener() if entry.opener else open(entry.path, "rb") as src:
+        header = src.read(len(GZIP_HEADER))
+        if header[:4] != GZIP_HEADER[:4]:
+            raise zlib.error(f"不支持的 gzip 头: {entry.arcname}")
+        # 最后 8 字节是 gzip 尾，读到末尾之前始终保留
+        pending = b""
+        while chunk := src.read(chunk_size):
+            pending += chunk
+            if len(pending) > GZIP_TRAILER.size:
+                dest.write(pending[: -GZIP_TRAILER.size])
+                pending = pending[-GZIP_TRAILER.size :]
+                if sink.pending >= flush_size:
+                    yield sink.take()
+    if len(pending) != GZIP_TRAILER.size:
+        raise zlib.error(f"gzip 数据不完整: {entry.arcname}")
+    crc, size = GZIP_TRAILER.unpack(pending)
+    if size != entry.size & 0xFFFFFFFF:
+        raise zlib.error(f"gzip 大小与记录不一致: {entry.arcname}")
+    dest._crc = crc  # type: ignore[attr-defined]
+    dest._file_size = entry.size  # type: ignore[attr-defined]
+
+
+@lru_cache(maxsize=1)
+def gzip_passthrough_supported() -> bool:
+    """当前 Python 的 zipfile 能否直接写入 gzip 中的 DEFLATE 数据
+
+    _copy_gzip_deflate 替换 zipfile._ZipWriteFile 的内部属性，CPython 修改其实现后可能失效。
+    首次调用时检查这些属性，并在内存中按同样的方式写出一个条目、用 zipfile 读回校验内容和 CRC；
+    任一步失败时返回 False，iter_zip 改为解压后重新压缩。
+    """
+    content = b"gzip passthrough self-test\n" * 64
+    compressed = compress_bytes(content, ENCODING_GZIP)
+    entry = zip_entry_from_stream(lambda: io.BytesIO(compressed), "self-test.txt", len(content), mtime=0)
+    entry = entry._replace(encoding=ENCODING_GZIP)
+    sink = _ZipSink()
+    archive = b""
+    try:
+        with zipfile.ZipFile(sink, "w") as zf:
+            with zf.open(_zip_info(entry), "w") as dest:
+                missing = [name for name in _PASSTHROUGH_ATTRS if not hasattr(dest, name)]
+                if missing:
+                    logger.warning(f"zipfile 缺少内部属性 {missing}，gzip 文件打包时将解压后重新压缩")
+                    return False
+                archive += b"".join(_copy_gzip_deflate(entry, dest, sink, ZIP_CHUNK_SIZE, ZIP_FLUSH_SIZE))
+        archive += sink.take()
+        with zipfile.ZipFile(io.BytesIO(archive)) as zf:
+            if zf.read(entry.arcname) == content:
+                return True
+    except Exception as e:
+        logger.warning(f"gzip 数据直接写入 ZIP 自检失败，将解压后重新压缩: {e}")
+        return False
+    logger.warning("gzip 数据直接写入 ZIP 自检内容不一致，将解压后重新压缩")
+    return False
+
+
+def aiter_zip(
+    entries: Iterable[ZipEntry], chunk_size: int = ZIP_CHUNK_SIZE, flush_size: int = ZIP_FLUSH_SIZE
+) -> AsyncIterator[bytes]:
+    """在文件 I/O 线程池中逐块生成 ZIP 压缩包（用于 StreamingResponse）
+
+    Args:
+        entries: 压缩包条目
+        chunk_size: 读取源文件的块大小
+        flush_size: 输出缓冲达到该大小时产出一块
+
+    Returns:
+        AsyncIterator[bytes]: 压缩包数据
+    """
+    return aiter_file_io("stream_zip", iter_zip(entries, chunk_size, flush_size))
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+缓存中间件吞吐量基准测试
+
+对比纯 ASGI 实现的 CacheMiddleware 与旧版基于 BaseHTTPMiddleware 的缓冲实现
+（call_next → 读出完整响应体 → 重建 Response）在以下场景下的吞吐量：
+
+- bypass：不参与缓存的请求（POST）
+- miss：缓存未命中（每次请求使用不同的查询参数）
+- hit：缓存命中
+- stream：未命中的大体积流式响应（多分片）
+
+使用内存字典模拟 Redis，不依赖外部服务。
+
+使用方法：
+    python scripts/python/benchmark_cache_middleware.py [requests]
+
+示例：
+    python scripts/python/benchmark_cache_middleware.py
+    python scripts/python/benchmark_cache_middleware.py 5000
+"""
+
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+STREAM_CHUNK = b"x" * 64 * 1024
+STREAM_CHUNKS = 32
+
+
+class InMemoryRedis:
+    """模拟 RedisClient 的最小内存实现"""
+
+    def __init__(self):
+        self._data: dict[str, str] = {}
+
+    async def get(self, key: str):
+        return self._data.get(key)
+
+    async def set(self, key: str, value: str, ttl: int | None = None) -> bool:
+        self._data[key] = value
+        return True
+
+    async def delete(self, key: str) -> bool:
+        return self._data.pop(key, None) is not None
+
+
+def build_legacy_middleware():
+    """构建旧版缓冲式中间件（与纯 ASGI 版本共享缓存键、TTL、ETag 逻辑）"""
+    from fastapi import Response
+    from starlette.middleware.base import BaseHTTPMiddleware
+
+    from app.core.cache.middleware import CacheMiddleware
+
+    class LegacyCacheMiddleware(BaseHTTPMiddleware):
+        """旧实现：完整缓冲响应体后重建 Response"""
+
+        def __init__(self, app, cache_manager, default_ttl: int = 300):
+            super().__init__(app)
+            self.helper = CacheMiddleware(app, cache_manager=cache_manager, default_ttl=default_ttl)
+            self.cache_manager = cache_manager
+
+        async def dispatch(self, request, call_next):
+            if not self.helper._should_cache_request(request):
+                return await call_next(request)
+
+            cache_key = self.helper._build_cache_key(request)
+            cached = await self.cache_manager.get_cached(cache_key)
+            if cached is not None:
+                data = json.loads(cached)
+                response = Response(
+                    content=data["content"],
+                    status_code=data["status_code"],
+                    headers=data["headers"],
+                    media_type=data.get("media_type"),
+                )
+                response.headers["X-Cache"] = "HIT"
+                return response
+
+            response = await call_next(request)
+            body = b""
+            async for chunk in response.body_iterator:
+                body += chunk
+
+            etag = self.helper._generate_etag(body)
+            ttl = self.helper._get_ttl_from_headers(response.headers)
+            if 200 <= response.status_code < 300 and ttl:
+                cache_data = {
+                    "content": body.decode("utf-8"),
+                    "status_code": response.status_code,
+                    "headers": dict(response.headers),
+                    "media_type": response.media_type,
+                    "etag": etag,
+                }
+                await self.cache_manager.set_cached(cache_key, json.dumps(cache_data), ttl=ttl)
+
+            headers = dict(response.headers)
+            headers["ETag"] = etag
+            headers["X-Cache"] = "MISS"
+            return Response(content=body, status_code=response.status_code, headers=headers)
+
+    return LegacyCacheMiddleware
+
+
+def build_app(middleware_cls):
+    """构建挂载指定中间件的测试应用"""
+    from fastapi import FastAPI
+    from fastapi.responses import StreamingResponse
+
+    from app.core.cache.manager import CacheManager
+
+    app = FastAPI()
+    cache_manager = CacheManager(redis_client=InMemoryRedis(), key_prefix="bench", enabled=True)
+    app.add_middleware(middleware_cls, cache_manager=cache_manager, default_ttl=300)
+
+    @app.get("/items")
+    async def list_items(page: int = 1):
+        return {"page": page, "items": [{"id": i, "name": f"item-{i}"} for i in range(50)]}
+
+    @app.post("/items")
+    async def create_item():
+        return {"ok": True}
+
+    @app.get("/stream")
+    async def stream(n: int = 0):
+        async def chunks():
+            for _ in range(STREAM_CHUNKS):
+                yield STREAM_CHUNK
+
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    return app
+
+
+async def run_scenario(client, scenario: str, requests: int) -> float:
+    """运行单个场景，返回每秒请求数"""
+    if scenario == "hit":
+        await client.get("/items", params={"page": 0})
+
+    start = time.perf_counter()
+    for i in range(requests):
+        if scenario == "bypass":
+            response = await client.post("/items")
+        elif scenario == "miss":
+            response = await client.get("/items", params={"page": i})
+        elif scenario == "hit":
+            response = await client.get("/items", params={"page": 0})
+        else:
+            response = await client.get("/stream", params={"n": i})
+        response.raise_for_status()
+    return requests / (time.perf_counter() - start)
+
+
+async def benchmark(requests: int) -> None:
+    """运行全部场景并打印对比结果"""
+    import httpx
+
+    from app.core.cache.middleware import CacheMiddleware
+
+    implementations = {"legacy": build_legacy_middleware(), "asgi": CacheMiddleware}
+    scenarios = {"bypass": requests, "miss": requests, "hit": requests, "stream": max(requests // 20, 10)}
+
+    print(f"\n{'='*70}")
+    print("缓存中间件吞吐量基准测试")
+    print(f"{'='*70}\n")
+    print(f"{'场景':<10}{'请求数':>10}{'legacy (req/s)':>18}{'asgi (req/s)':>18}{'提升':>10}")
+
+    for scenario, count in scenarios.items():
+        results = {}
+        for name, middleware_cls in implementations.items():
+            transport = httpx.ASGITransport(app=build_app(middleware_cls))
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                results[name] = await run_scenario(client, scenario, count)
+        speedup = results["asgi"] / results["legacy"]
+        print(f"{scenario:<10}{count:>10}{results['legacy']:>18.1f}{results['asgi']:>18.1f}{speedup:>9.2f}x")
+
+    print(f"\n{'='*70}\n")
+
+
+def main():
+    """主函数"""
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    asyncio.run(benchmark(requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+blob 存储维护脚本
+
+按现存的文件记录修正引用计数，并删除超过宽限期仍无引用的 blob。
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from dotenv import load_dotenv  # noqa: E402
+
+# 加载环境变量
+load_dotenv()
+
+from app.core.config import settings  # noqa: E402
+from app.core.database import SessionLocal  # noqa: E402
+from app.services.blob_store import BlobStore  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="blob 存储引用计数修正与垃圾回收")
+    parser.add_argument(
+        "--grace-seconds",
+        type=int,
+        default=settings.FILE_BLOB_GC_GRACE_SECONDS,
+        help="无引用的 blob 超过该时间（秒）后才会被删除",
+    )
+    parser.add_argument("--skip-recount", action="store_true", help="跳过引用计数修正")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("blob 存储维护")
+    print("=" * 60)
+
+    db = SessionLocal()
+    try:
+        blob_store = BlobStore(db, settings.UPLOAD_DIR)
+        print(f"存储后端: {blob_store.storage.name}")
+        print(f"blob 目录: {blob_store.blob_dir}")
+
+        if not args.skip_recount:
+            fixed = blob_store.recount()
+            print(f"✓ 修正引用计数: {fixed} 个 blob")
+
+        result = blob_store.collect_garbage(grace_seconds=args.grace_seconds)
+        print(f"✓ 删除记录: {result['removed_records']} 条")
+        print(f"✓ 删除文件: {result['removed_files']} 个")
+        print(f"✓ 释放空间: {result['freed_bytes']} 字节")
+        return 0
+    except Exception as e:
+        print(f"❌ 维护失败: {e}")
+        return 1
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+blob 迁移清理脚本
+
+迁移 8d2c4a6e9f13 只把已有文件复制到 blob 目录，不在数据库事务中删除任何文件：
+- 升级提交后运行：删除已迁入 blob 的原文件（原文件与 blob 内容一致时才删除）
+- 降级提交后运行：file_blobs 表已不存在，删除不再使用的 blob 目录
+可重复执行。
+"""
+
+import argparse
+import hashlib
+import os
+import shutil
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from dotenv import load_dotenv  # noqa: E402
+
+# 加载环境变量
+load_dotenv()
+
+from sqlalchemy import inspect  # noqa: E402
+
+from app.core.database import SessionLocal, engine  # noqa: E402
+from app.models.database import KnowledgeBase, KnowledgeBaseFile, PersonaCard, PersonaCardFile  # noqa: E402
+from app.services.blob_store import BLOB_DIR_NAME, BlobStore, resolve_upload_dir  # noqa: E402
+
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def migrated_files(db) -> list[tuple[str, str, str, str | None]]:
+    """已迁入 blob 的文件记录: [(base_path, file_path, content_hash, content_encoding)]"""
+    rows = [
+        (base_path, file_path, content_hash, content_encoding)
+        for base_path, file_path, content_hash, content_encoding in db.query(
+            KnowledgeBase.base_path,
+            KnowledgeBaseFile.file_path,
+            KnowledgeBaseFile.content_hash,
+            KnowledgeBaseFile.content_encoding,
+        )
+        .join(KnowledgeBase, KnowledgeBase.id == KnowledgeBaseFile.knowledge_base_id)
+        .filter(KnowledgeBaseFile.content_hash.isnot(None))
+    ]
+    rows.extend(
+        (base_path, file_path, content_hash, None)
+        for base_path, file_path, content_hash in db.query(
+            PersonaCard.base_path, PersonaCardFile.file_path, PersonaCardFile.content_hash
+        )
+        .join(PersonaCard, PersonaCard.id == PersonaCardFile.persona_card_id)
+        .filter(PersonaCardFile.content_hash.isnot(None))
+    )
+    return rows
+
+
+def remove_legacy_files(dry_run: bool) -> int:
+    """删除已迁入 blob 的原文件，返回失败数"""
+    removed = kept = failed = 0
+    db = SessionLocal()
+    try:
+        blob_store = BlobStore(db)
+        for base_path, file_path, content_hash, encoding in migrated_files(db):
+            legacy_path = os.path.join(base_path or "", file_path or "")
+            if not base_path or not file_path or not os.path.isfile(legacy_path):
+                continue
+            try:
+                # 只删除与 blob 内容一致、且 blob 确实存在的原文件
+                if hash_file(legacy_path) != content_hash or not blob_store.file_exists(
+                    base_path, file_path, content_hash, encoding
+                ):
+                    kept += 1
+                    print(f"⚠️  保留（与 blob 不一致或 blob 缺失）: {legacy_path}")
+                    continue
+                if not dry_run:
+                    os.remove(legacy_path)
+                removed += 1
+            except OSError as e:
+                failed += 1
+                print(f"❌ {legacy_path}: {e}")
+    finally:
+        db.close()
+
+    print(f"✓ {'可删除' if dry_run else '删除'}原文件: {removed} 个")
+    if kept:
+        print(f"⚠️  保留: {kept} 个")
+    if failed:
+        print(f"❌ 失败: {failed} 个")
+    return failed
+
+
+def remove_blob_dir(dry_run: bool) -> None:
+    """降级后删除 blob 目录"""
+    blob_dir = os.path.join(resolve_upload_dir(), BLOB_DIR_NAME)
+    if not os.path.isdir(blob_dir):
+        print("✓ blob 目录不存在，无需清理")
+        return
+    if not dry_run:
+        shutil.rmtree(blob_dir)
+    print(f"✓ {'可删除' if dry_run else '已删除'} blob 目录: {blob_dir}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="blob 迁移（升级 / 降级）提交后的文件清理")
+    parser.add_argument("--dry-run", action="store_true", help="只列出要删除的内容，不实际删除")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("blob 迁移清理")
+    print("=" * 60)
+
+    if inspect(engine).has_table("file_blobs"):
+        return 1 if remove_legacy_files(args.dry_run) else 0
+    remove_blob_dir(args.dry_run)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+存储后端同步脚本
+
+把本地上传目录中的 blob（uploads/blobs）上传到当前配置的存储后端，用于从本地存储切换到 S3 兼容对象存储。
+已存在的对象跳过，可重复执行；上传时以 blob 的 SHA-256 作为内容校验（压缩保存的 blob 除外）。
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from dotenv import load_dotenv  # noqa: E402
+
+# 加载环境变量
+load_dotenv()
+
+from app.core.storage import LocalStorageBackend, StorageBackend, get_storage_backend  # noqa: E402
+from app.services.blob_store import BLOB_DIR_NAME, resolve_upload_dir  # noqa: E402
+
+
+def sync_blob(
+    source: LocalStorageBackend,
+    target: StorageBackend,
+    key: str,
+    content_hash: str | None,
+    staging_dir: str,
+    move: bool,
+) -> bool:
+    """把一个本地 blob 上传到目标后端
+
+    Returns:
+        bool: 是否上传（目标后端已存在时为 False）
+    """
+    uploaded = False
+    if not target.exists(key):
+        # put_file 会消耗源文件，保留本地文件时上传一份副本
+        path = source.local_path(key)
+        if not move:
+            fd, path = tempfile.mkstemp(prefix=".sync-", dir=staging_dir)
+            os.close(fd)
+            shutil.copyfile(source.local_path(key), path)
+        try:
+            target.put_file(key, path, content_hash)
+        finally:
+            if not move and os.path.exists(path):
+                os.remove(path)
+        uploaded = True
+    if move:
+        source.delete(key)
+    return uploaded
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="把本地 blob 同步到配置的存储后端")
+    parser.add_argument("--move", action="store_true", help="上传成功后删除本地文件")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("存储后端同步")
+    print("=" * 60)
+
+    upload_dir = resolve_upload_dir()
+    source = LocalStorageBackend(upload_dir)
+    target = get_storage_backend(upload_dir)
+    if isinstance(target, LocalStorageBackend):
+        print("当前配置的存储后端为本地存储，无需同步（请先配置 [storage] backend）")
+        return 0
+
+    print(f"本地目录: {os.path.join(upload_dir, BLOB_DIR_NAME)}")
+    print(f"目标后端: {target.name}")
+
+    uploaded = skipped = failed = 0
+    staging_dir = os.path.join(upload_dir, ".staging")
+    os.makedirs(staging_dir, exist_ok=True)
+    for obj in source.list(f"{BLOB_DIR_NAME}/"):
+        name = obj.key.rpartition("/")[2]
+        if name.startswith("."):
+            continue
+        # 压缩保存的 blob（{hash}.gz 等）内容与 SHA-256 不对应，上传时不做内容校验
+        content_hash = None if "." in name else name
+        try:
+            if sync_blob(source, target, obj.key, content_hash, staging_dir, args.move):
+                uploaded += 1
+            else:
+                skipped += 1
+        except OSError as e:
+            failed += 1
+            print(f"❌ {obj.key}: {e}")
+
+    print(f"✓ 上传: {uploaded} 个")
+    print(f"✓ 已存在: {skipped} 个")
+    if failed:
+        print(f"❌ 失败: {failed} 个")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+上传会话清理脚本
+
+删除已过期的可续传上传会话记录及其分块，以及没有记录的分块目录。
+新建上传会话时也会顺带清理，本脚本适合定时执行。
+"""
+
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from dotenv import load_dotenv  # noqa: E402
+
+# 加载环境变量
+load_dotenv()
+
+from app.core.config import settings  # noqa: E402
+from app.core.database import SessionLocal  # noqa: E402
+from app.services.upload_session_service import UploadSessionService  # noqa: E402
+
+
+def main() -> int:
+    print("=" * 60)
+    print("上传会话清理")
+    print("=" * 60)
+
+    db = SessionLocal()
+    try:
+        session_service = UploadSessionService(db)
+        print(f"分块目录: {session_service.session_root}")
+        print(f"会话有效期: {settings.UPLOAD_SESSION_TTL_HOURS} 小时")
+
+        result = session_service.collect_expired()
+        print(f"✓ 删除会话: {result['removed_sessions']} 个")
+        print(f"✓ 删除分块目录: {result['removed_dirs']} 个")
+        return 0
+    except Exception as e:
+        print(f"❌ 清理失败: {e}")
+        return 1
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
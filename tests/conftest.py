@@ -304,6 +304,7 @@ from app.models.database import (  # noqa: E402
     CommentReaction,
     DownloadRecord,
     EmailVerification,
+    FileBlob,
     KnowledgeBase,
     KnowledgeBaseFile,
     Message,
@@ -311,6 +312,7 @@ from app.models.database import (  # noqa: E402
     PersonaCardFile,
     StarRecord,
     UploadRecord,
+    UploadSession,
     User,
 )
 from tests.fixtures.data_factory import TestDataFactory  # noqa: E402
@@ -434,6 +436,8 @@ def test_db() -> Session:
                 (PersonaCard, "persona_cards"),
                 (KnowledgeBaseFile, "knowledge_base_files"),
                 (KnowledgeBase, "knowledge_bases"),
+                (FileBlob, "file_blobs"),
+                (UploadSession, "upload_sessions"),
                 (User, "users"),
             ]
 
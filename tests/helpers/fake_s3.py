@@ -0,0 +1,168 @@
+"""
+S3 兼容服务的测试替身
+
+在后台线程中运行的最小 HTTP 服务，按路径风格（/{bucket}/{key}）实现 S3StorageBackend 用到的请求：
+PUT / HEAD / GET（含单个字节范围）/ DELETE 对象，以及 ListObjectsV2（分页）。
+对象保存在内存中；请求必须带有 SigV4 Authorization 头，上传内容按 x-amz-content-sha256 校验。
+"""
+
+import hashlib
+import threading
+import time
+from datetime import UTC, datetime
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+from xml.sax.saxutils import escape
+
+
+class FakeS3Server:
+    """内存中的 S3 兼容服务"""
+
+    def __init__(self, bucket: str = "test-bucket", page_size: int = 1000):
+        self.bucket = bucket
+        self.page_size = page_size
+        # key -> (内容, 修改时间)
+        self.objects: dict[str, tuple[bytes, float]] = {}
+        # (方法, 路径) 请求记录
+        self.requests: list[tuple[str, str]] = []
+        self._server: ThreadingHTTPServer | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def endpoint_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeS3Server":
+        handler = type("Handler", (_FakeS3Handler,), {"fake": self})
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join(timeout=5)
+            self._server = None
+
+    def set_mtime(self, key: str, mtime: float) -> None:
+        """修改对象的修改时间（测试宽限期等）"""
+        data, _ = self.objects[key]
+        self.objects[key] = (data, mtime)
+
+
+class _FakeS3Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    fake: FakeS3Server
+
+    def log_message(self, format, *args):  # noqa: A002
+        pass
+
+    def _send(self, status: int, body: bytes = b"", headers: dict[str, str] | None = None) -> None:
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if "Content-Length" not in (headers or {}):
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body and self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _error(self, status: int, code: str) -> None:
+        self._send(status, f"<Error><Code>{code}</Code></Error>".encode(), {"Content-Type": "application/xml"})
+
+    def _route(self) -> tuple[str | None, dict[str, list[str]]] | None:
+        """校验签名头并解析对象键，返回 None 表示已发送错误响应"""
+        parts = urlsplit(self.path)
+        self.fake.requests.append((self.command, parts.path))
+        if not self.headers.get("Authorization", "").startswith("AWS4-HMAC-SHA256 Credential="):
+            self._error(403, "AccessDenied")
+            return None
+        bucket, _, key = unquote(parts.path).lstrip("/").partition("/")
+        if bucket != self.fake.bucket:
+            self._error(404, "NoSuchBucket")
+            return None
+        return key or None, parse_qs(parts.query)
+
+    def do_PUT(self):  # noqa: N802
+        routed = self._route()
+        if routed is None:
+            return
+        key, _ = routed
+        data = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        payload_hash = self.headers.get("x-amz-content-sha256")
+        if payload_hash != "UNSIGNED-PAYLOAD" and payload_hash != hashlib.sha256(data).hexdigest():
+            self._error(400, "XAmzContentSHA256Mismatch")
+            return
+        self.fake.objects[key] = (data, time.time())
+        self._send(200, headers={"ETag": f'"{hashlib.md5(data).hexdigest()}"'})
+
+    def do_HEAD(self):  # noqa: N802
+        routed = self._route()
+        if routed is None:
+            return
+        obj = self.fake.objects.get(routed[0])
+        if obj is None:
+            self._send(404)
+            return
+        data, mtime = obj
+        self._send(200, headers={"Content-Length": str(len(data)), "Last-Modified": formatdate(mtime, usegmt=True)})
+
+    def do_GET(self):  # noqa: N802
+        routed = self._route()
+        if routed is None:
+            return
+        key, query = routed
+        if key is None:
+            self._list(query)
+            return
+        obj = self.fake.objects.get(key)
+        if obj is None:
+            self._error(404, "NoSuchKey")
+            return
+        data, mtime = obj
+        headers = {"Last-Modified": formatdate(mtime, usegmt=True)}
+        range_header = self.headers.get("Range")
+        if range_header:
+            first, _, last = range_header.removeprefix("bytes=").partition("-")
+            start, end = int(first), min(int(last) if last else len(data) - 1, len(data) - 1)
+            headers["Content-Range"] = f"bytes {start}-{end}/{len(data)}"
+            self._send(206, data[start : end + 1], headers)
+            return
+        self._send(200, data, headers)
+
+    def do_DELETE(self):  # noqa: N802
+        routed = self._route()
+        if routed is None:
+            return
+        self.fake.objects.pop(routed[0], None)
+        self._send(204)
+
+    def _list(self, query: dict[str, list[str]]) -> None:
+        prefix = query.get("prefix", [""])[0]
+        start = int(query.get("continuation-token", ["0"])[0])
+        keys = sorted(key for key in self.fake.objects if key.startswith(prefix))
+        page = keys[start : start + self.fake.page_size]
+        truncated = start + len(page) < len(keys)
+
+        contents = []
+        for key in page:
+            data, mtime = self.fake.objects[key]
+            last_modified = datetime.fromtimestamp(mtime, UTC).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+            contents.append(
+                f"<Contents><Key>{escape(key)}</Key><LastModified>{last_modified}</LastModified>"
+                f"<Size>{len(data)}</Size></Contents>"
+            )
+        token = f"<NextContinuationToken>{start + len(page)}</NextContinuationToken>" if truncated else ""
+        body = (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+            f"<Name>{self.fake.bucket}</Name><Prefix>{escape(prefix)}</Prefix>"
+            f"<IsTruncated>{'true' if truncated else 'false'}</IsTruncated>{token}{''.join(contents)}"
+            "</ListBucketResult>"
+        )
+        self._send(200, body.encode(), {"Content-Type": "application/xml"})
@@ -5,8 +5,11 @@
 Requirements: 3.2
 """
 
+import gzip
 import io
 
+import pytest
+
 from app.models.database import KnowledgeBase, StarRecord
 from tests.conftest import assert_error_response
 
@@ -37,6 +40,34 @@ class TestUploadKnowledgeBase:
         assert resp_data["data"]["is_public"] is False
         assert resp_data["data"]["is_pending"] is False
 
+    def test_upload_multiple_files_reports_stage_timings(self, authenticated_client, test_user, test_db):
+        """测试多文件上传并行处理，响应中包含各阶段耗时"""
+        from app.models.database import KnowledgeBaseFile
+
+        files = [("files", (f"doc{i}.txt", io.BytesIO(f"content {i}".encode()), "text/plain")) for i in range(8)]
+        data = {"name": "Multi KB", "description": "Test description"}
+
+        response = authenticated_client.post("/api/knowledge/upload", files=files, data=data)
+
+        assert response.status_code == 200
+        resp_data = response.json()["data"]
+        assert set(resp_data["timings_ms"]) == {"receive", "validate", "hash", "register", "write", "commit"}
+        kb_files = test_db.query(KnowledgeBaseFile).filter(KnowledgeBaseFile.knowledge_base_id == resp_data["id"]).all()
+        assert sorted(kb_file.original_name for kb_file in kb_files) == [f"doc{i}.txt" for i in range(8)]
+
+    def test_upload_rejects_invalid_type_before_receiving(self, authenticated_client, test_user, test_db):
+        """测试文件类型在接收内容之前检查"""
+        files = [
+            ("files", ("ok.txt", io.BytesIO(b"ok"), "text/plain")),
+            ("files", ("run.exe", io.BytesIO(b"bad"), "application/octet-stream")),
+        ]
+        data = {"name": "Bad KB", "description": "Test description"}
+
+        response = authenticated_client.post("/api/knowledge/upload", files=files, data=data)
+
+        assert response.status_code == 422
+        assert test_db.query(KnowledgeBase).filter(KnowledgeBase.name == "Bad KB").count() == 0
+
     def test_upload_knowledge_base_request_public(self, authenticated_client, test_user, test_db):
         """测试上传公开请求的知识库（应为待审核状态）"""
         file_content = b"Test content"
@@ -534,6 +565,26 @@ class TestDownloadKnowledgeBaseFiles:
 
         assert response.status_code in [404, 500]
 
+    def test_download_knowledge_base_etag(self, authenticated_client, test_user, factory, test_db):
+        """Test repeated downloads share an ETag and If-None-Match returns 304"""
+        kb = factory.create_knowledge_base(uploader=test_user, is_public=True)
+
+        first = authenticated_client.get(f"/api/knowledge/{kb.id}/download")
+        second = authenticated_client.get(f"/api/knowledge/{kb.id}/download")
+
+        assert first.status_code == 200
+        assert second.status_code == 200
+        assert first.headers["etag"] == second.headers["etag"]
+        assert first.content == second.content
+
+        response = authenticated_client.get(
+            f"/api/knowledge/{kb.id}/download", headers={"If-None-Match": first.headers["etag"]}
+        )
+
+        assert response.status_code == 304
+        test_db.refresh(kb)
+        assert kb.downloads == 2
+
 
 class TestDownloadKnowledgeBaseFile:
     """Test GET /api/knowledge/{kb_id}/file/{file_id} endpoint"""
@@ -2323,22 +2374,16 @@ class TestKnowledgeZipDownloadErrorHandling:
             assert "不存在" in error_msg or "missing" in error_msg.lower() or "失败" in error_msg
 
     def test_download_kb_zipfile_write_error(self, authenticated_client, test_user, factory, monkeypatch):
-        """Test downloading KB when zipfile.ZipFile.write fails"""
-        from unittest.mock import MagicMock, patch
+        """Test downloading KB when reading a file into the ZIP fails"""
+        from unittest.mock import patch
 
         kb = factory.create_knowledge_base(uploader=test_user, is_public=True)
         factory.create_knowledge_base_file(knowledge_base=kb)
 
         # Mock os.path.exists to return True so we get past file existence check
-        # Then mock zipfile to fail
+        # Then fail while building the ZIP entries
         with patch("app.services.file_service.os.path.exists", return_value=True):
-            with patch("app.services.file_service.zipfile.ZipFile") as mock_zipfile:
-                mock_zip_instance = MagicMock()
-                mock_zip_instance.__enter__ = MagicMock(return_value=mock_zip_instance)
-                mock_zip_instance.__exit__ = MagicMock(return_value=False)
-                mock_zip_instance.write.side_effect = OSError("Failed to write to ZIP")
-                mock_zipfile.return_value = mock_zip_instance
-
+            with patch("app.services.blob_store.zip_entry_from_file", side_effect=OSError("Failed to write to ZIP")):
                 response = authenticated_client.get(f"/api/knowledge/{kb.id}/download")
 
                 # Should return 500 error
@@ -2350,17 +2395,18 @@ class TestKnowledgeZipDownloadErrorHandling:
                 assert "Failed to write" not in error_msg
 
     def test_download_kb_zipfile_permission_error(self, authenticated_client, test_user, factory, monkeypatch):
-        """Test downloading KB when ZIP file creation has permission error"""
+        """Test downloading KB when a file cannot be opened for the ZIP"""
         from unittest.mock import patch
 
         kb = factory.create_knowledge_base(uploader=test_user, is_public=True)
         factory.create_knowledge_base_file(knowledge_base=kb)
 
-        # Mock os.path.exists to return True, then mock zipfile to fail
+        # Mock os.path.exists to return True, then fail with a permission error
         with patch("app.services.file_service.os.path.exists", return_value=True):
-            with patch("app.services.file_service.zipfile.ZipFile") as mock_zipfile:
-                mock_zipfile.side_effect = PermissionError("Permission denied to create ZIP")
-
+            with patch(
+                "app.services.blob_store.zip_entry_from_file",
+                side_effect=PermissionError("Permission denied to create ZIP"),
+            ):
                 response = authenticated_client.get(f"/api/knowledge/{kb.id}/download")
 
                 # Should return 500 error
@@ -2372,44 +2418,36 @@ class TestKnowledgeZipDownloadErrorHandling:
                 assert "Permission denied" not in error_msg
 
     def test_download_kb_temp_dir_not_writable(self, authenticated_client, test_user, factory, monkeypatch):
-        """Test downloading KB when temp directory is not writable"""
+        """Test downloading KB when the archive cache directory is not writable"""
+        import os
+        import zipfile
         from unittest.mock import patch
 
         kb = factory.create_knowledge_base(uploader=test_user, is_public=True)
-        factory.create_knowledge_base_file(knowledge_base=kb)
-
-        # Mock os.path.exists to return True, then mock zipfile to fail
-        with patch("app.services.file_service.os.path.exists", return_value=True):
-            with patch("app.services.file_service.tempfile.gettempdir") as mock_tempdir:
-                mock_tempdir.return_value = "/nonexistent/temp"
-
-                with patch("app.services.file_service.zipfile.ZipFile") as mock_zipfile:
-                    mock_zipfile.side_effect = OSError("Cannot create file in directory")
+        kb_file = factory.create_knowledge_base_file(knowledge_base=kb)
+        os.makedirs(kb.base_path, exist_ok=True)
+        with open(os.path.join(kb.base_path, kb_file.file_path), "w") as f:
+            f.write("test content")
 
-                    response = authenticated_client.get(f"/api/knowledge/{kb.id}/download")
+        # The archive is still streamed when the cache file cannot be created
+        with patch("app.services.archive_cache.open", side_effect=OSError("Cannot create file"), create=True):
+            response = authenticated_client.get(f"/api/knowledge/{kb.id}/download")
 
-                    # Should return 500 error
-                    assert response.status_code == 500
-                    error_msg = self._get_error_message(response.json())
-                    # Should have user-friendly error message
-                    assert "失败" in error_msg
+        assert response.status_code == 200
+        with zipfile.ZipFile(io.BytesIO(response.content)) as zf:
+            assert zf.read(kb_file.original_name) == b"test content"
 
     def test_download_kb_zipfile_corrupted(self, authenticated_client, test_user, factory, monkeypatch):
-        """Test downloading KB when ZIP file becomes corrupted during creation"""
+        """Test downloading KB when a file is unreadable while preparing the ZIP"""
         import zipfile
-        from unittest.mock import MagicMock, patch
+        from unittest.mock import patch
 
         kb = factory.create_knowledge_base(uploader=test_user, is_public=True)
         factory.create_knowledge_base_file(knowledge_base=kb)
 
-        # Mock os.path.exists to return True, then mock zipfile to fail
+        # Mock os.path.exists to return True, then fail while building the ZIP entries
         with patch("app.services.file_service.os.path.exists", return_value=True):
-            with patch("app.services.file_service.zipfile.ZipFile") as mock_zipfile:
-                mock_zip_instance = MagicMock()
-                mock_zip_instance.__enter__ = MagicMock(return_value=mock_zip_instance)
-                mock_zip_instance.__exit__ = MagicMock(side_effect=zipfile.BadZipFile("Bad ZIP file"))
-                mock_zipfile.return_value = mock_zip_instance
-
+            with patch("app.services.blob_store.zip_entry_from_file", side_effect=zipfile.BadZipFile("Bad ZIP file")):
                 response = authenticated_client.get(f"/api/knowledge/{kb.id}/download")
 
                 # Should return 500 error
@@ -2422,20 +2460,14 @@ class TestKnowledgeZipDownloadErrorHandling:
 
     def test_download_kb_file_read_error_during_zip(self, authenticated_client, test_user, factory, monkeypatch):
         """Test downloading KB when file cannot be read during ZIP creation"""
-        from unittest.mock import MagicMock, patch
+        from unittest.mock import patch
 
         kb = factory.create_knowledge_base(uploader=test_user, is_public=True)
         factory.create_knowledge_base_file(knowledge_base=kb)
 
-        # Mock os.path.exists to return True, then mock zipfile to fail
+        # Mock os.path.exists to return True, then fail to read the file
         with patch("app.services.file_service.os.path.exists", return_value=True):
-            with patch("app.services.file_service.zipfile.ZipFile") as mock_zipfile:
-                mock_zip_instance = MagicMock()
-                mock_zip_instance.__enter__ = MagicMock(return_value=mock_zip_instance)
-                mock_zip_instance.__exit__ = MagicMock(return_value=False)
-                mock_zip_instance.write.side_effect = OSError("Cannot read file")
-                mock_zipfile.return_value = mock_zip_instance
-
+            with patch("app.services.blob_store.zip_entry_from_file", side_effect=OSError("Cannot read file")):
                 response = authenticated_client.get(f"/api/knowledge/{kb.id}/download")
 
                 # Should return 500 error
@@ -2521,3 +2553,421 @@ class TestKnowledgeZipDownloadErrorHandling:
             # If successful, verify it's a ZIP file
             if response.status_code == 200:
                 assert response.headers.get("content-type") == "application/zip"
+
+
+class TestRangeDownloads:
+    """Test Range / If-Range support for file and archive downloads"""
+
+    content = bytes(range(100))
+
+    def upload(self, client, test_db):
+        files = [("files", ("data.txt", io.BytesIO(self.content), "text/plain"))]
+        data = {"name": "Range KB", "description": "Range test", "is_public": False}
+        response = client.post("/api/knowledge/upload", files=files, data=data)
+        assert response.status_code == 200
+
+        from app.models.database import KnowledgeBaseFile
+
+        kb = test_db.query(KnowledgeBase).filter(KnowledgeBase.id == response.json()["data"]["id"]).first()
+        kb_file = test_db.query(KnowledgeBaseFile).filter(KnowledgeBaseFile.knowledge_base_id == kb.id).first()
+        return kb, kb_file
+
+    def test_file_single_range(self, authenticated_client, test_user, test_db):
+        """Test a single range returns 206 with a strong content-hash ETag"""
+        import hashlib
+
+        kb, kb_file = self.upload(authenticated_client, test_db)
+
+        response = authenticated_client.get(
+            f"/api/knowledge/{kb.id}/file/{kb_file.id}", headers={"Range": "bytes=10-19"}
+        )
+
+        assert response.status_code == 206
+        assert response.content == self.content[10:20]
+        assert response.headers["content-range"] == "bytes 10-19/100"
+        assert response.headers["accept-ranges"] == "bytes"
+        assert response.headers["etag"] == f'"{hashlib.sha256(self.content).hexdigest()}"'
+
+    def test_file_multi_range(self, authenticated_client, test_user, test_db):
+        """Test multiple ranges return a multipart/byteranges body"""
+        kb, kb_file = self.upload(authenticated_client, test_db)
+
+        response = authenticated_client.get(
+            f"/api/knowledge/{kb.id}/file/{kb_file.id}", headers={"Range": "bytes=0-4,50-54"}
+        )
+
+        assert response.status_code == 206
+        assert response.headers["content-type"].startswith("multipart/byteranges")
+        assert self.content[0:5] in response.content
+        assert self.content[50:55] in response.content
+        assert b"bytes 50-54/100" in response.content
+
+    def test_file_if_range_mismatch_returns_full_file(self, authenticated_client, test_user, test_db):
+        """Test a stale If-Range validator returns the whole file"""
+        kb, kb_file = self.upload(authenticated_client, test_db)
+
+        response = authenticated_client.get(
+            f"/api/knowledge/{kb.id}/file/{kb_file.id}", headers={"Range": "bytes=10-19", "If-Range": '"stale"'}
+        )
+
+        assert response.status_code == 200
+        assert response.content == self.content
+
+    def test_archive_resume_after_disconnect(self, authenticated_client, test_user, test_db):
+        """Test an interrupted archive download resumes from the middle with identical bytes"""
+        from app.services.archive_cache import get_archive_cache
+
+        kb, _ = self.upload(authenticated_client, test_db)
+        full = authenticated_client.get(f"/api/knowledge/{kb.id}/download")
+        assert full.status_code == 200
+        assert full.headers["accept-ranges"] == "bytes"
+
+        # 中途断开的下载不会留下缓存，续传时重新生成同一版本的压缩包
+        get_archive_cache().invalidate("knowledge", kb.id)
+        offset = len(full.content) // 2
+        response = authenticated_client.get(
+            f"/api/knowledge/{kb.id}/download",
+            headers={"Range": f"bytes={offset}-", "If-Range": full.headers["etag"]},
+        )
+
+        assert response.status_code == 206
+        assert response.headers["etag"] == full.headers["etag"]
+        assert response.content == full.content[offset:]
+        test_db.refresh(kb)
+        assert kb.downloads == 1
+
+    def test_archive_multi_range(self, authenticated_client, test_user, test_db):
+        """Test multiple ranges of a cached archive"""
+        kb, _ = self.upload(authenticated_client, test_db)
+        full = authenticated_client.get(f"/api/knowledge/{kb.id}/download")
+
+        response = authenticated_client.get(f"/api/knowledge/{kb.id}/download", headers={"Range": "bytes=0-9,20-29"})
+
+        assert response.status_code == 206
+        assert response.headers["content-type"].startswith("multipart/byteranges")
+        assert full.content[0:10] in response.content
+        assert full.content[20:30] in response.content
+
+
+class TestStorageDownloads:
+    """Test file downloads with a remote storage backend and offloaded download modes"""
+
+    content = bytes(range(100))
+
+    @pytest.fixture
+    def fake_s3(self, monkeypatch):
+        from app.core.storage.s3 import S3StorageBackend
+        from tests.helpers.fake_s3 import FakeS3Server
+
+        server = FakeS3Server().start()
+        storage = S3StorageBackend(server.endpoint_url, server.bucket, "test-key", "test-secret")
+        monkeypatch.setattr("app.services.blob_store.get_storage_backend", lambda upload_dir: storage)
+        yield server
+        server.stop()
+
+    def upload(self, client, test_db):
+        return TestRangeDownloads.upload(self, client, test_db)
+
+    def test_remote_file_proxied_with_range(self, authenticated_client, test_user, test_db, fake_s3):
+        """Test a blob in remote storage is streamed through the app with single-range support"""
+        kb, kb_file = self.upload(authenticated_client, test_db)
+        url = f"/api/knowledge/{kb.id}/file/{kb_file.id}"
+        assert fake_s3.objects
+
+        full = authenticated_client.get(url)
+        assert full.status_code == 200
+        assert full.content == self.content
+        assert full.headers["accept-ranges"] == "bytes"
+
+        partial = authenticated_client.get(url, headers={"Range": "bytes=10-19", "If-Range": full.headers["etag"]})
+        assert partial.status_code == 206
+        assert partial.content == self.content[10:20]
+        assert partial.headers["content-range"] == "bytes 10-19/100"
+
+        stale = authenticated_client.get(url, headers={"Range": "bytes=10-19", "If-Range": '"stale"'})
+        assert stale.status_code == 200
+        assert stale.content == self.content
+
+        unsatisfiable = authenticated_client.get(url, headers={"Range": "bytes=200-"})
+        assert unsatisfiable.status_code == 416
+        assert unsatisfiable.headers["content-range"] == "bytes */100"
+
+    def test_remote_file_missing(self, authenticated_client, test_user, test_db, fake_s3):
+        """Test a blob missing from remote storage returns 404"""
+        kb, kb_file = self.upload(authenticated_client, test_db)
+        fake_s3.objects.clear()
+
+        response = authenticated_client.get(f"/api/knowledge/{kb.id}/file/{kb_file.id}")
+
+        assert response.status_code == 404
+
+    def test_remote_archive(self, authenticated_client, test_user, test_db, fake_s3):
+        """Test archives are built by streaming blobs from remote storage"""
+        import zipfile
+
+        kb, _ = self.upload(authenticated_client, test_db)
+
+        response = authenticated_client.get(f"/api/knowledge/{kb.id}/download")
+
+        assert response.status_code == 200
+        with zipfile.ZipFile(io.BytesIO(response.content)) as zf:
+            assert zf.read("data.txt") == self.content
+
+    def test_redirect_mode(self, authenticated_client, test_user, test_db, fake_s3):
+        """Test redirect mode sends clients to a presigned object URL"""
+        from unittest.mock import patch
+
+        kb, kb_file = self.upload(authenticated_client, test_db)
+
+        with patch("app.core.config.settings.STORAGE_DOWNLOAD_MODE", "redirect"):
+            response = authenticated_client.get(f"/api/knowledge/{kb.id}/file/{kb_file.id}", follow_redirects=False)
+
+        assert response.status_code == 307
+        location = response.headers["location"]
+        assert location.startswith(f"{fake_s3.endpoint_url}/{fake_s3.bucket}/blobs/")
+        assert "X-Amz-Signature=" in location
+        assert "response-content-disposition=" in location
+
+    def test_x_accel_redirect_mode(self, authenticated_client, test_user, test_db):
+        """Test x-accel-redirect mode hands the file to nginx"""
+        import hashlib
+        from unittest.mock import patch
+
+        kb, kb_file = self.upload(authenticated_client, test_db)
+        content_hash = hashlib.sha256(self.content).hexdigest()
+
+        with patch("app.core.config.settings.STORAGE_DOWNLOAD_MODE", "x-accel-redirect"):
+            response = authenticated_client.get(f"/api/knowledge/{kb.id}/file/{kb_file.id}")
+
+        assert response.status_code == 200
+        assert response.content == b""
+        assert response.headers["x-accel-redirect"] == (
+            f"/protected/blobs/{content_hash[:2]}/{content_hash[2:4]}/{content_hash}"
+        )
+        assert response.headers["etag"] == f'"{content_hash}"'
+        assert "data.txt" in response.headers["content-disposition"]
+
+    def test_x_sendfile_mode(self, authenticated_client, test_user, test_db):
+        """Test x-sendfile mode returns the absolute path of the local blob"""
+        import os
+        from unittest.mock import patch
+
+        kb, kb_file = self.upload(authenticated_client, test_db)
+
+        with patch("app.core.config.settings.STORAGE_DOWNLOAD_MODE", "x-sendfile"):
+            response = authenticated_client.get(f"/api/knowledge/{kb.id}/file/{kb_file.id}")
+
+        assert response.status_code == 200
+        assert os.path.isabs(response.headers["x-sendfile"])
+        with open(response.headers["x-sendfile"], "rb") as f:
+            assert f.read() == self.content
+
+
+class TestCompressedDownloads:
+    """Test downloads of knowledge files stored gzip-compressed at rest"""
+
+    content = "知识库内容 knowledge base line\n".encode() * 200
+
+    @pytest.fixture(autouse=True)
+    def gzip_compression(self):
+        from unittest.mock import patch
+
+        with (
+            patch("app.core.config.settings.UPLOAD_COMPRESSION", "gzip"),
+            patch("app.core.config.settings.UPLOAD_COMPRESSION_MIN_SIZE", 1024),
+        ):
+            yield
+
+    def upload(self, client, test_db):
+        kb, kb_file = TestRangeDownloads.upload(self, client, test_db)
+        assert kb_file.content_encoding == "gzip"
+        assert kb_file.file_size == len(self.content)
+        return kb, kb_file
+
+    def test_stored_bytes_sent_when_gzip_accepted(self, authenticated_client, test_user, test_db):
+        """Test the compressed blob is sent as-is with Content-Encoding"""
+        import hashlib
+
+        kb, kb_file = self.upload(authenticated_client, test_db)
+        url = f"/api/knowledge/{kb.id}/file/{kb_file.id}"
+
+        with authenticated_client.stream("GET", url, headers={"Accept-Encoding": "gzip"}) as response:
+            raw = b"".join(response.iter_raw())
+            headers = response.headers
+
+        assert response.status_code == 200
+        assert headers["content-encoding"] == "gzip"
+        assert headers["vary"] == "Accept-Encoding"
+        assert headers["etag"] == f'"{hashlib.sha256(self.content).hexdigest()}-gzip"'
+        assert int(headers["content-length"]) == len(raw) == kb_file.stored_size
+        assert gzip.decompress(raw) == self.content
+
+    def test_decompressed_when_gzip_not_accepted(self, authenticated_client, test_user, test_db):
+        """Test clients that do not accept gzip receive the original content"""
+        import hashlib
+
+        kb, kb_file = self.upload(authenticated_client, test_db)
+
+        response = authenticated_client.get(
+            f"/api/knowledge/{kb.id}/file/{kb_file.id}", headers={"Accept-Encoding": "identity"}
+        )
+
+        assert response.status_code == 200
+        assert "content-encoding" not in response.headers
+        assert response.content == self.content
+        assert response.headers["content-length"] == str(len(self.content))
+        assert response.headers["etag"] == f'"{hashlib.sha256(self.content).hexdigest()}"'
+
+    def test_range_served_from_decompressed_content(self, authenticated_client, test_user, test_db):
+        """Test range requests address the original content even when gzip is accepted"""
+        kb, kb_file = self.upload(authenticated_client, test_db)
+        url = f"/api/knowledge/{kb.id}/file/{kb_file.id}"
+        size = len(self.content)
+
+        partial = authenticated_client.get(url, headers={"Range": "bytes=100-1099", "Accept-Encoding": "gzip"})
+        assert partial.status_code == 206
+        assert "content-encoding" not in partial.headers
+        assert partial.content == self.content[100:1100]
+        assert partial.headers["content-range"] == f"bytes 100-1099/{size}"
+
+        suffix = authenticated_client.get(url, headers={"Range": "bytes=-10"})
+        assert suffix.content == self.content[-10:]
+
+        unsatisfiable = authenticated_client.get(url, headers={"Range": f"bytes={size}-"})
+        assert unsatisfiable.status_code == 416
+        assert unsatisfiable.headers["content-range"] == f"bytes */{size}"
+
+    def test_offload_modes_not_used(self, authenticated_client, test_user, test_db):
+        """Test compressed blobs are always sent by the app"""
+        from unittest.mock import patch
+
+        kb, kb_file = self.upload(authenticated_client, test_db)
+
+        with patch("app.core.config.settings.STORAGE_DOWNLOAD_MODE", "x-accel-redirect"):
+            response = authenticated_client.get(
+                f"/api/knowledge/{kb.id}/file/{kb_file.id}", headers={"Accept-Encoding": "identity"}
+            )
+
+        assert "x-accel-redirect" not in response.headers
+        assert response.content == self.content
+
+    def test_archive_contains_original_content(self, authenticated_client, test_user, test_db):
+        """Test archives reuse the compressed blob and contain the original content"""
+        import zipfile
+
+        kb, _ = self.upload(authenticated_client, test_db)
+
+        response = authenticated_client.get(f"/api/knowledge/{kb.id}/download")
+
+        assert response.status_code == 200
+        with zipfile.ZipFile(io.BytesIO(response.content)) as zf:
+            assert zf.testzip() is None
+            assert zf.read("data.txt") == self.content
+
+
+class TestUploadSessions:
+    """Test the resumable chunked upload session API"""
+
+    content = b"resumable knowledge base content " * 4
+
+    @staticmethod
+    def put_chunk(client, session_id, chunk_index, data, chunk_size, checksum=None):
+        import hashlib
+
+        return client.put(
+            f"/api/knowledge/upload-sessions/{session_id}/files/0/chunks/{chunk_index}",
+            content=data,
+            headers={
+                "Upload-Offset": str(chunk_index * chunk_size),
+                "Upload-Checksum": f"sha256 {checksum or hashlib.sha256(data).hexdigest()}",
+                "Content-Type": "application/octet-stream",
+            },
+        )
+
+    def create_session(self, client, monkeypatch, name="Chunked KB"):
+        import hashlib
+
+        from app.core.config import settings
+
+        # 使用小分块，让测试内容分为多块
+        monkeypatch.setattr(settings, "UPLOAD_SESSION_CHUNK_SIZE_MB", 1)
+        payload = {
+            "name": name,
+            "description": "Uploaded in chunks",
+            "files": [
+                {"name": "data.txt", "size": len(self.content), "sha256": hashlib.sha256(self.content).hexdigest()}
+            ],
+        }
+        response = client.post("/api/knowledge/upload-sessions", json=payload)
+        assert response.status_code == 200
+        return response.json()["data"]
+
+    def test_chunked_upload_and_commit(self, authenticated_client, test_user, test_db, monkeypatch):
+        """Test the full create → put chunks → progress → commit flow"""
+        session = self.create_session(authenticated_client, monkeypatch)
+        chunk_size = session["chunk_size"]
+        assert session["files"][0]["missing_chunks"] == [0]
+
+        response = self.put_chunk(authenticated_client, session["session_id"], 0, self.content, chunk_size)
+        assert response.status_code == 200
+        assert response.json()["data"]["missing_chunks"] == []
+
+        progress = authenticated_client.get(f"/api/knowledge/upload-sessions/{session['session_id']}").json()["data"]
+        assert progress["complete"] is True
+        assert progress["received_bytes"] == len(self.content)
+
+        response = authenticated_client.post(f"/api/knowledge/upload-sessions/{session['session_id']}/commit")
+        assert response.status_code == 200
+        kb_id = response.json()["data"]["id"]
+        assert response.json()["data"]["name"] == "Chunked KB"
+
+        download = authenticated_client.get(f"/api/knowledge/{kb_id}/download")
+        assert download.status_code == 200
+
+        # 重复提交返回同一个知识库
+        retry = authenticated_client.post(f"/api/knowledge/upload-sessions/{session['session_id']}/commit")
+        assert retry.status_code == 200
+        assert retry.json()["data"]["id"] == kb_id
+
+    def test_commit_with_missing_chunks(self, authenticated_client, test_user, test_db, monkeypatch):
+        """Test committing before all chunks arrive returns 409"""
+        session = self.create_session(authenticated_client, monkeypatch)
+
+        response = authenticated_client.post(f"/api/knowledge/upload-sessions/{session['session_id']}/commit")
+
+        assert response.status_code == 409
+
+    def test_chunk_checksum_mismatch(self, authenticated_client, test_user, test_db, monkeypatch):
+        """Test a corrupted chunk is rejected and not recorded"""
+        session = self.create_session(authenticated_client, monkeypatch)
+
+        response = self.put_chunk(
+            authenticated_client, session["session_id"], 0, self.content, session["chunk_size"], checksum="0" * 64
+        )
+
+        assert response.status_code == 422
+        progress = authenticated_client.get(f"/api/knowledge/upload-sessions/{session['session_id']}").json()["data"]
+        assert progress["files"][0]["missing_chunks"] == [0]
+
+    def test_unknown_session(self, authenticated_client, test_user, test_db):
+        """Test an unknown session id returns 404"""
+        response = authenticated_client.get("/api/knowledge/upload-sessions/nonexistent")
+
+        assert response.status_code == 404
+
+    def test_invalid_manifest(self, authenticated_client, test_user, test_db):
+        """Test file type rules apply when the session is created"""
+        payload = {"name": "Bad KB", "description": "desc", "files": [{"name": "run.exe", "size": 10}]}
+
+        response = authenticated_client.post("/api/knowledge/upload-sessions", json=payload)
+
+        assert response.status_code == 422
+
+    def test_cancel_session(self, authenticated_client, test_user, test_db, monkeypatch):
+        """Test cancelling a session removes it"""
+        session = self.create_session(authenticated_client, monkeypatch)
+
+        response = authenticated_client.delete(f"/api/knowledge/upload-sessions/{session['session_id']}")
+
+        assert response.status_code == 200
+        assert authenticated_client.get(f"/api/knowledge/upload-sessions/{session['session_id']}").status_code == 404
@@ -771,6 +771,34 @@ class TestDownloadPersonaCardFile:
 
         assert response.status_code == 404
 
+    def test_download_file_from_remote_storage(self, authenticated_client, test_user, test_db, monkeypatch):
+        """Test downloading a file whose content is stored in an S3-compatible backend"""
+        from app.core.storage.s3 import S3StorageBackend
+        from app.models.database import PersonaCardFile
+        from tests.helpers.fake_s3 import FakeS3Server
+
+        server = FakeS3Server().start()
+        storage = S3StorageBackend(server.endpoint_url, server.bucket, "test-key", "test-secret")
+        monkeypatch.setattr("app.services.blob_store.get_storage_backend", lambda upload_dir: storage)
+        file_content = b'version = "1.0.0"\nname = "Remote Persona"\n'
+        try:
+            response = authenticated_client.post(
+                "/api/persona/upload",
+                files=[("files", ("bot_config.toml", io.BytesIO(file_content), "application/toml"))],
+                data={"name": "Remote Persona", "description": "d", "copyright_owner": "o", "is_public": "false"},
+            )
+            assert response.status_code == 200
+            pc_id = response.json()["data"]["id"]
+            pc_file = test_db.query(PersonaCardFile).filter(PersonaCardFile.persona_card_id == pc_id).first()
+
+            response = authenticated_client.get(f"/api/persona/{pc_id}/file/{pc_file.id}")
+
+            assert response.status_code == 200
+            assert response.content == file_content
+            assert len(server.objects) == 1
+        finally:
+            server.stop()
+
 
 class TestPersonaCardEdgeCases:
     """Test edge cases and error handling for persona card routes"""
@@ -9,6 +9,7 @@ from unittest.mock import Mock, patch
 import pytest
 from fastapi import HTTPException
 from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import text
 
 from app.api.deps import (
     get_admin_user,
@@ -16,6 +17,9 @@ from app.api.deps import (
     get_current_user_optional,
     get_moderator_user,
 )
+from app.core.cache.entity_cache import EntityCache
+from app.core.cache.manager import CacheManager
+from app.core.cache.memory_backend import MemoryCacheBackend
 from app.models.database import User
 
 
@@ -248,6 +252,44 @@ class TestGetCurrentUser:
 
             assert result["id"] == user.id
 
+    @pytest.mark.asyncio
+    async def test_bulk_update_applies_immediately(self, test_db):
+        """测试绕过 ORM 的降级和密码重置立即生效（认证不经实体缓存）"""
+        user = User(
+            id="bulk-user-id",
+            username="bulkadmin",
+            email="bulk@example.com",
+            hashed_password="hashed",
+            is_active=True,
+            is_admin=True,
+            is_moderator=False,
+            is_super_admin=False,
+            password_version=1,
+        )
+        test_db.add(user)
+        test_db.commit()
+
+        credentials = Mock(spec=HTTPAuthorizationCredentials)
+        credentials.credentials = "valid_token"
+        cache_manager = CacheManager(redis_client=MemoryCacheBackend(), key_prefix="test", enabled=True)
+        entity_cache = EntityCache(cache_manager=cache_manager, models={"user": User})
+
+        with (
+            patch("app.services.user_service.get_entity_cache", return_value=entity_cache),
+            patch("app.api.deps.verify_token", return_value={"sub": user.id, "pwd_ver": 1}),
+        ):
+            assert (await get_current_user(credentials, test_db))["is_admin"] is True
+
+            # 原生 SQL 不触发 ORM 事件，不会更新实体版本
+            test_db.execute(text("UPDATE users SET is_admin = 0, password_version = 2 WHERE id = :id"), {"id": user.id})
+            test_db.commit()
+            test_db.expire_all()
+
+            with pytest.raises(HTTPException) as exc_info:
+                await get_current_user(credentials, test_db)
+            assert exc_info.value.status_code == 401
+            assert await get_current_user_optional(credentials, test_db) is None
+
 
 class TestGetAdminUser:
     """测试 get_admin_user 依赖"""
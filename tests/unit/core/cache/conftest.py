@@ -0,0 +1,18 @@
+"""
+缓存单元测试公共 fixture
+"""
+
+import pytest
+
+from app.core.cache.change_tracker import reset_change_tracker
+from app.core.cache.entity_cache import reset_entity_cache
+
+
+@pytest.fixture(autouse=True)
+def _reset_global_session_listeners():
+    """移除其他测试（如应用 lifespan）遗留的全局 Session 事件监听，避免测试结果依赖执行顺序"""
+    reset_change_tracker()
+    reset_entity_cache()
+    yield
+    reset_change_tracker()
+    reset_entity_cache()
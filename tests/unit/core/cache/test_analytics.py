@@ -0,0 +1,179 @@
+"""
+缓存分析单元测试
+
+测试 Space-Saving 热点键估算、按键前缀 / 路由模板的统计，以及 CacheManager 和 CacheMiddleware 的接入。
+"""
+
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+
+from app.core.cache import analytics as analytics_module
+from app.core.cache.analytics import OTHER_LABEL, CacheAnalytics, SpaceSaving, serialized_size
+from app.core.cache.manager import CacheManager
+from app.core.cache.memory_backend import MemoryCacheBackend
+from app.core.cache.middleware import CacheMiddleware
+
+
+def make_analytics(**kwargs):
+    """创建使用模拟指标记录器的分析实例"""
+    analytics = CacheAnalytics(key_prefix="test", **kwargs)
+    analytics.metrics = Mock()
+    return analytics
+
+
+class TestSpaceSaving:
+    """测试热点键估算"""
+
+    def test_exact_counts_within_capacity(self):
+        sketch = SpaceSaving(capacity=10)
+        for key, count in (("a", 5), ("b", 3), ("c", 1)):
+            for _ in range(count):
+                sketch.add(key)
+
+        assert sketch.top(2) == [{"key": "a", "count": 5, "error": 0}, {"key": "b", "count": 3, "error": 0}]
+
+    def test_heavy_hitters_survive_eviction(self):
+        sketch = SpaceSaving(capacity=20)
+        for i in range(2000):
+            sketch.add("hot-1" if i % 4 == 0 else "hot-2" if i % 4 == 1 else f"cold-{i}")
+
+        top_keys = [item["key"] for item in sketch.top(2)]
+
+        assert sorted(top_keys) == ["hot-1", "hot-2"]
+        assert len(sketch) == 20
+
+    def test_error_bounds_true_count(self):
+        sketch = SpaceSaving(capacity=2)
+        sketch.add("a")
+        sketch.add("b")
+        sketch.add("c")
+
+        (item,) = [entry for entry in sketch.top(2) if entry["key"] == "c"]
+
+        assert item["count"] - item["error"] <= 1 <= item["count"]
+
+
+class TestCacheAnalytics:
+    """测试按前缀 / 路由统计"""
+
+    def test_key_to_prefix(self):
+        analytics = make_analytics()
+
+        assert analytics.key_to_prefix("test:user:123") == "user"
+        assert analytics.key_to_prefix("kb:summary:1") == "kb"
+        assert analytics.key_to_prefix("test:http:abc#tag#") == "http"
+
+    def test_prefix_hit_rate_and_size(self):
+        analytics = make_analytics()
+        analytics.record_lookup("test:user:1", hit=True)
+        analytics.record_lookup("test:user:1", hit=True)
+        analytics.record_lookup("test:user:2", hit=False)
+        analytics.record_write("test:user:2", 100)
+        analytics.record_write("test:user:3", 300)
+
+        stats = analytics.get_stats()["prefixes"]["user"]
+
+        assert stats["hits"] == 2
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == pytest.approx(66.67)
+        assert stats["avg_size_bytes"] == 200
+        analytics.metrics.record_prefix_request.assert_any_call("user", "hit")
+        analytics.metrics.record_object_size.assert_called_with("user", 300)
+
+    def test_hot_keys_reported(self):
+        analytics = make_analytics(top_k=1)
+        for _ in range(3):
+            analytics.record_lookup("test:user:hot", hit=True)
+        analytics.record_lookup("test:user:cold", hit=True)
+
+        assert analytics.get_stats()["hot_keys"] == [{"key": "test:user:hot", "count": 3, "error": 0}]
+
+    @pytest.mark.asyncio
+    async def test_public_metrics_endpoint_omits_hot_keys(self):
+        """测试不要求管理员权限的 /api/metrics/cache 不返回含用户 ID 的热点键和热点路径"""
+        from app.api.routes.metrics import cache_metrics
+
+        analytics = make_analytics()
+        analytics.record_lookup("test:starred:knowledge:user-1", hit=True)
+        analytics.record_route_lookup("/api/users/{user_id}/avatar", "/api/users/user-1/avatar", "hit")
+
+        with patch("app.api.routes.metrics.get_cache_analytics", return_value=analytics):
+            stats = (await cache_metrics())["analytics"]
+
+        assert "hot_keys" not in stats and "hot_paths" not in stats
+        assert "starred" in stats["prefixes"]
+        assert analytics.get_stats()["hot_keys"][0]["key"] == "test:starred:knowledge:user-1"
+
+    def test_route_lookup_with_ttl_remaining(self):
+        analytics = make_analytics()
+        analytics.record_route_lookup("/api/knowledge/{kb_id}", "/api/knowledge/1", "hit", ttl_remaining=40)
+        analytics.record_route_lookup("/api/knowledge/{kb_id}", "/api/knowledge/1", "stale", ttl_remaining=0)
+        analytics.record_route_lookup("/api/knowledge/{kb_id}", "/api/knowledge/2", "miss")
+
+        stats = analytics.get_stats()
+
+        route = stats["routes"]["/api/knowledge/{kb_id}"]
+        assert (route["hits"], route["stale"], route["misses"]) == (2, 1, 1)
+        assert route["avg_ttl_remaining"] == 20
+        assert stats["hot_paths"][0] == {"key": "/api/knowledge/1", "count": 2, "error": 0}
+        analytics.metrics.record_route_request.assert_called_with("/api/knowledge/{kb_id}", "miss")
+        analytics.metrics.record_ttl_remaining.assert_any_call("/api/knowledge/{kb_id}", 40)
+
+    def test_label_overflow_grouped_as_other(self, monkeypatch):
+        monkeypatch.setattr(analytics_module, "MAX_TRACKED_LABELS", 2)
+        analytics = make_analytics()
+        for prefix in ("a", "b", "c", "d"):
+            analytics.record_lookup(f"test:{prefix}:1", hit=True)
+
+        prefixes = analytics.get_stats()["prefixes"]
+
+        assert set(prefixes) == {"a", "b", OTHER_LABEL}
+        assert prefixes[OTHER_LABEL]["hits"] == 2
+
+    def test_disabled_records_nothing(self):
+        analytics = make_analytics(enabled=False)
+        analytics.record_lookup("test:user:1", hit=True)
+
+        assert analytics.get_stats()["prefixes"] == {}
+        analytics.metrics.record_prefix_request.assert_not_called()
+
+    def test_reset(self):
+        analytics = make_analytics()
+        analytics.record_lookup("test:user:1", hit=True)
+
+        analytics.reset()
+
+        stats = analytics.get_stats()
+        assert stats["prefixes"] == {}
+        assert stats["hot_keys"] == []
+
+    def test_serialized_size_counts_utf8_bytes(self):
+        assert serialized_size("abc") == 3
+        assert serialized_size("知识") == 6
+
+
+class TestIntegration:
+    """测试缓存管理器与中间件接入"""
+
+    @pytest.mark.asyncio
+    async def test_cache_manager_records_lookups_and_writes(self):
+        cache_manager = CacheManager(redis_client=MemoryCacheBackend(), key_prefix="test", enabled=True)
+        cache_manager.analytics = make_analytics()
+
+        await cache_manager.set_cached("test:kb:1", {"id": "1"})
+        await cache_manager.get_cached("test:kb:1")
+        await cache_manager.get_cached("test:kb:2")
+        cache_manager.get_cached_sync("test:kb:1")
+
+        stats = cache_manager.analytics.get_stats()["prefixes"]["kb"]
+        assert (stats["hits"], stats["misses"], stats["writes"]) == (2, 1, 1)
+        assert stats["avg_size_bytes"] == len('{"id": "1"}')
+
+    def test_middleware_ttl_remaining(self):
+        now = time.time()
+
+        assert CacheMiddleware._ttl_remaining({"cached_at": now - 10, "ttl": 60}) == pytest.approx(50, abs=1)
+        assert CacheMiddleware._ttl_remaining({"cached_at": now - 100, "ttl": 300, "fresh_ttl": 60}) == 0
+        assert CacheMiddleware._ttl_remaining({"cached_at": now}) is None
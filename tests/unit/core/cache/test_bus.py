@@ -0,0 +1,247 @@
+"""
+失效事件总线单元测试
+
+测试 InvalidationBus 的进程内回环、Redis 发布/订阅分发、内存缓存失效同步和传播延迟指标。
+"""
+
+import asyncio
+import json
+import time
+from unittest.mock import AsyncMock, MagicMock, Mock
+
+import pytest
+
+from app.core.cache.bus import (
+    EVENT_CACHE_INVALIDATE,
+    EVENT_MESSAGE_UPDATE,
+    TRANSPORT_LOOPBACK,
+    TRANSPORT_REDIS,
+    InvalidationBus,
+)
+from app.core.cache.manager import CacheManager
+from app.core.cache.memory_backend import MemoryCacheBackend
+from app.core.cache.redis_client import RedisClient
+
+
+def make_redis_client(messages=None):
+    """创建模拟的 Redis 客户端，PubSub 依次返回给定消息"""
+    redis_client = MagicMock(spec=RedisClient)
+    redis_client.publish = AsyncMock(return_value=1)
+
+    pubsub = MagicMock()
+    pubsub.subscribe = AsyncMock()
+    pubsub.aclose = AsyncMock()
+    queue = list(messages or [])
+
+    async def get_message(ignore_subscribe_messages=True, timeout=1.0):
+        if queue:
+            return {"type": "message", "data": queue.pop(0)}
+        await asyncio.sleep(0.01)
+        return None
+
+    pubsub.get_message = get_message
+    redis_client.pubsub = AsyncMock(return_value=pubsub)
+    return redis_client, pubsub
+
+
+def make_memory_cache_manager():
+    """创建使用内存后端的缓存管理器"""
+    return CacheManager(redis_client=MemoryCacheBackend(), key_prefix="test", enabled=True)
+
+
+class TestLoopback:
+    """测试进程内回环"""
+
+    @pytest.mark.asyncio
+    async def test_publish_dispatches_locally(self):
+        bus = InvalidationBus(cache_manager=make_memory_cache_manager(), enabled=False)
+        handler = AsyncMock()
+        bus.subscribe(EVENT_MESSAGE_UPDATE, handler)
+
+        await bus.start()
+        await bus.publish(EVENT_MESSAGE_UPDATE, {"user_ids": ["u1"]})
+
+        assert bus.transport == TRANSPORT_LOOPBACK
+        assert bus.is_distributed is False
+        event = handler.await_args[0][0]
+        assert event["data"] == {"user_ids": ["u1"]}
+        assert event["origin"] == bus.worker_id
+
+    @pytest.mark.asyncio
+    async def test_handler_errors_are_isolated(self):
+        bus = InvalidationBus(cache_manager=make_memory_cache_manager(), enabled=False)
+        second = Mock()
+        bus.subscribe(EVENT_MESSAGE_UPDATE, Mock(side_effect=RuntimeError("boom")))
+        bus.subscribe(EVENT_MESSAGE_UPDATE, second)
+
+        await bus.publish(EVENT_MESSAGE_UPDATE, {})
+
+        second.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_loopback_when_subscribe_fails(self):
+        redis_client, pubsub = make_redis_client()
+        pubsub.subscribe.side_effect = ConnectionError("refused")
+        bus = InvalidationBus(cache_manager=make_memory_cache_manager(), redis_client=redis_client)
+
+        await bus.start()
+
+        assert bus.is_distributed is False
+
+    @pytest.mark.asyncio
+    async def test_publish_nowait_in_loop_keeps_task_until_done(self):
+        bus = InvalidationBus(cache_manager=make_memory_cache_manager(), enabled=False)
+        handler = AsyncMock()
+        bus.subscribe(EVENT_MESSAGE_UPDATE, handler)
+        await bus.start()
+
+        bus.publish_nowait(EVENT_MESSAGE_UPDATE, {"user_ids": ["u1"]})
+        assert len(bus._pending_tasks) == 1
+
+        await asyncio.gather(*bus._pending_tasks)
+        await asyncio.sleep(0)
+        handler.assert_awaited_once()
+        assert not bus._pending_tasks
+
+    @pytest.mark.asyncio
+    async def test_publish_nowait_from_thread_submits_to_bus_loop(self):
+        bus = InvalidationBus(cache_manager=make_memory_cache_manager(), enabled=False)
+        handler = AsyncMock()
+        bus.subscribe(EVENT_MESSAGE_UPDATE, handler)
+        await bus.start()
+
+        await asyncio.to_thread(bus.publish_nowait, EVENT_MESSAGE_UPDATE, {"user_ids": ["u1"]})
+        for _ in range(100):
+            if not bus._pending_futures:
+                break
+            await asyncio.sleep(0.01)
+
+        handler.assert_awaited_once()
+        assert not bus._pending_futures
+        assert not bus._pending_tasks
+
+
+class TestRedisTransport:
+    """测试 Redis 发布/订阅分发"""
+
+    @pytest.mark.asyncio
+    async def test_publish_goes_through_redis(self):
+        redis_client, _ = make_redis_client()
+        bus = InvalidationBus(cache_manager=make_memory_cache_manager(), redis_client=redis_client)
+        handler = AsyncMock()
+        bus.subscribe(EVENT_MESSAGE_UPDATE, handler)
+
+        await bus.start()
+        await bus.publish(EVENT_MESSAGE_UPDATE, {"user_ids": ["u1"]})
+        await bus.stop()
+
+        assert bus.channel == "test:bus"
+        channel, payload = redis_client.publish.await_args[0]
+        assert channel == "test:bus"
+        assert json.loads(payload)["type"] == EVENT_MESSAGE_UPDATE
+        handler.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_publish_failure_falls_back_to_local_dispatch(self):
+        redis_client, _ = make_redis_client()
+        redis_client.publish.side_effect = ConnectionError("down")
+        bus = InvalidationBus(cache_manager=make_memory_cache_manager(), redis_client=redis_client)
+        handler = AsyncMock()
+        bus.subscribe(EVENT_MESSAGE_UPDATE, handler)
+
+        await bus.start()
+        await bus.publish(EVENT_MESSAGE_UPDATE, {})
+        await bus.stop()
+
+        handler.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_remote_events_dispatched_and_latency_recorded(self):
+        event = {"type": EVENT_MESSAGE_UPDATE, "origin": "other", "ts": time.time(), "data": {"user_ids": ["u1"]}}
+        redis_client, _ = make_redis_client([json.dumps(event)])
+        bus = InvalidationBus(cache_manager=make_memory_cache_manager(), redis_client=redis_client)
+        bus.metrics = Mock()
+        received = asyncio.Event()
+        bus.subscribe(EVENT_MESSAGE_UPDATE, lambda e: received.set())
+
+        await bus.start()
+        await asyncio.wait_for(received.wait(), timeout=1)
+        await bus.stop()
+
+        bus.metrics.record_bus_propagation.assert_called_once()
+        event_type, transport, latency = bus.metrics.record_bus_propagation.call_args[0]
+        assert event_type == EVENT_MESSAGE_UPDATE
+        assert transport == TRANSPORT_REDIS
+        assert latency >= 0
+
+
+class TestCacheInvalidation:
+    """测试内存缓存失效同步"""
+
+    @pytest.mark.asyncio
+    async def test_remote_invalidation_clears_memory_cache(self):
+        cache_manager = make_memory_cache_manager()
+        await cache_manager.set_cached("test:kb:1", {"id": "1"})
+        bus = InvalidationBus(cache_manager=cache_manager, enabled=False)
+
+        await bus._dispatch(
+            {"type": EVENT_CACHE_INVALIDATE, "origin": "other", "ts": time.time(), "data": {"patterns": ["test:kb:*"]}},
+            TRANSPORT_REDIS,
+        )
+
+        assert await cache_manager.redis_client.get("test:kb:1") is None
+
+    @pytest.mark.asyncio
+    async def test_own_invalidation_ignored(self):
+        cache_manager = make_memory_cache_manager()
+        await cache_manager.set_cached("test:kb:1", {"id": "1"})
+        bus = InvalidationBus(cache_manager=cache_manager, enabled=False)
+
+        await bus._dispatch(
+            {"type": EVENT_CACHE_INVALIDATE, "origin": bus.worker_id, "data": {"patterns": ["test:kb:*"]}},
+            TRANSPORT_REDIS,
+        )
+
+        assert await cache_manager.redis_client.get("test:kb:1") is not None
+
+    @pytest.mark.asyncio
+    async def test_publish_cache_invalidation_only_for_memory_backend(self):
+        redis_client, _ = make_redis_client()
+        shared = CacheManager(redis_client=redis_client, key_prefix="test", enabled=True)
+        bus = InvalidationBus(cache_manager=shared, redis_client=redis_client)
+        await bus.start()
+
+        bus.publish_cache_invalidation(["test:kb:*"])
+        await asyncio.sleep(0)
+        await bus.stop()
+
+        redis_client.publish.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_publish_cache_invalidation_with_memory_backend(self):
+        redis_client, _ = make_redis_client()
+        bus = InvalidationBus(cache_manager=make_memory_cache_manager(), redis_client=redis_client)
+        await bus.start()
+
+        bus.publish_cache_invalidation(["test:kb:*"])
+        await asyncio.sleep(0.01)
+        await bus.stop()
+
+        payload = json.loads(redis_client.publish.await_args[0][1])
+        assert payload["type"] == EVENT_CACHE_INVALIDATE
+        assert payload["data"] == {"patterns": ["test:kb:*"]}
+
+    @pytest.mark.asyncio
+    async def test_remote_invalidation_evicts_local_cache_with_redis_backend(self):
+        redis_client, _ = make_redis_client()
+        cache_manager = CacheManager(redis_client=redis_client, key_prefix="test", enabled=True)
+        local_cache = cache_manager._get_local_cache()
+        local_cache.set_sync("test:kb:1", '{"id": "1"}')
+        bus = InvalidationBus(cache_manager=cache_manager, enabled=False)
+
+        await bus._dispatch(
+            {"type": EVENT_CACHE_INVALIDATE, "origin": "other", "ts": time.time(), "data": {"patterns": ["test:kb:*"]}},
+            TRANSPORT_REDIS,
+        )
+
+        assert local_cache.get_sync("test:kb:1") is None
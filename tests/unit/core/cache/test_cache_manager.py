@@ -491,6 +491,82 @@ class TestCacheManagerInvalidatePattern:
         assert result3 == 0
 
 
+class TestCacheManagerGetManyCached:
+    """测试 CacheManager.get_many_cached 批量读取"""
+
+    @pytest.mark.asyncio
+    async def test_get_many_all_hits(self):
+        """测试全部命中时不调用数据获取函数"""
+        mock_redis = AsyncMock()
+        mock_redis.mget = AsyncMock(return_value=[json.dumps({"id": 1}), "NULL_PLACEHOLDER"])
+        manager = CacheManager(redis_client=mock_redis, key_prefix="test", enabled=True)
+        fetch_missing = MagicMock()
+
+        result = await manager.get_many_cached(["test:a", "test:b"], fetch_missing)
+
+        assert result == {"test:a": {"id": 1}, "test:b": None}
+        fetch_missing.assert_not_called()
+        mock_redis.mget.assert_called_once_with(["test:a", "test:b"])
+
+    @pytest.mark.asyncio
+    async def test_get_many_fetches_missing_in_one_batch(self):
+        """测试未命中的键通过一次批量查询补齐并批量回写"""
+        mock_redis = AsyncMock()
+        mock_redis.mget = AsyncMock(return_value=[json.dumps("cached"), None, None])
+        mock_redis.mset_with_ttl = AsyncMock(return_value=True)
+        manager = CacheManager(redis_client=mock_redis, key_prefix="test", enabled=True)
+
+        async def fetch_missing(keys):
+            assert keys == ["test:b", "test:c"]
+            return {"test:b": "fetched"}
+
+        result = await manager.get_many_cached(["test:a", "test:b", "test:c", "test:a"], fetch_missing, ttl=120)
+
+        assert result == {"test:a": "cached", "test:b": "fetched", "test:c": None}
+        mock_redis.mset_with_ttl.assert_any_call({"test:b": json.dumps("fetched")}, ttl=120)
+        mock_redis.mset_with_ttl.assert_any_call({"test:c": "NULL_PLACEHOLDER"}, ttl=60)
+
+    @pytest.mark.asyncio
+    async def test_get_many_disabled(self):
+        """测试缓存禁用时直接调用数据获取函数"""
+        manager = CacheManager(redis_client=None, key_prefix="test", enabled=False)
+
+        result = await manager.get_many_cached(["test:a"], lambda keys: {key: key.upper() for key in keys})
+
+        assert result == {"test:a": "TEST:A"}
+
+    @pytest.mark.asyncio
+    async def test_get_many_redis_failure_degrades(self):
+        """测试 Redis 批量读取失败时降级到数据源"""
+        mock_redis = AsyncMock()
+        mock_redis.mget = AsyncMock(side_effect=Exception("Redis 连接失败"))
+        mock_redis.mset_with_ttl = AsyncMock(side_effect=Exception("Redis 连接失败"))
+        manager = CacheManager(redis_client=mock_redis, key_prefix="test", enabled=True)
+
+        result = await manager.get_many_cached(["test:a", "test:b"], lambda keys: dict.fromkeys(keys, 1))
+
+        assert result == {"test:a": 1, "test:b": 1}
+
+    @pytest.mark.asyncio
+    async def test_get_many_empty_keys(self):
+        """测试空键列表"""
+        mock_redis = AsyncMock()
+        manager = CacheManager(redis_client=mock_redis, key_prefix="test", enabled=True)
+
+        assert await manager.get_many_cached([]) == {}
+        mock_redis.mget.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_invalidate_many(self):
+        """测试批量失效"""
+        mock_redis = AsyncMock()
+        mock_redis.delete_many = AsyncMock(return_value=2)
+        manager = CacheManager(redis_client=mock_redis, key_prefix="test", enabled=True)
+
+        assert await manager.invalidate_many(["test:a", "test:b"]) == 2
+        mock_redis.delete_many.assert_called_once_with(["test:a", "test:b"])
+
+
 class TestCacheManagerComplexScenarios:
     """测试 CacheManager 复杂场景"""
 
@@ -0,0 +1,205 @@
+"""
+会话变更跟踪器单元测试
+
+测试 after_flush 收集新增 / 修改 / 删除的实例、忽略列、按事务合并后在提交时一次发出，以及回滚时丢弃。
+"""
+
+from unittest.mock import Mock
+
+import pytest
+from sqlalchemy import Column, Integer, String, create_engine
+from sqlalchemy.orm import Session, declarative_base
+
+from app.core.cache import bus, invalidation
+from app.core.cache.change_tracker import ChangeSet, ChangeTracker, TrackedModel
+from app.core.cache.manager import CacheManager
+from app.core.cache.memory_backend import MemoryCacheBackend
+
+Base = declarative_base()
+
+
+class Item(Base):
+    __tablename__ = "items"
+
+    id = Column(String, primary_key=True)
+    owner_id = Column(String)
+    name = Column(String)
+    downloads = Column(Integer, default=0)
+
+
+class Note(Base):
+    __tablename__ = "notes"
+
+    id = Column(String, primary_key=True)
+    recipient_id = Column(String)
+    is_read = Column(Integer, default=0)
+
+
+def collect_item(cache_manager, item, changes: ChangeSet) -> None:
+    changes.add(([f"item:{item.id}"], [f"items:user:{item.owner_id}"]))
+
+
+def collect_note(cache_manager, note, changes: ChangeSet) -> None:
+    changes.add((["notes:*"], []))
+    changes.user_ids.add(note.recipient_id)
+
+
+@pytest.fixture
+def engine():
+    """创建内存数据库"""
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(Item(id="i1", owner_id="u1", name="first"))
+        db.commit()
+    return engine
+
+
+@pytest.fixture
+def published(monkeypatch):
+    """替换失效队列和总线，返回总线的模拟对象"""
+    monkeypatch.setattr(invalidation, "invalidate_cache_sync", Mock())
+    invalidation_bus = Mock()
+    monkeypatch.setattr(bus, "get_invalidation_bus", Mock(return_value=invalidation_bus))
+    return invalidation_bus
+
+
+@pytest.fixture
+def tracker(published):
+    """创建注册了会话事件的变更跟踪器"""
+    cache_manager = CacheManager(redis_client=MemoryCacheBackend(), key_prefix="test", enabled=True)
+    tracker = ChangeTracker(
+        cache_manager=cache_manager,
+        rules={
+            Item: TrackedModel(collect_item, frozenset({"downloads"})),
+            Note: TrackedModel(collect_note),
+        },
+    )
+    tracker.install_listeners()
+    yield tracker
+    tracker.remove_listeners()
+
+
+def submitted_patterns() -> list[list[str]]:
+    """失效队列收到的每次提交的模式列表"""
+    return [call.args[1] for call in invalidation.invalidate_cache_sync.call_args_list]
+
+
+class TestCollect:
+    """测试变更收集"""
+
+    def test_update_emits_patterns_and_tags_on_commit(self, engine, tracker):
+        with Session(engine) as db:
+            db.get(Item, "i1").name = "renamed"
+            db.flush()
+            invalidation.invalidate_cache_sync.assert_not_called()
+            db.commit()
+
+        assert submitted_patterns() == [["item:i1", "test:http:*#items:user:u1#*"]]
+
+    def test_new_and_deleted_instances(self, engine, tracker):
+        with Session(engine) as db:
+            db.add(Item(id="i2", owner_id="u2", name="second"))
+            db.delete(db.get(Item, "i1"))
+            db.commit()
+
+        [patterns] = submitted_patterns()
+        assert {"item:i1", "item:i2", "test:http:*#items:user:u1#*", "test:http:*#items:user:u2#*"} == set(patterns)
+
+    def test_ignored_columns_do_not_invalidate(self, engine, tracker):
+        with Session(engine) as db:
+            db.get(Item, "i1").downloads = 10
+            db.commit()
+
+            db.get(Item, "i1").name = "first"
+            db.commit()
+
+        invalidation.invalidate_cache_sync.assert_not_called()
+
+    def test_untracked_models_ignored(self, engine, published):
+        tracker = ChangeTracker(
+            cache_manager=CacheManager(redis_client=MemoryCacheBackend(), enabled=True),
+            rules={Note: TrackedModel(collect_note)},
+        )
+        tracker.install_listeners()
+        try:
+            with Session(engine) as db:
+                db.get(Item, "i1").name = "renamed"
+                db.commit()
+        finally:
+            tracker.remove_listeners()
+
+        invalidation.invalidate_cache_sync.assert_not_called()
+
+
+class TestBatching:
+    """测试按事务合并"""
+
+    def test_multiple_flushes_emit_once(self, engine, tracker, published):
+        with Session(engine) as db:
+            db.add(Note(id="n1", recipient_id="u1"))
+            db.flush()
+            db.add(Note(id="n2", recipient_id="u1"))
+            db.add(Note(id="n3", recipient_id="u2"))
+            db.flush()
+            db.commit()
+
+        assert submitted_patterns() == [["notes:*"]]
+        published.publish_nowait.assert_called_once_with(bus.EVENT_MESSAGE_UPDATE, {"user_ids": ["u1", "u2"]})
+
+    def test_rollback_discards_changes(self, engine, tracker, published):
+        with Session(engine) as db:
+            db.add(Note(id="n1", recipient_id="u1"))
+            db.get(Item, "i1").name = "renamed"
+            db.flush()
+            db.rollback()
+
+            db.get(Item, "i1").downloads = 1
+            db.commit()
+
+        invalidation.invalidate_cache_sync.assert_not_called()
+        published.publish_nowait.assert_not_called()
+
+    def test_disabled_cache_still_publishes_message_updates(self, engine, published):
+        tracker = ChangeTracker(
+            cache_manager=CacheManager(redis_client=None, enabled=False), rules={Note: TrackedModel(collect_note)}
+        )
+        tracker.install_listeners()
+        try:
+            with Session(engine) as db:
+                db.add(Note(id="n1", recipient_id="u1"))
+                db.commit()
+        finally:
+            tracker.remove_listeners()
+
+        invalidation.invalidate_cache_sync.assert_not_called()
+        published.publish_nowait.assert_called_once_with(bus.EVENT_MESSAGE_UPDATE, {"user_ids": ["u1"]})
+
+    def test_archives_invalidated_on_commit(self, engine, published, monkeypatch):
+        from app.services import archive_cache
+
+        cache = Mock()
+        monkeypatch.setattr(archive_cache, "get_archive_cache", Mock(return_value=cache))
+
+        def collect_archive(cache_manager, item, changes: ChangeSet) -> None:
+            changes.archives.add(("knowledge", item.id))
+
+        tracker = ChangeTracker(
+            cache_manager=CacheManager(redis_client=None, enabled=False),
+            rules={Item: TrackedModel(collect_archive, frozenset({"downloads"}))},
+        )
+        tracker.install_listeners()
+        try:
+            with Session(engine) as db:
+                db.get(Item, "i1").downloads = 5
+                db.commit()
+                cache.invalidate.assert_not_called()
+
+                db.get(Item, "i1").name = "renamed"
+                db.flush()
+                db.get(Item, "i1").name = "renamed again"
+                db.commit()
+        finally:
+            tracker.remove_listeners()
+
+        cache.invalidate.assert_called_once_with("knowledge", "i1")
@@ -0,0 +1,229 @@
+"""
+Redis 熔断器单元测试
+
+测试滑动窗口失败率、打开后快速失败、抖动探测、半开状态的恢复与重新打开，以及 RedisClient 和 CacheManager 的接入。
+"""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+from redis.exceptions import RedisError, ResponseError
+
+from app.core.cache.circuit_breaker import (
+    STATE_CLOSED,
+    STATE_HALF_OPEN,
+    STATE_OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+)
+from app.core.cache.manager import CacheManager
+from app.core.cache.redis_client import RedisClient
+
+
+class FakeClock:
+    """可手动推进的单调时钟"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def breaker(clock):
+    """窗口 10 秒、至少 4 次调用、失败率 50%、打开 5 秒（无抖动）的熔断器"""
+    return CircuitBreaker(
+        failure_rate_threshold=0.5, window_seconds=10, minimum_calls=4, open_seconds=5, jitter=0, clock=clock
+    )
+
+
+def trip(breaker: CircuitBreaker) -> None:
+    for _ in range(breaker.minimum_calls):
+        breaker.before_call()
+        breaker.record_failure()
+
+
+class TestFailureWindow:
+    """测试失败率窗口"""
+
+    def test_opens_when_failure_rate_reached(self, breaker):
+        for _ in range(2):
+            breaker.record_success()
+        breaker.record_failure()
+        assert breaker.state == STATE_CLOSED
+
+        breaker.record_failure()
+
+        assert breaker.state == STATE_OPEN
+
+    def test_minimum_calls_required(self, breaker):
+        for _ in range(3):
+            breaker.record_failure()
+
+        assert breaker.state == STATE_CLOSED
+
+    def test_old_failures_leave_window(self, breaker, clock):
+        for _ in range(3):
+            breaker.record_failure()
+        clock.now += 11
+
+        breaker.record_failure()
+
+        assert breaker.state == STATE_CLOSED
+        assert breaker.get_stats()["window_calls"] == 1
+
+    def test_disabled_never_rejects(self, clock):
+        breaker = CircuitBreaker(minimum_calls=1, enabled=False, clock=clock)
+        breaker.record_failure()
+
+        breaker.before_call()
+        assert breaker.state == STATE_CLOSED
+
+
+class TestOpenAndHalfOpen:
+    """测试打开、探测与恢复"""
+
+    def test_open_rejects_until_retry_time(self, breaker, clock):
+        trip(breaker)
+
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+
+        clock.now += 5
+        breaker.before_call()
+        assert breaker.state == STATE_HALF_OPEN
+
+    def test_half_open_limits_probes(self, breaker, clock):
+        trip(breaker)
+        clock.now += 5
+        breaker.before_call()
+
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+
+    def test_probe_success_closes(self, breaker, clock):
+        trip(breaker)
+        clock.now += 5
+        breaker.before_call()
+
+        breaker.record_success()
+
+        assert breaker.state == STATE_CLOSED
+        assert breaker.get_stats()["window_calls"] == 0
+
+    def test_probe_failure_reopens(self, breaker, clock):
+        trip(breaker)
+        clock.now += 5
+        breaker.before_call()
+
+        breaker.record_failure()
+
+        assert breaker.state == STATE_OPEN
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+
+    def test_lost_probe_released_after_timeout(self, breaker, clock):
+        trip(breaker)
+        clock.now += 5
+        breaker.before_call()
+
+        clock.now += 5
+        breaker.before_call()
+        assert breaker.state == STATE_HALF_OPEN
+
+    def test_jitter_spreads_retry_time(self, clock):
+        retry_times = set()
+        for _ in range(20):
+            breaker = CircuitBreaker(minimum_calls=1, open_seconds=10, jitter=0.5, clock=clock)
+            breaker.record_failure()
+            retry_times.add(breaker.get_stats()["retry_in"])
+
+        assert len(retry_times) > 1
+        assert all(5 <= retry_in <= 15 for retry_in in retry_times)
+
+    def test_transitions_recorded(self, breaker, clock):
+        breaker.metrics = MagicMock()
+        trip(breaker)
+        clock.now += 5
+        breaker.before_call()
+        breaker.record_success()
+
+        transitions = [call.args[1:3] for call in breaker.metrics.record_circuit_transition.call_args_list]
+        assert transitions == [
+            (STATE_CLOSED, STATE_OPEN),
+            (STATE_OPEN, STATE_HALF_OPEN),
+            (STATE_HALF_OPEN, STATE_CLOSED),
+        ]
+
+
+class TestRedisClientIntegration:
+    """测试 RedisClient 和 CacheManager 接入熔断器"""
+
+    @pytest.mark.asyncio
+    async def test_open_breaker_skips_redis(self, breaker):
+        client = RedisClient(circuit_breaker=breaker)
+        trip(breaker)
+
+        with patch.object(client, "_ensure_connection", new_callable=AsyncMock) as mock_ensure:
+            with pytest.raises(CircuitOpenError):
+                await client.get("k")
+
+        mock_ensure.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_connection_errors_trip_breaker(self, breaker):
+        client = RedisClient(circuit_breaker=breaker)
+
+        with patch.object(client, "_ensure_connection", new_callable=AsyncMock) as mock_ensure:
+            mock_ensure.side_effect = RedisConnectionError("连接失败")
+            for _ in range(breaker.minimum_calls):
+                with pytest.raises(RedisConnectionError):
+                    await client.get("k")
+
+        assert breaker.state == STATE_OPEN
+
+    @pytest.mark.asyncio
+    async def test_server_errors_do_not_trip_breaker(self, breaker):
+        client = RedisClient(circuit_breaker=breaker)
+
+        with (
+            patch.object(client, "_ensure_connection", new_callable=AsyncMock),
+            patch.object(client, "_client", new_callable=AsyncMock) as mock_client,
+        ):
+            mock_client.get = AsyncMock(side_effect=ResponseError("WRONGTYPE"))
+            for _ in range(breaker.minimum_calls):
+                with pytest.raises(RedisError):
+                    await client.get("k")
+
+        assert breaker.state == STATE_CLOSED
+
+    def test_sync_path_degrades_without_calling_redis(self, breaker):
+        client = RedisClient(circuit_breaker=breaker)
+        cache_manager = CacheManager(redis_client=client, key_prefix="test", enabled=True)
+        trip(breaker)
+        fetch = MagicMock(return_value={"id": 1})
+
+        with patch.object(client, "get_sync_client") as get_sync_client:
+            assert cache_manager.get_cached_sync("test:k", fetch) == {"id": 1}
+
+        get_sync_client.assert_not_called()
+        fetch.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_async_path_degrades_to_fetch(self, breaker):
+        client = RedisClient(circuit_breaker=breaker)
+        cache_manager = CacheManager(redis_client=client, key_prefix="test", enabled=True)
+        trip(breaker)
+
+        async def fetch():
+            return "db"
+
+        assert await cache_manager.get_cached("test:k", fetch) == "db"
+        assert await cache_manager.set_cached("test:k", "value") is False
@@ -8,7 +8,7 @@ from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
-from app.core.cache.decorators import _build_cache_key, cache_invalidate, cached
+from app.core.cache.decorators import _build_cache_key, bind_cache_args, cache_invalidate, cached
 from app.core.cache.manager import CacheManager
 
 
@@ -196,19 +196,13 @@ class TestCachedDecorator:
         # 验证没有调用 Redis 操作
         mock_cache_manager.get_cached.assert_not_called()
 
-    def test_cached_sync_function_warning(self, mock_cache_manager):
-        """测试同步函数的警告"""
+    def test_cached_rejects_sync_function(self):
+        """测试同步函数不能使用 @cached（阻塞式缓存读写会阻塞事件循环）"""
+        with pytest.raises(TypeError, match="只支持异步函数"):
 
-        @cached(key_pattern="user:{user_id}", ttl=3600)
-        def sync_get_user(user_id: str):
-            return {"id": user_id, "name": "Alice"}
-
-        # 同步函数应该直接执行，不使用缓存
-        result = sync_get_user("123")
-        assert result == {"id": "123", "name": "Alice"}
-
-        # 验证没有调用 Redis 操作
-        mock_cache_manager.get_cached.assert_not_called()
+            @cached(key_pattern="user:{user_id}", ttl=3600)
+            def sync_get_user(user_id: str):
+                return {"id": user_id}
 
 
 class TestCacheInvalidateDecorator:
@@ -279,19 +273,19 @@ class TestCacheInvalidateDecorator:
         # 验证尝试了失效操作
         mock_cache_manager.invalidate.assert_called_once()
 
-    def test_cache_invalidate_sync_function_warning(self, mock_cache_manager):
-        """测试同步函数的警告"""
+    def test_cache_invalidate_sync_function(self, mock_cache_manager):
+        """测试同步函数的缓存失效"""
 
         @cache_invalidate(key_pattern="user:{user_id}")
         def sync_update_user(user_id: str, data: dict):
             return {"id": user_id, **data}
 
-        # 同步函数应该直接执行，不使用缓存失效
         result = sync_update_user("123", {"name": "Bob"})
         assert result == {"id": "123", "name": "Bob"}
 
-        # 验证没有调用失效操作
+        # 同步函数使用同步失效接口
         mock_cache_manager.invalidate.assert_not_called()
+        mock_cache_manager.invalidate_sync.assert_called_once_with("user:123")
 
 
 class TestBuildCacheKey:
@@ -346,6 +340,32 @@ class TestBuildCacheKey:
         key = _build_cache_key("user:{user_id}", service.get_user, (service, "123"), {})  # args 包含 self 和 user_id
         assert key == "user:123"
 
+    def test_build_key_uses_defaults_and_skips_self(self):
+        """测试未传入的参数使用默认值，self 不参与键构建"""
+
+        class KnowledgeService:
+            def get_knowledge_base_by_id(self, kb_id: str, include_files: bool = False):
+                pass
+
+        service = KnowledgeService()
+        key = _build_cache_key(
+            "kb:{kb_id}:{include_files}", KnowledgeService.get_knowledge_base_by_id, (service, "kb1"), {}
+        )
+        assert key == "kb:kb1:False"
+
+    def test_bind_cache_args_skips_session(self):
+        """测试 SQLAlchemy Session 参数不参与键构建"""
+        from sqlalchemy.orm import Session
+
+        def get_user_by_id(db: Session, user_id: str):
+            pass
+
+        session = Session()
+        try:
+            assert bind_cache_args(get_user_by_id, (session, "u1"), {}) == {"user_id": "u1"}
+        finally:
+            session.close()
+
     def test_build_key_missing_parameter_raises_error(self):
         """测试缺少参数时抛出错误"""
 
@@ -359,6 +379,22 @@ class TestBuildCacheKey:
         assert "不存在" in str(exc_info.value)
 
 
+class TestSyncInvalidateWithMemoryBackend:
+    """测试同步服务方法使用真实缓存管理器（内存后端）失效缓存"""
+
+    def test_sync_method_invalidates_cached_value(self, memory_cache_manager):
+        class UserService:
+            @cache_invalidate(key_pattern="user:{user_id}")
+            def update_user(self, user_id: str):
+                return True
+
+        memory_cache_manager.set_cached_sync("user:u1", {"id": "u1"}, ttl=60)
+        assert memory_cache_manager.get_cached_sync("user:u1") == {"id": "u1"}
+
+        assert UserService().update_user("u1") is True
+        assert memory_cache_manager.get_cached_sync("user:u1") is None
+
+
 # Fixtures
 
 
@@ -370,6 +406,7 @@ def mock_cache_manager(monkeypatch):
     mock_manager.get_cached = AsyncMock()
     mock_manager.set_cached = AsyncMock()
     mock_manager.invalidate = AsyncMock()
+    mock_manager.local_cache = None
 
     # 模拟 get_cache_manager 返回 mock
     with patch("app.core.cache.factory.get_cache_manager", return_value=mock_manager):
@@ -388,3 +425,13 @@ def mock_cache_manager_disabled(monkeypatch):
     # 模拟 get_cache_manager 返回 mock
     with patch("app.core.cache.factory.get_cache_manager", return_value=mock_manager):
         yield mock_manager
+
+
+@pytest.fixture
+def memory_cache_manager():
+    """使用内存后端的真实缓存管理器"""
+    from app.core.cache.memory_backend import MemoryCacheBackend
+
+    manager = CacheManager(redis_client=MemoryCacheBackend(), key_prefix="test", enabled=True)
+    with patch("app.core.cache.factory.get_cache_manager", return_value=manager):
+        yield manager
@@ -0,0 +1,185 @@
+"""
+实体读穿缓存单元测试
+
+测试实体快照的读穿、游离实例重建、排除列，以及 SQLAlchemy 更新 / 删除事件在提交后更换版本。
+"""
+
+from datetime import datetime
+from unittest.mock import Mock, patch
+
+import pytest
+from sqlalchemy import Column, DateTime, Integer, String, create_engine
+from sqlalchemy.inspection import inspect as sqlalchemy_inspect
+from sqlalchemy.orm import Session, declarative_base
+
+from app.core.cache import invalidation
+from app.core.cache.entity_cache import EntityCache
+from app.core.cache.manager import CacheManager
+from app.core.cache.memory_backend import MemoryCacheBackend
+from app.core.cache.redis_client import RedisClient
+
+Base = declarative_base()
+
+
+class Account(Base):
+    __tablename__ = "accounts"
+
+    id = Column(String, primary_key=True)
+    username = Column(String)
+    hashed_password = Column(String)
+    password_version = Column(Integer, default=0)
+    created_at = Column(DateTime)
+
+
+CREATED_AT = datetime(2026, 1, 2, 3, 4, 5)
+
+
+@pytest.fixture
+def engine():
+    """创建内存数据库"""
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(Account(id="u1", username="alice", hashed_password="secret", password_version=0, created_at=CREATED_AT))
+        db.commit()
+    return engine
+
+
+@pytest.fixture
+def entity_cache(monkeypatch):
+    """创建使用内存后端的实体缓存，失效队列替换为模拟对象"""
+    monkeypatch.setattr(invalidation, "invalidate_cache_sync", Mock())
+    cache_manager = CacheManager(redis_client=MemoryCacheBackend(), key_prefix="test", enabled=True)
+    cache = EntityCache(cache_manager=cache_manager, models={"user": Account})
+    cache.install_listeners()
+    yield cache
+    cache.remove_listeners()
+
+
+def load(db: Session, loader_calls: Mock):
+    """返回查询 u1 的 loader，调用时计数"""
+
+    def loader():
+        loader_calls()
+        return db.query(Account).filter(Account.id == "u1").first()
+
+    return loader
+
+
+class TestReadThrough:
+    """测试读穿缓存"""
+
+    def test_hit_returns_detached_snapshot(self, engine, entity_cache):
+        loader_calls = Mock()
+        with Session(engine) as db:
+            first = entity_cache.get("user", "u1", load(db, loader_calls))
+            second = entity_cache.get("user", "u1", load(db, loader_calls))
+
+        assert loader_calls.call_count == 1
+        assert first.username == second.username == "alice"
+        assert second.created_at == CREATED_AT
+        state = sqlalchemy_inspect(second)
+        assert state.detached
+        assert "hashed_password" not in state.dict
+
+    def test_missing_entity_not_cached(self, engine, entity_cache):
+        loader = Mock(return_value=None)
+
+        assert entity_cache.get("user", "missing", loader) is None
+        assert entity_cache.get("user", "missing", loader) is None
+        assert loader.call_count == 2
+
+    def test_disabled_cache_always_loads(self, engine):
+        cache = EntityCache(cache_manager=CacheManager(redis_client=None, enabled=False), models={"user": Account})
+        loader_calls = Mock()
+        with Session(engine) as db:
+            cache.get("user", "u1", load(db, loader_calls))
+            cache.get("user", "u1", load(db, loader_calls))
+
+        assert loader_calls.call_count == 2
+
+    def test_version_failure_falls_back_to_loader(self, engine, entity_cache):
+        entity_cache.cache_manager.get_or_set_sync = Mock(side_effect=ConnectionError("down"))
+        loader = Mock(return_value="from-db")
+
+        assert entity_cache.get("user", "u1", loader) == "from-db"
+
+
+class TestVersionBump:
+    """测试实体修改后更换版本"""
+
+    def test_update_commit_bumps_version(self, engine, entity_cache):
+        loader_calls = Mock()
+        with Session(engine) as db:
+            entity_cache.get("user", "u1", load(db, loader_calls))
+
+            account = db.get(Account, "u1")
+            account.password_version = 1
+            db.commit()
+
+            refreshed = entity_cache.get("user", "u1", load(db, loader_calls))
+
+        assert loader_calls.call_count == 2
+        assert refreshed.password_version == 1
+        invalidation.invalidate_cache_sync.assert_called_once_with(entity_cache.cache_manager, ["test:ver:user:u1"])
+
+    def test_delete_commit_bumps_version(self, engine, entity_cache):
+        with Session(engine) as db:
+            entity_cache.get("user", "u1", load(db, Mock()))
+
+            db.delete(db.get(Account, "u1"))
+            db.commit()
+
+            assert entity_cache.get("user", "u1", load(db, Mock())) is None
+
+    def test_rollback_does_not_bump(self, engine, entity_cache):
+        with Session(engine) as db:
+            account = db.get(Account, "u1")
+            account.username = "changed"
+            db.flush()
+            db.rollback()
+
+        invalidation.invalidate_cache_sync.assert_not_called()
+
+    def test_uncommitted_changes_not_cached(self, engine, entity_cache):
+        loader_calls = Mock()
+        with Session(engine) as db:
+            account = db.get(Account, "u1")
+            account.username = "uncommitted"
+            entity_cache.get("user", "u1", load(db, loader_calls))
+            db.rollback()
+
+            cached = entity_cache.get("user", "u1", load(db, loader_calls))
+
+        assert loader_calls.call_count == 2
+        assert cached.username == "alice"
+
+    def test_update_without_changes_does_not_bump(self, engine, entity_cache):
+        with Session(engine) as db:
+            account = db.get(Account, "u1")
+            account.username = "alice"
+            db.commit()
+
+        invalidation.invalidate_cache_sync.assert_not_called()
+
+
+class TestGetOrSetSync:
+    """测试同步原子读取或创建"""
+
+    def test_remote_existing_value_cached_locally(self):
+        sync_client = Mock()
+        sync_client.set.return_value = None
+        sync_client.get.return_value = "existing"
+        redis_client = RedisClient()
+        cache_manager = CacheManager(redis_client=redis_client, key_prefix="test", enabled=True)
+
+        with patch.object(redis_client, "get_sync_client", return_value=sync_client):
+            assert cache_manager.get_or_set_sync("k", "new", ttl=60) == "existing"
+            assert cache_manager.get_or_set_sync("k", "new", ttl=60) == "existing"
+        sync_client.set.assert_called_once_with("k", "new", ex=60, nx=True)
+
+    def test_memory_backend(self):
+        cache_manager = CacheManager(redis_client=MemoryCacheBackend(), key_prefix="test", enabled=True)
+
+        assert cache_manager.get_or_set_sync("k", "first") == "first"
+        assert cache_manager.get_or_set_sync("k", "second") == "first"
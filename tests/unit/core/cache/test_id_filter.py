@@ -0,0 +1,197 @@
+"""
+不存在 ID 过滤器单元测试
+
+测试 BloomFilter 的判定与假阳性率，以及 ExistenceFilter 的重建、插入同步、就绪条件和 SQLAlchemy 事件接入。
+"""
+
+import asyncio
+from unittest.mock import Mock
+
+import pytest
+from sqlalchemy import Column, String, create_engine
+from sqlalchemy.orm import Session, declarative_base
+from starlette.requests import Request
+
+from app.core.cache.bus import EVENT_BUS_RECONNECTED, EVENT_ENTITY_CREATED, TRANSPORT_LOOPBACK, InvalidationBus
+from app.core.cache.id_filter import BloomFilter, ExistenceFilter
+
+Base = declarative_base()
+
+
+class Item(Base):
+    __tablename__ = "items"
+
+    id = Column(String, primary_key=True)
+
+
+def make_filter(ids=None, **kwargs):
+    """创建使用给定 ID 列表构建的过滤器"""
+    loaded = {"item": list(ids or [])}
+    id_filter = ExistenceFilter(models={"item": Item}, id_loader=lambda model: loaded["item"], **kwargs)
+    id_filter.metrics = Mock()
+    return id_filter
+
+
+class TestBloomFilter:
+    """测试布隆过滤器"""
+
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        ids = [f"id-{i}" for i in range(1000)]
+        for entity_id in ids:
+            bloom.add(entity_id)
+
+        assert all(entity_id in bloom for entity_id in ids)
+        assert bloom.count == 1000
+
+    def test_false_positive_rate_near_target(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add(f"id-{i}")
+
+        false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+
+        assert false_positives / 10000 < 0.03
+        assert bloom.false_positive_rate == pytest.approx(0.01, rel=0.2)
+
+    def test_empty_filter_rejects_everything(self):
+        bloom = BloomFilter(capacity=10)
+
+        assert "anything" not in bloom
+        assert bloom.false_positive_rate == 0
+
+
+class TestExistenceFilter:
+    """测试 ID 过滤器"""
+
+    def test_not_ready_allows_everything(self):
+        id_filter = make_filter(["a"])
+
+        assert id_filter.might_exist("item", "missing") is True
+        id_filter.metrics.record_id_filter_check.assert_not_called()
+
+    def test_rebuild_answers_absent(self):
+        id_filter = make_filter(["a", "b"])
+        id_filter.rebuild()
+
+        assert id_filter.might_exist("item", "a") is True
+        assert id_filter.might_exist("item", "missing") is False
+        id_filter.metrics.record_id_filter_check.assert_called_with("item", "absent")
+
+    def test_request_check_reused_within_request(self):
+        """测试同一请求内（缓存中间件 + 端点）只检查一次、只计一次指标"""
+        id_filter = make_filter(["a"])
+        id_filter.rebuild()
+        scope = {"type": "http", "method": "GET", "path": "/", "headers": []}
+
+        assert id_filter.might_exist_in_request(Request(scope), "item", "a") is True
+        assert id_filter.might_exist_in_request(Request(scope), "item", "a") is True
+        assert id_filter.might_exist_in_request(Request(scope), "item", "missing") is False
+        assert id_filter.metrics.record_id_filter_check.call_count == 2
+
+        other_request = Request({"type": "http", "method": "GET", "path": "/", "headers": []})
+        id_filter.might_exist_in_request(other_request, "item", "a")
+        assert id_filter.metrics.record_id_filter_check.call_count == 3
+
+    def test_unknown_resource_allowed(self):
+        id_filter = make_filter(["a"])
+        id_filter.rebuild()
+
+        assert id_filter.might_exist("other", "missing") is True
+
+    def test_disabled_filter_allows_everything(self):
+        id_filter = make_filter(["a"], enabled=False)
+        id_filter.rebuild()
+
+        assert id_filter.might_exist("item", "missing") is True
+
+    def test_add_after_rebuild(self):
+        id_filter = make_filter(["a"])
+        id_filter.rebuild()
+
+        id_filter.add("item", "new")
+
+        assert id_filter.might_exist("item", "new") is True
+
+    def test_recent_inserts_survive_rebuild(self):
+        id_filter = make_filter([])
+        id_filter.add("item", "uncommitted")
+
+        id_filter.rebuild()
+
+        assert id_filter.might_exist("item", "uncommitted") is True
+
+    def test_invalidate_during_rebuild_keeps_filter_not_ready(self):
+        id_filter = make_filter(["a"])
+
+        def loader(model):
+            id_filter.invalidate()
+            return ["a"]
+
+        id_filter._id_loader = loader
+        id_filter.rebuild()
+
+        assert id_filter.is_ready is False
+        assert id_filter.might_exist("item", "missing") is True
+
+    def test_report_missing_records_false_positive(self):
+        id_filter = make_filter(["a"])
+        id_filter.rebuild()
+
+        id_filter.report_missing("item", "a")
+
+        id_filter.metrics.record_id_filter_false_positive.assert_called_once_with("item")
+
+    def test_sqlalchemy_insert_added(self):
+        id_filter = make_filter([])
+        id_filter.rebuild()
+        id_filter._publish_insert = Mock()
+        engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(engine)
+
+        id_filter.install_listeners()
+        try:
+            with Session(engine) as db:
+                db.add(Item(id="created"))
+                db.commit()
+        finally:
+            id_filter.remove_listeners()
+
+        assert id_filter.might_exist("item", "created") is True
+        id_filter._publish_insert.assert_called_once_with("item", "created")
+
+
+class TestBusIntegration:
+    """测试与失效事件总线的配合"""
+
+    @pytest.mark.asyncio
+    async def test_not_started_without_distributed_bus(self):
+        id_filter = make_filter(["a"])
+        bus = InvalidationBus(cache_manager=Mock(), enabled=False)
+
+        await id_filter.start(bus)
+
+        assert id_filter._task is None
+        assert id_filter.might_exist("item", "missing") is True
+
+    @pytest.mark.asyncio
+    async def test_remote_insert_and_reconnect(self):
+        id_filter = make_filter(["a"], allow_without_bus=True)
+        bus = InvalidationBus(cache_manager=Mock(), enabled=False)
+
+        await id_filter.start(bus)
+        for _ in range(100):
+            if id_filter.is_ready:
+                break
+            await asyncio.sleep(0.01)
+        assert id_filter.might_exist("item", "remote") is False
+
+        created = {"type": EVENT_ENTITY_CREATED, "origin": "other", "data": {"resource": "item", "id": "remote"}}
+        await bus._dispatch(created, TRANSPORT_LOOPBACK)
+        assert id_filter.might_exist("item", "remote") is True
+
+        await bus._dispatch({"type": EVENT_BUS_RECONNECTED, "origin": bus.worker_id}, TRANSPORT_LOOPBACK)
+        assert id_filter.might_exist("item", "missing") is True
+
+        await id_filter.stop()
+        assert id_filter.is_ready is False
@@ -0,0 +1,200 @@
+"""
+后台缓存失效队列单元测试
+
+测试 InvalidationQueue 的合并去重、批量删除、失败重试、flush/stop 以及 invalidate_cache_sync 接入。
+"""
+
+import threading
+from unittest.mock import MagicMock, Mock, patch
+
+import pytest
+
+from app.core.cache.invalidation import auto_invalidate_cache, invalidate_cache_sync
+from app.core.cache.invalidation_queue import InvalidationQueue
+from app.core.cache.manager import CacheManager
+from app.core.cache.memory_backend import MemoryCacheBackend
+
+
+def make_cache_manager():
+    """创建记录批次的模拟缓存管理器"""
+    cache_manager = MagicMock()
+    cache_manager.is_enabled.return_value = True
+    cache_manager.invalidate_patterns_sync.return_value = 1
+    return cache_manager
+
+
+@pytest.fixture
+def queue():
+    q = InvalidationQueue(coalesce_window=0.2, max_retries=2)
+    q.metrics = Mock()
+    with patch.object(InvalidationQueue, "_publish"):
+        yield q
+        q.stop(timeout=1)
+
+
+class TestCoalescing:
+    """测试合并与去重"""
+
+    def test_identical_patterns_coalesced_into_one_batch(self, queue):
+        cache_manager = make_cache_manager()
+
+        queue.submit(["test:kb:*", "test:user:1"], cache_manager=cache_manager)
+        queue.submit(["test:kb:*"], cache_manager=cache_manager)
+        queue.submit(["test:persona:*"], cache_manager=cache_manager)
+
+        assert queue.flush(timeout=1) is True
+        cache_manager.invalidate_patterns_sync.assert_called_once_with(["test:kb:*", "test:user:1", "test:persona:*"])
+        assert queue.depth == 0
+
+    def test_local_cache_evicted_on_submit(self, queue):
+        cache_manager = make_cache_manager()
+
+        queue.submit(["test:kb:*"], cache_manager=cache_manager)
+
+        cache_manager.evict_local.assert_called_once_with("test:kb:*")
+
+    def test_disabled_cache_skipped(self, queue):
+        cache_manager = make_cache_manager()
+        cache_manager.is_enabled.return_value = False
+
+        queue.submit(["test:kb:*"], cache_manager=cache_manager)
+
+        assert queue.depth == 0
+        assert queue.is_running is False
+
+    def test_batches_split_by_cache_manager(self, queue):
+        first, second = make_cache_manager(), make_cache_manager()
+
+        queue.submit(["test:kb:*"], cache_manager=first)
+        queue.submit(["test:kb:*"], cache_manager=second)
+        queue.flush(timeout=1)
+
+        first.invalidate_patterns_sync.assert_called_once_with(["test:kb:*"])
+        second.invalidate_patterns_sync.assert_called_once_with(["test:kb:*"])
+
+    def test_metrics_recorded(self, queue):
+        queue.submit(["test:kb:*"], cache_manager=make_cache_manager())
+        queue.flush(timeout=1)
+
+        queue.metrics.set_invalidation_queue_depth.assert_any_call(1)
+        queue.metrics.set_invalidation_queue_depth.assert_called_with(0)
+        queue.metrics.record_invalidation_batch.assert_called_once_with("success")
+        queue.metrics.record_invalidation_lag.assert_called_once()
+
+    def test_published_after_apply(self, queue):
+        queue.submit(["test:kb:*"], cache_manager=make_cache_manager())
+        queue.flush(timeout=1)
+
+        InvalidationQueue._publish.assert_called_once_with(["test:kb:*"])
+
+
+class TestRetry:
+    """测试失败重试"""
+
+    def test_retries_then_succeeds(self, queue):
+        cache_manager = make_cache_manager()
+        cache_manager.invalidate_patterns_sync.side_effect = [ConnectionError("down"), 3]
+
+        queue.submit(["test:kb:*"], cache_manager=cache_manager)
+
+        assert queue.flush(timeout=2) is True
+        assert cache_manager.invalidate_patterns_sync.call_count == 2
+        queue.metrics.record_invalidation_batch.assert_any_call("retry")
+        queue.metrics.record_invalidation_batch.assert_called_with("success")
+
+    def test_dropped_after_max_retries(self, queue):
+        cache_manager = make_cache_manager()
+        cache_manager.invalidate_patterns_sync.side_effect = ConnectionError("down")
+
+        queue.submit(["test:kb:*"], cache_manager=cache_manager)
+
+        assert queue.flush(timeout=2) is True
+        assert cache_manager.invalidate_patterns_sync.call_count == 3
+        queue.metrics.record_invalidation_batch.assert_called_with("dropped")
+        InvalidationQueue._publish.assert_not_called()
+
+
+class TestLifecycle:
+    """测试 flush 与 stop"""
+
+    def test_flush_without_submissions(self, queue):
+        assert queue.flush(timeout=0.1) is True
+
+    def test_stop_drains_and_restarts_on_submit(self, queue):
+        cache_manager = make_cache_manager()
+
+        queue.submit(["test:kb:*"], cache_manager=cache_manager)
+        assert queue.stop(timeout=1) is True
+        assert queue.is_running is False
+        cache_manager.invalidate_patterns_sync.assert_called_once()
+
+        queue.submit(["test:user:*"], cache_manager=cache_manager)
+        queue.flush(timeout=1)
+        assert cache_manager.invalidate_patterns_sync.call_count == 2
+
+    def test_submit_from_multiple_threads(self, queue):
+        cache_manager = make_cache_manager()
+        threads = [
+            threading.Thread(target=queue.submit, args=([f"test:kb:{i % 5}"],), kwargs={"cache_manager": cache_manager})
+            for i in range(20)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        queue.flush(timeout=1)
+
+        applied = [p for call in cache_manager.invalidate_patterns_sync.call_args_list for p in call[0][0]]
+        assert sorted(set(applied)) == [f"test:kb:{i}" for i in range(5)]
+
+
+class TestMemoryBackendIntegration:
+    """测试与真实缓存管理器（内存后端）的集成"""
+
+    @pytest.mark.asyncio
+    async def test_patterns_deleted_from_memory_backend(self, queue):
+        cache_manager = CacheManager(redis_client=MemoryCacheBackend(), key_prefix="test", enabled=True)
+        await cache_manager.set_cached("test:kb:1", {"id": "1"})
+        await cache_manager.set_cached("test:kb:2", {"id": "2"})
+        await cache_manager.set_cached("test:user:1", {"id": "u1"})
+
+        queue.submit(["test:kb:*"], cache_manager=cache_manager)
+        queue.flush(timeout=1)
+
+        assert await cache_manager.get_cached("test:kb:1") is None
+        assert await cache_manager.get_cached("test:kb:2") is None
+        assert await cache_manager.get_cached("test:user:1") == {"id": "u1"}
+
+
+class TestInvalidateCacheSync:
+    """测试同步失效函数接入失效队列"""
+
+    def test_invalidate_cache_sync_submits_to_queue(self, queue):
+        cache_manager = make_cache_manager()
+
+        with patch("app.core.cache.invalidation.get_invalidation_queue", return_value=queue):
+            invalidate_cache_sync(cache_manager, ["test:kb:*"])
+            queue.flush(timeout=1)
+
+        cache_manager.invalidate_patterns_sync.assert_called_once_with(["test:kb:*"])
+
+    def test_auto_invalidate_cache_only_on_success(self, queue):
+        cache_manager = make_cache_manager()
+
+        @auto_invalidate_cache(["test:kb:*"])
+        def update(success):
+            return success, "ok", None
+
+        with (
+            patch("app.core.cache.invalidation.get_invalidation_queue", return_value=queue),
+            patch("app.core.cache.factory.get_cache_manager", return_value=cache_manager),
+        ):
+            update(False)
+            queue.flush(timeout=1)
+            cache_manager.invalidate_patterns_sync.assert_not_called()
+
+            update(True)
+            queue.flush(timeout=1)
+
+        cache_manager.invalidate_patterns_sync.assert_called_once_with(["test:kb:*"])
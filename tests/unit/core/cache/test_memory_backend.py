@@ -0,0 +1,184 @@
+"""
+MemoryCacheBackend 单元测试
+
+测试进程内内存缓存后端的基础操作、TTL、LRU 淘汰、内存上限和 glob 模式删除，
+以及通过工厂函数与 CacheManager 集成。
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+from app.core.cache.backend import CacheBackend
+from app.core.cache.config import CacheConfig
+from app.core.cache.factory import create_cache_backend, create_cache_manager
+from app.core.cache.memory_backend import MemoryCacheBackend
+from app.core.cache.redis_client import RedisClient
+
+
+class TestMemoryCacheBackendOperations:
+    """测试基础操作"""
+
+    @pytest.mark.asyncio
+    async def test_set_get_delete(self):
+        backend = MemoryCacheBackend()
+
+        assert await backend.set("k", "v") is True
+        assert await backend.get("k") == "v"
+        assert await backend.exists("k") is True
+        assert await backend.delete("k") is True
+        assert await backend.get("k") is None
+        assert await backend.delete("k") is False
+
+    @pytest.mark.asyncio
+    async def test_batch_operations(self):
+        backend = MemoryCacheBackend()
+
+        assert await backend.mset_with_ttl({"a": "1", "b": "2"}, ttl=60) is True
+        assert await backend.mget(["a", "missing", "b"]) == ["1", None, "2"]
+        assert await backend.delete_many(["a", "b", "missing"]) == 2
+        assert len(backend) == 0
+        assert backend.memory_bytes == 0
+
+    @pytest.mark.asyncio
+    async def test_get_or_set_keeps_existing_value(self):
+        backend = MemoryCacheBackend()
+
+        assert await backend.get_or_set("k", "first", ttl=60) == "first"
+        assert await backend.get_or_set("k", "second", ttl=60) == "first"
+        assert await backend.get("k") == "first"
+
+    @pytest.mark.asyncio
+    async def test_delete_pattern(self):
+        backend = MemoryCacheBackend()
+        await backend.mset_with_ttl({"maimnp:kb:1": "1", "maimnp:kb:2": "2", "maimnp:user:1": "3"})
+
+        assert await backend.delete_pattern("maimnp:kb:*") == 2
+        assert await backend.delete_pattern("maimnp:user:?") == 1
+        assert len(backend) == 0
+
+    def test_sync_operations(self):
+        backend = MemoryCacheBackend()
+
+        assert backend.set_sync("maimnp:kb:1", "1") is True
+        assert backend.set_sync("maimnp:user:1", "2", ttl=60) is True
+        assert backend.delete_sync("maimnp:kb:1") is True
+        assert backend.delete_sync("maimnp:kb:1") is False
+        backend.set_sync("maimnp:kb:2", "3")
+        assert backend.delete_patterns_sync(["maimnp:kb:*", "maimnp:user:*"]) == 2
+        assert len(backend) == 0
+        with pytest.raises(NotImplementedError):
+            backend.call_sync(lambda client: client.get("k"))
+
+    @pytest.mark.asyncio
+    async def test_ping_and_close(self):
+        backend = MemoryCacheBackend()
+        await backend.set("k", "v")
+
+        assert await backend.ping() is True
+        await backend.close()
+        assert len(backend) == 0
+
+
+class TestMemoryCacheBackendExpiry:
+    """测试 TTL"""
+
+    @pytest.mark.asyncio
+    async def test_expired_entry_not_returned(self):
+        backend = MemoryCacheBackend()
+        with patch("app.core.cache.memory_backend.time.monotonic", return_value=100.0):
+            await backend.set("k", "v", ttl=10)
+            await backend.set("forever", "v")
+
+        with patch("app.core.cache.memory_backend.time.monotonic", return_value=111.0):
+            assert await backend.get("k") is None
+            assert await backend.exists("k") is False
+            assert await backend.get("forever") == "v"
+
+    @pytest.mark.asyncio
+    async def test_expire_extends_ttl(self):
+        backend = MemoryCacheBackend()
+        with patch("app.core.cache.memory_backend.time.monotonic", return_value=100.0):
+            await backend.set("k", "v", ttl=10)
+            assert await backend.expire("k", 60) is True
+            assert await backend.expire("missing", 60) is False
+
+        with patch("app.core.cache.memory_backend.time.monotonic", return_value=150.0):
+            assert await backend.get("k") == "v"
+
+
+class TestMemoryCacheBackendEviction:
+    """测试 LRU 淘汰和内存上限"""
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction_by_entry_count(self):
+        backend = MemoryCacheBackend(max_entries=2)
+        await backend.set("a", "1")
+        await backend.set("b", "2")
+        await backend.get("a")
+        await backend.set("c", "3")
+
+        assert await backend.get("b") is None
+        assert await backend.get("a") == "1"
+        assert await backend.get("c") == "3"
+        assert backend.evictions == 1
+
+    @pytest.mark.asyncio
+    async def test_eviction_by_memory_cap(self):
+        backend = MemoryCacheBackend(max_memory_bytes=20)
+        # 每个条目 11 字节（键 + 值），写入第二个后超过 20 字节的上限
+        await backend.set("a", "x" * 10)
+        await backend.set("b", "y" * 10)
+
+        assert await backend.get("a") is None
+        assert await backend.get("b") == "y" * 10
+        assert backend.memory_bytes <= 20
+
+    @pytest.mark.asyncio
+    async def test_value_larger_than_cap_rejected(self):
+        backend = MemoryCacheBackend(max_memory_bytes=10)
+
+        assert await backend.set("k", "x" * 100) is False
+        assert len(backend) == 0
+
+
+class TestMemoryBackendFactory:
+    """测试工厂函数与 CacheManager 集成"""
+
+    def test_create_memory_backend(self):
+        backend = create_cache_backend(CacheConfig(backend="memory", memory_max_entries=5))
+
+        assert isinstance(backend, MemoryCacheBackend)
+        assert isinstance(backend, CacheBackend)
+        assert backend.max_entries == 5
+
+    def test_create_redis_backend_by_default(self):
+        backend = create_cache_backend(CacheConfig())
+
+        assert isinstance(backend, RedisClient)
+        assert isinstance(backend, CacheBackend)
+
+    def test_disabled_cache_has_no_backend(self):
+        assert create_cache_backend(CacheConfig(enabled=False, backend="memory")) is None
+
+    def test_invalid_backend_rejected(self):
+        with pytest.raises(ValueError):
+            CacheConfig(backend="memcached")
+
+    @pytest.mark.asyncio
+    async def test_cache_manager_with_memory_backend(self):
+        manager = create_cache_manager(CacheConfig(backend="memory"))
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            return {"id": "1"}
+
+        assert manager.is_enabled() is True
+        assert await manager.get_cached("maimnp:kb:1", fetch, ttl=60) == {"id": "1"}
+        assert await manager.get_cached("maimnp:kb:1", fetch, ttl=60) == {"id": "1"}
+        assert len(calls) == 1
+
+        assert await manager.invalidate_pattern("maimnp:kb:*") == 1
+        assert await manager.get_cached("maimnp:kb:1", fetch, ttl=60) == {"id": "1"}
+        assert len(calls) == 2
@@ -8,6 +8,7 @@
 - 降级逻辑（缓存禁用时直接转发请求）
 """
 
+import asyncio
 import json
 import time
 from unittest.mock import AsyncMock, Mock
@@ -734,3 +735,77 @@ class TestCacheMiddlewareEdgeCases:
 
         # 验证没有调用 set（因为状态码不是 2xx）
         # 注意：由于状态码是 404，不会缓存
+
+    @pytest.mark.asyncio
+    async def test_background_task_kept_until_done(self, cache_manager_enabled):
+        """测试后台任务（SWR 刷新、删除损坏条目）完成前保留引用，完成后移除"""
+        middleware = CacheMiddleware(FastAPI(), cache_manager=cache_manager_enabled)
+        release = asyncio.Event()
+
+        middleware._run_in_background(release.wait())
+
+        assert len(middleware._background_tasks) == 1
+        task = next(iter(middleware._background_tasks))
+        release.set()
+        await task
+        await asyncio.sleep(0)
+        assert middleware._background_tasks == set()
+
+
+class TestCacheMiddlewareStreaming:
+    """测试纯 ASGI 实现的流式透传与收集"""
+
+    def test_streaming_response_passes_through_and_is_cached(self, cache_manager_enabled, mock_redis_client):
+        """测试多分片流式响应完整透传，结束后整体写入缓存"""
+        from fastapi.responses import StreamingResponse
+
+        app = FastAPI()
+        app.add_middleware(CacheMiddleware, cache_manager=cache_manager_enabled, default_ttl=300)
+
+        @app.get("/stream")
+        async def stream_route():
+            async def chunks():
+                for i in range(5):
+                    yield f"chunk-{i};".encode()
+
+            return StreamingResponse(chunks(), media_type="text/plain")
+
+        response = TestClient(app).get("/stream")
+
+        assert response.status_code == 200
+        assert response.text == "".join(f"chunk-{i};" for i in range(5))
+        assert response.headers.get("X-Cache") == "MISS"
+
+        mock_redis_client.set.assert_called_once()
+        stored = json.loads(json.loads(mock_redis_client.set.call_args.args[1]))
+        assert stored["content"] == response.text
+
+    def test_oversized_response_not_cached(self, cache_manager_enabled, mock_redis_client):
+        """测试超过大小上限的响应只透传不缓存"""
+        app = FastAPI()
+        app.add_middleware(CacheMiddleware, cache_manager=cache_manager_enabled, max_body_size=16)
+
+        @app.get("/large")
+        async def large_route():
+            return Response(content="x" * 64, media_type="text/plain")
+
+        response = TestClient(app).get("/large")
+
+        assert response.status_code == 200
+        assert response.text == "x" * 64
+        mock_redis_client.set.assert_not_called()
+
+    def test_miss_etag_matches_body(self, cache_manager_enabled):
+        """测试未命中响应的 ETag 由响应体计算"""
+        import hashlib
+
+        app = FastAPI()
+        app.add_middleware(CacheMiddleware, cache_manager=cache_manager_enabled)
+
+        @app.get("/test")
+        async def test_route():
+            return {"message": "Hello"}
+
+        response = TestClient(app).get("/test")
+
+        assert response.headers["ETag"] == hashlib.md5(response.content).hexdigest()
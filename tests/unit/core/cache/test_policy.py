@@ -0,0 +1,303 @@
+"""
+路由缓存策略单元测试
+
+测试 CachePolicy / CachePolicyRegistry 以及 CacheMiddleware 按策略缓存的行为，包括：
+- 策略声明与校验
+- 路由匹配（首个匹配生效、未声明策略不缓存）
+- 按用户区分缓存键、匿名请求绕过
+- 标签写入缓存键与按标签失效
+- SWR 过期数据返回与后台刷新
+"""
+
+import asyncio
+import json
+import time
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+from app.core.cache.invalidation import invalidate_cache_tags
+from app.core.cache.manager import CacheManager
+from app.core.cache.memory_backend import MemoryCacheBackend
+from app.core.cache.middleware import CacheMiddleware
+from app.core.cache.policy import (
+    CachePolicy,
+    CachePolicyRegistry,
+    cache_policy,
+    render_tags,
+    tag_key_pattern,
+)
+from app.core.cache.redis_client import RedisClient
+from app.core.security import create_user_token
+
+
+@pytest.fixture
+def mock_redis_client():
+    """创建模拟的 Redis 客户端"""
+    client = AsyncMock(spec=RedisClient)
+    client.get = AsyncMock(return_value=None)
+    client.set = AsyncMock(return_value=True)
+    client.delete = AsyncMock(return_value=True)
+    client.delete_pattern = AsyncMock(return_value=0)
+    return client
+
+
+@pytest.fixture
+def cache_manager(mock_redis_client):
+    """创建启用缓存的缓存管理器"""
+    return CacheManager(redis_client=mock_redis_client, key_prefix="test", enabled=True)
+
+
+def _build_app(cache_manager: CacheManager) -> tuple[FastAPI, CachePolicyRegistry]:
+    """创建带策略注册表的测试应用"""
+    app = FastAPI()
+    registry = CachePolicyRegistry()
+    app.add_middleware(CacheMiddleware, cache_manager=cache_manager, policy_registry=registry)
+
+    @app.get("/items/public")
+    @cache_policy(ttl=120, tags=["item:public"])
+    async def public_items():
+        return {"items": [1, 2, 3]}
+
+    @app.get("/items/{item_id}")
+    @cache_policy(ttl=300, tags=["item:{item_id}"], stale_while_revalidate=30)
+    async def item_detail(item_id: str):
+        return {"id": item_id}
+
+    @app.get("/mine")
+    @cache_policy(ttl=60, vary_by=["user"], tags=["mine:{user}"])
+    async def my_items():
+        return {"mine": True}
+
+    @app.get("/uncached")
+    async def uncached():
+        return {"cached": False}
+
+    registry.load_from_app(app)
+    return app, registry
+
+
+def _saved_keys(mock_redis_client) -> list[str]:
+    """返回写入缓存的键列表"""
+    return [call.args[0] for call in mock_redis_client.set.call_args_list]
+
+
+class TestCachePolicy:
+    """测试策略声明与校验"""
+
+    def test_decorator_attaches_policy(self):
+        """测试装饰器在端点上附加策略且不改变函数"""
+
+        @cache_policy(ttl=60, vary_by=["user", "header:Accept-Language"], tags=["t:{id}"])
+        async def endpoint():
+            return 1
+
+        policy = endpoint.__cache_policy__
+        assert policy.ttl == 60
+        assert policy.vary_by == ("user", "header:Accept-Language")
+        assert policy.is_per_user is True
+        assert asyncio.run(endpoint()) == 1
+
+    def test_must_exist_stored_as_pairs(self):
+        """测试 must_exist 以 (路径参数, 资源名) 保存"""
+
+        @cache_policy(must_exist={"kb_id": "knowledge"})
+        async def endpoint(kb_id: str):
+            return kb_id
+
+        assert endpoint.__cache_policy__.must_exist == (("kb_id", "knowledge"),)
+
+    def test_versioned_and_store(self):
+        """测试 versioned 以 (路径参数, 资源名) 保存，store 默认缓存响应体"""
+
+        @cache_policy(versioned={"user_id": "user"}, store=False)
+        async def endpoint(user_id: str):
+            return user_id
+
+        policy = endpoint.__cache_policy__
+        assert policy.versioned == (("user_id", "user"),)
+        assert policy.store is False
+        assert CachePolicy().store is True
+
+    def test_storage_ttl_includes_swr(self):
+        """测试写入 TTL 为新鲜期加 SWR 窗口"""
+        assert CachePolicy(ttl=100, stale_while_revalidate=20).storage_ttl == 120
+
+    @pytest.mark.parametrize(
+        "kwargs",
+        [{"ttl": 0}, {"stale_while_revalidate": -1}, {"vary_by": ("session",)}, {"vary_by": ("header:",)}],
+    )
+    def test_invalid_policy(self, kwargs):
+        """测试非法策略参数"""
+        with pytest.raises(ValidationError):
+            CachePolicy(**kwargs)
+
+    def test_render_tags_skips_missing_params(self):
+        """测试标签渲染跳过缺失参数的模板"""
+        policy = CachePolicy(tags=("kb:{kb_id}", "user:{user}", "missing:{other}"))
+        tags = render_tags(policy, {"kb_id": "k1"}, {"user": "u1", "role": "user"})
+        assert tags == ["kb:k1", "user:u1"]
+
+
+class TestCachePolicyRegistry:
+    """测试策略注册表"""
+
+    def test_first_match_wins(self):
+        """测试先注册的路由优先匹配，未声明策略的路由返回 None"""
+        registry = CachePolicyRegistry()
+        registry.register("/kb/public", CachePolicy(ttl=10))
+        registry.register("/kb/{kb_id}", CachePolicy(ttl=20))
+        registry.register("/kb/{kb_id}/starred", None)
+
+        assert registry.match("/kb/public").policy.ttl == 10
+        match = registry.match("/kb/abc")
+        assert match.policy.ttl == 20
+        assert match.path_params == {"kb_id": "abc"}
+        assert registry.match("/kb/abc/starred") is None
+        assert registry.match("/other") is None
+
+    def test_load_from_app(self, cache_manager):
+        """测试从应用加载 GET 路由策略"""
+        _, registry = _build_app(cache_manager)
+
+        assert registry.loaded is True
+        assert registry.match("/items/public").route_path == "/items/public"
+        assert registry.match("/uncached") is None
+
+
+class TestMiddlewareWithPolicies:
+    """测试中间件按策略缓存"""
+
+    def test_unregistered_route_bypassed(self, cache_manager, mock_redis_client):
+        """测试未声明策略的路由不访问缓存"""
+        app, _ = _build_app(cache_manager)
+        response = TestClient(app).get("/uncached")
+
+        assert response.status_code == 200
+        assert "X-Cache" not in response.headers
+        mock_redis_client.get.assert_not_called()
+
+    def test_policy_ttl_and_tags_in_key(self, cache_manager, mock_redis_client):
+        """测试按策略 TTL 缓存，且标签写入缓存键"""
+        app, _ = _build_app(cache_manager)
+        response = TestClient(app).get("/items/public")
+
+        assert response.headers["X-Cache"] == "MISS"
+        key = mock_redis_client.set.call_args.args[0]
+        assert key.startswith("test:http:")
+        assert key.endswith("#item:public#")
+        assert mock_redis_client.set.call_args.kwargs["ttl"] == 120
+
+    def test_definitely_absent_id_skips_cache_lookup(self, cache_manager, mock_redis_client):
+        """测试 ID 过滤器判定不存在时不访问缓存"""
+        app = FastAPI()
+        registry = CachePolicyRegistry()
+        app.add_middleware(CacheMiddleware, cache_manager=cache_manager, policy_registry=registry)
+
+        @app.get("/kb/{kb_id}")
+        @cache_policy(ttl=300, must_exist={"kb_id": "knowledge"})
+        async def kb_detail(kb_id: str):
+            return {"id": kb_id}
+
+        registry.load_from_app(app)
+        id_filter = Mock()
+        id_filter.might_exist_in_request.side_effect = lambda request, resource, entity_id: entity_id == "kb-1"
+
+        with patch("app.core.cache.middleware.get_existence_filter", return_value=id_filter):
+            client = TestClient(app)
+            client.get("/kb/missing")
+            mock_redis_client.get.assert_not_called()
+
+            client.get("/kb/kb-1")
+            mock_redis_client.get.assert_called_once()
+
+        assert id_filter.might_exist_in_request.call_args_list[0][0][1:] == ("knowledge", "missing")
+
+    def test_anonymous_request_bypasses_per_user_policy(self, cache_manager, mock_redis_client):
+        """测试按用户区分的策略对匿名请求不缓存"""
+        app, _ = _build_app(cache_manager)
+        response = TestClient(app).get("/mine", headers={"Authorization": "Bearer invalid"})
+
+        assert response.status_code == 200
+        assert "X-Cache" not in response.headers
+        mock_redis_client.get.assert_not_called()
+
+    def test_per_user_keys_differ(self, cache_manager, mock_redis_client):
+        """测试不同用户生成不同的缓存键和标签"""
+        app, _ = _build_app(cache_manager)
+        client = TestClient(app)
+        token_a = create_user_token("user-a", "alice", "user")
+        token_b = create_user_token("user-b", "bob", "user")
+
+        client.get("/mine", headers={"Authorization": f"Bearer {token_a}"})
+        client.get("/mine", headers={"Authorization": f"Bearer {token_b}"})
+
+        key_a, key_b = _saved_keys(mock_redis_client)
+        assert key_a != key_b
+        assert key_a.endswith("#mine:user-a#")
+        assert key_b.endswith("#mine:user-b#")
+
+    def test_stale_entry_served_and_revalidated(self, cache_manager, mock_redis_client):
+        """测试超过新鲜期的条目在 SWR 窗口内返回旧数据并后台刷新"""
+        stale_entry = {
+            "content": json.dumps({"id": "old"}),
+            "status_code": 200,
+            "headers": {"content-type": "application/json"},
+            "media_type": "application/json",
+            "etag": "old-etag",
+            "cached_at": time.time() - 400,
+            "fresh_ttl": 300,
+        }
+        # CacheManager 会对中间件写入的 JSON 字符串再做一次序列化
+        mock_redis_client.get = AsyncMock(return_value=json.dumps(json.dumps(stale_entry)))
+        app, _ = _build_app(cache_manager)
+
+        response = TestClient(app).get("/items/42")
+
+        assert response.headers["X-Cache"] == "STALE"
+        assert response.json() == {"id": "old"}
+        # 后台刷新写入新数据，写入 TTL 为新鲜期 + SWR 窗口
+        key, value = mock_redis_client.set.call_args.args
+        assert key.endswith("#item:42#")
+        assert json.loads(json.loads(json.loads(value))["content"]) == {"id": "42"}
+        assert mock_redis_client.set.call_args.kwargs["ttl"] == 330
+
+
+class TestTagInvalidation:
+    """测试按标签失效"""
+
+    def test_tag_key_pattern(self):
+        """测试标签匹配模式"""
+        assert tag_key_pattern("maimnp", "knowledge:kb-1") == "maimnp:http:*#knowledge:kb-1#*"
+
+    def test_tag_key_pattern_escapes_glob_characters(self):
+        """测试路径参数中的通配符按字面匹配，不会失效其他条目"""
+        backend = MemoryCacheBackend()
+        for item_id in ("*", "a?c", "[ab]", "abc", "a\\c", "b"):
+            backend.set_sync(f"maimnp:http:hash#item:{item_id}#", "{}")
+
+        for item_id in ("*", "a?c", "[ab]", "a\\c"):
+            assert backend.delete_pattern_sync(tag_key_pattern("maimnp", f"item:{item_id}")) == 1
+
+        assert backend.get_sync("maimnp:http:hash#item:abc#") is not None
+        assert backend.get_sync("maimnp:http:hash#item:b#") is not None
+
+    def test_invalidate_cache_tags(self, cache_manager):
+        """测试按标签失效使用缓存管理器前缀构建模式"""
+        with patch("app.core.cache.invalidation.invalidate_cache_sync") as mock_invalidate:
+            invalidate_cache_tags(["knowledge:public", "knowledge:kb-1"], cache_manager)
+
+        mock_invalidate.assert_called_once_with(
+            cache_manager, ["test:http:*#knowledge:public#*", "test:http:*#knowledge:kb-1#*"]
+        )
+
+    def test_invalidate_cache_tags_disabled(self):
+        """测试缓存禁用时不执行失效"""
+        disabled = CacheManager(redis_client=None, key_prefix="test", enabled=False)
+        with patch("app.core.cache.invalidation.invalidate_cache_sync") as mock_invalidate:
+            invalidate_cache_tags(["knowledge:public"], disabled)
+
+        mock_invalidate.assert_not_called()
@@ -257,6 +257,22 @@ class TestRedisClientBasicOperations:
             assert result is True
             mock_client.setex.assert_called_once_with("test_key", 3600, "test_value")
 
+    @pytest.mark.asyncio
+    async def test_get_or_set(self):
+        """测试 SET NX：键不存在时写入，已存在时返回当前值"""
+        client = RedisClient()
+
+        with (
+            patch.object(client, "_ensure_connection", new_callable=AsyncMock),
+            patch.object(client, "_client", new_callable=AsyncMock) as mock_client,
+        ):
+            mock_client.set = AsyncMock(side_effect=[True, None])
+            mock_client.get = AsyncMock(return_value="existing")
+
+            assert await client.get_or_set("test_key", "new", ttl=60) == "new"
+            assert await client.get_or_set("test_key", "other", ttl=60) == "existing"
+            mock_client.set.assert_called_with("test_key", "other", ex=60, nx=True)
+
     @pytest.mark.asyncio
     async def test_delete_success(self):
         """测试 DELETE 操作成功"""
@@ -410,6 +426,164 @@ class TestRedisClientBatchOperations:
             assert client._is_connected is False
 
 
+class TestRedisClientMultiKeyOperations:
+    """测试 RedisClient 多键批量操作（MGET / 管道 SETEX / 批量 DELETE）"""
+
+    @pytest.mark.asyncio
+    async def test_mget_success(self):
+        """测试批量获取，保持键顺序"""
+        client = RedisClient()
+
+        with (
+            patch.object(client, "_ensure_connection", new_callable=AsyncMock),
+            patch.object(client, "_client", new_callable=AsyncMock) as mock_client,
+        ):
+            mock_client.mget = AsyncMock(return_value=["v1", None, "v3"])
+
+            result = await client.mget(["k1", "k2", "k3"])
+
+            assert result == ["v1", None, "v3"]
+            mock_client.mget.assert_called_once_with(["k1", "k2", "k3"])
+
+    @pytest.mark.asyncio
+    async def test_mget_empty_keys(self):
+        """测试空键列表不访问 Redis"""
+        client = RedisClient()
+
+        with patch.object(client, "_ensure_connection", new_callable=AsyncMock) as mock_ensure:
+            assert await client.mget([]) == []
+            mock_ensure.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_mget_connection_error(self):
+        """测试批量获取连接失败"""
+        client = RedisClient()
+
+        with patch.object(client, "_ensure_connection", new_callable=AsyncMock) as mock_ensure:
+            mock_ensure.side_effect = RedisConnectionError("连接失败")
+
+            with pytest.raises(RedisConnectionError):
+                await client.mget(["k1"])
+
+            assert client._is_connected is False
+
+    @pytest.mark.asyncio
+    async def test_mset_with_ttl_uses_single_pipeline(self):
+        """测试批量设置通过一个非事务管道发送 SETEX"""
+        client = RedisClient()
+        mock_pipe = MagicMock()
+        mock_pipe.execute = AsyncMock(return_value=[True, True])
+        mock_pipe.__aenter__ = AsyncMock(return_value=mock_pipe)
+        mock_pipe.__aexit__ = AsyncMock(return_value=False)
+
+        with (
+            patch.object(client, "_ensure_connection", new_callable=AsyncMock),
+            patch.object(client, "_client", new_callable=MagicMock) as mock_client,
+        ):
+            mock_client.pipeline = MagicMock(return_value=mock_pipe)
+
+            result = await client.mset_with_ttl({"k1": "v1", "k2": "v2"}, ttl=60)
+
+            assert result is True
+            mock_client.pipeline.assert_called_once_with(transaction=False)
+            assert mock_pipe.setex.call_count == 2
+            mock_pipe.setex.assert_any_call("k1", 60, "v1")
+            mock_pipe.execute.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_mset_with_ttl_empty_mapping(self):
+        """测试空映射直接返回成功"""
+        client = RedisClient()
+
+        with patch.object(client, "_ensure_connection", new_callable=AsyncMock) as mock_ensure:
+            assert await client.mset_with_ttl({}, ttl=60) is True
+            mock_ensure.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_delete_many_success(self):
+        """测试批量删除指定键"""
+        client = RedisClient()
+
+        with (
+            patch.object(client, "_ensure_connection", new_callable=AsyncMock),
+            patch.object(client, "_client", new_callable=AsyncMock) as mock_client,
+        ):
+            mock_client.delete = AsyncMock(return_value=2)
+
+            result = await client.delete_many(["k1", "k2", "k3"])
+
+            assert result == 2
+            mock_client.delete.assert_called_once_with("k1", "k2", "k3")
+
+    @pytest.mark.asyncio
+    async def test_pipeline_connection_error_marks_disconnected(self):
+        """测试管道执行时连接失败会标记为断开"""
+        client = RedisClient()
+        mock_pipe = MagicMock()
+        mock_pipe.execute = AsyncMock(side_effect=RedisConnectionError("连接失败"))
+        mock_pipe.__aenter__ = AsyncMock(return_value=mock_pipe)
+        mock_pipe.__aexit__ = AsyncMock(return_value=False)
+
+        with (
+            patch.object(client, "_ensure_connection", new_callable=AsyncMock),
+            patch.object(client, "_client", new_callable=MagicMock) as mock_client,
+        ):
+            mock_client.pipeline = MagicMock(return_value=mock_pipe)
+            client._is_connected = True
+
+            with pytest.raises(RedisConnectionError):
+                async with client.pipeline() as pipe:
+                    pipe.get("k1")
+                    await pipe.execute()
+
+            assert client._is_connected is False
+
+    def test_delete_patterns_sync_dedupes_and_batches(self):
+        """测试多个模式的键去重后分批 UNLINK"""
+        client = RedisClient()
+        sync_client = MagicMock()
+        scanned = {"a:*": ["k1", "k2"], "b:*": ["k2", "k3"]}
+        sync_client.scan_iter = MagicMock(side_effect=lambda match, count: iter(scanned[match]))
+        sync_client.unlink = MagicMock(side_effect=lambda *keys: len(keys))
+
+        with patch.object(client, "get_sync_client", return_value=sync_client):
+            result = client.delete_patterns_sync(["a:*", "b:*", "exact:key"], batch_size=3)
+
+        assert result == 4
+        assert sync_client.unlink.call_count == 2
+        deleted = {key for call in sync_client.unlink.call_args_list for key in call[0]}
+        assert deleted == {"k1", "k2", "k3", "exact:key"}
+
+    def test_delete_patterns_sync_connection_error(self):
+        """测试同步批量删除时连接失败抛出异常"""
+        client = RedisClient()
+        sync_client = MagicMock()
+        sync_client.scan_iter = MagicMock(side_effect=RedisConnectionError("连接失败"))
+
+        with patch.object(client, "get_sync_client", return_value=sync_client):
+            with pytest.raises(RedisConnectionError):
+                client.delete_patterns_sync(["a:*"])
+
+    def test_sync_set_and_delete(self):
+        """测试同步写入（带 / 不带 TTL）、删除和单模式删除"""
+        client = RedisClient()
+        sync_client = MagicMock()
+        sync_client.delete = MagicMock(return_value=1)
+        sync_client.scan_iter = MagicMock(return_value=iter(["p:1", "p:2"]))
+        sync_client.unlink = MagicMock(return_value=2)
+
+        with patch.object(client, "get_sync_client", return_value=sync_client):
+            assert client.set_sync("k", "v", ttl=60) is True
+            assert client.set_sync("k", "v") is True
+            assert client.delete_sync("k") is True
+            assert client.delete_pattern_sync("p:*") == 2
+
+        sync_client.setex.assert_called_once_with("k", 60, "v")
+        sync_client.set.assert_called_once_with("k", "v")
+        sync_client.delete.assert_called_once_with("k")
+        sync_client.unlink.assert_called_once()
+
+
 class TestRedisClientErrorHandling:
     """测试 RedisClient 异常处理"""
 
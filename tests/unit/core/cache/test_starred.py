@@ -0,0 +1,228 @@
+"""
+收藏集合缓存单元测试
+
+测试内存后端的完整加载、原地更新、过期与淘汰、经失效总线在 worker 之间同步，
+Redis 后端的 SMISMEMBER 检查与加载标记，以及降级到 IN 查询。
+"""
+
+from unittest.mock import MagicMock, Mock, patch
+
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.core.cache.manager import CacheManager
+from app.core.cache.memory_backend import MemoryCacheBackend
+from app.core.cache.redis_client import RedisClient
+from app.core.cache.starred import LOADED_MARKER, StarredSetCache, starred_key
+
+
+class FakeClock:
+    """可手动推进的单调时钟"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_loader(starred: set[str]) -> Mock:
+    """loader(None) 返回全部收藏，loader(ids) 返回 ids 中已收藏的部分"""
+    return Mock(side_effect=lambda ids: set(starred) if ids is None else starred.intersection(ids))
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def local_cache(clock):
+    cache_manager = CacheManager(redis_client=MemoryCacheBackend(), key_prefix="test", enabled=True)
+    return StarredSetCache(cache_manager=cache_manager, ttl=60, max_users=2, clock=clock)
+
+
+class TestLocalBackend:
+    """测试内存后端"""
+
+    def test_loads_full_set_once(self, local_cache):
+        loader = make_loader({"k1", "k3"})
+
+        assert local_cache.get_starred("u1", "knowledge", ["k1", "k2"], loader) == {"k1"}
+        assert local_cache.get_starred("u1", "knowledge", ["k2", "k3"], loader) == {"k3"}
+
+        loader.assert_called_once_with(None)
+
+    def test_add_and_discard_update_loaded_set(self, local_cache):
+        loader = make_loader({"k1"})
+        local_cache.get_starred("u1", "knowledge", ["k1"], loader)
+
+        local_cache.add("u1", "knowledge", "k2")
+        local_cache.discard("u1", "knowledge", "k1")
+
+        assert local_cache.get_starred("u1", "knowledge", ["k1", "k2"], loader) == {"k2"}
+        loader.assert_called_once()
+
+    def test_target_types_are_separate(self, local_cache):
+        local_cache.get_starred("u1", "knowledge", ["x"], make_loader({"x"}))
+
+        assert local_cache.get_starred("u1", "persona", ["x"], make_loader(set())) == set()
+
+    def test_expired_set_reloaded(self, local_cache, clock):
+        loader = make_loader({"k1"})
+        local_cache.get_starred("u1", "knowledge", ["k1"], loader)
+
+        clock.now += 60
+        local_cache.get_starred("u1", "knowledge", ["k1"], loader)
+
+        assert loader.call_count == 2
+
+    def test_least_recently_used_user_evicted(self, local_cache):
+        loaders = {user_id: make_loader(set()) for user_id in ("u1", "u2", "u3")}
+        for user_id in ("u1", "u2", "u3"):
+            local_cache.get_starred(user_id, "knowledge", ["k1"], loaders[user_id])
+
+        local_cache.get_starred("u1", "knowledge", ["k1"], loaders["u1"])
+        local_cache.get_starred("u3", "knowledge", ["k1"], loaders["u3"])
+
+        assert loaders["u1"].call_count == 2
+        assert loaders["u3"].call_count == 1
+
+    def test_disabled_uses_in_query(self):
+        cache = StarredSetCache(cache_manager=CacheManager(redis_client=None, enabled=False))
+        loader = make_loader({"k1"})
+
+        assert cache.get_starred("u1", "knowledge", ["k1", "k2", "k1"], loader) == {"k1"}
+        loader.assert_called_once_with(["k1", "k2"])
+
+    def test_empty_ids_skip_loader(self, local_cache):
+        loader = make_loader({"k1"})
+
+        assert local_cache.get_starred("u1", "knowledge", [], loader) == set()
+        loader.assert_not_called()
+
+
+class TestLocalBackendAcrossWorkers:
+    """测试内存后端经失效事件总线在 worker 之间同步"""
+
+    @staticmethod
+    def make_worker(worker_id: str) -> tuple[StarredSetCache, Mock]:
+        cache_manager = CacheManager(redis_client=MemoryCacheBackend(), key_prefix="test", enabled=True)
+        cache = StarredSetCache(cache_manager=cache_manager, ttl=60)
+        bus = Mock(worker_id=worker_id)
+        cache.attach_bus(bus)
+        return cache, bus
+
+    @staticmethod
+    def event(origin: str, *patterns: str) -> dict:
+        return {"type": "cache.invalidate", "origin": origin, "data": {"patterns": list(patterns)}}
+
+    def test_attach_subscribes_to_bus(self):
+        cache, bus = self.make_worker("a")
+
+        subscribed = {call[0][0]: call[0][1] for call in bus.subscribe.call_args_list}
+        assert subscribed["cache.invalidate"] == cache.handle_cache_invalidate
+        assert subscribed["bus.reconnected"] == cache.handle_bus_reconnected
+
+    def test_change_published_and_dropped_on_other_worker(self):
+        worker_a, bus_a = self.make_worker("a")
+        worker_b, _ = self.make_worker("b")
+        loader_b = make_loader({"k1"})
+        worker_b.get_starred("u1", "knowledge", ["k1"], loader_b)
+
+        worker_a.discard("u1", "knowledge", "k1")
+        key = starred_key("test", "knowledge", "u1")
+        bus_a.publish_cache_invalidation.assert_called_once_with([key])
+
+        worker_b.handle_cache_invalidate(self.event("a", key))
+        worker_b.get_starred("u1", "knowledge", ["k1"], loader_b)
+        assert loader_b.call_count == 2
+
+    def test_own_and_unrelated_events_keep_sets(self):
+        cache, _ = self.make_worker("a")
+        loader = make_loader({"k1"})
+        cache.get_starred("u1", "knowledge", ["k1"], loader)
+
+        cache.handle_cache_invalidate(self.event("a", starred_key("test", "knowledge", "u1")))
+        cache.handle_cache_invalidate(self.event("b", "test:knowledge:*", starred_key("test", "persona", "u1")))
+        cache.get_starred("u1", "knowledge", ["k1"], loader)
+
+        loader.assert_called_once()
+
+    def test_glob_pattern_and_reconnect_drop_sets(self):
+        cache, _ = self.make_worker("a")
+        loaders = {user_id: make_loader(set()) for user_id in ("u1", "u2")}
+        for user_id, loader in loaders.items():
+            cache.get_starred(user_id, "knowledge", ["k1"], loader)
+
+        cache.handle_cache_invalidate(self.event("b", "test:*"))
+        cache.get_starred("u1", "knowledge", ["k1"], loaders["u1"])
+        cache.handle_bus_reconnected({"type": "bus.reconnected"})
+        cache.get_starred("u1", "knowledge", ["k1"], loaders["u1"])
+        cache.get_starred("u2", "knowledge", ["k1"], loaders["u2"])
+
+        assert loaders["u1"].call_count == 3
+        assert loaders["u2"].call_count == 2
+
+
+class TestRedisBackend:
+    """测试 Redis 后端"""
+
+    @pytest.fixture
+    def redis_client(self):
+        return RedisClient()
+
+    @pytest.fixture
+    def cache(self, redis_client):
+        cache_manager = CacheManager(redis_client=redis_client, key_prefix="test", enabled=True)
+        return StarredSetCache(cache_manager=cache_manager, ttl=60)
+
+    @pytest.fixture
+    def sync_client(self, redis_client):
+        client = MagicMock()
+        with patch.object(redis_client, "get_sync_client", return_value=client):
+            yield client
+
+    def test_loaded_set_answers_with_one_command(self, cache, sync_client):
+        sync_client.smismember.return_value = [1, 1, 0]
+        loader = make_loader(set())
+
+        assert cache.get_starred("u1", "knowledge", ["k1", "k2"], loader) == {"k1"}
+
+        sync_client.smismember.assert_called_once_with(
+            starred_key("test", "knowledge", "u1"), [LOADED_MARKER, "k1", "k2"]
+        )
+        loader.assert_not_called()
+
+    def test_missing_marker_loads_and_stores_set(self, cache, sync_client):
+        sync_client.smismember.return_value = [0, 1, 0]
+        pipe = sync_client.pipeline.return_value
+        loader = make_loader({"k2", "k3"})
+
+        assert cache.get_starred("u1", "knowledge", ["k1", "k2"], loader) == {"k2"}
+
+        key = starred_key("test", "knowledge", "u1")
+        loader.assert_called_once_with(None)
+        pipe.delete.assert_called_once_with(key)
+        assert pipe.sadd.call_args.args[0] == key
+        assert set(pipe.sadd.call_args.args[1:]) == {LOADED_MARKER, "k2", "k3"}
+        pipe.expire.assert_called_once_with(key, 60)
+        pipe.execute.assert_called_once()
+
+    def test_redis_error_falls_back_to_in_query(self, cache, sync_client):
+        sync_client.smismember.side_effect = RedisConnectionError("连接失败")
+        loader = make_loader({"k1"})
+
+        assert cache.get_starred("u1", "knowledge", ["k1", "k2"], loader) == {"k1"}
+        loader.assert_called_once_with(["k1", "k2"])
+
+    def test_add_and_discard(self, cache, sync_client):
+        pipe = sync_client.pipeline.return_value
+        key = starred_key("test", "persona", "u1")
+
+        cache.add("u1", "persona", "p1")
+        cache.discard("u1", "persona", "p2")
+
+        pipe.sadd.assert_called_once_with(key, "p1")
+        pipe.srem.assert_called_once_with(key, "p2")
+        assert pipe.expire.call_count == 2
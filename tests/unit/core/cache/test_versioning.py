@@ -0,0 +1,176 @@
+"""
+实体版本校验器单元测试
+
+测试版本 ETag / Last-Modified 的生成与比较，以及 CacheMiddleware 在执行端点之前按版本键应答条件请求。
+"""
+
+from email.utils import formatdate
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import Response
+from fastapi.testclient import TestClient
+from starlette.datastructures import Headers
+
+from app.core.cache.manager import CacheManager
+from app.core.cache.memory_backend import MemoryCacheBackend
+from app.core.cache.middleware import CacheMiddleware
+from app.core.cache.policy import CachePolicyRegistry, cache_policy
+from app.core.cache.versioning import EntityValidators, etag_matches, resolve_validators, version_key
+
+
+@pytest.fixture
+def cache_manager():
+    """创建使用内存后端的缓存管理器"""
+    return CacheManager(redis_client=MemoryCacheBackend(), key_prefix="test", enabled=True)
+
+
+def _build_app(cache_manager: CacheManager) -> tuple[FastAPI, Mock, Mock]:
+    """创建带版本化端点的测试应用，返回 (应用, 详情处理函数计数, 头像处理函数计数)"""
+    app = FastAPI()
+    registry = CachePolicyRegistry()
+    app.add_middleware(CacheMiddleware, cache_manager=cache_manager, policy_registry=registry)
+    detail_calls, avatar_calls = Mock(), Mock()
+
+    @app.get("/items/{item_id}")
+    @cache_policy(ttl=300, tags=["item:{item_id}"], versioned={"item_id": "item"})
+    async def item_detail(item_id: str):
+        detail_calls()
+        return {"id": item_id}
+
+    @app.get("/items/{item_id}/avatar")
+    @cache_policy(ttl=300, store=False, versioned={"item_id": "item"})
+    async def item_avatar(item_id: str):
+        avatar_calls()
+        return Response(content=b"\x89PNG", media_type="image/png")
+
+    registry.load_from_app(app)
+    return app, detail_calls, avatar_calls
+
+
+class TestValidators:
+    """测试校验器比较"""
+
+    def test_etag_matches_weak_and_lists(self):
+        assert etag_matches('W/"abc"', 'W/"abc"')
+        assert etag_matches('"abc"', 'W/"abc"')
+        assert etag_matches('"x", W/"abc"', 'W/"abc"')
+        assert etag_matches("*", 'W/"abc"')
+        assert not etag_matches('W/"other"', 'W/"abc"')
+
+    def test_if_modified_since(self):
+        validators = EntityValidators('W/"abc"', 1_700_000_000)
+
+        assert validators.is_not_modified(Headers({"If-Modified-Since": formatdate(1_700_000_000, usegmt=True)}))
+        assert not validators.is_not_modified(Headers({"If-Modified-Since": formatdate(1_699_999_999, usegmt=True)}))
+        assert not validators.is_not_modified(Headers({"If-Modified-Since": "not a date"}))
+
+    def test_if_none_match_takes_precedence(self):
+        validators = EntityValidators('W/"abc"', 1_700_000_000)
+        headers = Headers({"If-None-Match": 'W/"old"', "If-Modified-Since": formatdate(1_800_000_000, usegmt=True)})
+
+        assert not validators.is_not_modified(headers)
+
+
+class TestResolveValidators:
+    """测试版本键读取与创建"""
+
+    @pytest.mark.asyncio
+    async def test_stable_until_version_deleted(self, cache_manager):
+        first = await resolve_validators(cache_manager, [("item", "1")], "repr")
+        second = await resolve_validators(cache_manager, [("item", "1")], "repr")
+        assert first.etag == second.etag
+
+        await cache_manager.invalidate(version_key("test", "item", "1"))
+        third = await resolve_validators(cache_manager, [("item", "1")], "repr")
+
+        assert third.etag != first.etag
+
+    @pytest.mark.asyncio
+    async def test_representation_changes_etag(self, cache_manager):
+        first = await resolve_validators(cache_manager, [("item", "1")], "size=100")
+        second = await resolve_validators(cache_manager, [("item", "1")], "size=200")
+
+        assert first.etag != second.etag
+
+    @pytest.mark.asyncio
+    async def test_backend_failure_returns_none(self):
+        backend = AsyncMock()
+        backend.mget.side_effect = ConnectionError("down")
+        cache_manager = CacheManager(redis_client=backend, key_prefix="test", enabled=True)
+
+        assert await resolve_validators(cache_manager, [("item", "1")], "repr") is None
+
+    @pytest.mark.asyncio
+    async def test_disabled_cache_returns_none(self):
+        cache_manager = CacheManager(redis_client=None, key_prefix="test", enabled=False)
+
+        assert await resolve_validators(cache_manager, [("item", "1")], "repr") is None
+
+
+class TestConditionalRequests:
+    """测试中间件应答条件请求"""
+
+    def test_if_none_match_answered_without_handler(self, cache_manager):
+        app, detail_calls, _ = _build_app(cache_manager)
+        client = TestClient(app)
+
+        first = client.get("/items/1")
+        etag = first.headers["ETag"]
+        assert etag.startswith('W/"')
+        assert "Last-Modified" in first.headers
+
+        response = client.get("/items/1", headers={"If-None-Match": etag})
+
+        assert response.status_code == 304
+        assert response.headers["X-Cache"] == "NOT_MODIFIED"
+        assert detail_calls.call_count == 1
+
+    def test_if_modified_since_answered_without_handler(self, cache_manager):
+        app, detail_calls, _ = _build_app(cache_manager)
+        client = TestClient(app)
+
+        last_modified = client.get("/items/1").headers["Last-Modified"]
+        response = client.get("/items/1", headers={"If-Modified-Since": last_modified})
+
+        assert response.status_code == 304
+        assert detail_calls.call_count == 1
+
+    def test_cache_hit_carries_version_etag(self, cache_manager):
+        app, detail_calls, _ = _build_app(cache_manager)
+        client = TestClient(app)
+
+        etag = client.get("/items/1").headers["ETag"]
+        response = client.get("/items/1")
+
+        assert response.headers["X-Cache"] == "HIT"
+        assert response.headers["ETag"] == etag
+        assert detail_calls.call_count == 1
+
+    def test_version_bump_invalidates_etag_and_cached_entry(self, cache_manager):
+        app, detail_calls, _ = _build_app(cache_manager)
+        client = TestClient(app)
+        etag = client.get("/items/1").headers["ETag"]
+
+        # 只删除版本键：旧缓存条目由旧版本生成，不能带上新版本的 ETag
+        cache_manager.redis_client.delete_sync(version_key("test", "item", "1"))
+        response = client.get("/items/1", headers={"If-None-Match": etag})
+
+        assert response.status_code == 200
+        assert response.headers["X-Cache"] == "MISS"
+        assert response.headers["ETag"] != etag
+        assert detail_calls.call_count == 2
+
+    def test_store_false_route_validated_but_not_cached(self, cache_manager):
+        app, _, avatar_calls = _build_app(cache_manager)
+        client = TestClient(app)
+
+        first = client.get("/items/1/avatar")
+        second = client.get("/items/1/avatar")
+        conditional = client.get("/items/1/avatar", headers={"If-None-Match": first.headers["ETag"]})
+
+        assert second.status_code == 200
+        assert "X-Cache" not in second.headers
+        assert conditional.status_code == 304
+        assert avatar_calls.call_count == 2
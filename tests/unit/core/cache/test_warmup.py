@@ -0,0 +1,206 @@
+"""
+启动缓存预热单元测试
+
+测试 CacheWarmer 的预热目标构建、有界并发、跳过与超时处理，以及就绪状态。
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from fastapi import FastAPI
+from pydantic import ValidationError
+
+from app.core.cache.warmup import (
+    STATE_READY,
+    STATE_SKIPPED,
+    STATE_TIMEOUT,
+    CacheWarmer,
+    CacheWarmupConfig,
+)
+
+
+def make_cache_manager(enabled: bool = True, ping: bool = True):
+    """创建模拟的缓存管理器"""
+    cache_manager = Mock()
+    cache_manager.is_enabled.return_value = enabled
+    cache_manager.redis_client = Mock()
+    cache_manager.redis_client.ping = AsyncMock(return_value=ping)
+    return cache_manager
+
+
+def make_app(delay: float = 0.0):
+    """创建记录请求和并发数的测试应用"""
+    app = FastAPI()
+    app.state.requests = []
+    app.state.active = 0
+    app.state.max_active = 0
+
+    async def track(path: str):
+        app.state.requests.append(path)
+        app.state.active += 1
+        app.state.max_active = max(app.state.max_active, app.state.active)
+        await asyncio.sleep(delay)
+        app.state.active -= 1
+
+    @app.get("/api/knowledge/public")
+    async def knowledge_public(page: int = 1):
+        await track(f"knowledge:public:{page}")
+        return {"page": page}
+
+    @app.get("/api/persona/public")
+    async def persona_public(page: int = 1):
+        await track(f"persona:public:{page}")
+        return {"page": page}
+
+    @app.get("/api/knowledge/{kb_id}")
+    async def knowledge_detail(kb_id: str):
+        await track(f"knowledge:{kb_id}")
+        return {"id": kb_id}
+
+    @app.get("/api/persona/{pc_id}")
+    async def persona_detail(pc_id: str):
+        await track(f"persona:{pc_id}")
+        return {"id": pc_id}
+
+    @app.get("/api/dictionary/translation")
+    async def translation():
+        await track("translation")
+        return {}
+
+    return app
+
+
+def make_warmer(app, cache_manager=None, **config):
+    """创建使用固定 ID 列表的预热器"""
+    return CacheWarmer(
+        app,
+        CacheWarmupConfig(**config),
+        cache_manager=cache_manager or make_cache_manager(),
+        id_loader=lambda limit: {"knowledge": ["kb1", "kb2"][:limit], "persona": ["pc1"][:limit]},
+    )
+
+
+class TestCacheWarmupConfig:
+    """测试预热配置验证"""
+
+    def test_defaults(self):
+        config = CacheWarmupConfig()
+        assert config.enabled is True
+        assert config.concurrency > 0
+
+    def test_invalid_values_rejected(self):
+        with pytest.raises(ValidationError):
+            CacheWarmupConfig(concurrency=0)
+        with pytest.raises(ValidationError):
+            CacheWarmupConfig(pages=-1)
+
+
+class TestCacheWarmerTargets:
+    """测试预热目标构建"""
+
+    @pytest.mark.asyncio
+    async def test_build_targets(self):
+        warmer = make_warmer(make_app(), pages=2, page_size=10, sort_by=["created_at", "star_count"], top_starred=2)
+
+        targets = await warmer.build_targets()
+
+        list_targets = [t for t in targets if "/public?" in t]
+        assert len(list_targets) == 2 * 2 * 2
+        assert "/api/knowledge/public?page=1&page_size=10&sort_by=star_count&sort_order=desc" in targets
+        assert "/api/knowledge/kb1" in targets
+        assert "/api/persona/pc1" in targets
+        assert targets[-1] == "/api/dictionary/translation"
+
+    @pytest.mark.asyncio
+    async def test_build_targets_without_translation(self):
+        warmer = make_warmer(make_app(), pages=1, sort_by=["created_at"], top_starred=0, include_translation=False)
+
+        targets = await warmer.build_targets()
+
+        assert targets == [
+            "/api/knowledge/public?page=1&page_size=20&sort_by=created_at&sort_order=desc",
+            "/api/persona/public?page=1&page_size=20&sort_by=created_at&sort_order=desc",
+        ]
+
+
+class TestCacheWarmerRun:
+    """测试预热执行与就绪状态"""
+
+    @pytest.mark.asyncio
+    async def test_run_warms_all_targets_with_bounded_concurrency(self):
+        app = make_app(delay=0.01)
+        warmer = make_warmer(app, pages=3, sort_by=["created_at", "star_count"], concurrency=3)
+
+        assert not warmer.is_ready
+        await warmer.run()
+
+        assert warmer.is_ready
+        assert warmer.state == STATE_READY
+        assert warmer.warmed == warmer.total == len(app.state.requests)
+        assert warmer.failed == 0
+        assert app.state.max_active <= 3
+        assert warmer.status()["status"] == "ready"
+
+    @pytest.mark.asyncio
+    async def test_failed_requests_counted(self):
+        app = FastAPI()
+        warmer = make_warmer(app, pages=1, sort_by=["created_at"], top_starred=0, include_translation=False)
+
+        await warmer.run()
+
+        assert warmer.state == STATE_READY
+        assert warmer.failed == 2
+        assert warmer.warmed == 0
+
+    @pytest.mark.asyncio
+    async def test_skipped_when_cache_disabled(self):
+        app = make_app()
+        warmer = make_warmer(app, cache_manager=make_cache_manager(enabled=False))
+
+        await warmer.run()
+
+        assert warmer.is_ready
+        assert warmer.state == STATE_SKIPPED
+        assert app.state.requests == []
+
+    @pytest.mark.asyncio
+    async def test_skipped_when_redis_unavailable(self):
+        app = make_app()
+        warmer = make_warmer(app, cache_manager=make_cache_manager(ping=False))
+
+        await warmer.run()
+
+        assert warmer.state == STATE_SKIPPED
+        assert app.state.requests == []
+
+    @pytest.mark.asyncio
+    async def test_skipped_when_warmup_disabled(self):
+        cache_manager = make_cache_manager()
+        warmer = make_warmer(make_app(), cache_manager=cache_manager, enabled=False)
+
+        await warmer.run()
+
+        assert warmer.state == STATE_SKIPPED
+        cache_manager.redis_client.ping.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_timeout_marks_ready(self):
+        warmer = make_warmer(make_app(delay=5), pages=1, sort_by=["created_at"], concurrency=1, timeout=1)
+        warmer.config.timeout = 0.05
+
+        await warmer.run()
+
+        assert warmer.is_ready
+        assert warmer.state == STATE_TIMEOUT
+
+    @pytest.mark.asyncio
+    async def test_start_and_stop(self):
+        warmer = make_warmer(make_app(delay=5), concurrency=1)
+
+        warmer.start()
+        await asyncio.sleep(0.01)
+        assert not warmer.is_ready
+
+        await warmer.stop()
+        assert warmer.status()["status"] == "ready"
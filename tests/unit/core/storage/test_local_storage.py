@@ -0,0 +1,125 @@
+"""
+LocalStorageBackend 单元测试
+
+测试本地存储后端的写入、读取、按范围读取、删除和遍历，对象键校验，以及工厂函数按配置创建后端。
+"""
+
+import os
+from unittest.mock import patch
+
+import pytest
+
+from app.core.storage import (
+    LocalStorageBackend,
+    create_storage_backend,
+    get_storage_backend,
+    reset_storage_backend,
+)
+from app.core.storage.s3 import S3StorageBackend
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return LocalStorageBackend(str(tmp_path))
+
+
+class TestLocalStorageOperations:
+    """测试基础操作"""
+
+    def test_put_bytes_and_read(self, storage, tmp_path):
+        storage.put_bytes("blobs/ab/cd/abcd", b"hello world")
+
+        assert storage.local_path("blobs/ab/cd/abcd") == os.path.join(str(tmp_path), "blobs", "ab", "cd", "abcd")
+        assert storage.stat("blobs/ab/cd/abcd").size == 11
+        assert storage.exists("blobs/ab/cd/abcd") is True
+        with storage.open("blobs/ab/cd/abcd") as f:
+            assert f.read() == b"hello world"
+        # 没有残留临时文件
+        assert os.listdir(tmp_path / "blobs" / "ab" / "cd") == ["abcd"]
+
+    def test_put_file_moves_source(self, storage, tmp_path):
+        source = tmp_path / "upload.part"
+        source.write_bytes(b"staged")
+
+        storage.put_file("blobs/ef/01/ef01", str(source))
+
+        assert not source.exists()
+        assert b"".join(storage.iter_range("blobs/ef/01/ef01")) == b"staged"
+
+    def test_iter_range(self, storage):
+        storage.put_bytes("k/data", bytes(range(100)))
+
+        assert b"".join(storage.iter_range("k/data", 10, 19)) == bytes(range(10, 20))
+        assert b"".join(storage.iter_range("k/data", 90)) == bytes(range(90, 100))
+        assert [len(chunk) for chunk in storage.iter_range("k/data", 0, 9, chunk_size=4)] == [4, 4, 2]
+
+    def test_missing_object(self, storage):
+        assert storage.stat("blobs/missing") is None
+        assert storage.delete("blobs/missing") is False
+        with pytest.raises(FileNotFoundError):
+            storage.open("blobs/missing")
+
+    def test_delete(self, storage):
+        storage.put_bytes("blobs/aa/bb/aabb", b"x")
+
+        assert storage.delete("blobs/aa/bb/aabb") is True
+        assert storage.exists("blobs/aa/bb/aabb") is False
+
+    def test_list_by_prefix(self, storage):
+        storage.put_bytes("blobs/aa/bb/aabb", b"1")
+        storage.put_bytes("blobs/cc/dd/ccdd", b"22")
+        storage.put_bytes("archive_cache/knowledge/x.zip", b"333")
+
+        objects = sorted(storage.list("blobs/"))
+
+        assert [(obj.key, obj.size) for obj in objects] == [("blobs/aa/bb/aabb", 1), ("blobs/cc/dd/ccdd", 2)]
+        assert list(storage.list("missing/")) == []
+
+    @pytest.mark.parametrize("key", ["", "../escape", "blobs/../../escape", "blobs//x", "/abs"])
+    def test_rejects_invalid_keys(self, storage, key):
+        with pytest.raises(ValueError):
+            storage.stat(key)
+
+    def test_no_presigned_url(self, storage):
+        assert storage.presigned_url("blobs/aa", 60) is None
+
+
+class TestStorageFactory:
+    """测试按配置创建存储后端"""
+
+    def setup_method(self):
+        reset_storage_backend()
+
+    def teardown_method(self):
+        reset_storage_backend()
+
+    def test_local_by_default(self, tmp_path):
+        with patch("app.core.config.settings.STORAGE_BACKEND", "local"):
+            backend = create_storage_backend(str(tmp_path))
+
+        assert isinstance(backend, LocalStorageBackend)
+        assert backend.root == str(tmp_path)
+
+    def test_unknown_backend_falls_back_to_local(self, tmp_path):
+        with patch("app.core.config.settings.STORAGE_BACKEND", "gcs"):
+            assert isinstance(create_storage_backend(str(tmp_path)), LocalStorageBackend)
+
+    def test_s3_backend(self, tmp_path):
+        with (
+            patch("app.core.config.settings.STORAGE_BACKEND", "s3"),
+            patch("app.core.config.settings.STORAGE_S3_ENDPOINT", "http://minio:9000"),
+            patch("app.core.config.settings.STORAGE_S3_BUCKET", "uploads"),
+            patch("app.core.config.settings.STORAGE_S3_PREFIX", "maimnp"),
+        ):
+            backend = create_storage_backend(str(tmp_path))
+
+        assert isinstance(backend, S3StorageBackend)
+        assert backend.object_url("blobs/ab") == "http://minio:9000/uploads/maimnp/blobs/ab"
+
+    def test_local_singleton_follows_upload_dir(self, tmp_path):
+        with patch("app.core.config.settings.STORAGE_BACKEND", "local"):
+            first = get_storage_backend(str(tmp_path / "a"))
+            other = get_storage_backend(str(tmp_path / "b"))
+
+        assert get_storage_backend(str(tmp_path / "a")) is first
+        assert other.root == str(tmp_path / "b")
@@ -0,0 +1,265 @@
+"""
+打包下载缓存单元测试
+
+测试压缩包的写入与命中、旧版本清理、客户端断开时丢弃不完整的文件并关闭源文件、完整生成（Range 请求）、
+按最近下载时间淘汰（按估算的总大小减少目录遍历）、失效，以及版本号、ETag 和续传请求的判断。
+"""
+
+import asyncio
+import io
+import os
+import threading
+import time
+import zipfile
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import archive_cache
+from app.services.archive_cache import (
+    ArchiveCache,
+    archive_etag,
+    archive_version,
+    etag_matches,
+    is_resume_request,
+)
+from app.utils.zip_stream import iter_zip, zip_entry_from_bytes, zip_entry_from_stream
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ArchiveCache(str(tmp_path / "archive_cache"), max_bytes=1024 * 1024)
+
+
+def make_chunks(content: bytes = b"hello") -> list[bytes]:
+    return list(iter_zip([zip_entry_from_bytes(content, "a.txt", mtime=1_700_000_000)]))
+
+
+def store(cache: ArchiveCache, item_id: str, version: str, chunks: list[bytes]) -> bytes:
+    return b"".join(cache.iter_and_store("knowledge", item_id, version, iter(chunks)))
+
+
+class BlockingReader(io.BytesIO):
+    """第一次读取时等待 release，模拟读取较慢的源文件"""
+
+    def __init__(self, data: bytes, entered: threading.Event, release: threading.Event):
+        super().__init__(data)
+        self.entered = entered
+        self.release = release
+
+    def read(self, size=-1):
+        self.entered.set()
+        self.release.wait(5)
+        return super().read(size)
+
+
+def set_mtime(path: str, seconds_ago: int) -> None:
+    mtime = time.time() - seconds_ago
+    os.utime(path, (mtime, mtime))
+
+
+class TestStoreAndGet:
+    """测试写入与命中"""
+
+    def test_miss_then_hit(self, cache):
+        chunks = make_chunks()
+        assert cache.get("knowledge", "kb-1", "v1") is None
+
+        assert store(cache, "kb-1", "v1", chunks) == b"".join(chunks)
+
+        path = cache.get("knowledge", "kb-1", "v1")
+        assert path == cache.archive_path("knowledge", "kb-1", "v1")
+        with open(path, "rb") as f, zipfile.ZipFile(io.BytesIO(f.read())) as zf:
+            assert zf.read("a.txt") == b"hello"
+
+    def test_new_version_replaces_old(self, cache):
+        store(cache, "kb-1", "v1", make_chunks(b"old"))
+        store(cache, "kb-1", "v2", make_chunks(b"new"))
+
+        assert cache.get("knowledge", "kb-1", "v1") is None
+        assert cache.get("knowledge", "kb-1", "v2") is not None
+
+    def test_closed_stream_not_cached(self, cache):
+        chunks = cache.iter_and_store("knowledge", "kb-1", "v1", iter([b"part1", b"part2"]))
+        assert next(chunks) == b"part1"
+
+        chunks.close()
+
+        assert cache.get("knowledge", "kb-1", "v1") is None
+        assert os.listdir(os.path.dirname(cache.archive_path("knowledge", "kb-1", "v1"))) == []
+
+    @pytest.mark.asyncio
+    async def test_cancelled_stream_closes_sources_and_removes_temp_file(self, cache):
+        entered, release = threading.Event(), threading.Event()
+        reader = BlockingReader(b"x" * 4096, entered, release)
+        entries = [zip_entry_from_stream(lambda: reader, "a.txt", 4096, mtime=1_700_000_000)]
+
+        async def consume():
+            async for _chunk in cache.stream("knowledge", "kb-1", "v1", entries):
+                pass
+
+        task = asyncio.create_task(consume())
+        await asyncio.to_thread(entered.wait, 5)
+        # 客户端在线程读取源文件时断开
+        task.cancel()
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert reader.closed
+        assert cache.get("knowledge", "kb-1", "v1") is None
+        assert os.listdir(os.path.dirname(cache.archive_path("knowledge", "kb-1", "v1"))) == []
+
+    def test_oversized_archive_streamed_but_not_cached(self, tmp_path):
+        cache = ArchiveCache(str(tmp_path), max_bytes=8)
+
+        assert store(cache, "kb-1", "v1", [b"0123456789"]) == b"0123456789"
+        assert cache.get("knowledge", "kb-1", "v1") is None
+
+    def test_build_matches_streamed_archive(self, cache):
+        entries = [zip_entry_from_bytes(b"x" * 4096, "a.txt", mtime=1_700_000_000)]
+        streamed = b"".join(iter_zip(entries))
+
+        path = cache.build("knowledge", "kb-1", "v1", entries)
+
+        with open(path, "rb") as f:
+            assert f.read() == streamed
+
+    def test_disabled_cache(self, tmp_path):
+        cache = ArchiveCache(str(tmp_path), max_bytes=0)
+
+        assert not cache.enabled
+        assert cache.get("knowledge", "kb-1", "v1") is None
+        assert cache.build("knowledge", "kb-1", "v1", []) is None
+
+
+class TestEvictionAndInvalidation:
+    """测试淘汰与失效"""
+
+    def test_least_recently_downloaded_evicted(self, tmp_path):
+        cache = ArchiveCache(str(tmp_path), max_bytes=25)
+        store(cache, "kb-1", "v1", [b"a" * 10])
+        store(cache, "kb-2", "v1", [b"b" * 10])
+        set_mtime(cache.archive_path("knowledge", "kb-1", "v1"), 200)
+        set_mtime(cache.archive_path("knowledge", "kb-2", "v1"), 100)
+        # 命中会更新最近下载时间
+        cache.get("knowledge", "kb-1", "v1")
+
+        store(cache, "kb-3", "v1", [b"c" * 10])
+
+        assert cache.get("knowledge", "kb-1", "v1") is not None
+        assert cache.get("knowledge", "kb-2", "v1") is None
+        assert cache.get("knowledge", "kb-3", "v1") is not None
+        assert cache.get_stats() == {"files": 2, "bytes": 20, "max_bytes": 25}
+
+    def test_commit_scans_only_when_needed(self, tmp_path, monkeypatch):
+        cache = ArchiveCache(str(tmp_path), max_bytes=25)
+        walks = []
+        real_walk = os.walk
+        monkeypatch.setattr(archive_cache.os, "walk", lambda top: walks.append(top) or real_walk(top))
+
+        # 首次写入遍历一次得到总大小，之后未超出上限时不再遍历
+        store(cache, "kb-1", "v1", [b"a" * 10])
+        store(cache, "kb-2", "v1", [b"b" * 10])
+        store(cache, "kb-2", "v2", [b"b" * 12])
+        assert len(walks) == 1
+
+        # 估算超出上限时立即淘汰
+        store(cache, "kb-3", "v1", [b"c" * 10])
+        assert len(walks) == 2
+        assert cache.get_stats()["bytes"] <= 25
+
+        # 距上次遍历超过间隔时重新遍历（计入其他 worker 的写入）
+        walks.clear()
+        monkeypatch.setattr(cache, "_scanned_at", time.monotonic() - archive_cache.EVICT_SCAN_INTERVAL_SECONDS)
+        store(cache, "kb-4", "v1", [b"d"])
+        assert len(walks) == 1
+
+    def test_stale_temp_files_removed(self, cache):
+        store(cache, "kb-1", "v1", [b"data"])
+        temp_path = cache.archive_path("knowledge", "kb-1", "v2") + ".abc.part"
+        with open(temp_path, "wb") as f:
+            f.write(b"partial")
+        set_mtime(temp_path, 7200)
+
+        cache.evict()
+
+        assert not os.path.exists(temp_path)
+
+    def test_invalidate(self, cache):
+        store(cache, "kb-1", "v1", [b"data"])
+
+        assert cache.invalidate("knowledge", "kb-1") == 1
+        assert cache.get("knowledge", "kb-1", "v1") is None
+        assert cache.invalidate("knowledge", "kb-1") == 0
+
+
+class TestVersionAndETag:
+    """测试版本号与 ETag"""
+
+    @staticmethod
+    def make_item(**overrides):
+        item = SimpleNamespace(
+            id="kb-1",
+            name="知识库",
+            description="描述",
+            copyright_owner=None,
+            created_at="2026-01-01 00:00:00",
+            updated_at="2026-01-02 00:00:00",
+        )
+        for key, value in overrides.items():
+            setattr(item, key, value)
+        return item
+
+    @staticmethod
+    def make_file(**overrides):
+        file = SimpleNamespace(
+            id="f-1", original_name="a.txt", content_hash="ab" * 32, file_path="a.txt", file_size=5, updated_at=None
+        )
+        for key, value in overrides.items():
+            setattr(file, key, value)
+        return file
+
+    def test_version_stable_for_same_content(self):
+        item, files = self.make_item(), [self.make_file()]
+
+        assert archive_version(item, files, "user") == archive_version(self.make_item(), [self.make_file()], "user")
+
+    @pytest.mark.parametrize(
+        "item_overrides, file_overrides, uploader",
+        [
+            ({"description": "新描述"}, {}, "user"),
+            ({"updated_at": "2026-01-03 00:00:00"}, {}, "user"),
+            ({}, {"content_hash": "cd" * 32}, "user"),
+            ({}, {"original_name": "b.txt"}, "user"),
+            ({}, {}, "renamed"),
+        ],
+    )
+    def test_version_changes_with_content(self, item_overrides, file_overrides, uploader):
+        base = archive_version(self.make_item(), [self.make_file()], "user")
+
+        assert archive_version(self.make_item(**item_overrides), [self.make_file(**file_overrides)], uploader) != base
+
+    def test_etag_matches(self):
+        etag = archive_etag("v1")
+
+        assert etag == '"v1"'
+        assert etag_matches('"v1"', etag)
+        assert etag_matches('"v0", W/"v1"', etag)
+        assert etag_matches("*", etag)
+        assert not etag_matches('"v0"', etag)
+        assert not etag_matches(None, etag)
+
+    @pytest.mark.parametrize(
+        "range_header, expected",
+        [
+            (None, False),
+            ("bytes=0-", False),
+            ("bytes=0-99,200-299", False),
+            ("bytes=100-", True),
+            ("bytes=-500", True),
+            ("items=5-", False),
+        ],
+    )
+    def test_is_resume_request(self, range_header, expected):
+        assert is_resume_request(range_header) is expected
@@ -0,0 +1,479 @@
+"""
+按内容寻址的文件存储单元测试
+
+测试 blob 的写入与去重、引用计数的增减与重新计算、宽限期垃圾回收及其与并发上传的互斥、保存在 S3 兼容存储后端中的 blob、
+知识库文件的压缩保存，以及 FileService 上传相同内容时共享 blob。
+"""
+
+import hashlib
+import io
+import os
+import threading
+import time
+import zipfile
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.core.storage.s3 import S3StorageBackend
+from app.models.database import FileBlob, KnowledgeBaseFile
+from app.services.blob_store import BlobStore
+from app.utils.compression import ENCODING_GZIP, iter_decompress
+from app.services.file_service import FileService
+from app.utils.file import StagedUpload
+from app.utils.zip_stream import iter_zip
+from tests.helpers.fake_s3 import FakeS3Server
+
+
+def make_staged(directory: str, content: bytes) -> StagedUpload:
+    temp_path = os.path.join(directory, f".upload-{hashlib.md5(content).hexdigest()}.part")
+    with open(temp_path, "wb") as f:
+        f.write(content)
+    return StagedUpload("test.txt", temp_path, len(content), hashlib.sha256(content).hexdigest())
+
+
+@pytest.fixture
+def blob_store(test_db: Session, tmp_path):
+    return BlobStore(test_db, str(tmp_path))
+
+
+def get_blob(db: Session, content_hash: str) -> FileBlob | None:
+    db.expire_all()
+    return db.query(FileBlob).filter(FileBlob.hash == content_hash).first()
+
+
+def age_blob(db: Session, content_hash: str, seconds: int = 7200) -> None:
+    blob = get_blob(db, content_hash)
+    blob.updated_at = datetime.now() - timedelta(seconds=seconds)
+    db.commit()
+
+
+def unreferenced_blob(db: Session, blob_store: BlobStore, content: bytes) -> str:
+    """保存内容后释放引用并超过宽限期，成为可回收的 blob"""
+    content_hash, _ = blob_store.store(content)
+    blob_store.release(content_hash)
+    db.commit()
+    age_blob(db, content_hash)
+    return content_hash
+
+
+def run_in_thread(func) -> tuple[threading.Thread, list]:
+    """在线程中执行，返回线程和结果列表（结果或异常）"""
+    results = []
+
+    def target():
+        try:
+            results.append(func())
+        except Exception as e:
+            results.append(e)
+
+    thread = threading.Thread(target=target)
+    thread.start()
+    return thread, results
+
+
+class TestStore:
+    """测试写入与去重"""
+
+    def test_store_bytes(self, test_db, blob_store):
+        content_hash, size = blob_store.store(b"hello")
+        test_db.commit()
+
+        assert content_hash == hashlib.sha256(b"hello").hexdigest()
+        assert size == 5
+        with open(blob_store.blob_path(content_hash), "rb") as f:
+            assert f.read() == b"hello"
+        assert get_blob(test_db, content_hash).ref_count == 1
+
+    def test_duplicate_content_shares_blob(self, test_db, blob_store, tmp_path):
+        content_hash, _ = blob_store.store(b"same")
+        staged = make_staged(str(tmp_path), b"same")
+
+        assert blob_store.store(staged)[0] == content_hash
+        test_db.commit()
+
+        assert not os.path.exists(staged.temp_path)
+        assert staged.read_bytes() == b"same"
+        assert get_blob(test_db, content_hash).ref_count == 2
+
+    def test_staged_upload_moved_into_place(self, test_db, blob_store, tmp_path):
+        staged = make_staged(str(tmp_path), b"staged")
+
+        content_hash, _ = blob_store.store(staged)
+
+        assert staged.path == blob_store.blob_path(content_hash)
+        assert os.path.exists(staged.path)
+        assert not os.path.exists(staged.temp_path)
+
+    def test_rollback_discards_reference(self, test_db, blob_store):
+        content_hash, _ = blob_store.store(b"rolled back")
+        test_db.rollback()
+
+        assert get_blob(test_db, content_hash) is None
+
+    def test_resolve_legacy_and_blob(self, blob_store):
+        assert blob_store.resolve("/kb", "a.txt", None) == os.path.join("/kb", "a.txt")
+        assert blob_store.resolve("/kb", "a.txt", "ab" * 32) == blob_store.blob_path("ab" * 32)
+
+
+class TestReleaseAndGarbageCollection:
+    """测试释放引用与垃圾回收"""
+
+    def test_release_keeps_file_until_collected(self, test_db, blob_store):
+        content_hash, _ = blob_store.store(b"release")
+        test_db.commit()
+
+        blob_store.release(content_hash)
+        test_db.commit()
+
+        assert get_blob(test_db, content_hash).ref_count == 0
+        assert os.path.exists(blob_store.blob_path(content_hash))
+
+    def test_collect_after_grace_period(self, test_db, blob_store):
+        content_hash, _ = blob_store.store(b"garbage")
+        blob_store.release(content_hash)
+        test_db.commit()
+
+        assert blob_store.collect_garbage(grace_seconds=3600)["removed_records"] == 0
+
+        age_blob(test_db, content_hash)
+        result = blob_store.collect_garbage(grace_seconds=3600)
+
+        assert result == {"removed_records": 1, "removed_files": 1, "freed_bytes": 7}
+        assert get_blob(test_db, content_hash) is None
+        assert not os.path.exists(blob_store.blob_path(content_hash))
+
+    def test_referenced_blob_not_collected(self, test_db, blob_store):
+        content_hash, _ = blob_store.store(b"kept")
+        test_db.commit()
+        age_blob(test_db, content_hash)
+
+        blob_store.collect_garbage(grace_seconds=3600)
+
+        assert get_blob(test_db, content_hash).ref_count == 1
+        assert os.path.exists(blob_store.blob_path(content_hash))
+
+    def test_orphan_file_collected_after_grace_period(self, test_db, blob_store):
+        content_hash, _ = blob_store.store(b"orphan")
+        test_db.rollback()
+        path = blob_store.blob_path(content_hash)
+        assert os.path.exists(path)
+
+        blob_store.collect_garbage(grace_seconds=3600)
+        assert os.path.exists(path)
+
+        old = time.time() - 7200
+        os.utime(path, (old, old))
+        assert blob_store.collect_garbage(grace_seconds=3600)["removed_files"] == 1
+        assert not os.path.exists(path)
+
+    def test_pending_upload_reference_blocks_collection(self, test_db, blob_store, tmp_path):
+        content_hash = unreferenced_blob(test_db, blob_store, b"race")
+
+        # 上传在未提交的事务中重新引用 blob，并因为文件已存在而跳过写入
+        with Session(bind=test_db.get_bind()) as upload_db:
+            BlobStore(upload_db, str(tmp_path)).store(b"race")
+            collector, results = run_in_thread(lambda: blob_store.collect_garbage(grace_seconds=3600))
+            collector.join(0.3)
+            # 回收等待上传的事务
+            assert collector.is_alive()
+            upload_db.commit()
+        collector.join(10)
+
+        assert results == [{"removed_records": 0, "removed_files": 0, "freed_bytes": 0}]
+        assert get_blob(test_db, content_hash).ref_count == 1
+        with open(blob_store.blob_path(content_hash), "rb") as f:
+            assert f.read() == b"race"
+
+    def test_upload_during_collection_rewrites_content(self, test_db, blob_store, tmp_path, monkeypatch):
+        content_hash = unreferenced_blob(test_db, blob_store, b"race")
+        deleting, resume = threading.Event(), threading.Event()
+        delete = blob_store.storage.delete
+
+        def slow_delete(key):
+            deleting.set()
+            resume.wait(5)
+            return delete(key)
+
+        monkeypatch.setattr(blob_store.storage, "delete", slow_delete)
+        collector, collected = run_in_thread(lambda: blob_store.collect_garbage(grace_seconds=3600))
+        assert deleting.wait(5)
+
+        def upload():
+            with Session(bind=test_db.get_bind()) as upload_db:
+                BlobStore(upload_db, str(tmp_path)).store(b"race")
+                upload_db.commit()
+
+        # 回收已锁定记录并正在删除文件时上传相同内容
+        uploader, uploaded = run_in_thread(upload)
+        uploader.join(0.3)
+        assert uploader.is_alive()
+        resume.set()
+        collector.join(10)
+        uploader.join(10)
+
+        assert collected[0]["removed_records"] == 1
+        assert uploaded == [None]
+        assert get_blob(test_db, content_hash).ref_count == 1
+        with open(blob_store.blob_path(content_hash), "rb") as f:
+            assert f.read() == b"race"
+
+    def test_release_file_removes_legacy_file(self, blob_store, tmp_path):
+        legacy_path = tmp_path / "legacy.txt"
+        legacy_path.write_bytes(b"legacy")
+
+        blob_store.release_file(str(tmp_path), "legacy.txt", None)
+
+        assert not legacy_path.exists()
+
+
+class TestRecount:
+    """测试按文件记录重新计算引用计数"""
+
+    def test_recount_from_file_records(self, test_db, blob_store, factory):
+        kb = factory.create_knowledge_base()
+        content_hash, _ = blob_store.store(b"recount")
+        test_db.commit()
+        for name in ("a.txt", "b.txt"):
+            factory.create_knowledge_base_file(knowledge_base=kb, original_name=name, content_hash=content_hash)
+        stale_hash, _ = blob_store.store(b"stale")
+        test_db.commit()
+
+        assert blob_store.recount() == 2
+
+        assert get_blob(test_db, content_hash).ref_count == 2
+        assert get_blob(test_db, stale_hash).ref_count == 0
+
+
+TEXT_CONTENT = b'{"question": "what is it", "answer": "knowledge"}\n' * 200
+
+
+@pytest.fixture
+def gzip_compression():
+    with (
+        patch("app.core.config.settings.UPLOAD_COMPRESSION", "gzip"),
+        patch("app.core.config.settings.UPLOAD_COMPRESSION_MIN_SIZE", 1024),
+    ):
+        yield
+
+
+@pytest.mark.usefixtures("gzip_compression")
+class TestCompression:
+    """测试知识库文件的压缩保存"""
+
+    def test_staged_upload_compressed(self, blob_store, tmp_path):
+        staged = make_staged(str(tmp_path), TEXT_CONTENT)
+
+        stored = blob_store.put(staged, staged.sha256, compress=True)
+
+        assert stored.encoding == ENCODING_GZIP
+        assert stored.key == BlobStore.blob_key(staged.sha256) + ".gz"
+        assert stored.stored_size < len(TEXT_CONTENT) // 5
+        path = blob_store.blob_path(staged.sha256, ENCODING_GZIP)
+        assert os.path.getsize(path) == stored.stored_size
+        with open(path, "rb") as f:
+            assert b"".join(iter_decompress([f.read()], ENCODING_GZIP)) == TEXT_CONTENT
+        # 没有原始内容，临时文件和压缩用的临时文件都已删除
+        assert staged.path is None
+        assert not os.path.exists(blob_store.blob_path(staged.sha256))
+        assert [name for name in os.listdir(tmp_path) if name.startswith(".")] == []
+
+    def test_small_or_incompressible_content_kept_raw(self, blob_store):
+        small = b"short text"
+        random_data = os.urandom(4096)
+
+        for content in (small, random_data):
+            content_hash = hashlib.sha256(content).hexdigest()
+            stored = blob_store.put(content, content_hash, compress=True)
+            assert stored == (BlobStore.blob_key(content_hash), None, len(content))
+            assert not os.path.exists(blob_store.blob_path(content_hash, ENCODING_GZIP))
+
+    def test_disabled_by_config(self, blob_store):
+        content_hash = hashlib.sha256(TEXT_CONTENT).hexdigest()
+
+        with patch("app.core.config.settings.UPLOAD_COMPRESSION", "none"):
+            assert blob_store.put(TEXT_CONTENT, content_hash, compress=True).encoding is None
+
+    def test_existing_raw_blob_reused(self, blob_store, tmp_path):
+        content_hash, _ = blob_store.store(TEXT_CONTENT)
+        staged = make_staged(str(tmp_path), TEXT_CONTENT)
+
+        stored = blob_store.put(staged, content_hash, compress=True)
+
+        assert stored.encoding is None
+        assert staged.path == blob_store.blob_path(content_hash)
+        assert not os.path.exists(blob_store.blob_path(content_hash, ENCODING_GZIP))
+
+    def test_existing_compressed_blob_reused(self, blob_store, tmp_path):
+        content_hash = hashlib.sha256(TEXT_CONTENT).hexdigest()
+        first = blob_store.put(TEXT_CONTENT, content_hash, compress=True)
+        staged = make_staged(str(tmp_path), TEXT_CONTENT)
+
+        assert blob_store.put(staged, content_hash, compress=True) == first
+        assert not os.path.exists(staged.temp_path)
+
+    def test_zip_entry_reuses_compressed_blob(self, blob_store):
+        content_hash = hashlib.sha256(TEXT_CONTENT).hexdigest()
+        blob_store.put(TEXT_CONTENT, content_hash, compress=True)
+
+        entry = blob_store.zip_entry(
+            "/kb", "qa.json", content_hash, "qa.json", encoding=ENCODING_GZIP, size=len(TEXT_CONTENT)
+        )
+
+        assert entry.size == len(TEXT_CONTENT)
+        with zipfile.ZipFile(io.BytesIO(b"".join(iter_zip([entry])))) as zf:
+            assert zf.read("qa.json") == TEXT_CONTENT
+        assert blob_store.file_exists("/kb", "qa.json", content_hash, ENCODING_GZIP) is True
+        assert blob_store.file_exists("/kb", "qa.json", content_hash) is False
+
+    def test_collect_removes_compressed_blob(self, test_db, blob_store):
+        content_hash = hashlib.sha256(TEXT_CONTENT).hexdigest()
+        blob_store.acquire(content_hash, len(TEXT_CONTENT))
+        stored = blob_store.put(TEXT_CONTENT, content_hash, compress=True)
+        blob_store.release(content_hash)
+        test_db.commit()
+        age_blob(test_db, content_hash)
+
+        result = blob_store.collect_garbage(grace_seconds=3600)
+
+        assert result == {"removed_records": 1, "removed_files": 1, "freed_bytes": stored.stored_size}
+        assert not os.path.exists(blob_store.blob_path(content_hash, ENCODING_GZIP))
+
+    def test_referenced_compressed_blob_not_treated_as_orphan(self, test_db, blob_store):
+        content_hash = hashlib.sha256(TEXT_CONTENT).hexdigest()
+        blob_store.acquire(content_hash, len(TEXT_CONTENT))
+        blob_store.put(TEXT_CONTENT, content_hash, compress=True)
+        test_db.commit()
+        path = blob_store.blob_path(content_hash, ENCODING_GZIP)
+        old = time.time() - 7200
+        os.utime(path, (old, old))
+
+        assert blob_store.collect_garbage(grace_seconds=3600)["removed_files"] == 0
+        assert os.path.exists(path)
+
+
+class TestRemoteStorage:
+    """测试保存在 S3 兼容存储后端中的 blob"""
+
+    @pytest.fixture
+    def fake_s3(self):
+        server = FakeS3Server().start()
+        yield server
+        server.stop()
+
+    @pytest.fixture
+    def remote_store(self, test_db, tmp_path, fake_s3):
+        storage = S3StorageBackend(fake_s3.endpoint_url, fake_s3.bucket, "test-key", "test-secret")
+        return BlobStore(test_db, str(tmp_path), storage=storage)
+
+    def test_store_uploads_object(self, test_db, remote_store, fake_s3, tmp_path):
+        staged = make_staged(str(tmp_path), b"remote")
+
+        content_hash, _ = remote_store.store(staged)
+        test_db.commit()
+
+        key = BlobStore.blob_key(content_hash)
+        assert fake_s3.objects[key][0] == b"remote"
+        assert not os.path.exists(staged.temp_path)
+        assert staged.path is None
+        assert remote_store.resolve("/kb", "a.txt", content_hash) is None
+        assert remote_store.file_exists("/kb", "a.txt", content_hash) is True
+        assert not os.path.exists(remote_store.blob_path(content_hash))
+
+    def test_duplicate_content_not_uploaded_again(self, test_db, remote_store, fake_s3, tmp_path):
+        content_hash, _ = remote_store.store(b"same")
+        test_db.commit()
+        uploads = sum(1 for method, _ in fake_s3.requests if method == "PUT")
+        staged = make_staged(str(tmp_path), b"same")
+
+        assert remote_store.store(staged)[0] == content_hash
+        test_db.commit()
+
+        assert sum(1 for method, _ in fake_s3.requests if method == "PUT") == uploads
+        assert not os.path.exists(staged.temp_path)
+        assert get_blob(test_db, content_hash).ref_count == 2
+
+    def test_zip_entry_streams_object(self, test_db, remote_store):
+        content_hash, _ = remote_store.store(b"zipped remote content")
+        test_db.commit()
+
+        entry = remote_store.zip_entry("/kb", "a.txt", content_hash, "a.txt")
+
+        assert entry.size == len(b"zipped remote content")
+        with zipfile.ZipFile(io.BytesIO(b"".join(iter_zip([entry])))) as zf:
+            assert zf.read("a.txt") == b"zipped remote content"
+        with pytest.raises(FileNotFoundError):
+            remote_store.zip_entry("/kb", "b.txt", "ab" * 32, "b.txt")
+
+    def test_collect_garbage(self, test_db, remote_store, fake_s3):
+        released_hash, _ = remote_store.store(b"released")
+        remote_store.release(released_hash)
+        test_db.commit()
+        age_blob(test_db, released_hash)
+        orphan_hash, _ = remote_store.store(b"orphan")
+        test_db.rollback()
+        orphan_key = BlobStore.blob_key(orphan_hash)
+        fake_s3.set_mtime(orphan_key, time.time() - 7200)
+
+        result = remote_store.collect_garbage(grace_seconds=3600)
+
+        assert result == {"removed_records": 1, "removed_files": 2, "freed_bytes": 8 + 6}
+        assert fake_s3.objects == {}
+
+    @pytest.mark.usefixtures("gzip_compression")
+    def test_compressed_upload(self, test_db, remote_store, fake_s3, tmp_path):
+        staged = make_staged(str(tmp_path), TEXT_CONTENT)
+
+        stored = remote_store.put(staged, staged.sha256, compress=True)
+
+        assert stored.encoding == ENCODING_GZIP
+        assert len(fake_s3.objects[stored.key][0]) == stored.stored_size
+        assert BlobStore.blob_key(staged.sha256) not in fake_s3.objects
+        assert [name for name in os.listdir(tmp_path) if name.startswith(".")] == []
+
+
+class TestFileServiceIntegration:
+    """测试 FileService 使用 blob 存储"""
+
+    def test_same_content_uploaded_twice_stored_once(self, test_db, factory, tmp_path, monkeypatch):
+        monkeypatch.setenv("UPLOAD_DIR", str(tmp_path))
+        service = FileService(test_db)
+        user = factory.create_user()
+
+        kb1 = service.upload_knowledge_base([("a.txt", b"shared")], name="KB1", description="d", uploader_id=user.id)
+        kb2 = service.upload_knowledge_base([("b.txt", b"shared")], name="KB2", description="d", uploader_id=user.id)
+
+        content_hash = hashlib.sha256(b"shared").hexdigest()
+        files = test_db.query(KnowledgeBaseFile).filter(KnowledgeBaseFile.content_hash == content_hash).all()
+        assert {f.knowledge_base_id for f in files} == {kb1.id, kb2.id}
+        assert get_blob(test_db, content_hash).ref_count == 2
+
+        kb1_file = next(f for f in files if f.knowledge_base_id == kb1.id)
+        info = service.get_knowledge_base_file_path(kb1.id, kb1_file.id)
+        assert info["full_path"] == service.blob_store.blob_path(content_hash)
+
+        assert service.delete_knowledge_base(kb1.id, user.id) is True
+        assert get_blob(test_db, content_hash).ref_count == 1
+        assert os.path.exists(service.blob_store.blob_path(content_hash))
+
+    @pytest.mark.usefixtures("gzip_compression")
+    def test_knowledge_file_compressed(self, test_db, factory, tmp_path, monkeypatch):
+        monkeypatch.setenv("UPLOAD_DIR", str(tmp_path))
+        service = FileService(test_db)
+        user = factory.create_user()
+
+        kb = service.upload_knowledge_base([("qa.json", TEXT_CONTENT)], name="KB", description="d", uploader_id=user.id)
+
+        kb_file = test_db.query(KnowledgeBaseFile).filter(KnowledgeBaseFile.knowledge_base_id == kb.id).one()
+        assert kb_file.file_size == len(TEXT_CONTENT)
+        assert kb_file.content_encoding == ENCODING_GZIP
+        assert 0 < kb_file.stored_size < kb_file.file_size
+        info = service.get_knowledge_base_file_path(kb.id, kb_file.id)
+        assert info["storage_key"] == BlobStore.blob_key(kb_file.content_hash, ENCODING_GZIP)
+        assert info["stored_size"] == kb_file.stored_size
+
+        zip_result = service.create_knowledge_base_zip(kb.id)
+        with zipfile.ZipFile(io.BytesIO(b"".join(iter_zip(zip_result["entries"])))) as zf:
+            assert zf.read("qa.json") == TEXT_CONTENT
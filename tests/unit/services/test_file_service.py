@@ -6,16 +6,22 @@
 Requirements: 2.2
 """
 
+import hashlib
+import io
 import os
 import shutil
 import tempfile
+import zipfile
 from unittest.mock import patch
 
 import pytest
 from sqlalchemy.orm import Session
 
 from app.models.database import KnowledgeBase, KnowledgeBaseFile
+from app.services.archive_cache import ArchiveCache
 from app.services.file_service import FileDatabaseError, FileService, FileValidationError
+from app.utils.file_io import StageTimer
+from app.utils.zip_stream import iter_zip
 
 
 class TestFileServiceInit:
@@ -217,6 +223,29 @@ class TestKnowledgeBaseUpload:
                 kb_files = test_db.query(KnowledgeBaseFile).filter(KnowledgeBaseFile.knowledge_base_id == kb.id).all()
                 assert len(kb_files) == 2
 
+    def test_upload_knowledge_base_parallel_store_with_timings(self, test_db: Session, factory):
+        """测试多个文件并行保存，文件记录与输入一一对应，并记录各阶段耗时"""
+        service = FileService(test_db)
+        user = factory.create_user()
+        timer = StageTimer("test")
+
+        files = [(f"file{i}.txt", f"content {i}".encode()) for i in range(6)] + [("dup.txt", b"content 0")]
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with patch.object(service, "knowledge_dir", temp_dir), patch.object(service, "MAX_PARALLEL_FILES", 3):
+                kb = service.upload_knowledge_base(
+                    files=files, name="Parallel KB", description="Test", uploader_id=user.id, timer=timer
+                )
+
+        kb_files = test_db.query(KnowledgeBaseFile).filter(KnowledgeBaseFile.knowledge_base_id == kb.id).all()
+        hashes = {kb_file.original_name: kb_file.content_hash for kb_file in kb_files}
+        assert len(hashes) == 7
+        for filename, content in files:
+            assert hashes[filename] == hashlib.sha256(content).hexdigest()
+            with open(service.blob_store.blob_path(hashes[filename]), "rb") as f:
+                assert f.read() == content
+        assert set(timer.as_dict()) == {"validate", "hash", "register", "write", "commit"}
+
     def test_upload_knowledge_base_too_many_files(self, test_db: Session, factory):
         """测试上传文件数量超过限制"""
         service = FileService(test_db)
@@ -552,13 +581,11 @@ class TestZipCreation:
         try:
             result = service.create_knowledge_base_zip(kb.id)
 
-            assert "zip_path" in result
-            assert "zip_filename" in result
-            assert os.path.exists(result["zip_path"])
+            assert "zip_path" not in result
             assert result["zip_filename"].endswith(".zip")
-
-            # 清理 ZIP 文件
-            os.remove(result["zip_path"])
+            with zipfile.ZipFile(io.BytesIO(b"".join(iter_zip(result["entries"])))) as zf:
+                assert zf.read(kb_file.original_name) == b"test content"
+                assert "README.txt" in zf.namelist()
         finally:
             if os.path.exists(kb.base_path):
                 shutil.rmtree(kb.base_path)
@@ -574,6 +601,37 @@ class TestZipCreation:
         with pytest.raises(FileValidationError, match="文件不存在"):
             service.create_knowledge_base_zip(kb.id)
 
+    def test_create_knowledge_base_zip_uses_archive_cache(self, test_db: Session, factory, tmp_path):
+        """测试内容未变化时使用已缓存的压缩包，变化后生成新版本"""
+        service = FileService(test_db)
+        kb = factory.create_knowledge_base()
+        os.makedirs(kb.base_path, exist_ok=True)
+        kb_file = factory.create_knowledge_base_file(knowledge_base=kb)
+        with open(os.path.join(kb.base_path, kb_file.file_path), "w") as f:
+            f.write("test content")
+
+        archive_cache = ArchiveCache(str(tmp_path), max_bytes=1024 * 1024)
+        try:
+            with patch("app.services.file_service.get_archive_cache", return_value=archive_cache):
+                first = service.create_knowledge_base_zip(kb.id)
+                data = b"".join(
+                    archive_cache.iter_and_store("knowledge", kb.id, first["version"], iter_zip(first["entries"]))
+                )
+
+                cached = service.create_knowledge_base_zip(kb.id)
+                assert cached["version"] == first["version"]
+                with open(cached["archive_path"], "rb") as f:
+                    assert f.read() == data
+
+                kb.description = "新的描述"
+                test_db.commit()
+                changed = service.create_knowledge_base_zip(kb.id)
+                assert changed["version"] != first["version"]
+                assert "entries" in changed
+        finally:
+            if os.path.exists(kb.base_path):
+                shutil.rmtree(kb.base_path)
+
     def test_create_persona_card_zip_success(self, test_db: Session, factory):
         """测试成功创建人设卡 ZIP"""
         service = FileService(test_db)
@@ -590,12 +648,10 @@ class TestZipCreation:
         try:
             result = service.create_persona_card_zip(pc.id)
 
-            assert "zip_path" in result
-            assert "zip_filename" in result
-            assert os.path.exists(result["zip_path"])
-
-            # 清理 ZIP 文件
-            os.remove(result["zip_path"])
+            assert "zip_path" not in result
+            assert result["zip_filename"].endswith(".zip")
+            with zipfile.ZipFile(io.BytesIO(b"".join(iter_zip(result["entries"])))) as zf:
+                assert zf.read(pc_file.original_name) == b"test content"
         finally:
             if os.path.exists(pc.base_path):
                 shutil.rmtree(pc.base_path)
@@ -823,8 +879,8 @@ class TestExceptionHandling:
             f.write("test")
 
         try:
-            # Mock zipfile.ZipFile to raise exception
-            with patch("zipfile.ZipFile", side_effect=Exception("Zip error")):
+            # Mock 读取文件信息失败
+            with patch("app.services.blob_store.zip_entry_from_file", side_effect=Exception("Zip error")):
                 with pytest.raises(FileDatabaseError, match="创建压缩包失败"):
                     service.create_knowledge_base_zip(kb.id)
         finally:
@@ -844,8 +900,8 @@ class TestExceptionHandling:
             f.write("test")
 
         try:
-            # Mock zipfile.ZipFile to raise exception
-            with patch("zipfile.ZipFile", side_effect=Exception("Zip error")):
+            # Mock 读取文件信息失败
+            with patch("app.services.blob_store.zip_entry_from_file", side_effect=Exception("Zip error")):
                 with pytest.raises(FileDatabaseError, match="创建压缩包失败"):
                     service.create_persona_card_zip(pc.id)
         finally:
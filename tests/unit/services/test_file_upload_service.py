@@ -4,9 +4,11 @@ FileUploadService 单元测试
 测试文件上传服务的核心功能，使用真实的数据库会话而不是 Mock。
 """
 
+import io
 import os
 import shutil
 import tempfile
+import zipfile
 from datetime import datetime
 from unittest.mock import AsyncMock, Mock
 
@@ -17,6 +19,7 @@ from fastapi import HTTPException, UploadFile
 from app.core.error_handlers import ValidationError
 from app.models.database import KnowledgeBase, KnowledgeBaseFile, PersonaCard, PersonaCardFile
 from app.services.file_upload_service import FileUploadService
+from app.utils.zip_stream import iter_zip
 
 
 class TestFileUploadServiceInit:
@@ -466,15 +469,15 @@ class TestZipCreation:
         service = FileUploadService(test_db)
         result = await service.create_knowledge_base_zip(kb.id)
 
-        # 验证
+        # 验证：返回压缩包条目，不生成临时文件
         assert result is not None
-        assert "zip_path" in result
-        assert "zip_filename" in result
-        assert os.path.exists(result["zip_path"])
+        assert "zip_path" not in result
+        assert result["zip_filename"].endswith(".zip")
+        with zipfile.ZipFile(io.BytesIO(b"".join(iter_zip(result["entries"])))) as zf:
+            assert zf.read("test.txt") == b"test content"
+            assert "README.txt" in zf.namelist()
 
         # 清理
-        if os.path.exists(result["zip_path"]):
-            os.remove(result["zip_path"])
         if os.path.exists(kb.base_path):
             shutil.rmtree(kb.base_path)
 
@@ -1088,15 +1091,14 @@ version = "2.0.0"
         service = FileUploadService(test_db)
         result = await service.create_persona_card_zip(pc.id)
 
-        # 验证
+        # 验证：返回压缩包条目，不生成临时文件
         assert result is not None
-        assert "zip_path" in result
-        assert "zip_filename" in result
-        assert os.path.exists(result["zip_path"])
+        assert "zip_path" not in result
+        assert result["zip_filename"].endswith(".zip")
+        with zipfile.ZipFile(io.BytesIO(b"".join(iter_zip(result["entries"])))) as zf:
+            assert zf.read("bot_config.toml") == b"version = '1.0.0'"
 
         # 清理
-        if os.path.exists(result["zip_path"]):
-            os.remove(result["zip_path"])
         if os.path.exists(pc.base_path):
             shutil.rmtree(pc.base_path)
 
@@ -2142,13 +2144,8 @@ description = "No version here"
             result = await service.create_persona_card_zip(pc.id)
 
             assert result is not None
-            assert "zip_path" in result
-            assert os.path.exists(result["zip_path"])
-            assert result["zip_path"].endswith(".zip")
-
-            # 清理 ZIP 文件
-            if os.path.exists(result["zip_path"]):
-                os.remove(result["zip_path"])
+            assert result["zip_filename"].endswith(".zip")
+            assert [entry.arcname for entry in result["entries"]] == ["bot_config.toml", "README.txt"]
         finally:
             if os.path.exists(temp_dir):
                 shutil.rmtree(temp_dir)
@@ -601,6 +601,7 @@ class TestFileManagement:
         mock_query = Mock()
         mock_filter = Mock()
         mock_filter.delete = Mock()
+        mock_filter.all = Mock(return_value=[])
         mock_query.filter = Mock(return_value=mock_filter)
         db.query = Mock(return_value=mock_query)
         db.commit = Mock()
@@ -619,6 +620,7 @@ class TestFileManagement:
         mock_query = Mock()
         mock_filter = Mock()
         mock_filter.delete = Mock()
+        mock_filter.all = Mock(return_value=[])
         mock_query.filter = Mock(return_value=mock_filter)
         db.query = Mock(return_value=mock_query)
         db.commit = Mock(side_effect=Exception("Database error"))
@@ -693,6 +695,7 @@ class TestUploadRecords:
         mock_query = Mock()
         mock_filter = Mock()
         mock_filter.delete = Mock()
+        mock_filter.all = Mock(return_value=[])
         mock_query.filter = Mock(return_value=mock_filter)
         db.query = Mock(return_value=mock_query)
         db.commit = Mock(side_effect=Exception("Database error"))
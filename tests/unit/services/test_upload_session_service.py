@@ -0,0 +1,275 @@
+"""
+可续传上传会话单元测试
+
+测试文件清单校验、分块的偏移量 / 长度 / 校验和检查与重试、进度查询、提交时的拼接与校验，以及过期会话的清理。
+"""
+
+import hashlib
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.models.database import UploadSession
+from app.services.file_service import FileValidationError
+from app.services.upload_session_service import (
+    SESSION_STATUS_ACTIVE,
+    SESSION_STATUS_COMMITTED,
+    UploadSessionConflictError,
+    UploadSessionNotFoundError,
+    UploadSessionService,
+    parse_upload_checksum,
+)
+from app.utils.file import discard_staged
+
+CONTENT = b"0123456789"  # chunk_size=4 时分为 3 块：4 + 4 + 2
+
+
+@pytest.fixture
+def service(test_db: Session, tmp_path):
+    return UploadSessionService(test_db, str(tmp_path), chunk_size=4, ttl_seconds=3600)
+
+
+def sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def create(service: UploadSessionService, files=None, user_id: str = "user-1") -> UploadSession:
+    files = files or [{"name": "a.txt", "size": len(CONTENT), "sha256": sha256(CONTENT)}]
+    return service.create_session(user_id=user_id, name="知识库", description="描述", files=files)
+
+
+def put(service: UploadSessionService, upload_session: UploadSession, chunk_index: int, content: bytes = CONTENT):
+    data = content[chunk_index * 4 : chunk_index * 4 + 4]
+    return service.put_chunk(upload_session, 0, chunk_index, chunk_index * 4, data, sha256(data))
+
+
+def expire(db: Session, upload_session: UploadSession, seconds: int = 60) -> None:
+    upload_session.expires_at = datetime.now() - timedelta(seconds=seconds)
+    db.commit()
+
+
+class TestCreateSession:
+    """测试创建会话"""
+
+    def test_create_session(self, service):
+        upload_session = create(service)
+
+        progress = service.get_progress(upload_session)
+        assert progress["status"] == SESSION_STATUS_ACTIVE
+        assert progress["chunk_size"] == 4
+        assert progress["total_bytes"] == 10
+        assert progress["received_bytes"] == 0
+        assert progress["files"][0]["missing_chunks"] == [0, 1, 2]
+
+    @pytest.mark.parametrize(
+        "files, code",
+        [
+            ([{"name": "a.exe", "size": 1}], "INVALID_FILE_TYPE"),
+            ([{"name": "a.txt", "size": 1024 * 1024 * 1024}], "FILE_SIZE_EXCEEDED"),
+            ([{"name": "a.txt", "size": 1}, {"name": "a.txt", "size": 2}], "DUPLICATE_FILE_NAME"),
+            ([{"name": "a.txt", "size": 1, "sha256": "not-a-hash"}], "INVALID_CHECKSUM"),
+        ],
+    )
+    def test_invalid_manifest(self, service, files, code):
+        with pytest.raises(FileValidationError) as exc_info:
+            create(service, files=files)
+
+        assert exc_info.value.code == code
+
+    def test_active_session_limit(self, service, monkeypatch):
+        from app.core.config import settings
+
+        monkeypatch.setattr(settings, "UPLOAD_SESSION_MAX_ACTIVE", 1)
+        create(service)
+
+        with pytest.raises(FileValidationError) as exc_info:
+            create(service)
+        assert exc_info.value.code == "TOO_MANY_UPLOAD_SESSIONS"
+
+    def test_get_session_of_other_user(self, service):
+        upload_session = create(service)
+
+        with pytest.raises(UploadSessionNotFoundError):
+            service.get_session(upload_session.id, "user-2")
+
+    def test_get_expired_session(self, test_db, service):
+        upload_session = create(service)
+        expire(test_db, upload_session)
+
+        with pytest.raises(UploadSessionNotFoundError):
+            service.get_session(upload_session.id, "user-1")
+
+
+class TestChunks:
+    """测试分块上传"""
+
+    def test_put_chunk_updates_progress(self, service):
+        upload_session = create(service)
+
+        progress = put(service, upload_session, 1)
+
+        assert progress["missing_chunks"] == [0, 2]
+        assert progress["received_bytes"] == 4
+        with open(service.chunk_path(upload_session.id, 0, 1), "rb") as f:
+            assert f.read() == b"4567"
+
+    def test_retry_is_idempotent(self, service):
+        upload_session = create(service)
+        put(service, upload_session, 2)
+
+        progress = put(service, upload_session, 2)
+
+        assert progress["received_chunks"] == 1
+        assert progress["received_bytes"] == 2
+
+    def test_put_chunk_extends_expiry(self, test_db, service):
+        upload_session = create(service)
+        upload_session.expires_at = datetime.now() + timedelta(seconds=10)
+        test_db.commit()
+
+        put(service, upload_session, 0)
+
+        assert upload_session.expires_at > datetime.now() + timedelta(seconds=3000)
+
+    @pytest.mark.parametrize(
+        "chunk_index, offset, data, code",
+        [
+            (1, 0, b"4567", "CHUNK_OFFSET_MISMATCH"),
+            (2, 8, b"8", "CHUNK_SIZE_MISMATCH"),
+            (0, 0, b"01234", "CHUNK_SIZE_MISMATCH"),
+            (3, 12, b"", "INVALID_CHUNK_INDEX"),
+        ],
+    )
+    def test_invalid_chunk(self, service, chunk_index, offset, data, code):
+        upload_session = create(service)
+
+        with pytest.raises(FileValidationError) as exc_info:
+            service.put_chunk(upload_session, 0, chunk_index, offset, data, sha256(data))
+        assert exc_info.value.code == code
+
+    def test_checksum_mismatch_not_stored(self, service):
+        upload_session = create(service)
+
+        with pytest.raises(FileValidationError) as exc_info:
+            service.put_chunk(upload_session, 0, 0, 0, b"0123", sha256(b"corrupt"))
+
+        assert exc_info.value.code == "CHUNK_CHECKSUM_MISMATCH"
+        assert not os.path.exists(service.chunk_path(upload_session.id, 0, 0))
+
+    def test_parse_upload_checksum(self):
+        digest = sha256(b"data")
+
+        assert parse_upload_checksum(f"sha256 {digest.upper()}") == digest
+        with pytest.raises(FileValidationError):
+            parse_upload_checksum(f"md5 {digest}")
+        with pytest.raises(FileValidationError):
+            parse_upload_checksum(None)
+
+
+class TestCommit:
+    """测试提交"""
+
+    def test_commit_assembles_files(self, service):
+        upload_session = create(service)
+        for chunk_index in (2, 0, 1):
+            put(service, upload_session, chunk_index)
+
+        file_data = service.begin_commit(upload_session)
+        try:
+            [(filename, staged)] = file_data
+            assert filename == "a.txt"
+            assert staged.read_bytes() == CONTENT
+            assert staged.sha256 == sha256(CONTENT)
+        finally:
+            discard_staged(staged for _, staged in file_data)
+
+        service.finish_commit(upload_session, "kb-1")
+
+        assert upload_session.status == SESSION_STATUS_COMMITTED
+        assert upload_session.knowledge_base_id == "kb-1"
+        assert not os.path.exists(service.session_dir(upload_session.id))
+        assert service.get_progress(upload_session)["complete"] is True
+
+    def test_commit_with_missing_chunks(self, service):
+        upload_session = create(service)
+        put(service, upload_session, 0)
+
+        with pytest.raises(UploadSessionConflictError) as exc_info:
+            service.begin_commit(upload_session)
+
+        assert exc_info.value.details["missing_chunks"] == {0: [1, 2]}
+
+    def test_declared_hash_mismatch_restores_session(self, service):
+        other = b"abcdefghij"
+        upload_session = create(service, files=[{"name": "a.txt", "size": 10, "sha256": sha256(other)}])
+        for chunk_index in range(3):
+            put(service, upload_session, chunk_index)
+
+        with pytest.raises(FileValidationError) as exc_info:
+            service.begin_commit(upload_session)
+
+        assert exc_info.value.code == "FILE_CHECKSUM_MISMATCH"
+        service.db.refresh(upload_session)
+        assert upload_session.status == SESSION_STATUS_ACTIVE
+        assert os.listdir(service.staging_dir) == []
+
+    def test_second_commit_rejected(self, service):
+        upload_session = create(service)
+        for chunk_index in range(3):
+            put(service, upload_session, chunk_index)
+        file_data = service.begin_commit(upload_session)
+        discard_staged(staged for _, staged in file_data)
+
+        with pytest.raises(UploadSessionConflictError):
+            service.begin_commit(upload_session)
+        with pytest.raises(UploadSessionConflictError):
+            put(service, upload_session, 0)
+
+    def test_empty_file(self, service):
+        upload_session = create(service, files=[{"name": "empty.txt", "size": 0}])
+
+        [(_, staged)] = service.begin_commit(upload_session)
+
+        assert staged.size == 0
+        staged.discard()
+
+
+class TestCollectExpired:
+    """测试过期会话清理"""
+
+    def test_expired_session_removed(self, test_db, service):
+        active = create(service)
+        expired = create(service)
+        put(service, expired, 0)
+        expire(test_db, expired)
+        expired_id = expired.id
+
+        result = service.collect_expired()
+
+        assert result == {"removed_sessions": 1, "removed_dirs": 1}
+        test_db.expire_all()
+        assert test_db.query(UploadSession).filter(UploadSession.id == expired_id).first() is None
+        assert not os.path.exists(service.session_dir(expired_id))
+        assert service.get_session(active.id, "user-1") is not None
+
+    def test_orphan_directory_removed(self, service):
+        orphan_dir = os.path.join(service.session_dir("orphan"), "0")
+        os.makedirs(orphan_dir)
+        mtime = time.time() - 7200
+        os.utime(service.session_dir("orphan"), (mtime, mtime))
+
+        assert service.collect_expired()["removed_dirs"] == 1
+        assert not os.path.exists(service.session_dir("orphan"))
+
+    def test_create_session_collects_expired(self, test_db, service):
+        expired = create(service)
+        expire(test_db, expired)
+        expired_id = expired.id
+
+        create(service)
+
+        test_db.expire_all()
+        assert test_db.query(UploadSession).filter(UploadSession.id == expired_id).first() is None
@@ -121,6 +121,19 @@ class TestRouteRegistration:
         assert response.status_code == 200
         assert response.json() == {"status": "healthy"}
 
+    def test_readiness_endpoint_reports_warmup(self):
+        """测试就绪检查端点在缓存预热结束后返回 200"""
+        from app.main import app
+
+        with TestClient(app) as client:
+            client.portal.call(app.state.cache_warmer.wait_ready)
+            response = client.get("/ready")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["status"] == "ready"
+        assert "state" in data["warmup"]
+
     def test_websocket_endpoint_registration(self):
         """测试WebSocket端点注册 - Task 3.4.3"""
         from app.main import app
@@ -0,0 +1,122 @@
+"""
+app/utils/compression.py 单元测试
+
+测试 gzip 压缩结果的格式（固定文件头、与标准库兼容）、分块解压和数据流包装、
+Accept-Encoding 协商，以及压缩算法配置的解析。
+"""
+
+import gzip
+import io
+import zlib
+from unittest.mock import patch
+
+import pytest
+
+from app.utils.compression import (
+    ENCODING_GZIP,
+    ENCODING_ZSTD,
+    GZIP_HEADER,
+    accepts_encoding,
+    compress_bytes,
+    compress_file,
+    encoded_path,
+    iter_decompress,
+    open_decompressed,
+    resolve_encoding,
+)
+
+CONTENT = "知识库内容 knowledge base content\n".encode() * 500
+
+
+class TestGzip:
+    """测试 gzip 压缩和解压"""
+
+    def test_compress_bytes_is_standard_gzip(self):
+        compressed = compress_bytes(CONTENT, ENCODING_GZIP)
+
+        assert compressed.startswith(GZIP_HEADER)
+        assert len(compressed) < len(CONTENT) // 5
+        assert gzip.decompress(compressed) == CONTENT
+        # 没有修改时间等可变字段，相同内容得到相同结果
+        assert compress_bytes(CONTENT, ENCODING_GZIP) == compressed
+
+    def test_compress_file(self, tmp_path):
+        source = tmp_path / "notes.txt"
+        source.write_bytes(CONTENT)
+
+        size = compress_file(str(source), str(tmp_path / "notes.txt.gz"), ENCODING_GZIP, level=9)
+
+        assert size == (tmp_path / "notes.txt.gz").stat().st_size
+        assert gzip.decompress((tmp_path / "notes.txt.gz").read_bytes()) == CONTENT
+
+    def test_iter_decompress_small_chunks(self):
+        compressed = compress_bytes(CONTENT, ENCODING_GZIP)
+        chunks = (compressed[i : i + 7] for i in range(0, len(compressed), 7))
+
+        assert b"".join(iter_decompress(chunks, ENCODING_GZIP)) == CONTENT
+
+    def test_iter_decompress_truncated(self):
+        compressed = compress_bytes(CONTENT, ENCODING_GZIP)
+
+        with pytest.raises(zlib.error):
+            b"".join(iter_decompress([compressed[:-4]], ENCODING_GZIP))
+
+    def test_open_decompressed_closes_source(self):
+        source = io.BytesIO(compress_bytes(CONTENT, ENCODING_GZIP))
+
+        with open_decompressed(source, ENCODING_GZIP) as f:
+            assert f.read(10) == CONTENT[:10]
+            assert f.read() == CONTENT[10:]
+        assert source.closed
+
+    def test_unsupported_encoding(self):
+        with pytest.raises(ValueError):
+            compress_bytes(CONTENT, "br")
+
+
+class TestAcceptsEncoding:
+    """测试 Accept-Encoding 协商"""
+
+    @pytest.mark.parametrize(
+        ("header", "expected"),
+        [
+            ("gzip, deflate, br", True),
+            ("GZIP", True),
+            ("x-gzip", True),
+            ("br;q=1.0, gzip;q=0.5", True),
+            ("gzip;q=0", False),
+            ("*", True),
+            ("*;q=0.1, gzip;q=0", False),
+            ("br, deflate", False),
+            ("identity", False),
+            ("", False),
+            (None, False),
+        ],
+    )
+    def test_gzip(self, header, expected):
+        assert accepts_encoding(header, ENCODING_GZIP) is expected
+
+
+class TestResolveEncoding:
+    """测试压缩算法配置的解析"""
+
+    def setup_method(self):
+        resolve_encoding.cache_clear()
+
+    def test_known_algorithms(self):
+        assert resolve_encoding("gzip") == ENCODING_GZIP
+        assert resolve_encoding(" GZIP ") == ENCODING_GZIP
+        assert resolve_encoding("none") is None
+        assert resolve_encoding("") is None
+
+    def test_zstd_falls_back_without_zstandard(self):
+        with patch("app.utils.compression.zstandard", None):
+            assert resolve_encoding("zstd") == ENCODING_GZIP
+
+    def test_unknown_algorithm_falls_back_to_gzip(self):
+        assert resolve_encoding("lz4") == ENCODING_GZIP
+
+    def test_encoded_path(self):
+        assert encoded_path("blobs/ab/cd/abcd", ENCODING_GZIP) == "blobs/ab/cd/abcd.gz"
+        assert encoded_path("blobs/ab/cd/abcd", ENCODING_ZSTD) == "blobs/ab/cd/abcd.zst"
+        assert encoded_path("blobs/ab/cd/abcd", None) == "blobs/ab/cd/abcd"
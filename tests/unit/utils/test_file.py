@@ -4,19 +4,25 @@ app/utils/file.py 单元测试
 测试文件工具函数，包括验证、保存和删除。
 """
 
+import hashlib
 import os
+from io import BytesIO
 from unittest.mock import AsyncMock, Mock, patch
 
 import pytest
 from fastapi import HTTPException, UploadFile
 
 from app.utils.file import (
+    UploadTooLargeError,
     delete_file,
+    discard_staged,
     ensure_directory_exists,
     generate_unique_filename,
     get_file_extension,
     save_uploaded_file,
     save_uploaded_file_with_size,
+    stage_upload,
+    stage_uploads,
     validate_file_content_size,
     validate_file_size,
     validate_file_type,
@@ -267,6 +273,97 @@ class TestSaveUploadedFileWithSize:
         assert "文件保存失败" in exc_info.value.detail
 
 
+class TestStageUpload:
+    """Tests for stage_upload async function"""
+
+    @pytest.mark.asyncio
+    async def test_stage_copies_in_chunks_and_hashes(self, tmp_path):
+        """Test content is copied chunk by chunk and SHA-256 is computed"""
+        content = b"0123456789" * 10
+        file = UploadFile(filename="doc.txt", file=BytesIO(content))
+
+        staged = await stage_upload(file, str(tmp_path / "staging"), max_size=len(content), chunk_size=16)
+
+        assert staged.size == len(content) == len(staged)
+        assert staged.sha256 == hashlib.sha256(content).hexdigest()
+        assert staged.read_bytes() == content
+
+    @pytest.mark.asyncio
+    async def test_stage_stops_when_limit_exceeded(self, tmp_path):
+        """Test staging stops mid-stream and removes the temp file"""
+        staging_dir = tmp_path / "staging"
+        file = UploadFile(filename="big.txt", file=BytesIO(b"x" * 100))
+
+        with pytest.raises(UploadTooLargeError) as exc_info:
+            await stage_upload(file, str(staging_dir), max_size=40, chunk_size=16)
+
+        assert exc_info.value.filename == "big.txt"
+        assert file.file.tell() == 48
+        assert os.listdir(staging_dir) == []
+
+    @pytest.mark.asyncio
+    async def test_commit_moves_file_atomically(self, tmp_path):
+        """Test commit moves the temp file and adds timestamp when target exists"""
+        target_dir = tmp_path / "kb"
+        target_dir.mkdir()
+        (target_dir / "doc.txt").write_bytes(b"old")
+        file = UploadFile(filename="doc.txt", file=BytesIO(b"new"))
+        staged = await stage_upload(file, str(tmp_path / "staging"))
+
+        with patch("app.utils.file.datetime") as mock_datetime:
+            mock_datetime.now.return_value.strftime.return_value = "20240101_120000"
+            file_path = staged.commit(str(target_dir))
+
+        assert file_path == str(target_dir / "doc_20240101_120000.txt")
+        assert not os.path.exists(staged.temp_path)
+        assert (target_dir / "doc.txt").read_bytes() == b"old"
+        assert staged.read_bytes() == b"new"
+
+    @pytest.mark.asyncio
+    async def test_discard_removes_only_uncommitted(self, tmp_path):
+        """Test discard_staged removes temp files but keeps committed ones"""
+        staging_dir = str(tmp_path / "staging")
+        committed = await stage_upload(UploadFile(filename="a.txt", file=BytesIO(b"a")), staging_dir)
+        pending = await stage_upload(UploadFile(filename="b.txt", file=BytesIO(b"b")), staging_dir)
+        file_path = committed.commit(str(tmp_path / "kb"))
+
+        discard_staged([committed, pending])
+
+        assert os.path.exists(file_path)
+        assert not os.path.exists(pending.temp_path)
+
+
+class TestStageUploads:
+    """Tests for stage_uploads async function"""
+
+    @pytest.mark.asyncio
+    async def test_stages_all_files_in_order(self, tmp_path):
+        """Test files are staged concurrently and returned in input order"""
+        contents = [f"file {i}".encode() * (i + 1) for i in range(5)]
+        files = [UploadFile(filename=f"{i}.txt", file=BytesIO(content)) for i, content in enumerate(contents)]
+
+        staged_files = await stage_uploads(files, str(tmp_path / "staging"), concurrency=3)
+
+        assert [staged.filename for staged in staged_files] == [f"{i}.txt" for i in range(5)]
+        assert [staged.read_bytes() for staged in staged_files] == contents
+
+    @pytest.mark.asyncio
+    async def test_failure_discards_all_staged_files(self, tmp_path):
+        """Test one oversized file aborts the batch and leaves no temp files"""
+        staging_dir = tmp_path / "staging"
+        files = [
+            UploadFile(filename="a.txt", file=BytesIO(b"a" * 10)),
+            UploadFile(filename="big.txt", file=BytesIO(b"b" * 100)),
+            UploadFile(filename="c.txt", file=BytesIO(b"c" * 10)),
+        ]
+
+        with pytest.raises(UploadTooLargeError) as exc_info:
+            await stage_uploads(files, str(staging_dir), max_size=50, concurrency=2)
+
+        assert exc_info.value.filename == "big.txt"
+        assert os.listdir(staging_dir) == []
+
+
 class TestEnsureDirectoryExists:
     """Tests for ensure_directory_exists function"""
 
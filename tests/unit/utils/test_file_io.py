@@ -0,0 +1,206 @@
+"""
+app/utils/file_io.py 单元测试
+
+测试文件 I/O 线程池在独立线程中执行操作、传播异常和 contextvars、限制并发，以及统计状态；
+aiter_file_io 在客户端断开时关闭生成器；map_file_io 的并行执行和失败处理；StageTimer 的阶段计时。
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+
+import pytest
+
+from app.utils.file_io import FileIOExecutor, StageTimer, aiter_file_io, map_file_io
+
+request_id = contextvars.ContextVar("request_id", default=None)
+
+
+@pytest.fixture
+def executor():
+    executor = FileIOExecutor(max_workers=1, name="test-file-io")
+    yield executor
+    executor.shutdown()
+
+
+class TestFileIOExecutor:
+    """Tests for FileIOExecutor"""
+
+    @pytest.mark.asyncio
+    async def test_runs_in_pool_thread(self, executor):
+        """Test operation runs outside the event loop thread"""
+        thread_name = await executor.run("probe", lambda: threading.current_thread().name)
+
+        assert thread_name.startswith("test-file-io")
+        assert executor.get_stats()["completed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_exception_propagates_and_counts_failure(self, executor):
+        """Test exceptions from the operation reach the caller"""
+
+        def fail():
+            raise OSError("disk error")
+
+        with pytest.raises(OSError, match="disk error"):
+            await executor.run("fail", fail)
+
+        assert executor.get_stats()["failed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_context_variables_copied(self, executor):
+        """Test contextvars of the caller are visible in the worker thread"""
+        request_id.set("req-1")
+
+        assert await executor.run("context", request_id.get) == "req-1"
+
+    @pytest.mark.asyncio
+    async def test_operations_queue_beyond_max_workers(self, executor):
+        """Test the pool bounds concurrency and keeps the event loop responsive"""
+        release = threading.Event()
+        first = asyncio.create_task(executor.run("block", release.wait, 5))
+        second = asyncio.create_task(executor.run("block", release.wait, 5))
+        await asyncio.sleep(0.05)
+
+        stats = executor.get_stats()
+        assert stats["active"] == 1
+        assert stats["queued"] == 1
+
+        release.set()
+        assert await asyncio.gather(first, second) == [True, True]
+        assert executor.get_stats()["active"] == 0
+        assert executor.get_stats()["queued"] == 0
+
+
+class TestAiterFileIO:
+    """Tests for aiter_file_io"""
+
+    @pytest.mark.asyncio
+    async def test_yields_all_chunks_and_closes(self):
+        """Test chunks are yielded in order and the generator is closed afterwards"""
+        closed = threading.Event()
+
+        def chunks():
+            try:
+                yield from (b"a", b"b", b"c")
+            finally:
+                closed.set()
+
+        assert [chunk async for chunk in aiter_file_io("test", chunks())] == [b"a", b"b", b"c"]
+        assert closed.is_set()
+
+    @pytest.mark.asyncio
+    async def test_cancel_during_next_closes_generator(self):
+        """Test cancelling the consumer while next() runs waits for it, then closes the generator"""
+        entered = threading.Event()
+        release = threading.Event()
+        closed = threading.Event()
+        received = []
+
+        def chunks():
+            try:
+                yield b"a"
+                entered.set()
+                release.wait(5)
+                yield b"b"
+                yield b"c"
+            finally:
+                closed.set()
+
+        async def consume():
+            async for chunk in aiter_file_io("test", chunks()):
+                received.append(chunk)
+
+        task = asyncio.create_task(consume())
+        await asyncio.to_thread(entered.wait, 5)
+        task.cancel()
+        await asyncio.sleep(0.05)
+        # next() 仍在线程中执行，此时不能关闭生成器
+        assert not closed.is_set()
+
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert closed.is_set()
+        assert received == [b"a"]
+
+
+class TestMapFileIO:
+    """Tests for map_file_io"""
+
+    def test_results_keep_input_order(self):
+        """Test results follow input order even when later items finish first"""
+
+        def work(item):
+            time.sleep(0.01 * (3 - item))
+            return item * 10
+
+        assert map_file_io("test-map", work, [0, 1, 2], max_workers=3) == [0, 10, 20]
+
+    def test_bounded_parallelism(self):
+        """Test at most max_workers calls run at the same time"""
+        lock = threading.Lock()
+        running = peak = 0
+
+        def work(_):
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.02)
+            with lock:
+                running -= 1
+
+        map_file_io("test-map", work, list(range(8)), max_workers=3)
+
+        assert 1 < peak <= 3
+
+    def test_sequential_when_single_worker(self):
+        """Test max_workers=1 runs in the calling thread"""
+        caller = threading.current_thread().name
+
+        assert map_file_io("test-map", lambda _: threading.current_thread().name, [1, 2], max_workers=1) == [
+            caller,
+            caller,
+        ]
+
+    def test_first_error_propagates(self):
+        """Test an exception from any call reaches the caller"""
+
+        def work(item):
+            if item == 1:
+                raise OSError("disk error")
+            return item
+
+        with pytest.raises(OSError, match="disk error"):
+            map_file_io("test-map", work, [0, 1, 2], max_workers=2)
+
+
+class TestStageTimer:
+    """Tests for StageTimer"""
+
+    def test_stages_accumulate_in_order(self):
+        """Test repeated stages add up and keep first-seen order"""
+        timer = StageTimer("test")
+
+        with timer.stage("receive"):
+            time.sleep(0.01)
+        with timer.stage("write"):
+            pass
+        with timer.stage("receive"):
+            time.sleep(0.01)
+
+        timings = timer.as_dict()
+        assert list(timings) == ["receive", "write"]
+        assert timings["receive"] >= 20
+
+    def test_failed_stage_recorded(self):
+        """Test a stage that raises is still timed"""
+        timer = StageTimer("test")
+
+        with pytest.raises(ValueError):
+            with timer.stage("validate"):
+                raise ValueError("bad")
+
+        assert "validate" in timer.as_dict()
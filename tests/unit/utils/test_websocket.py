@@ -388,6 +388,32 @@ class TestMessageWebSocketManager:
 
         # No assertions needed, just verify it doesn't crash
 
+    @pytest.mark.asyncio
+    async def test_broadcast_user_update_publishes_when_distributed(self, manager):
+        """Test broadcast publishes to the invalidation bus when it spans workers"""
+        bus = Mock()
+        bus.is_distributed = True
+        bus.publish = AsyncMock()
+
+        with (
+            patch("app.utils.websocket.get_invalidation_bus", return_value=bus),
+            patch.object(manager, "send_message_update", new_callable=AsyncMock) as mock_send,
+        ):
+            await manager.broadcast_user_update(["user2", "user1", "user2"])
+
+        bus.publish.assert_awaited_once_with("ws.message_update", {"user_ids": ["user1", "user2"]})
+        mock_send.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_handle_message_update_event_only_local_users(self, manager, mock_websocket):
+        """Test bus events only push to users connected to this worker"""
+        await manager.connect("user1", mock_websocket)
+
+        with patch.object(manager, "send_message_update", new_callable=AsyncMock) as mock_send:
+            await manager.handle_message_update_event({"data": {"user_ids": ["user1", "user2"]}})
+
+        mock_send.assert_awaited_once_with("user1")
+
 
 class TestGlobalManagerInstance:
     """Tests for the global message_ws_manager instance"""
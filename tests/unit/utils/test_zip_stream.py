@@ -0,0 +1,187 @@
+"""
+app/utils/zip_stream.py 单元测试
+
+测试流式 ZIP 的内容完整性（本地文件、内存内容和按需打开的数据流）、分块产出、压缩方式选择、
+复用 gzip 保存的压缩数据（及 zipfile 内部实现不可用时的回退）、客户端断开时的关闭，
+以及 Content-Disposition 编码。
+"""
+
+import io
+import os
+import zipfile
+import zlib
+
+import pytest
+
+from app.utils import zip_stream
+from app.utils.compression import ENCODING_GZIP, compress_bytes
+from app.utils.zip_stream import (
+    MIN_DEFLATE_SIZE,
+    aiter_zip,
+    compress_type_for,
+    content_disposition,
+    gzip_passthrough_supported,
+    iter_zip,
+    zip_entry_from_bytes,
+    zip_entry_from_file,
+    zip_entry_from_stream,
+)
+
+
+@pytest.fixture
+def entries(tmp_path):
+    text = tmp_path / "notes.txt"
+    text.write_bytes(b"line\n" * 20000)
+    image = tmp_path / "cover.png"
+    image.write_bytes(os.urandom(4096))
+    return [
+        zip_entry_from_file(str(text), "知识库笔记.txt"),
+        zip_entry_from_file(str(image), "cover.png"),
+        zip_entry_from_bytes("说明".encode(), "README.txt"),
+    ]
+
+
+def read_zip(data: bytes) -> zipfile.ZipFile:
+    return zipfile.ZipFile(io.BytesIO(data))
+
+
+class TestIterZip:
+    """Tests for iter_zip"""
+
+    def test_archive_contents(self, entries):
+        with read_zip(b"".join(iter_zip(entries))) as zf:
+            assert zf.testzip() is None
+            assert zf.read("知识库笔记.txt") == b"line\n" * 20000
+            assert zf.read("README.txt").decode() == "说明"
+            assert zf.namelist() == ["知识库笔记.txt", "cover.png", "README.txt"]
+
+    def test_compression_chosen_per_entry(self, entries):
+        with read_zip(b"".join(iter_zip(entries))) as zf:
+            infos = {info.filename: info for info in zf.infolist()}
+
+        assert infos["知识库笔记.txt"].compress_type == zipfile.ZIP_DEFLATED
+        assert infos["知识库笔记.txt"].compress_size < infos["知识库笔记.txt"].file_size
+        assert infos["cover.png"].compress_type == zipfile.ZIP_STORED
+        assert infos["README.txt"].compress_type == zipfile.ZIP_STORED
+
+    def test_yields_multiple_chunks(self, entries):
+        chunks = list(iter_zip(entries, chunk_size=1024, flush_size=1024))
+
+        assert len(chunks) > 2
+        assert all(chunks)
+
+    def test_close_stops_generation(self, entries):
+        chunks = iter_zip(entries, chunk_size=1024, flush_size=1024)
+        next(chunks)
+
+        chunks.close()
+
+        with pytest.raises(StopIteration):
+            next(chunks)
+
+    def test_stream_entry(self):
+        content = b"remote blob " * 1000
+        opened = []
+
+        def opener():
+            opened.append(True)
+            return io.BytesIO(content)
+
+        entry = zip_entry_from_stream(opener, "remote.txt", len(content), mtime=0)
+
+        assert opened == []
+        with read_zip(b"".join(iter_zip([entry]))) as zf:
+            assert zf.read("remote.txt") == content
+        assert opened == [True]
+
+    def test_gzip_entry_reuses_deflate_data(self):
+        content = b'{"question": "...", "answer": "..."}\n' * 2000
+        compressed = compress_bytes(content, ENCODING_GZIP)
+        entry = zip_entry_from_stream(lambda: io.BytesIO(compressed), "qa.json", len(content), mtime=0)
+
+        data = b"".join(iter_zip([entry._replace(encoding=ENCODING_GZIP)], chunk_size=100, flush_size=100))
+
+        with read_zip(data) as zf:
+            assert zf.testzip() is None
+            assert zf.read("qa.json") == content
+            info = zf.getinfo("qa.json")
+        assert info.compress_type == zipfile.ZIP_DEFLATED
+        assert info.file_size == len(content)
+        # 压缩数据即 gzip 去掉 10 字节头和 8 字节尾
+        assert info.compress_size == len(compressed) - 18
+        assert compressed[10:-8] in data
+
+    def test_gzip_entry_size_mismatch(self):
+        compressed = compress_bytes(b"x" * 1000, ENCODING_GZIP)
+        entry = zip_entry_from_stream(lambda: io.BytesIO(compressed), "a.txt", 999, mtime=0)
+
+        with pytest.raises(zlib.error):
+            b"".join(iter_zip([entry._replace(encoding=ENCODING_GZIP)]))
+
+    def test_gzip_entry_fallback_recompresses(self, monkeypatch):
+        monkeypatch.setattr(zip_stream, "gzip_passthrough_supported", lambda: False)
+        monkeypatch.setattr(zip_stream, "_copy_gzip_deflate", None)
+        content = b'{"question": "...", "answer": "..."}\n' * 2000
+        compressed = compress_bytes(content, ENCODING_GZIP)
+        entry = zip_entry_from_stream(lambda: io.BytesIO(compressed), "qa.json", len(content), mtime=0)
+
+        data = b"".join(iter_zip([entry._replace(encoding=ENCODING_GZIP)], chunk_size=100, flush_size=100))
+
+        with read_zip(data) as zf:
+            assert zf.testzip() is None
+            assert zf.read("qa.json") == content
+            assert zf.getinfo("qa.json").compress_type == zipfile.ZIP_DEFLATED
+
+    def test_empty_archive(self):
+        with read_zip(b"".join(iter_zip([]))) as zf:
+            assert zf.namelist() == []
+
+
+class TestGzipPassthroughSupported:
+    """Tests for gzip_passthrough_supported"""
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        gzip_passthrough_supported.cache_clear()
+        yield
+        gzip_passthrough_supported.cache_clear()
+
+    def test_supported_on_current_python(self):
+        assert gzip_passthrough_supported() is True
+
+    def test_missing_internal_attribute(self, monkeypatch):
+        monkeypatch.setattr(zip_stream, "_PASSTHROUGH_ATTRS", ("_compressor", "_no_such_attr"))
+
+        assert gzip_passthrough_supported() is False
+
+    def test_broken_passthrough_detected(self, monkeypatch):
+        # 模拟内部实现变化：写入的数据不再原样进入压缩包
+        monkeypatch.setattr(zip_stream._PassthroughCompressor, "compress", lambda self, data: b"")
+
+        assert gzip_passthrough_supported() is False
+
+
+class TestAiterZip:
+    """Tests for aiter_zip"""
+
+    @pytest.mark.asyncio
+    async def test_matches_sync_output(self, entries):
+        chunks = [chunk async for chunk in aiter_zip(entries)]
+
+        with read_zip(b"".join(chunks)) as zf:
+            assert zf.testzip() is None
+            with open(entries[1].path, "rb") as f:
+                assert zf.read("cover.png") == f.read()
+
+
+class TestHelpers:
+    """Tests for helper functions"""
+
+    def test_compress_type_for(self):
+        assert compress_type_for("a.txt", MIN_DEFLATE_SIZE) == zipfile.ZIP_DEFLATED
+        assert compress_type_for("a.txt", MIN_DEFLATE_SIZE - 1) == zipfile.ZIP_STORED
+        assert compress_type_for("a.ZIP", 10**6) == zipfile.ZIP_STORED
+
+    def test_content_disposition(self):
+        assert content_disposition("kb.zip") == 'attachment; filename="kb.zip"'
+        assert content_disposition("知识库.zip") == "attachment; filename*=utf-8''%E7%9F%A5%E8%AF%86%E5%BA%93.zip"